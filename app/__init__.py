@@ -2,31 +2,42 @@ from flask import Flask
 from flask_cors import CORS
 from config import config
 from .extensions import db, cache
-from flask_migrate import Migrate
-from flasgger import Flasgger
 from .logging_config import configure_logging
+from .startup import StartupTimer, needs_migrate
 import os
 
 def create_app(config_name=None):
     """
     Application factory function.
+
+    Each phase is timed into ``app.extensions['startup']`` (see app/startup.py).
     """
+    timer = StartupTimer()
     if config_name is None:
         config_name = os.getenv('FLASK_CONFIG', 'default')
 
-    app = Flask(__name__)
-    app.config.from_object(config[config_name])
+    with timer.phase('config'):
+        app = Flask(__name__)
+        app.config.from_object(config[config_name])
+    app.extensions['startup'] = timer
 
     # Configure logging
-    configure_logging(
-        log_level=app.config.get("LOG_LEVEL", "INFO"),
-        is_debug=app.config.get("DEBUG", False)
-    )
+    with timer.phase('logging'):
+        configure_logging(
+            log_level=app.config.get("LOG_LEVEL", "INFO"),
+            is_debug=app.config.get("DEBUG", False)
+        )
 
     # Initialize extensions
-    db.init_app(app)
-    cache.init_app(app)
-    Migrate(app, db)
+    with timer.phase('extensions'):
+        db.init_app(app)
+        cache.init_app(app)
+    # Flask-Migrate pulls in alembic and only serves `flask db`
+    if needs_migrate():
+        with timer.phase('migrate'):
+            from flask_migrate import Migrate
+
+            Migrate(app, db)
 
     with app.app_context():
         # Load settings from the database after the app and db are initialized
@@ -38,7 +49,8 @@ def create_app(config_name=None):
         if not skip_settings:
             from .settings import settings
             try:
-                settings.load()
+                with timer.phase('settings'):
+                    settings.load()
             except Exception as e:
                 # Do not abort app creation if the DB/tables aren't present yet
                 # (common when the developer just cloned the repo). Log a warning
@@ -49,23 +61,21 @@ def create_app(config_name=None):
                 )
 
         # Register the master v1 API blueprint
-        from .api.v1 import api_v1
-        app.register_blueprint(api_v1, url_prefix='/api/v1')
-
-        # After blueprints are registered, inject swagger extras (e.g. pagination)
-        try:
-            from .api.swagger_helpers import apply_swagger_extras
+        with timer.phase('blueprints'):
+            from .api.v1 import api_v1
+            app.register_blueprint(api_v1, url_prefix='/api/v1')
 
-            apply_swagger_extras(app)
-        except Exception:
-            # Non-fatal: if helpers fail, continue and Flasgger will still work
-            pass
+    # Initialize Flasgger after blueprints are registered; the swagger extras
+    # (e.g. pagination) are injected when the spec is first built unless
+    # SWAGGER_LAZY is off
+    with timer.phase('swagger'):
+        from .api.swagger_helpers import init_swagger
 
-    # Initialize Flasgger after blueprints are registered and docs injected
-    Flasgger(app)  # Initialize Flasgger
+        init_swagger(app)
 
     # Configure CORS for API endpoints and set secure Referrer-Policy
-    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
+    with timer.phase('cors'):
+        CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
     @app.after_request
     def set_security_headers(response):
@@ -73,4 +83,11 @@ def create_app(config_name=None):
         response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
         return response
 
+    # Per-endpoint latency/DB/size metrics, Server-Timing and /metrics
+    with timer.phase('metrics'):
+        from .metrics import init_metrics
+
+        init_metrics(app)
+
+    timer.log(config=config_name)
     return app
@@ -1,5 +1,7 @@
 from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
 
+from app.metrics import timed
+
 
 def _to_int(value: Any, default: int) -> int:
     try:
@@ -8,6 +10,7 @@ def _to_int(value: Any, default: int) -> int:
         return default
 
 
+@timed
 def paginate_query(
     query,
     model,
@@ -4,10 +4,15 @@ Provides a small decorator to mark view functions that should get
 common swagger extras injected automatically (for example pagination
 query-parameters). An `apply_swagger_extras(app)` function will mutate
 the view function __doc__ before Flasgger builds the spec.
+
+`write_spec` (the `flask openapi-build` command) precompiles the whole spec
+into a JSON file that `init_swagger` serves instead of building it.
 """
 from typing import Callable
 from collections import OrderedDict
 import textwrap
+import gzip
+import hashlib
 import yaml
 import json
 import os
@@ -67,6 +72,33 @@ def with_example_file(path: str):
     return _decorator
 
 
+def _get_attr_from_wrapped(obj, name):
+    """Try to find attribute `name` on obj or on its __wrapped__ chain."""
+    cur = obj
+    for _ in range(10):
+        if cur is None:
+            return None
+        if hasattr(cur, name):
+            return getattr(cur, name)
+        cur = getattr(cur, "__wrapped__", None)
+    return None
+
+
+def _example_candidates(app, example_file: str):
+    """Paths tried, in order, for a `with_example_file` path."""
+    p = Path(example_file)
+    # if absolute, try it directly
+    if p.is_absolute():
+        return [p]
+    # common candidates: relative to Flask app root, project root (parent), or app/api/examples
+    return [
+        Path(app.root_path) / example_file,
+        Path(app.root_path).parent / example_file,
+        # fallback: try app root + 'api/examples/<name>' if user passed just filename or subpath
+        Path(app.root_path) / "api" / "examples" / p.name,
+    ]
+
+
 def apply_swagger_extras(app):
     """Scan registered view functions and inject pagination YAML for
     those marked with `__add_pagination__`.
@@ -77,17 +109,6 @@ def apply_swagger_extras(app):
 
     marker = "# __pagination_injected__"
 
-    def _get_attr_from_wrapped(obj, name):
-        """Try to find attribute `name` on obj or on its __wrapped__ chain."""
-        cur = obj
-        for _ in range(10):
-            if cur is None:
-                return None
-            if hasattr(cur, name):
-                return getattr(cur, name)
-            cur = getattr(cur, "__wrapped__", None)
-        return None
-
     for endpoint, view in list(app.view_functions.items()):
         # skip flask internals
         if endpoint.startswith("static"):
@@ -107,17 +128,7 @@ def apply_swagger_extras(app):
             example_file = _get_attr_from_wrapped(fn, "__swagger_example_file__")
             example_obj = None
             if example_file:
-                p = Path(example_file)
-                candidate_paths = []
-                # if absolute, try it directly
-                if p.is_absolute():
-                    candidate_paths.append(p)
-                else:
-                    # common candidates: relative to Flask app root, project root (parent), or app/api/examples
-                    candidate_paths.append(Path(app.root_path) / example_file)
-                    candidate_paths.append(Path(app.root_path).parent / example_file)
-                    # fallback: try app root + 'api/examples/<name>' if user passed just filename or subpath
-                    candidate_paths.append(Path(app.root_path) / "api" / "examples" / p.name)
+                candidate_paths = _example_candidates(app, example_file)
 
                 loaded = False
                 for cand in candidate_paths:
@@ -240,8 +251,158 @@ def apply_swagger_extras(app):
                 continue
 
             dumped = yaml.safe_dump(final, sort_keys=False)
+            # keep the hand-written docstring for spec_fingerprint
+            fn.__swagger_source_doc__ = doc
             fn.__doc__ = pre.rstrip() + "\n\n---\n" + marker + "\n" + dumped
 
         except Exception:
             # be defensive: don't break app startup if anything goes wrong
             continue
+
+
+def spec_fingerprint(app) -> str:
+    """Hash of everything the spec is built from.
+
+    Covers the SWAGGER config, each documented rule with its hand-written
+    docstring (as it was before `apply_swagger_extras`), and the contents of
+    its example file. A precompiled spec is only served while this matches.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(app.config.get("SWAGGER", {}), sort_keys=True, default=str).encode("utf-8"))
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: (r.rule, r.endpoint)):
+        view = app.view_functions.get(rule.endpoint)
+        doc = getattr(view, "__swagger_source_doc__", None) or getattr(view, "__doc__", None) or ""
+        example_file = _get_attr_from_wrapped(view, "__swagger_example_file__")
+        if "---" not in doc and not example_file and not _get_attr_from_wrapped(view, "__add_pagination__"):
+            continue
+        h.update(f"{rule.rule} {sorted(rule.methods or ())} {rule.endpoint}\n{doc}\n".encode("utf-8"))
+        if example_file:
+            for cand in _example_candidates(app, example_file):
+                if cand.exists():
+                    h.update(cand.read_bytes())
+                    break
+    return h.hexdigest()[:16]
+
+
+def build_spec(app) -> dict:
+    """The spec served at the first Flasgger spec route, tagged with `spec_fingerprint`.
+
+    Needs an app context.
+    """
+    fingerprint = spec_fingerprint(app)  # before the extras rewrite any docstring
+    endpoint = app.swag.config["specs"][0]["endpoint"]
+    spec = dict(app.swag.get_apispecs(endpoint))
+    spec["x-source-fingerprint"] = fingerprint
+    return spec
+
+
+def write_spec(app, path) -> dict:
+    """Build the spec and write it to `path` (the file `OPENAPI_SPEC_PATH` serves)."""
+    spec = build_spec(app)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(spec, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+    return spec
+
+
+class SpecDocument:
+    """Encoded spec ready to serve: JSON body, gzipped body and ETag."""
+
+    def __init__(self, body: bytes, source: str):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.source = source
+
+
+def load_spec_document(app, endpoint: str) -> SpecDocument:
+    """The precompiled spec file when it is current, else the dynamically built spec.
+
+    Debug mode always builds dynamically so docstring edits show up.
+    """
+    path = app.config.get("OPENAPI_SPEC_PATH")
+    if path and not app.debug:
+        try:
+            body = Path(path).read_bytes()
+            data = json.loads(body)
+        except FileNotFoundError:
+            app.logger.info("openapi: no precompiled spec at %s, building it (see `flask openapi-build`)", path)
+        except (OSError, ValueError) as e:
+            app.logger.warning("openapi: unreadable precompiled spec %s: %s", path, e)
+        else:
+            if data.get("x-source-fingerprint") == spec_fingerprint(app):
+                return SpecDocument(body, "precompiled")
+            app.logger.warning("openapi: %s is out of date, building the spec instead (run `flask openapi-build`)", path)
+    spec = app.swag.get_apispecs(endpoint)
+    return SpecDocument(json.dumps(spec, ensure_ascii=False).encode("utf-8"), "dynamic")
+
+
+def init_swagger(app):
+    """Initialize Flasgger.
+
+    With ``SWAGGER_LAZY`` (the default) nothing about the spec is done at
+    startup: ``apply_swagger_extras`` runs when the spec is first requested
+    (``/api/docs/`` loads it), and the built spec is cached for the life of
+    the process, also in debug mode where Flasgger would rebuild it on
+    every request. ``SWAGGER_LAZY=0`` applies the extras eagerly as before.
+
+    The spec route serves ``OPENAPI_SPEC_PATH`` (written by ``flask
+    openapi-build``) as-is when it matches the routes, gzipped when the
+    client accepts it and with an ETag, so repeat loads are 304s. Outside
+    debug mode the docstrings are then never parsed at all.
+    """
+    import threading
+
+    from flasgger import Swagger
+    from flask import Response, request
+
+    class DeferredSwagger(Swagger):
+        _extras_lock = threading.Lock()
+        _extras_applied = False
+
+        def get_apispecs(self, endpoint="apispec_1"):
+            if endpoint in self.apispecs:
+                return self.apispecs[endpoint]
+            if not self._extras_applied:
+                with self._extras_lock:
+                    if not self._extras_applied:
+                        apply_swagger_extras(self.app)
+                        self._extras_applied = True
+            with self._extras_lock:
+                if endpoint not in self.apispecs:
+                    super().get_apispecs(endpoint)
+                return self.apispecs[endpoint]
+
+    if not app.config.get("SWAGGER_LAZY", True):
+        try:
+            apply_swagger_extras(app)
+        except Exception:
+            # Non-fatal: if helpers fail, continue and Flasgger will still work
+            pass
+        swagger = Swagger(app)
+    else:
+        swagger = DeferredSwagger(app)
+
+    endpoint = swagger.config["specs"][0]["endpoint"]
+    documents = {}
+    lock = threading.Lock()
+
+    def serve_spec():
+        doc = documents.get(endpoint)
+        if doc is None:
+            with lock:
+                doc = documents.get(endpoint)
+                if doc is None:
+                    doc = documents[endpoint] = load_spec_document(app, endpoint)
+        use_gzip = "gzip" in request.accept_encodings
+        resp = Response(doc.gzipped if use_gzip else doc.body, mimetype="application/json")
+        if use_gzip:
+            resp.headers["Content-Encoding"] = "gzip"
+        resp.set_etag(doc.etag + ("-gz" if use_gzip else ""))
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Spec-Source"] = doc.source
+        return resp.make_conditional(request)
+
+    app.view_functions[f"{swagger.config.get('endpoint', 'flasgger')}.{endpoint}"] = serve_spec
+    return swagger
@@ -6,6 +6,8 @@ from .prompt_routes import prompts_bp
 from .script_routes import scripts_bp
 from .stream_routes import stream_bp
 from .vbee_routes import vbee_bp
+from .transcript_routes import transcripts_bp
+from .admin_routes import admin_bp
 
 # Create a master blueprint for the v1 API
 api_v1 = Blueprint('api_v1', __name__)
@@ -15,4 +17,6 @@ api_v1.register_blueprint(settings_bp)
 api_v1.register_blueprint(prompts_bp)
 api_v1.register_blueprint(scripts_bp)
 api_v1.register_blueprint(stream_bp)
-api_v1.register_blueprint(vbee_bp)
\ No newline at end of file
+api_v1.register_blueprint(vbee_bp)
+api_v1.register_blueprint(transcripts_bp)
+api_v1.register_blueprint(admin_bp)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import hmac
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+admin_bp = Blueprint('admin', __name__)
+
+
+def admin_required(view):
+    """Require ``X-Admin-Token`` to match ``ADMIN_TOKEN``; without a configured token the routes do not exist."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = current_app.config.get('ADMIN_TOKEN')
+        if not expected:
+            return jsonify({"error": "Not found"}), 404
+        given = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(given.encode('utf-8'), str(expected).encode('utf-8')):
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@admin_bp.route('/admin/threads', methods=['GET'])
+@admin_required
+def list_threads():
+    """Threads of the API process and what each job worker is doing.
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: header
+        name: X-Admin-Token
+        type: string
+        required: true
+    responses:
+      200:
+        description: "`threads` (names usable as the profile `thread` filter) and `workers` state."
+      403:
+        description: Wrong admin token.
+    """
+    from app.profiling import thread_names
+    from app.tasks import worker_snapshot
+
+    return jsonify({"threads": thread_names(), "workers": worker_snapshot()})
+
+
+@admin_bp.route('/admin/profile', methods=['POST'])
+@admin_required
+def capture_profile():
+    """Sample the stacks of the running process for a few seconds.
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: header
+        name: X-Admin-Token
+        type: string
+        required: true
+      - in: query
+        name: seconds
+        type: number
+        description: Capture length (default 5, at most 60).
+      - in: query
+        name: interval
+        type: number
+        description: Seconds between samples (default 0.005).
+      - in: query
+        name: thread
+        type: string
+        description: Only threads whose name matches this glob, e.g. Worker-Thread-*.
+      - in: query
+        name: format
+        type: string
+        enum: [folded, json]
+        description: "folded (flamegraph.pl/speedscope text, default) or json with top functions."
+    responses:
+      200:
+        description: The profile.
+      400:
+        description: Invalid parameters.
+      409:
+        description: Another capture is running.
+    """
+    from app.profiling import ProfilerBusy, folded, sample_stacks, top_functions
+
+    params = dict(request.args)
+    params.update(request.get_json(silent=True) or {})
+    fmt = params.get('format', 'folded')
+    if fmt not in ('folded', 'json'):
+        return jsonify({"error": "format must be folded or json"}), 400
+    try:
+        seconds = float(params.get('seconds', 5))
+        interval = float(params.get('interval', 0.005))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds and interval must be numbers"}), 400
+
+    try:
+        profile = sample_stacks(seconds, interval=interval, thread=params.get('thread') or None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+
+    if fmt == 'folded':
+        resp = Response(folded(profile['stacks']), mimetype='text/plain')
+        resp.headers['X-Profile-Samples'] = str(profile['samples'])
+        resp.headers['X-Profile-Seconds'] = str(profile['seconds'])
+        return resp
+    profile['top'] = top_functions(profile['stacks'])
+    return jsonify(profile)
+
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@admin_required
+def list_sampled_profiles():
+    """Recent cProfile runs of sampled requests (METRICS_PROFILE_SAMPLE_RATE).
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: header
+        name: X-Admin-Token
+        type: string
+        required: true
+    responses:
+      200:
+        description: Newest first; `top` is the pstats listing by cumulative time.
+    """
+    from app.metrics import get_metrics
+
+    metrics = get_metrics()
+    profiles = list(reversed(metrics.profiles)) if metrics else []
+    return jsonify({"profiles": profiles})
@@ -22,6 +22,8 @@ from flask import abort
 from app.extensions import db
 from app.models.script import Script
 from app.settings import settings
+from app.utils import get_projects_root
+from app.services.asset_index import get_asset_index, summarize
 from app.services.script_service import (
     compute_project_path_for_script,
     prepare_project_folder,
@@ -549,3 +551,148 @@ def get_script_project_path(script_id):
     except Exception as e:
         log.error("project_path.resolve.failed", script_id=script_id, error=str(e))
         return jsonify({"error": "Failed to resolve project path"}), 500
+
+
+@scripts_bp.route("/scripts/<int:script_id>/assets", methods=["GET"])
+def get_script_assets(script_id):
+    """List the files in a script's project folder, answered from the asset index.
+    ---
+    tags:
+      - Scripts
+    parameters:
+      - in: path
+        name: script_id
+        type: integer
+        required: true
+      - in: query
+        name: refresh
+        type: boolean
+        required: false
+        description: Rescan this project folder before answering.
+    responses:
+      200:
+        description: >
+          Indexed files grouped by kind (audio, scene_image, transcript,
+          subtitle, draft, script, image, other) with size and mtime, plus a
+          summary. `indexed` is false when the folder has not been crawled.
+      404:
+        description: Script not found.
+    """
+    script = db.session.get(Script, script_id)
+    if not script:
+        return jsonify({"error": "Script not found"}), 404
+
+    root_dir = Path(current_app.root_path).parent
+    try:
+        index = get_asset_index(get_projects_root(root_dir))
+        expected = str(compute_project_path_for_script(script, root_dir))
+        if request.args.get("refresh", "").lower() in ("1", "true", "yes"):
+            index.refresh_episode(Path(expected))
+        paths = index.episode_paths(script_id)
+        path = expected if expected in paths else (paths[0] if paths else None)
+        info = index.episode_assets(path) if path else None
+    except Exception as e:
+        log.error("assets.lookup.failed", script_id=script_id, error=str(e))
+        return jsonify({"error": "Failed to read asset index"}), 500
+
+    if info is None:
+        return jsonify({"script_id": script_id, "path": expected, "indexed": False, "assets": {}, "summary": summarize({})})
+    info.update(script_id=script_id, indexed=True)
+    return jsonify(info)
+
+
+@scripts_bp.route("/scripts/<int:script_id>/generate-images", methods=["POST"])
+def generate_script_images(script_id):
+    """Schedule scene image generation for a script on the background job queue.
+    ---
+    tags:
+      - Scripts
+    parameters:
+      - in: path
+        name: script_id
+        type: integer
+        required: true
+      - in: body
+        name: body
+        required: false
+        schema:
+          type: object
+          properties:
+            mode:
+              type: string
+              enum: [all, scene]
+              description: "all: one prompt for every scene; scene: batches of batch_size scenes, one tab each."
+            batch_size:
+              type: integer
+            tabs:
+              type: integer
+            timeout:
+              type: integer
+    responses:
+      202:
+        description: Job queued; poll `status_url` or listen on /stream.
+      400:
+        description: Invalid options.
+      404:
+        description: Script not found.
+      409:
+        description: The project folder has no capcut-api.json to read scenes from.
+    """
+    from app.services.image_generator import enqueue_image_generation
+    from app.services.materializer import materialize_pending
+
+    script = db.session.get(Script, script_id)
+    if not script:
+        return jsonify({"error": "Script not found"}), 404
+
+    body = request.get_json(silent=True) or {}
+    mode = body.get("mode", "all")
+    if mode not in ("all", "scene"):
+        return jsonify({"error": "mode must be 'all' or 'scene'"}), 400
+    options = {"mode": mode}
+    try:
+        for key in ("batch_size", "tabs", "timeout"):
+            if body.get(key) is not None:
+                options[key] = max(1, int(body[key]))
+    except (TypeError, ValueError):
+        return jsonify({"error": "batch_size, tabs and timeout must be integers"}), 400
+
+    root_dir = Path(current_app.root_path).parent
+    folder = compute_project_path_for_script(script, root_dir)
+    script_path = folder / "capcut-api.json"
+    if not script_path.exists():
+        materialize_pending(root_dir=root_dir, force=True, script_ids=[script_id])
+    if not script_path.exists():
+        return jsonify({"error": "Project folder has no capcut-api.json", "path": str(folder)}), 409
+
+    job_id = enqueue_image_generation(script_path, folder, **options)
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/v1/images/jobs/{job_id}",
+    }), 202
+
+
+@scripts_bp.route("/images/jobs/<job_id>", methods=["GET"])
+def get_image_job_status(job_id):
+    """Status, progress and result of an image generation job.
+    ---
+    tags:
+      - Scripts
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: "status is one of queued, waiting, running, done, failed."
+      404:
+        description: Unknown job id.
+    """
+    from app.services.image_generator import get_image_job
+
+    job = get_image_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(dict(job, job_id=job_id))
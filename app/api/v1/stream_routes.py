@@ -1,5 +1,4 @@
 from flask import Blueprint, Response, request
-from app.tasks import redis_client, REDIS_CHANNEL
 import structlog
 
 stream_bp = Blueprint('stream', __name__)
@@ -9,8 +8,11 @@ def event_stream():
     """
     Subscribes to the Redis channel and yields server-sent events.
     """
-    pubsub = redis_client.pubsub()
-    pubsub.subscribe(REDIS_CHANNEL)
+    # Looked up at request time: the client only exists once init_tasks ran
+    from app import tasks
+
+    pubsub = tasks.redis_client.pubsub()
+    pubsub.subscribe(tasks.REDIS_CHANNEL)
     
     # Send a confirmation message to the client
     log.info("sse.client.connected", remote_addr=request.remote_addr)
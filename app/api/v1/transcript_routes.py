@@ -0,0 +1,134 @@
+from flask import Blueprint, request, jsonify, current_app
+
+transcripts_bp = Blueprint("transcripts", __name__)
+
+MAX_LIMIT = 200
+
+
+@transcripts_bp.route("/transcripts/search", methods=["GET"])
+def search_transcripts():
+    """Search quotes across all transcribed episodes.
+    ---
+    tags:
+      - Transcripts
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+        description: Words to find (all must appear; wrap in double quotes for an exact phrase).
+      - in: query
+        name: script_id
+        type: integer
+        required: false
+      - in: query
+        name: limit
+        type: integer
+        default: 50
+      - in: query
+        name: offset
+        type: integer
+        default: 0
+    responses:
+      200:
+        description: Matching subtitle cues ranked by relevance.
+        schema:
+          type: object
+          properties:
+            q:
+              type: string
+            hits:
+              type: array
+              items:
+                type: object
+                properties:
+                  script_id:
+                    type: integer
+                  scene:
+                    type: integer
+                  start:
+                    type: number
+                  end:
+                    type: number
+                  timecode:
+                    type: string
+                    example: "00:12:03.480"
+                  text:
+                    type: string
+                  snippet:
+                    type: string
+                  episode:
+                    type: string
+      400:
+        description: Missing query or invalid parameters.
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "Query parameter 'q' is required."}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), MAX_LIMIT)
+        offset = max(int(request.args.get("offset", 0)), 0)
+        script_id = request.args.get("script_id", type=int)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit and offset must be integers."}), 400
+
+    # imported here: the index pulls in numpy, which API startup does not need
+    from app.services.transcript_index import get_index
+
+    try:
+        hits = get_index().search(q, limit=limit, offset=offset, script_id=script_id)
+    except Exception as e:
+        current_app.logger.exception("Transcript search failed")
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"q": q, "count": len(hits), "hits": hits})
+
+
+@transcripts_bp.route("/transcripts/transcribe", methods=["POST"])
+def transcribe_script_audio():
+    """Queue WhisperX transcription of a script's episode audio.
+    ---
+    tags:
+      - Transcripts
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [script_id]
+          properties:
+            script_id:
+              type: integer
+            model:
+              type: string
+              description: Whisper model (default $WHISPER_MODEL or small).
+    responses:
+      202:
+        description: Queued; runs on the warm transcription worker and updates the search index.
+      400:
+        description: Missing script_id.
+      404:
+        description: Script or its episode audio not found.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        script_id = int(payload.get("script_id"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "script_id is required."}), 400
+
+    from app.extensions import db
+    from app.models.script import Script
+    from app.services.script_service import compute_project_path_for_script
+    from app.services.transcription_worker import DEFAULT_MODEL, enqueue_transcription
+
+    script = db.session.get(Script, script_id)
+    if not script:
+        return jsonify({"error": "Script not found"}), 404
+    episode = compute_project_path_for_script(script)
+    audio = next(iter(sorted(episode.glob("*.mp3"))), None) if episode.is_dir() else None
+    if audio is None:
+        return jsonify({"error": "No episode audio (*.mp3) found", "path": str(episode)}), 404
+    output = audio.with_name(audio.stem + ".whisperx.json")
+
+    job_id = enqueue_transcription(audio, output, payload.get("model") or DEFAULT_MODEL)
+    return jsonify({"job_id": job_id, "audio": str(audio), "output": str(output)}), 202
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask import current_app as app
 
-from ...services.vbee_service import VbeeService
-
 vbee_bp = Blueprint('vbee', __name__)
 
+# Upper bound on script ids accepted by one batch request
+MAX_BATCH_SIZE = 500
+
 
 @vbee_bp.route('/vbee/projects/create-from-script', methods=['POST'])
 def create_project_from_script():
@@ -19,10 +20,86 @@ def create_project_from_script():
     if not script_id:
         return jsonify({"error": "script_id is required"}), 400
 
-    service = VbeeService(app.config)
+    from ...services.vbee_service import get_vbee_service
+
+    service = get_vbee_service()
     try:
         result = service.create_project_from_script(script_id, product=product)
         return jsonify(result), 200
     except Exception as e:
         app.logger.exception('VBEE create project failed')
         return jsonify({"error": str(e)}), 500
+
+
+@vbee_bp.route('/vbee/projects/batch', methods=['POST'])
+def create_projects_batch():
+    """Queue VBEE project creation for many scripts.
+    ---
+    tags:
+      - VBEE
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [script_ids]
+          properties:
+            script_ids:
+              type: array
+              items:
+                type: integer
+            product:
+              type: string
+            dry_run:
+              type: boolean
+    responses:
+      202:
+        description: "Jobs queued; `jobs` maps each script id to its job id."
+      400:
+        description: Missing, invalid or too many script ids.
+    """
+    payload = request.get_json(silent=True) or {}
+    script_ids = payload.get('script_ids')
+    if not isinstance(script_ids, list) or not script_ids:
+        return jsonify({"error": "script_ids must be a non-empty list"}), 400
+    if len(script_ids) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"at most {MAX_BATCH_SIZE} script_ids per batch"}), 400
+    try:
+        ids = [int(s) for s in script_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "script_ids must be integers"}), 400
+
+    dry_run = payload.get('dry_run')
+    from ...services.vbee_service import enqueue_project_creation
+
+    jobs = enqueue_project_creation(ids, product=payload.get('product'), dry_run=None if dry_run is None else bool(dry_run))
+    return jsonify({
+        "jobs": {str(sid): job_id for sid, job_id in jobs.items()},
+        "status_url": "/api/v1/vbee/jobs/<job_id>",
+    }), 202
+
+
+@vbee_bp.route('/vbee/jobs/<job_id>', methods=['GET'])
+def get_vbee_job_status(job_id):
+    """Status and result of a VBEE project creation job.
+    ---
+    tags:
+      - VBEE
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: "status is one of queued, running, done, failed."
+      404:
+        description: Unknown job id.
+    """
+    from ...services.vbee_service import get_vbee_job
+
+    job = get_vbee_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(dict(job, job_id=job_id))
@@ -0,0 +1,38 @@
+import click
+import json
+from pathlib import Path
+
+
+def init_asset_commands(app):
+    """Register project asset index Flask CLI commands on the given app."""
+
+    @app.cli.command('index-assets')
+    @click.option('--projects-dir', default=None, help='Projects root to crawl (default: PROJECT_FOLDER setting)')
+    @click.option('--full', is_flag=True, default=False, help='Rescan every folder, not only those whose mtime changed')
+    def index_assets(projects_dir, full):
+        """Refresh the project asset index used by /scripts/<id>/assets."""
+        from app.services.asset_index import get_asset_index
+        from app.utils import get_projects_root
+
+        with app.app_context():
+            root = Path(projects_dir) if projects_dir else get_projects_root(Path(app.root_path).parent)
+            index = get_asset_index(root)
+            res = index.refresh(full=full)
+            res.update(index.stats())
+            res['index'] = str(index.path)
+            print(json.dumps(res, ensure_ascii=False, indent=2))
+
+    @app.cli.command('reconcile-flags')
+    @click.option('--projects-dir', default=None, help='Projects root to check (default: PROJECT_FOLDER setting)')
+    @click.option('--dry-run', is_flag=True, default=False, help='Report mismatches without updating the database')
+    @click.option('--no-refresh', 'refresh', is_flag=True, flag_value=False, default=True, help='Use the asset index as is, without rescanning changed folders')
+    def reconcile_flags_cmd(projects_dir, dry_run, refresh):
+        """Sync the Script is_* generation flags with the project folders."""
+        from app.services.asset_index import get_asset_index
+        from app.services.flag_reconciler import reconcile_flags
+        from app.utils import get_projects_root
+
+        with app.app_context():
+            root = Path(projects_dir) if projects_dir else get_projects_root(Path(app.root_path).parent)
+            res = reconcile_flags(get_asset_index(root), refresh=refresh, dry_run=dry_run)
+            print(json.dumps(res, ensure_ascii=False, indent=2))
@@ -0,0 +1,36 @@
+import click
+import json
+from pathlib import Path
+
+
+def init_openapi_commands(app):
+    """Register OpenAPI spec build commands on the given app."""
+
+    @app.cli.command('openapi-build')
+    @click.option('--out', type=click.Path(dir_okay=False, path_type=Path), default=None, help='Output file (default: OPENAPI_SPEC_PATH)')
+    @click.option('--check', is_flag=True, default=False, help='Only verify the file is current; exit 1 if it is missing or stale')
+    def openapi_build(out, check):
+        """Precompile the OpenAPI spec served at /apispec_1.json.
+
+        Run after changing route docstrings or example files; the server
+        falls back to building the spec itself while the file is stale.
+        """
+        from app.api.swagger_helpers import spec_fingerprint, write_spec
+
+        path = out or app.config.get('OPENAPI_SPEC_PATH')
+        if not path:
+            raise click.UsageError('no output file (--out or OPENAPI_SPEC_PATH)')
+        path = Path(path)
+        if check:
+            try:
+                current = json.loads(path.read_text(encoding='utf-8')).get('x-source-fingerprint')
+            except (OSError, ValueError) as e:
+                raise click.ClickException(f'{path}: {e}')
+            expected = spec_fingerprint(app)
+            if current != expected:
+                raise click.ClickException(f'{path} is out of date ({current} != {expected}); run `flask openapi-build`')
+            click.echo(f'{path} is up to date ({expected})')
+            return
+        with app.app_context():
+            spec = write_spec(app, path)
+        click.echo(f"Wrote {path} ({len(spec.get('paths', {}))} paths, fingerprint {spec['x-source-fingerprint']})")
@@ -0,0 +1,44 @@
+import click
+import json
+import os
+from pathlib import Path
+
+
+def init_profile_commands(app):
+    """Register on-demand profiling Flask CLI commands on the given app."""
+
+    @app.cli.command('profile-capture')
+    @click.option('--url', default='http://127.0.0.1:5000', show_default=True, help='Base URL of the running API process')
+    @click.option('--seconds', type=float, default=10.0, show_default=True, help='Capture length (at most 60)')
+    @click.option('--interval', type=float, default=0.005, show_default=True, help='Seconds between stack samples')
+    @click.option('--thread', default=None, help='Only threads matching this glob, e.g. "Worker-Thread-*"')
+    @click.option('--format', 'fmt', type=click.Choice(['folded', 'json']), default='folded', show_default=True)
+    @click.option('--out', type=click.Path(dir_okay=False, path_type=Path), default=None, help='Write the profile here instead of stdout')
+    @click.option('--token', default=None, help='Admin token (default: ADMIN_TOKEN env/config)')
+    def profile_capture(url, seconds, interval, thread, fmt, out, token):
+        """Capture a sampling profile of a running API process.
+
+        The folded output feeds flamegraph.pl, inferno or speedscope directly.
+        """
+        import requests
+
+        token = token or os.getenv('ADMIN_TOKEN') or app.config.get('ADMIN_TOKEN')
+        if not token:
+            raise click.UsageError('an admin token is required (--token or ADMIN_TOKEN)')
+        params = {'seconds': seconds, 'interval': interval, 'format': fmt}
+        if thread:
+            params['thread'] = thread
+        resp = requests.post(
+            f"{url.rstrip('/')}/api/v1/admin/profile",
+            params=params,
+            headers={'X-Admin-Token': token},
+            timeout=seconds + 30,
+        )
+        if resp.status_code != 200:
+            raise click.ClickException(f'profile capture failed ({resp.status_code}): {resp.text.strip()}')
+        body = resp.text if fmt == 'folded' else json.dumps(resp.json(), ensure_ascii=False, indent=2)
+        if out:
+            out.write_text(body, encoding='utf-8')
+            click.echo(f'Wrote {out} ({resp.headers.get("X-Profile-Samples", "?")} samples)')
+        else:
+            click.echo(body, nl=False)
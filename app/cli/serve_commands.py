@@ -0,0 +1,70 @@
+import click
+
+
+def init_serve_commands(app):
+    """Register production serve / worker Flask CLI commands on the given app."""
+
+    @app.cli.command('serve')
+    @click.option('--host', default=None, help='Bind address (default: SERVE_HOST)')
+    @click.option('--port', type=int, default=None, help='Port (default: SERVE_PORT)')
+    @click.option('--threads', type=int, default=None, help='Request threads per process (default: SERVE_THREADS)')
+    @click.option('--processes', type=int, default=None, help='Forked server processes sharing the socket (default: SERVE_PROCESSES)')
+    @click.option('--connection-limit', type=int, default=None, help='Waitress connection limit per process')
+    @click.option('--workers/--no-workers', 'start_workers', default=None,
+                  help='Run job workers in the API processes (default: only with the in-memory queue)')
+    def serve_command(host, port, threads, processes, connection_limit, start_workers):
+        """Serve the API with waitress (production).
+
+        With JOB_QUEUE_BACKEND=redis run the job workers separately with
+        `flask worker`. SIGTERM shuts down gracefully.
+        """
+        from app.server import check_processes, serve
+
+        cfg = app.config
+        processes = processes or cfg.get('SERVE_PROCESSES', 1)
+        try:
+            check_processes(app, processes, start_workers)
+        except ValueError as e:
+            raise click.UsageError(f'{e}; pass --no-workers or set JOB_QUEUE_BACKEND=redis')
+        options = {}
+        if connection_limit or cfg.get('SERVE_CONNECTION_LIMIT'):
+            options['connection_limit'] = connection_limit or cfg.get('SERVE_CONNECTION_LIMIT')
+        serve(
+            app,
+            host=host or cfg.get('SERVE_HOST', '127.0.0.1'),
+            port=port or cfg.get('SERVE_PORT', 5000),
+            threads=threads or cfg.get('SERVE_THREADS', 8),
+            processes=processes,
+            start_workers=start_workers,
+            shutdown_timeout=cfg.get('SHUTDOWN_TIMEOUT', 30),
+            **options,
+        )
+
+    @app.cli.command('worker')
+    @click.option('--workers', type=int, default=None, help='Worker threads (default: NUM_WORKERS)')
+    @click.option('--metrics-host', default=None, help='Bind address of the metrics listener (default: SERVE_HOST)')
+    @click.option('--metrics-port', type=int, default=None,
+                  help='Serve /metrics and /api/v1/admin/* for this process on this port (default: WORKER_METRICS_PORT, 0 = off)')
+    def worker_command(workers, metrics_host, metrics_port):
+        """Run background job workers for the API processes (needs JOB_QUEUE_BACKEND=redis).
+
+        Job metrics and worker state live in this process; use --metrics-port
+        to expose them (the API's /metrics does not see them).
+        """
+        from app.server import start_admin_listener
+        from app.tasks import run_worker
+
+        cfg = app.config
+        if str(cfg.get('JOB_QUEUE_BACKEND') or 'memory').lower() != 'redis':
+            raise click.UsageError('a separate worker needs JOB_QUEUE_BACKEND=redis; the in-memory queue is per process')
+        port = metrics_port if metrics_port is not None else cfg.get('WORKER_METRICS_PORT', 0)
+        listener = None
+        if port:
+            listener = start_admin_listener(app, metrics_host or cfg.get('SERVE_HOST', '127.0.0.1'), port)
+        try:
+            ok = run_worker(app, num_workers=workers, shutdown_timeout=cfg.get('SHUTDOWN_TIMEOUT', 30))
+        finally:
+            if listener is not None:
+                listener.close()
+        if not ok:
+            raise SystemExit(1)
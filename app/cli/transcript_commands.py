@@ -0,0 +1,23 @@
+import click
+import json
+from pathlib import Path
+
+
+def init_transcript_commands(app):
+    """Register transcript index Flask CLI commands on the given app."""
+
+    @app.cli.command('index-transcripts')
+    @click.option('--projects-dir', default=None, help='Projects root to scan (default: PROJECT_FOLDER setting)')
+    @click.option('--force', is_flag=True, default=False, help='Re-index every episode, even unchanged ones')
+    def index_transcripts(projects_dir, force):
+        """Incrementally index all episode transcripts for /transcripts/search."""
+        from app.services.transcript_index import default_index_path, get_index
+        from app.utils import get_projects_root
+
+        with app.app_context():
+            root = Path(projects_dir) if projects_dir else get_projects_root(Path(app.root_path).parent)
+            index = get_index(default_index_path(root))
+            res = index.update(root, force=force)
+            res.update(index.stats())
+            res['index'] = str(index.path)
+            print(json.dumps(res, ensure_ascii=False, indent=2))
@@ -0,0 +1,442 @@
+"""Request-level performance instrumentation.
+
+``init_metrics(app)`` adds hooks that record, per endpoint (the URL rule,
+so ``/scripts/<int:script_id>`` is one series):
+
+- ``http_request_duration_seconds`` latency histogram (method, endpoint, status)
+- ``http_request_size_bytes`` / ``http_response_size_bytes`` histograms
+- ``http_request_db_queries`` / ``http_request_db_seconds``: queries issued and
+  time spent in the database per request (SQLAlchemy cursor events)
+
+Metrics are served in the Prometheus text format at ``/metrics``, and each
+response carries a ``Server-Timing`` header (``app``, ``db`` and anything
+added with ``add_timing``) plus ``X-Request-ID``, which is also bound in the
+structlog context so every log line of a request can be correlated.
+
+Background job metrics (``JOB_METRICS``: queue wait, run time, outcomes,
+retries and worker busy time, recorded by ``app.tasks``) are process-wide
+and served on the same endpoint.
+
+Hot functions marked with ``@timed`` are timed on every call
+(``function_duration_seconds``) and show up in the Server-Timing of the
+request that called them.
+
+A fraction of requests (``METRICS_PROFILE_SAMPLE_RATE``) can be run under
+cProfile; the top functions of the last few profiles are kept in memory and
+the raw stats are written to ``METRICS_PROFILE_DIR`` when it is set. With
+sampling off the per-request cost is a few ``perf_counter`` calls and dict
+updates.
+"""
+import cProfile
+import functools
+from bisect import bisect_left
+import io
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from flask import Response, current_app, g, request
+
+log = structlog.get_logger()
+
+EXTENSION_KEY = 'metrics'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+FUNCTION_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+UNMATCHED_ENDPOINT = '<unmatched>'
+PROFILE_TOP = 30
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labelvalues: Any) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: Any) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, key)} {_number(v)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: Any) -> None:
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            # first bucket with value <= bound; len(buckets) is the +Inf bucket
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self, *labelvalues: Any) -> Optional[Dict[str, Any]]:
+        """``{count, sum}`` of one series (None when never observed)."""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                return None
+            return {'count': int(sum(series[:-1])), 'sum': series[-1]}
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """Value read at scrape time from ``fn``: a number, or ``{label values tuple: number}``."""
+
+    def __init__(self, name: str, documentation: str, fn, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, v in sorted(values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, key)} {_number(v)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self.metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class AppMetrics:
+    """The registry and HTTP metrics of one app (``app.extensions['metrics']``)."""
+
+    def __init__(self, profile_keep: int = 20):
+        self.registry = Registry()
+        self.requests = self.registry.register(Histogram(
+            'http_request_duration_seconds', 'Request latency in seconds.', ('method', 'endpoint', 'status')))
+        self.request_size = self.registry.register(Histogram(
+            'http_request_size_bytes', 'Request body size in bytes.', ('endpoint',), SIZE_BUCKETS))
+        self.response_size = self.registry.register(Histogram(
+            'http_response_size_bytes', 'Response body size in bytes (non-streamed responses).', ('endpoint',), SIZE_BUCKETS))
+        self.db_queries = self.registry.register(Histogram(
+            'http_request_db_queries', 'Database queries issued per request.', ('endpoint',), QUERY_BUCKETS))
+        self.db_seconds = self.registry.register(Histogram(
+            'http_request_db_seconds', 'Time spent in database queries per request.', ('endpoint',)))
+        self.profiles: deque = deque(maxlen=max(1, int(profile_keep)))
+
+
+class JobMetrics:
+    """Background job metrics, process-wide (the worker threads serve every app)."""
+
+    def __init__(self):
+        self.registry = Registry()
+        self.wait = self.registry.register(Histogram(
+            'job_queue_wait_seconds', 'Time jobs spent queued before a worker picked them up.', ('job',), JOB_BUCKETS))
+        self.run = self.registry.register(Histogram(
+            'job_run_seconds', 'Job execution time.', ('job',), JOB_BUCKETS))
+        self.outcomes = self.registry.register(Counter(
+            'jobs_total', 'Finished job attempts by outcome (ok, failed, error, retried).', ('job', 'outcome')))
+        self.retries = self.registry.register(Counter(
+            'job_retries_total', 'Job attempts re-queued after an error.', ('job',)))
+        self.busy = self.registry.register(Counter(
+            'job_worker_busy_seconds_total', 'Seconds each worker spent running jobs.', ('worker',)))
+
+
+JOB_METRICS = JobMetrics()
+
+# @timed functions, process-wide like the job metrics
+FUNCTION_METRICS = Registry()
+FUNCTION_SECONDS = FUNCTION_METRICS.register(Histogram(
+    'function_duration_seconds', 'Time spent in functions marked with @timed.', ('function',), FUNCTION_BUCKETS))
+
+
+class _RequestStats:
+    __slots__ = ('started', 'queries', 'db_seconds', 'timings', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.timings: Dict[str, float] = {}
+        self.profiler: Optional[cProfile.Profile] = None
+
+
+_current: ContextVar[Optional[_RequestStats]] = ContextVar('request_metrics', default=None)
+_hooks_installed = False
+_hooks_lock = threading.Lock()
+
+
+def add_timing(name: str, seconds: float) -> None:
+    """Add ``seconds`` to the ``name`` entry of the current request's Server-Timing (no-op outside requests)."""
+    stats = _current.get()
+    if stats is not None:
+        stats.timings[name] = stats.timings.get(name, 0.0) + seconds
+
+
+def timed(name=None):
+    """Mark a hot function for always-on timing: ``@timed`` or ``@timed('label')``.
+
+    Each call is observed in ``function_duration_seconds{function=...}`` and,
+    inside a request, added to its Server-Timing under the last dotted part
+    of the label. The cost is two ``perf_counter`` calls and a histogram
+    update, so it is fine to leave on in production.
+    """
+    def decorate(fn):
+        label = name or f'{fn.__module__}.{fn.__qualname__}'
+        timing_name = label.rsplit('.', 1)[-1]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                FUNCTION_SECONDS.observe(elapsed, label)
+                add_timing(timing_name, elapsed)
+
+        return wrapper
+
+    if callable(name):
+        fn, name = name, None
+        return decorate(fn)
+    return decorate
+
+
+def current_db_stats() -> Optional[Dict[str, Any]]:
+    """Queries and DB seconds so far in the current request, or None outside one."""
+    stats = _current.get()
+    if stats is None:
+        return None
+    return {'queries': stats.queries, 'seconds': stats.db_seconds}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get('metrics_query_start')
+    if starts:
+        stats.db_seconds += time.perf_counter() - starts.pop()
+    stats.queries += 1
+
+
+def _install_query_hooks() -> None:
+    """Listen on every Engine once per process."""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _hooks_installed = True
+
+
+def _endpoint() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else UNMATCHED_ENDPOINT
+
+
+def _server_timing(stats: _RequestStats, total: float) -> str:
+    entries = [f'app;dur={total * 1000:.1f}', f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"']
+    entries.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in stats.timings.items())
+    return ', '.join(entries)
+
+
+def _save_profile(metrics: AppMetrics, profiler: cProfile.Profile, endpoint: str, request_id: str, seconds: float) -> None:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP)
+    entry = {
+        'request_id': request_id,
+        'method': request.method,
+        'endpoint': endpoint,
+        'path': request.path,
+        'seconds': round(seconds, 4),
+        'at': time.time(),
+        'top': out.getvalue(),
+    }
+    profile_dir = current_app.config.get('METRICS_PROFILE_DIR')
+    if profile_dir:
+        try:
+            Path(profile_dir).mkdir(parents=True, exist_ok=True)
+            path = Path(profile_dir) / f'{int(entry["at"])}-{request_id}.prof'
+            profiler.dump_stats(str(path))
+            entry['file'] = str(path)
+        except OSError as e:
+            log.warning('metrics.profile.write_failed', error=str(e))
+    metrics.profiles.append(entry)
+
+
+def _start_request() -> None:
+    stats = _RequestStats()
+    g._metrics_token = _current.set(stats)
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    structlog.contextvars.bind_contextvars(request_id=g.request_id)
+    rate = current_app.config.get('METRICS_PROFILE_SAMPLE_RATE') or 0
+    if rate and random.random() < float(rate):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active (e.g. a concurrent sampled request)
+            return
+        stats.profiler = profiler
+
+
+def _finish_request(response: Response) -> Response:
+    stats = _current.get()
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats.started
+    if stats.profiler is not None:
+        stats.profiler.disable()
+    metrics: AppMetrics = current_app.extensions[EXTENSION_KEY]
+    endpoint = _endpoint()
+    metrics.requests.observe(total, request.method, endpoint, response.status_code)
+    metrics.db_queries.observe(stats.queries, endpoint)
+    metrics.db_seconds.observe(stats.db_seconds, endpoint)
+    if request.content_length:
+        metrics.request_size.observe(request.content_length, endpoint)
+    if not response.is_streamed:
+        metrics.response_size.observe(response.calculate_content_length() or 0, endpoint)
+    if current_app.config.get('METRICS_SERVER_TIMING', True):
+        response.headers['Server-Timing'] = _server_timing(stats, total)
+    response.headers['X-Request-ID'] = g.request_id
+    if stats.profiler is not None:
+        _save_profile(metrics, stats.profiler, endpoint, g.request_id, total)
+        stats.profiler = None
+    return response
+
+
+def _teardown_request(exc=None) -> None:
+    token = g.pop('_metrics_token', None)
+    if token is not None:
+        stats = _current.get()
+        if stats is not None and stats.profiler is not None:
+            stats.profiler.disable()
+        _current.reset(token)
+    structlog.contextvars.unbind_contextvars('request_id')
+
+
+def metrics_view():
+    metrics: AppMetrics = current_app.extensions[EXTENSION_KEY]
+    body = metrics.registry.render() + JOB_METRICS.registry.render() + FUNCTION_METRICS.render()
+    return Response(body, mimetype=None, content_type=CONTENT_TYPE)
+
+
+def get_metrics(flask_app=None) -> Optional[AppMetrics]:
+    flask_app = flask_app or current_app
+    return flask_app.extensions.get(EXTENSION_KEY)
+
+
+def init_metrics(app) -> Optional[AppMetrics]:
+    """Install the request hooks, the query hooks and the ``/metrics`` route (unless ``METRICS_ENABLED`` is off)."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return None
+    metrics = AppMetrics(profile_keep=app.config.get('METRICS_PROFILE_KEEP') or 20)
+    app.extensions[EXTENSION_KEY] = metrics
+    _install_query_hooks()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    route = app.config.get('METRICS_ENDPOINT', '/metrics')
+    if route:
+        app.add_url_rule(route, 'metrics', metrics_view, methods=['GET'])
+    return metrics
+
+
+__all__ = [
+    'AppMetrics',
+    'Counter',
+    'FUNCTION_METRICS',
+    'Gauge',
+    'Histogram',
+    'JOB_METRICS',
+    'JobMetrics',
+    'Registry',
+    'add_timing',
+    'current_db_stats',
+    'get_metrics',
+    'init_metrics',
+    'timed',
+]
@@ -2,6 +2,7 @@ import json
 import ast
 from datetime import datetime, timezone
 from ..extensions import db
+from ..metrics import timed
 from sqlalchemy import text
 
 
@@ -37,7 +38,7 @@ class Script(db.Model):
     is_image_generated = db.Column(db.Boolean, nullable=False, default=False)
     is_transcript_generated = db.Column(db.Boolean, nullable=False, default=False)
     is_video_compiled = db.Column(db.Boolean, nullable=False, default=False)
-    is_has_folder = db.Column(db.Boolean, nullable=False, default=False)
+    is_has_folder = db.Column(db.Boolean, nullable=False, default=False, index=True)
     builder_configs = db.Column(db.Text, nullable=True)
 
     # timestamps
@@ -131,6 +132,7 @@ class Script(db.Model):
         return [s.strip() for s in (self.genre or "").split(",") if s.strip()]
 
     @property
+    @timed('Script.acts_parsed')
     def acts_parsed(self):
         if not self.acts:
             return []
@@ -0,0 +1,141 @@
+"""On-demand sampling profiler for the running process.
+
+``sample_stacks`` polls ``sys._current_frames()`` every ``interval`` seconds
+for a bounded time and counts the call stacks of every thread (or only those
+whose name matches ``thread``, e.g. ``Worker-Thread-2`` or ``Worker-*``).
+Unlike cProfile it sees the worker threads, needs no tracing hooks, and
+costs nothing until a capture is running, so it can stay compiled in.
+
+``folded`` renders the counts in the collapsed-stack format read by
+flamegraph.pl, speedscope and inferno: one ``thread;outer;...;inner count``
+line per distinct stack. Only one capture runs at a time.
+"""
+import fnmatch
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL = 0.001
+DEFAULT_INTERVAL = 0.005
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another capture is already running."""
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_PROJECT_ROOT):
+        return filename[len(_PROJECT_ROOT) + 1:]
+    marker = 'site-packages/'
+    i = filename.rfind(marker)
+    if i >= 0:
+        return filename[i + len(marker):]
+    return Path(filename).name
+
+
+def _frame_label(code, cache: Dict[Any, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        # ';' separates frames in the folded format
+        label = f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'.replace(';', ',')
+        cache[code] = label
+    return label
+
+
+def sample_stacks(seconds: float, interval: float = DEFAULT_INTERVAL, thread: Optional[str] = None) -> Dict[str, Any]:
+    """Sample thread stacks for ``seconds`` (capped at ``MAX_SECONDS``).
+
+    Returns ``{seconds, interval, samples, threads, stacks}`` where ``stacks``
+    maps folded stack strings (root first, thread name as the root frame) to
+    sample counts. Raises ``ValueError`` unless ``seconds`` and ``interval``
+    are finite and positive, ``ProfilerBusy`` when a capture is already running.
+    """
+    seconds, interval = float(seconds), float(interval)
+    if not (math.isfinite(seconds) and seconds > 0 and math.isfinite(interval) and interval > 0):
+        raise ValueError('seconds and interval must be finite positive numbers')
+    seconds = min(max(seconds, 0.01), MAX_SECONDS)
+    interval = min(max(interval, MIN_INTERVAL), seconds)
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy('a profile capture is already running')
+    try:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        labels: Dict[Any, str] = {}
+        stacks: Counter = Counter()
+        seen = set()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    name = names.get(ident, f'thread-{ident}')
+                if thread and not fnmatch.fnmatchcase(name, thread):
+                    continue
+                frames: List[str] = []
+                while frame is not None:
+                    frames.append(_frame_label(frame.f_code, labels))
+                    frame = frame.f_back
+                frames.append(name)
+                frames.reverse()
+                stacks[';'.join(frames)] += 1
+                seen.add(name)
+            samples += 1
+            if time.perf_counter() + interval > deadline:
+                break
+            time.sleep(interval)
+        elapsed = time.perf_counter() - started
+    finally:
+        _capture_lock.release()
+    log.info('profile.captured', seconds=round(elapsed, 3), samples=samples, stacks=len(stacks), thread=thread)
+    return {
+        'seconds': round(elapsed, 3),
+        'interval': interval,
+        'samples': samples,
+        'threads': sorted(seen),
+        'stacks': dict(stacks),
+    }
+
+
+def folded(stacks: Dict[str, int]) -> str:
+    """Collapsed-stack text (flamegraph.pl / speedscope input)."""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+
+def top_functions(stacks: Dict[str, int], limit: int = 20) -> List[Dict[str, Any]]:
+    """Functions by self samples (leaf frames) and total samples (anywhere on the stack)."""
+    own: Counter = Counter()
+    total: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')[1:]
+        if not frames:
+            continue
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    return [
+        {'function': fn, 'self': own[fn], 'total': total[fn]}
+        for fn, _ in sorted(total.items(), key=lambda kv: (-own[kv[0]], -kv[1]))[:limit]
+    ]
+
+
+def thread_names() -> List[str]:
+    return sorted(t.name for t in threading.enumerate())
+
+
+__all__ = ['MAX_SECONDS', 'ProfilerBusy', 'folded', 'sample_stacks', 'thread_names', 'top_functions']
@@ -0,0 +1,194 @@
+"""Production serving with waitress (`flask serve`).
+
+``serve`` runs the app on waitress with ``threads`` request threads. With
+``processes > 1`` the parent binds the socket once and forks that many
+waitress processes sharing it (POSIX only); the parent only supervises,
+restarting a process that dies and forwarding SIGTERM/SIGINT.
+
+Background jobs: with ``JOB_QUEUE_BACKEND=redis`` the API processes start
+no workers and only enqueue; run the pool separately with `flask worker`.
+The in-memory queue and job states live in one process, so it only
+allows a single API process (or ``start_workers=False``, where nothing
+runs jobs).
+
+With that split the job metrics (``JOB_METRICS``), worker states and the
+worker threads themselves live in the `flask worker` process, so the API's
+``/metrics`` and ``/admin/threads`` show no job data. ``start_admin_listener``
+(`flask worker --metrics-port`) serves ``/metrics`` and ``/api/v1/admin/*``
+from the worker process; scrape both, and point ``/admin/profile`` with
+``thread=Worker-Thread-*`` at the worker's port.
+
+Shutdown is graceful: SIGTERM stops waitress, which finishes the requests
+in flight, then ``stop_tasks`` lets running jobs finish (up to
+``shutdown_timeout`` seconds) through ``STOP_EVENT``.
+"""
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+# what `flask worker --metrics-port` serves besides /metrics
+ADMIN_PATH_PREFIX = '/api/v1/admin/'
+
+
+def _raise_exit(signum, frame):
+    # waitress' run loop turns SystemExit into a clean shutdown
+    raise SystemExit(0)
+
+
+def _serve_process(app, sock: Optional[socket.socket], host: str, port: int, threads: int,
+                   start_workers: bool, shutdown_timeout: float, forked: bool, options: Dict[str, Any]) -> None:
+    from waitress import create_server
+
+    from app.tasks import init_tasks, stop_tasks
+
+    if forked:
+        # connections inherited from the parent must not be shared
+        from app.extensions import db
+
+        with app.app_context():
+            db.engine.dispose(close=False)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, _raise_exit)
+
+    init_tasks(app, start_workers=start_workers)
+    if sock is not None:
+        server = create_server(app, sockets=[sock], threads=threads, **options)
+    else:
+        server = create_server(app, host=host, port=port, threads=threads, **options)
+    log.info("server.started", pid=os.getpid(), host=host, port=port, threads=threads, workers=start_workers)
+    try:
+        server.run()
+    finally:
+        log.info("server.stopping", pid=os.getpid())
+        stop_tasks(shutdown_timeout)
+
+
+def start_admin_listener(app, host: str, port: int, threads: int = 2):
+    """Serve only ``/metrics`` and ``/api/v1/admin/*`` on a background waitress thread.
+
+    Returns the waitress server (``effective_port``; ``close()`` to stop).
+    """
+    from waitress import create_server
+
+    metrics_route = app.config.get('METRICS_ENDPOINT', '/metrics')
+
+    def admin_app(environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == metrics_route or path.startswith(ADMIN_PATH_PREFIX):
+            return app(environ, start_response)
+        start_response('404 Not Found', [('Content-Type', 'text/plain')])
+        return [b'Not Found']
+
+    server = create_server(admin_app, host=host, port=port, threads=threads)
+    thread = threading.Thread(target=server.run, name='Admin-Listener', daemon=True)
+    thread.start()
+    log.info("server.admin_listener", host=host, port=server.effective_port)
+    return server
+
+
+def _queue_backend(app) -> str:
+    return str(app.config.get('JOB_QUEUE_BACKEND') or 'memory').lower()
+
+
+def check_processes(app, processes: int, start_workers: Optional[bool]) -> None:
+    """Raise ``ValueError`` when ``processes > 1`` would split in-memory job state.
+
+    Each forked process would run its own queue, workers and periodic jobs,
+    and a job status poll landing on another process would not find the job.
+    """
+    if processes > 1 and start_workers is not False and _queue_backend(app) != 'redis':
+        raise ValueError('processes > 1 needs JOB_QUEUE_BACKEND=redis (and `flask worker`), '
+                         'or no job workers in the API processes')
+
+
+def serve(app, host: str = '127.0.0.1', port: int = 5000, threads: int = 8, processes: int = 1,
+          start_workers: Optional[bool] = None, shutdown_timeout: float = 30.0, **options: Any) -> None:
+    """Serve ``app`` until SIGTERM/SIGINT.
+
+    ``start_workers`` defaults to True for the in-memory queue and False for
+    the redis backend; see ``check_processes`` for when ``processes > 1``
+    is allowed. Extra ``options`` go to waitress (connection_limit,
+    channel_timeout, backlog, ...).
+    """
+    check_processes(app, processes, start_workers)
+    if start_workers is None:
+        start_workers = _queue_backend(app) != 'redis'
+    if processes <= 1:
+        _serve_process(app, None, host, port, threads, start_workers, shutdown_timeout, False, options)
+        return
+    if not hasattr(os, 'fork'):
+        raise RuntimeError('processes > 1 needs os.fork; on this platform run one process per port behind a proxy')
+
+    sock = socket.create_server((host, port), backlog=options.get('backlog', 1024))
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int) -> None:
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()  # or the child writes the parent's buffer again
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _serve_process(app, sock, host, port, threads, start_workers, shutdown_timeout, True, options)
+            except SystemExit:
+                pass
+            except BaseException:
+                log.exception("server.process_failed", index=index)
+                code = 1
+            finally:
+                # os._exit skips flushing buffered log output
+                for stream in (sys.stdout, sys.stderr):
+                    try:
+                        stream.flush()
+                    except Exception:
+                        pass
+                os._exit(code)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, stop)
+    for i in range(processes):
+        spawn(i)
+    log.info("server.supervising", pid=os.getpid(), processes=processes, host=host, port=port)
+
+    deadline = None
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            if stopping and deadline is None:
+                deadline = time.monotonic() + shutdown_timeout + 10
+            if deadline is not None and time.monotonic() > deadline:
+                for left in list(children):
+                    try:
+                        os.kill(left, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+            time.sleep(0.2)
+            continue
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            log.warning("server.process_died", pid=pid, status=status, index=index)
+            spawn(index)
+    sock.close()
+    log.info("server.stopped", pid=os.getpid())
+
+
+__all__ = ['check_processes', 'serve', 'start_admin_listener']
@@ -0,0 +1,359 @@
+"""Cached index of the files in every project (episode) folder.
+
+Walking the projects tree with ``os.walk``/``glob`` for every request or
+script run is slow on network storage. Instead, a crawler records every
+episode folder (``<root>/<video_type>/<id>.<alias>``) and its files in a
+SQLite file, ``$ASSET_INDEX`` or ``<projects root>/.asset-index.sqlite``. For
+each file it stores the name, kind, size and mtime.
+
+Refreshes are incremental. The crawler lists the tree with ``os.scandir`` in
+a thread pool (directory listing is I/O bound and releases the GIL) and only
+rescans episodes whose directory mtime changed. That mtime changes whenever
+a file is created, deleted or atomically replaced, which is how the pipeline
+writes its outputs. Files that are rewritten in place keep a stale
+size/mtime until the next ``full`` refresh.
+
+Asset kinds: ``audio``, ``scene_image`` (``N.png``/``N.jpg``/``N.webp``),
+``image``, ``transcript`` (``*.whisperx.json``), ``subtitle``
+(``.srt/.vtt/.ass``), ``draft`` (``capcut-api.json``, ``draft_*.json``),
+``script`` (``content.txt``/``content.json``) and ``other``.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from app.services.episode_manifest import script_id_from_folder
+
+log = structlog.get_logger()
+
+INDEX_NAME = ".asset-index.sqlite"
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".wav", ".aac", ".ogg", ".flac")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+SUBTITLE_EXTENSIONS = (".srt", ".vtt", ".ass")
+_SCENE_IMAGE_RE = re.compile(r"^\d+\.(png|jpe?g|webp)$", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    path TEXT PRIMARY KEY,
+    video_type TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    script_id INTEGER,
+    dir_mtime_ns INTEGER NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_episodes_script_id ON episodes(script_id);
+CREATE TABLE IF NOT EXISTS assets (
+    episode TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (episode, name)
+) WITHOUT ROWID;
+"""
+
+
+def classify(name: str) -> str:
+    lower = name.lower()
+    if lower.endswith(".whisperx.json"):
+        return "transcript"
+    if lower.endswith(AUDIO_EXTENSIONS):
+        return "audio"
+    if _SCENE_IMAGE_RE.match(name):
+        return "scene_image"
+    if lower.endswith(IMAGE_EXTENSIONS):
+        return "image"
+    if lower.endswith(SUBTITLE_EXTENSIONS):
+        return "subtitle"
+    if lower == "capcut-api.json" or (lower.startswith("draft_") and lower.endswith(".json")):
+        return "draft"
+    if lower in ("content.txt", "content.json"):
+        return "script"
+    return "other"
+
+
+def default_index_path(projects_root: Path) -> Path:
+    env = os.getenv("ASSET_INDEX")
+    return Path(env) if env else Path(projects_root) / INDEX_NAME
+
+
+def _list_dirs(path: str) -> List[Tuple[str, str, int]]:
+    """(name, path, mtime_ns) of visible sub-directories."""
+    out = []
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                if e.name.startswith(".") or not e.is_dir(follow_symlinks=False):
+                    continue
+                try:
+                    out.append((e.name, e.path, e.stat(follow_symlinks=False).st_mtime_ns))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return out
+
+
+def scan_episode(path: str) -> List[Tuple[str, str, int, int]]:
+    """(name, kind, size, mtime_ns) of the visible files in one episode folder."""
+    files = []
+    with os.scandir(path) as it:
+        for e in it:
+            if e.name.startswith(".") or e.name.endswith(".tmp"):
+                continue
+            try:
+                if not e.is_file(follow_symlinks=False):
+                    continue
+                st = e.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            files.append((e.name, classify(e.name), st.st_size, st.st_mtime_ns))
+    return files
+
+
+class AssetIndex:
+    """SQLite index of episode folders and their files (one connection per thread)."""
+
+    def __init__(self, projects_root: Path, path: Optional[Path] = None, max_workers: Optional[int] = None):
+        self.projects_root = Path(projects_root)
+        self.path = Path(path) if path is not None else default_index_path(self.projects_root)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- crawling ---------------------------------------------------------
+
+    def _crawl_dirs(self, pool: ThreadPoolExecutor) -> Dict[str, Tuple[str, str, int]]:
+        """Map episode path -> (video_type, folder, dir_mtime_ns) for the whole tree."""
+        type_dirs = _list_dirs(str(self.projects_root))
+        episodes: Dict[str, Tuple[str, str, int]] = {}
+        for (video_type, _, _), children in zip(type_dirs, pool.map(_list_dirs, [p for _, p, _ in type_dirs])):
+            for folder, path, mtime in children:
+                episodes[path] = (video_type, folder, mtime)
+        return episodes
+
+    def refresh(self, full: bool = False) -> Dict[str, int]:
+        """Bring the index in line with the disk.
+
+        Only episodes whose directory mtime changed are rescanned unless
+        ``full`` is set. Returns counts of scanned/unchanged/removed episodes.
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            conn = self._connect()
+            known = {r["path"]: r["dir_mtime_ns"] for r in conn.execute("SELECT path, dir_mtime_ns FROM episodes")}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                on_disk = self._crawl_dirs(pool)
+                changed = [p for p, (_, _, mtime) in on_disk.items() if full or known.get(p) != mtime]
+                scanned = dict(zip(changed, pool.map(self._safe_scan, changed)))
+            removed = [p for p in known if p not in on_disk]
+            now = time.time()
+
+            with conn:
+                if removed:
+                    conn.executemany("DELETE FROM assets WHERE episode = ?", [(p,) for p in removed])
+                    conn.executemany("DELETE FROM episodes WHERE path = ?", [(p,) for p in removed])
+                for path, files in scanned.items():
+                    if files is None:
+                        continue
+                    video_type, folder, mtime = on_disk[path]
+                    conn.execute("DELETE FROM assets WHERE episode = ?", (path,))
+                    conn.executemany(
+                        "INSERT INTO assets (episode, name, kind, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                        [(path, *f) for f in files],
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO episodes (path, video_type, folder, script_id, dir_mtime_ns, scanned_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, video_type, folder, script_id_from_folder(folder), mtime, now),
+                    )
+            stats = {
+                "episodes": len(on_disk),
+                "scanned": sum(1 for f in scanned.values() if f is not None),
+                "unchanged": len(on_disk) - len(changed),
+                "removed": len(removed),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+        log.info("asset_index.refreshed", **stats)
+        return stats
+
+    @staticmethod
+    def _safe_scan(path: str) -> Optional[List[Tuple[str, str, int, int]]]:
+        try:
+            return scan_episode(path)
+        except OSError:
+            return None
+
+    def refresh_episode(self, episode_dir: Path) -> bool:
+        """Rescan a single episode folder (e.g. right after writing to it)."""
+        episode_dir = Path(episode_dir)
+        path = str(episode_dir)
+        conn = self._connect()
+        try:
+            mtime = episode_dir.stat().st_mtime_ns
+            files = scan_episode(path)
+        except OSError:
+            with conn:
+                conn.execute("DELETE FROM assets WHERE episode = ?", (path,))
+                conn.execute("DELETE FROM episodes WHERE path = ?", (path,))
+            return False
+        with conn:
+            conn.execute("DELETE FROM assets WHERE episode = ?", (path,))
+            conn.executemany(
+                "INSERT INTO assets (episode, name, kind, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                [(path, *f) for f in files],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO episodes (path, video_type, folder, script_id, dir_mtime_ns, scanned_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, episode_dir.parent.name, episode_dir.name, script_id_from_folder(episode_dir.name), mtime, time.time()),
+            )
+        return True
+
+    # --- queries ----------------------------------------------------------
+
+    def episode_paths(self, script_id: int) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT path FROM episodes WHERE script_id = ? ORDER BY dir_mtime_ns DESC", (script_id,)
+        )
+        return [r["path"] for r in rows]
+
+    def episode_assets(self, path: str) -> Optional[Dict[str, Any]]:
+        """Files of one indexed episode grouped by kind, plus a summary."""
+        conn = self._connect()
+        ep = conn.execute("SELECT * FROM episodes WHERE path = ?", (str(path),)).fetchone()
+        if ep is None:
+            return None
+        assets: Dict[str, List[Dict[str, Any]]] = {}
+        for r in conn.execute("SELECT name, kind, size, mtime_ns FROM assets WHERE episode = ? ORDER BY name", (ep["path"],)):
+            assets.setdefault(r["kind"], []).append({"name": r["name"], "size": r["size"], "mtime": r["mtime_ns"] / 1e9})
+        if "scene_image" in assets:
+            assets["scene_image"].sort(key=lambda a: int(a["name"].split(".", 1)[0]))
+        return {
+            "path": ep["path"],
+            "script_id": ep["script_id"],
+            "video_type": ep["video_type"],
+            "scanned_at": ep["scanned_at"],
+            "assets": assets,
+            "summary": summarize({k: [a["name"] for a in v] for k, v in assets.items()}),
+        }
+
+    def summaries(self, script_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """Per-script asset summaries for every indexed episode, in one query.
+
+        When a script has several folders (renamed alias), the most recently
+        modified one wins.
+        """
+        sql = (
+            "SELECT e.script_id, e.path, e.dir_mtime_ns, a.name, a.kind FROM episodes e "
+            "LEFT JOIN assets a ON a.episode = e.path WHERE e.script_id IS NOT NULL"
+        )
+        params: List[Any] = []
+        if script_ids is not None:
+            ids = list(script_ids)
+            sql += f" AND e.script_id IN ({','.join('?' * len(ids))})" if ids else " AND 0"
+            params = ids
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for script_id, path, mtime, name, kind in self._connect().execute(sql, params):
+            entry = grouped.setdefault(path, {"script_id": script_id, "mtime": mtime, "names": {}})
+            if name is not None:
+                entry["names"].setdefault(kind, []).append(name)
+        result: Dict[int, Dict[str, Any]] = {}
+        best_mtime: Dict[int, int] = {}
+        for path, entry in grouped.items():
+            sid = entry["script_id"]
+            if sid in result and best_mtime[sid] >= entry["mtime"]:
+                continue
+            best_mtime[sid] = entry["mtime"]
+            result[sid] = dict(summarize(entry["names"]), path=path)
+        return result
+
+    def find_assets(self, kinds: Iterable[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Indexed files of the given kinds across all episodes."""
+        kinds = list(kinds)
+        if not kinds:
+            return []
+        sql = (
+            f"SELECT episode, name, kind, size, mtime_ns FROM assets WHERE kind IN ({','.join('?' * len(kinds))}) "
+            "ORDER BY episode, name"
+        )
+        params: List[Any] = list(kinds)
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [
+            {"path": os.path.join(r["episode"], r["name"]), "kind": r["kind"], "size": r["size"], "mtime": r["mtime_ns"] / 1e9}
+            for r in self._connect().execute(sql, params)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        return {
+            "episodes": conn.execute("SELECT COUNT(*) FROM episodes").fetchone()[0],
+            "assets": conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0],
+        }
+
+
+def summarize(names_by_kind: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Reduce an episode's file names (grouped by kind) to pipeline facts."""
+    transcripts = names_by_kind.get("transcript", [])
+    subtitles = names_by_kind.get("subtitle", [])
+    return {
+        "has_audio": bool(names_by_kind.get("audio")),
+        "scene_images": len(names_by_kind.get("scene_image", [])),
+        "has_transcript": bool(transcripts),
+        "has_subtitles": any(n.lower().endswith(".srt") for n in subtitles),
+        "has_draft": bool(names_by_kind.get("draft")),
+    }
+
+
+_INDEXES: Dict[str, AssetIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_asset_index(projects_root: Optional[Path] = None) -> AssetIndex:
+    """Shared index for ``projects_root`` (default: the PROJECT_FOLDER setting)."""
+    if projects_root is None:
+        from app.utils import get_projects_root
+
+        projects_root = get_projects_root()
+    key = str(Path(projects_root))
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = AssetIndex(Path(projects_root))
+        return index
+
+
+__all__ = [
+    "AssetIndex",
+    "classify",
+    "get_asset_index",
+    "scan_episode",
+    "summarize",
+]
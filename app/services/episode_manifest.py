@@ -0,0 +1,223 @@
+"""Per-episode pipeline manifest.
+
+Every episode folder carries a small ``.pipeline-manifest.json`` that records
+content hashes of stage inputs and outputs. The pipeline uses it to skip
+stages whose inputs are unchanged, to resume after a crash (a stage is only
+recorded once it has finished) and to report exactly what is stale.
+
+Hashes are cheap on no-op runs: a file is only re-hashed when its size or
+mtime differs from the fingerprint stored in the manifest.
+
+Manifest layout::
+
+    {
+      "version": 1,
+      "files": {"audio.mp3": {"size": 1, "mtime_ns": 2, "sha256": "..."}},
+      "stages": {
+        "transcribe": {"inputs": {"audio.mp3": "..."}, "outputs": {...}, "completed_at": "..."}
+      }
+    }
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANIFEST_NAME = ".pipeline-manifest.json"
+MANIFEST_VERSION = 1
+_HASH_CHUNK = 1024 * 1024
+_SCENE_IMAGE_RE = re.compile(r"^\d+\.(png|jpe?g|webp)$", re.IGNORECASE)
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def discover_episodes(projects_root: Path) -> List[Path]:
+    """List ``<projects_root>/<video_type>/<episode>`` folders using os.scandir."""
+    episodes: List[Path] = []
+    try:
+        with os.scandir(projects_root) as types:
+            for t in types:
+                if not t.is_dir(follow_symlinks=False) or t.name.startswith("."):
+                    continue
+                try:
+                    with os.scandir(t.path) as eps:
+                        episodes.extend(Path(e.path) for e in eps if e.is_dir(follow_symlinks=False) and not e.name.startswith("."))
+                except OSError:
+                    continue
+    except OSError:
+        return []
+    return sorted(episodes)
+
+
+def script_id_from_folder(name: str) -> Optional[int]:
+    """Episode folders are named ``<script id>.<alias>``."""
+    head = name.split(".", 1)[0]
+    return int(head) if head.isdigit() else None
+
+
+def scene_image_names(names: Iterable[str]) -> List[str]:
+    """Return scene image file names (``1.png``, ``2.jpg``...) in scene order."""
+    images = [n for n in names if _SCENE_IMAGE_RE.match(n)]
+    return sorted(images, key=lambda n: int(n.split(".", 1)[0]))
+
+
+def scene_image_map(names: Iterable[str]) -> Dict[int, str]:
+    """Map scene number -> image file name; ``N.png`` wins over other formats of the same scene."""
+    found: Dict[int, str] = {}
+    for name in scene_image_names(names):
+        number = int(name.split(".", 1)[0])
+        if number not in found or name.lower().endswith(".png"):
+            found[number] = name
+    return found
+
+
+class EpisodeManifest:
+    """Load, query and update the manifest of one episode folder."""
+
+    def __init__(self, episode_dir: Path):
+        self.episode_dir = Path(episode_dir)
+        self.path = self.episode_dir / MANIFEST_NAME
+        self.data = self._load()
+        self._listing: Optional[List[str]] = None
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+                data.setdefault("files", {})
+                data.setdefault("stages", {})
+                return data
+        except (OSError, ValueError):
+            pass
+        return {"version": MANIFEST_VERSION, "files": {}, "stages": {}}
+
+    def listing(self, refresh: bool = False) -> List[str]:
+        """File names in the episode folder (one scandir per manifest instance)."""
+        if self._listing is None or refresh:
+            try:
+                with os.scandir(self.episode_dir) as it:
+                    self._listing = sorted(e.name for e in it if e.is_file())
+            except OSError:
+                self._listing = []
+        return self._listing
+
+    def fingerprint(self, name: str) -> Optional[str]:
+        """Return the sha256 of a file, reusing the stored hash when size/mtime match."""
+        p = self.episode_dir / name
+        try:
+            st = p.stat()
+        except OSError:
+            self.data["files"].pop(name, None)
+            return None
+        prev = self.data["files"].get(name)
+        if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+            return prev.get("sha256")
+        digest = sha256_file(p)
+        self.data["files"][name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def digests(self, names: Iterable[str]) -> Dict[str, Optional[str]]:
+        return {n: self.fingerprint(n) for n in names}
+
+    def stale_reason(self, stage: str, inputs: Iterable[str], outputs: Iterable[str]) -> Optional[str]:
+        """Return why `stage` must run, or None when it is up to date."""
+        entry = self.data["stages"].get(stage)
+        if not entry:
+            return "never completed"
+        for name in outputs:
+            if not (self.episode_dir / name).exists():
+                return f"output missing: {name}"
+        recorded = entry.get("inputs", {})
+        current = self.digests(inputs)
+        if set(recorded) != set(current):
+            return "input set changed"
+        for name, digest in current.items():
+            if digest != recorded.get(name):
+                return f"input changed: {name}"
+        for name, digest in entry.get("outputs", {}).items():
+            if self.fingerprint(name) != digest:
+                return f"output changed: {name}"
+        return None
+
+    def is_stale(self, stage: str, inputs: Iterable[str], outputs: Iterable[str]) -> bool:
+        return self.stale_reason(stage, inputs, outputs) is not None
+
+    def record(self, stage: str, inputs: Iterable[str], outputs: Iterable[str], save: bool = True) -> None:
+        """Mark `stage` complete with the current input/output hashes."""
+        self.data["stages"][stage] = {
+            "inputs": self.digests(inputs),
+            "outputs": self.digests(outputs),
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if save:
+            self.save()
+
+    def invalidate(self, stage: str, save: bool = True) -> None:
+        self.data["stages"].pop(stage, None)
+        if save:
+            self.save()
+
+    def save(self) -> None:
+        """Write atomically so a crash never leaves a truncated manifest."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+
+def stage_plan(manifest: EpisodeManifest) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Inputs/outputs (file names) of each pipeline stage for an episode.
+
+    Returns an empty mapping when the episode has no audio yet.
+    """
+    names = manifest.listing()
+    audio = next((n for n in names if n.lower().endswith(".mp3")), None)
+    if not audio:
+        return {}
+    base = audio[: -len(".mp3")]
+    whisper_json = f"{base}.whisperx.json"
+    srt = f"{base}.whisperx.srt"
+    plan = {
+        "transcribe": ([audio], [whisper_json]),
+        "srt": ([whisper_json], [srt]),
+    }
+    if "capcut-api.json" in names:
+        plan["align"] = (["capcut-api.json", whisper_json, *scene_image_names(names)], ["capcut-api.json"])
+    return plan
+
+
+def stale_report(episode_dirs: Iterable[Path]) -> Dict[str, Dict[str, str]]:
+    """Map episode folder -> {stage: reason} for every stale stage."""
+    report: Dict[str, Dict[str, str]] = {}
+    for ep in episode_dirs:
+        m = EpisodeManifest(ep)
+        stale = {}
+        for stage, (inputs, outputs) in stage_plan(m).items():
+            reason = m.stale_reason(stage, inputs, outputs)
+            if reason:
+                stale[stage] = reason
+        if stale:
+            report[str(ep)] = stale
+    return report
+
+
+__all__ = [
+    "MANIFEST_NAME",
+    "EpisodeManifest",
+    "discover_episodes",
+    "scene_image_names",
+    "script_id_from_folder",
+    "stage_plan",
+    "stale_report",
+    "sha256_file",
+]
@@ -0,0 +1,36 @@
+"""Atomic file writes shared by the services.
+
+Only depends on the standard library, so the image, TTS and transcription
+helpers can use it without importing the app, its models or settings.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write ``data`` to a temp file next to ``path`` and ``os.replace`` it in."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically write ``data`` unless the file already holds the same bytes.
+
+    Returns True when the file was written.
+    """
+    try:
+        if path.stat().st_size == len(data):
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                    return False
+    except OSError:
+        pass
+    atomic_write(path, data)
+    return True
+
+
+__all__ = ["atomic_write", "write_if_changed"]
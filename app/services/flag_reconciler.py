@@ -0,0 +1,150 @@
+"""Reconcile the ``Script.is_*`` flags with what is actually on disk.
+
+Expected values come from the project asset index
+(``app.services.asset_index``), so no folder is walked here:
+
+- ``is_has_folder``: the script's episode folder exists
+- ``is_audio_generated``: the folder holds an audio file
+- ``is_image_generated``: there is an ``N.png/jpg/webp`` for every scene
+- ``is_transcript_generated``: both a ``.whisperx.json`` and an ``.srt``
+  exist
+
+``is_video_generated``/``is_video_compiled`` cannot be derived from the
+folder and are left alone.
+
+Flags are read in id-keyset batches, touching only the flag columns. ``acts``
+is loaded only for scripts whose folder has scene images, because that is the
+only case where the scene count matters. All mismatches are written with one
+ORM bulk UPDATE by primary key (a single executemany).
+"""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models.script import Script
+from app.services.asset_index import AssetIndex, get_asset_index, summarize
+
+log = structlog.get_logger()
+
+RECONCILED_FLAGS = ("is_has_folder", "is_audio_generated", "is_image_generated", "is_transcript_generated")
+BATCH_SIZE = 5000
+_RUN_LOCK = threading.Lock()
+
+
+def count_scenes(acts_text: Optional[str]) -> int:
+    """Number of scenes in a stored ``acts`` value (0 when unparseable)."""
+    if not acts_text:
+        return 0
+    try:
+        acts = json.loads(acts_text)
+    except ValueError:
+        # Legacy rows: fall back to the model's tolerant parser
+        acts = Script(acts=acts_text).acts_parsed
+    if not isinstance(acts, list):
+        return 0
+    return sum(len(a.get("scenes") or []) for a in acts if isinstance(a, dict))
+
+
+def expected_flags(summary: Optional[Dict[str, Any]], scene_count: int = 0) -> Dict[str, bool]:
+    """Flag values implied by an asset summary (None = no folder on disk)."""
+    s = summary or summarize({})
+    return {
+        "is_has_folder": summary is not None,
+        "is_audio_generated": bool(s["has_audio"]),
+        "is_image_generated": scene_count > 0 and s["scene_images"] >= scene_count,
+        "is_transcript_generated": bool(s["has_transcript"] and s["has_subtitles"]),
+    }
+
+
+def _scene_counts(ids: List[int]) -> Dict[int, int]:
+    counts: Dict[int, int] = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[start : start + BATCH_SIZE]
+        for sid, acts in db.session.execute(select(Script.id, Script.acts).where(Script.id.in_(chunk))):
+            counts[sid] = count_scenes(acts)
+    return counts
+
+
+def reconcile_flags(
+    index: Optional[AssetIndex] = None,
+    refresh: bool = True,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Compare DB flags with the asset index and fix mismatches.
+
+    Must run inside an app context. Returns a summary; ``changes`` counts
+    flags set/cleared per column. Concurrent calls are skipped, not queued.
+    """
+    if not _RUN_LOCK.acquire(blocking=False):
+        log.info("flags.reconcile.skipped", reason="already running")
+        return {"ok": False, "skipped": True, "error": "reconciliation already running"}
+    try:
+        return _reconcile(index or get_asset_index(), refresh, dry_run)
+    finally:
+        _RUN_LOCK.release()
+
+
+def _reconcile(index: AssetIndex, refresh: bool, dry_run: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if not Path(index.projects_root).is_dir():
+        # An unmounted share must not clear every flag in the database
+        return {"ok": False, "error": f"projects folder not found: {index.projects_root}"}
+    if refresh:
+        index.refresh()
+    summaries = index.summaries()
+
+    flag_cols = [getattr(Script, f) for f in RECONCILED_FLAGS]
+    current: Dict[int, tuple] = {}
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Script.id, *flag_cols).where(Script.id > last_id).order_by(Script.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            current[row[0]] = tuple(bool(v) for v in row[1:])
+        last_id = rows[-1][0]
+
+    scene_counts = _scene_counts([sid for sid in current if summaries.get(sid, {}).get("scene_images")])
+
+    changes = {f: {"set": 0, "cleared": 0} for f in RECONCILED_FLAGS}
+    updates: List[Dict[str, Any]] = []
+    for sid, flags in current.items():
+        want = expected_flags(summaries.get(sid), scene_counts.get(sid, 0))
+        if tuple(want[f] for f in RECONCILED_FLAGS) == flags:
+            continue
+        for f, old in zip(RECONCILED_FLAGS, flags):
+            if want[f] != old:
+                changes[f]["set" if want[f] else "cleared"] += 1
+        updates.append({"id": sid, **want})
+
+    if updates and not dry_run:
+        try:
+            db.session.execute(update(Script), updates)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            log.error("flags.reconcile.update_failed", count=len(updates), error=str(e))
+            raise
+
+    result = {
+        "ok": True,
+        "scripts": len(current),
+        "mismatched": len(updates),
+        "updated": 0 if dry_run else len(updates),
+        "dry_run": dry_run,
+        "changes": changes,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    log.info("flags.reconciled", **{k: v for k, v in result.items() if k != "changes"})
+    return result
+
+
+__all__ = ["RECONCILED_FLAGS", "count_scenes", "expected_flags", "reconcile_flags"]
@@ -0,0 +1,151 @@
+"""Lossless handling of generated scene images.
+
+Helpers to turn an image ``src`` (``data:`` URL, or bytes fetched in the page
+for ``blob:``/``http`` sources) into a verified file in its original format:
+
+- ``sniff_format`` / ``image_size`` read the format and dimensions from the
+  file header (PNG, JPEG, WebP, GIF) without decoding pixels or needing Pillow
+- ``save_scene_image`` writes ``N.<ext>`` atomically, checks the dimensions
+  and the sha256 of what landed on disk, and removes other-format copies of
+  the same scene so ``N.png`` and ``N.jpg`` never coexist
+"""
+import base64
+import binascii
+import hashlib
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+from app.services.fileio import write_if_changed
+
+MIN_IMAGE_SIDE = 64
+# Formats kept as-is; they are the ones the asset index and alignment accept
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+_SCENE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class ImageError(ValueError):
+    """The bytes are not a usable image."""
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """Image format from magic bytes: 'png', 'jpeg', 'webp', 'gif' or None."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    i, n = 2, len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", data[i + 2 : i + 4])
+        if marker in _JPEG_SOF:
+            h, w = struct.unpack(">HH", data[i + 5 : i + 9])
+            return w, h
+        i += 2 + length
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        w, h = struct.unpack("<HH", data[26:30])
+        return w & 0x3FFF, h & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        (bits,) = struct.unpack("<I", data[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        w = int.from_bytes(data[24:27], "little") + 1
+        h = int.from_bytes(data[27:30], "little") + 1
+        return w, h
+    return None
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) read from the image header, or None when unknown."""
+    fmt = sniff_format(data)
+    try:
+        if fmt == "png" and len(data) >= 24:
+            return struct.unpack(">II", data[16:24])
+        if fmt == "gif" and len(data) >= 10:
+            return struct.unpack("<HH", data[6:10])
+        if fmt == "jpeg":
+            return _jpeg_size(data)
+        if fmt == "webp":
+            return _webp_size(data)
+    except struct.error:
+        return None
+    return None
+
+
+def decode_data_url(url: str) -> bytes:
+    """Bytes of a ``data:`` URL (base64 or percent-encoded)."""
+    if not url.startswith("data:") or "," not in url:
+        raise ImageError("not a data: URL")
+    header, payload = url[5:].split(",", 1)
+    if header.endswith(";base64"):
+        try:
+            return base64.b64decode(payload, validate=False)
+        except (binascii.Error, ValueError) as e:
+            raise ImageError(f"invalid base64 payload: {e}")
+    return unquote_to_bytes(payload)
+
+
+def verify_image(data: bytes, min_side: int = MIN_IMAGE_SIDE) -> Dict[str, Any]:
+    """Format, dimensions and sha256 of ``data``; raises ``ImageError`` when unusable."""
+    fmt = sniff_format(data)
+    if fmt not in EXTENSIONS:
+        raise ImageError(f"unsupported image format: {fmt}")
+    size = image_size(data)
+    if not size or min(size) < min_side:
+        raise ImageError(f"unexpected image dimensions: {size}")
+    return {"format": fmt, "width": size[0], "height": size[1], "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def save_scene_image(data: bytes, out_dir: Path, number: int, min_side: int = MIN_IMAGE_SIDE) -> Dict[str, Any]:
+    """Write scene ``number`` as ``N.<original ext>`` and verify it on disk.
+
+    Returns the ``verify_image`` info plus ``path`` and ``written`` (False when
+    an identical file was already there).
+    """
+    info = verify_image(data, min_side)
+    out_dir = Path(out_dir)
+    path = out_dir / f"{number}{EXTENSIONS[info['format']]}"
+    written = write_if_changed(path, data)
+    with open(path, "rb") as f:
+        if hashlib.sha256(f.read()).hexdigest() != info["sha256"]:
+            raise ImageError(f"hash mismatch after writing {path.name}")
+    for ext in _SCENE_EXTENSIONS:
+        other = out_dir / f"{number}{ext}"
+        if other != path and other.exists():
+            other.unlink()
+    return dict(info, path=str(path), written=written)
+
+
+__all__ = [
+    "ImageError",
+    "MIN_IMAGE_SIDE",
+    "decode_data_url",
+    "image_size",
+    "save_scene_image",
+    "sniff_format",
+    "verify_image",
+]
@@ -0,0 +1,583 @@
+"""Scene image generation through Gemini in a pool of Chrome sessions.
+
+``generate_images`` used to drive one Chrome instance, send one prompt with
+every scene and wait for all images before saving them one by one. This
+module keeps that flow (``mode='all'``) and adds:
+
+- ``SessionPool``: several browser sessions, each with its own Chrome profile
+  (Chrome refuses to share a user-data-dir between running instances).
+  Drivers are started lazily and kept warm between jobs, so logins survive.
+- ``mode='scene'``: scenes are sent in batches of ``batch_size`` prompts, each
+  batch in its own tab (a new conversation), up to ``tabs`` batches in flight
+  per session. Tabs are polled round-robin and saved as soon as they finish.
+- ``generate_many``: several scripts processed concurrently, one session each.
+- images are saved from their original bytes (``data:`` URLs decoded
+  locally, ``blob:``/``http`` fetched in the page) in their original format,
+  verified, and written in parallel; a screenshot is only the fallback.
+- ``enqueue_image_generation``: runs a script's generation on the app's
+  background job queue; progress is kept in ``IMAGE_JOBS`` and published on
+  the Redis job channel when Redis is available.
+
+Selenium is imported lazily so the app still starts without it. Point
+``GEMINI_URL`` (or ``url=``) at ``scripts/mock/gemini_mock.html`` to exercise
+the whole flow without an account.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import structlog
+
+from app.services.image_bytes import ImageError, decode_data_url, save_scene_image
+
+log = structlog.get_logger()
+
+GEMINI_URL = os.getenv("GEMINI_URL", "https://gemini.google.com/")
+DEFAULT_SESSIONS = 2
+DEFAULT_TABS = 3
+DEFAULT_TIMEOUT = 240
+
+# --- Selectors ---
+INPUT_BOX_SELECTOR = "div.ql-editor.ql-blank"
+SEND_BUTTON_SELECTOR = "button.send-button"
+GENERATED_IMAGE_SELECTOR = "img.image.loaded"
+
+PROMPT_TEMPLATE = (
+    "tạo ảnh dựa theo JSON scenes sau: {scenes} "
+    "lưu ý: ảnh không chứa text, mọi nhân vật đều đủ 18 tuổi trở lên"
+)
+_VALID_SRC = ("blob:", "data:", "http")
+
+IMAGE_JOBS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def scenes_from_script(script_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Scenes of a script payload, derived from ``acts`` (top-level ``scenes`` is not used)."""
+    scenes: List[Dict[str, Any]] = []
+    for act in script_data.get("acts") or []:
+        if isinstance(act, dict):
+            scenes.extend(s for s in (act.get("scenes") or []) if isinstance(s, dict))
+    return scenes
+
+
+def build_prompt(scenes: List[Dict[str, Any]]) -> str:
+    return PROMPT_TEMPLATE.format(scenes=json.dumps(scenes, ensure_ascii=False, separators=(",", ":")))
+
+
+def plan_batches(scene_count: int, mode: str = "all", batch_size: int = 1) -> List[range]:
+    """Split scene indexes into prompt batches: one batch in 'all' mode, ``batch_size`` scenes each in 'scene' mode."""
+    if mode not in ("all", "scene"):
+        raise ValueError(f"unknown mode: {mode}")
+    if scene_count <= 0:
+        return []
+    if mode == "all":
+        return [range(0, scene_count)]
+    size = max(1, int(batch_size))
+    return [range(i, min(i + size, scene_count)) for i in range(0, scene_count, size)]
+
+
+def _selenium():
+    from selenium import webdriver
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    return webdriver, Options, By, EC, WebDriverWait, TimeoutException, WebDriverException
+
+
+def chrome_driver(profile_dir: Optional[Path], headless: bool = False, chrome_exe: Optional[str] = None):
+    """Start a Chrome WebDriver using ``profile_dir`` as its user-data-dir."""
+    webdriver, Options, *_ = _selenium()
+    options = Options()
+    if chrome_exe:
+        options.binary_location = chrome_exe
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+    if profile_dir:
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=options)
+
+
+class BrowserSession:
+    """One Chrome profile and its (lazily started) driver."""
+
+    def __init__(
+        self,
+        profile_dir: Optional[Path],
+        headless: bool = False,
+        chrome_exe: Optional[str] = None,
+        driver_factory: Optional[Callable[..., Any]] = None,
+    ):
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.headless = headless
+        self.chrome_exe = chrome_exe
+        self._factory = driver_factory or chrome_driver
+        self._driver = None
+        self.jobs = 0
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            log.info("image.session.start", profile=str(self.profile_dir), headless=self.headless)
+            self._driver = self._factory(self.profile_dir, headless=self.headless, chrome_exe=self.chrome_exe)
+        return self._driver
+
+    @property
+    def started(self) -> bool:
+        return self._driver is not None
+
+    def reset(self) -> None:
+        """Quit the driver; the next use starts a fresh one on the same profile."""
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    close = reset
+
+
+class SessionPool:
+    """Fixed set of browser sessions handed out one job at a time.
+
+    Session 0 uses ``profile_root`` itself (the existing logged-in profile);
+    session N uses ``<profile_root>-N``.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_SESSIONS,
+        profile_root: Optional[Path] = None,
+        headless: bool = False,
+        chrome_exe: Optional[str] = None,
+        driver_factory: Optional[Callable[..., Any]] = None,
+    ):
+        self.size = max(1, int(size))
+        self.sessions: List[BrowserSession] = []
+        for i in range(self.size):
+            profile = None
+            if profile_root:
+                profile = Path(profile_root) if i == 0 else Path(f"{profile_root}-{i}")
+            self.sessions.append(BrowserSession(profile, headless, chrome_exe, driver_factory))
+        # LIFO: the most recently used (warm) session is handed out first
+        self._free: "queue.LifoQueue[BrowserSession]" = queue.LifoQueue()
+        for s in reversed(self.sessions):
+            self._free.put(s)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[BrowserSession]:
+        """Borrow a session; raises ``TimeoutError`` when none frees up in time."""
+        try:
+            session = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("no free browser session")
+        try:
+            yield session
+        finally:
+            session.jobs += 1
+            self._free.put(session)
+
+    def close(self) -> None:
+        for s in self.sessions:
+            s.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "free": self._free.qsize(),
+            "started": sum(1 for s in self.sessions if s.started),
+            "jobs": sum(s.jobs for s in self.sessions),
+        }
+
+
+# Runs in the page: fetch every src (blob:/http, with the page's cookies) and
+# hand it back as a data: URL, so the original bytes cross the WebDriver bridge.
+_FETCH_IMAGES_JS = """
+const srcs = arguments[0];
+const done = arguments[arguments.length - 1];
+Promise.all(srcs.map(async (src) => {
+  try {
+    const resp = await fetch(src, {credentials: 'include'});
+    if (!resp.ok) return {error: 'HTTP ' + resp.status};
+    const blob = await resp.blob();
+    const data = await new Promise((resolve, reject) => {
+      const reader = new FileReader();
+      reader.onload = () => resolve(reader.result);
+      reader.onerror = () => reject(reader.error);
+      reader.readAsDataURL(blob);
+    });
+    return {data: data};
+  } catch (e) {
+    return {error: String(e)};
+  }
+})).then(done);
+"""
+
+
+def fetch_image_bytes(driver, srcs: List[str], timeout: int = 60) -> List[Any]:
+    """Original bytes of each src, or the error message (str) for failures.
+
+    ``data:`` URLs are decoded locally; the rest are fetched in one async
+    script call in the current tab.
+    """
+    out: List[Any] = [None] * len(srcs)
+    remote = []
+    for i, src in enumerate(srcs):
+        if src.startswith("data:"):
+            try:
+                out[i] = decode_data_url(src)
+            except ImageError as e:
+                out[i] = str(e)
+        else:
+            remote.append(i)
+    if remote:
+        try:
+            driver.set_script_timeout(timeout)
+            fetched = driver.execute_async_script(_FETCH_IMAGES_JS, [srcs[i] for i in remote]) or []
+        except Exception as e:
+            fetched = [{"error": f"fetch failed: {e}"}] * len(remote)
+        for i, item in zip(remote, fetched):
+            item = item or {}
+            try:
+                out[i] = decode_data_url(item["data"]) if item.get("data") else str(item.get("error") or "empty response")
+            except ImageError as e:
+                out[i] = str(e)
+    return out
+
+
+def _download_image_in_new_tab(driver, wait, image_url: str, image_output_path: Path, return_handle: str) -> None:
+    """Fallback: open image_url in a new tab and save an element screenshot (re-encoded PNG)."""
+    _, _, By, EC, *_ = _selenium()
+    driver.switch_to.new_window("tab")
+    driver.get(image_url)
+    img = wait.until(EC.presence_of_element_located((By.TAG_NAME, "img")))
+    # save screenshot of the image element (works even for blob/data urls)
+    img.screenshot(str(image_output_path))
+    driver.close()
+    driver.switch_to.window(return_handle)
+
+
+def save_batch_images(
+    driver,
+    wait,
+    srcs: List[str],
+    numbers: List[int],
+    out_dir: Path,
+    handle: str,
+    timeout: int = 60,
+) -> Dict[str, Any]:
+    """Save the images of one finished tab as ``N.<ext>``.
+
+    Bytes are extracted directly and written/verified in parallel; images
+    that cannot be fetched or fail verification fall back to a screenshot.
+    Returns ``{'files': {number: info}, 'errors': [...], 'screenshots': n}``.
+    """
+    payloads = fetch_image_bytes(driver, srcs, timeout)
+    files: Dict[int, Dict[str, Any]] = {}
+    errors: List[str] = []
+    retry: List[int] = []
+
+    def save(item):
+        number, data = item
+        if not isinstance(data, (bytes, bytearray)):
+            raise ImageError(data or "no data")
+        return save_scene_image(bytes(data), out_dir, number)
+
+    with ThreadPoolExecutor(max_workers=min(8, max(1, len(srcs)))) as pool:
+        futures = [(k, pool.submit(save, (numbers[k], payloads[k]))) for k in range(len(srcs))]
+        for k, fut in futures:
+            try:
+                files[numbers[k]] = fut.result()
+            except Exception as e:
+                log.warning("image.extract.failed", scene=numbers[k], error=str(e))
+                retry.append(k)
+
+    for k in retry:
+        path = Path(out_dir) / f"{numbers[k]}.png"
+        try:
+            _download_image_in_new_tab(driver, wait, srcs[k], path, handle)
+            files[numbers[k]] = {"path": str(path), "format": "png", "screenshot": True}
+        except Exception as e:
+            errors.append(f"scene {numbers[k]}: {e}")
+    return {"files": files, "errors": errors, "screenshots": len(retry) - len(errors)}
+
+
+def _ready_sources(driver, expected: int) -> Optional[List[str]]:
+    """The last ``expected`` image srcs of the current tab once all are loaded."""
+    _, _, By, *_ = _selenium()
+    imgs = driver.find_elements(By.CSS_SELECTOR, GENERATED_IMAGE_SELECTOR)
+    if len(imgs) < expected:
+        return None
+    srcs = [img.get_attribute("src") or "" for img in imgs[-expected:]]
+    return srcs if all(s.startswith(_VALID_SRC) for s in srcs) else None
+
+
+def generate_scene_images(
+    driver,
+    scenes: List[Dict[str, Any]],
+    out_dir: Path,
+    url: str = GEMINI_URL,
+    mode: str = "all",
+    batch_size: int = 1,
+    tabs: int = DEFAULT_TABS,
+    timeout: int = DEFAULT_TIMEOUT,
+    poll_interval: float = 1.0,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Generate and save ``N.<ext>`` for each scene using an already started driver.
+
+    Every batch is sent in a fresh tab, so the images of a tab are exactly the
+    batch's images. ``timeout`` applies to each batch from the moment it is sent.
+    """
+    _, _, By, EC, WebDriverWait, TimeoutException, _ = _selenium()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pending = plan_batches(len(scenes), mode, batch_size)
+    total = len(pending)
+    wait = WebDriverWait(driver, timeout)
+    home = driver.current_window_handle
+    in_flight: List[Dict[str, Any]] = []
+    saved: Dict[int, Dict[str, Any]] = {}
+    errors: List[str] = []
+    stats = {"screenshots": 0}
+
+    def send(batch: range) -> None:
+        driver.switch_to.new_window("tab")
+        driver.get(url)
+        box = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, INPUT_BOX_SELECTOR)))
+        # Use JS to set the content reliably
+        driver.execute_script("arguments[0].innerText = arguments[1];", box, build_prompt([scenes[i] for i in batch]))
+        time.sleep(0.8)
+        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, SEND_BUTTON_SELECTOR))).click()
+        in_flight.append({"handle": driver.current_window_handle, "batch": batch, "sent": time.monotonic()})
+        log.info("image.batch.sent", scenes=[i + 1 for i in batch], in_flight=len(in_flight))
+
+    def finish(entry: Dict[str, Any], srcs: Optional[List[str]]) -> None:
+        in_flight.remove(entry)
+        handle = entry["handle"]
+        if srcs is None:
+            errors.append(f"timeout: scenes {entry['batch'].start + 1}-{entry['batch'].stop}")
+        else:
+            res = save_batch_images(driver, wait, srcs, [i + 1 for i in entry["batch"]], out_dir, handle, timeout)
+            for number, info in res["files"].items():
+                saved[number - 1] = info
+            errors.extend(res["errors"])
+            stats["screenshots"] += res["screenshots"]
+        driver.switch_to.window(handle)
+        driver.close()
+        driver.switch_to.window(home)
+        if on_progress:
+            on_progress({"done": total - len(pending) - len(in_flight), "total": total, "images": len(saved)})
+
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < max(1, tabs):
+                send(pending.pop(0))
+            for entry in list(in_flight):
+                driver.switch_to.window(entry["handle"])
+                srcs = _ready_sources(driver, len(entry["batch"]))
+                if srcs is not None:
+                    finish(entry, srcs)
+                elif time.monotonic() - entry["sent"] > timeout:
+                    finish(entry, None)
+            if in_flight:
+                time.sleep(poll_interval)
+    except TimeoutException:
+        errors.append("timeout")
+    files = [dict(saved[i], scene=i + 1) for i in sorted(saved)]
+    paths = [f["path"] for f in files]
+    result: Dict[str, Any] = {
+        "ok": bool(paths) and not errors,
+        "images": len(paths),
+        "paths": paths,
+        "files": files,
+        "screenshots": stats["screenshots"],
+    }
+    if errors:
+        result["errors"] = errors
+        result["error"] = errors[0]
+    return result
+
+
+def _load_script(script_path: Path) -> Dict[str, Any]:
+    with open(script_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def generate_images(
+    script_path: Path,
+    output_dir: Optional[Path] = None,
+    headless: bool = False,
+    chrome_exe: Optional[str] = None,
+    user_data_dir: Optional[Path] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    mode: str = "all",
+    batch_size: int = 1,
+    tabs: int = DEFAULT_TABS,
+    url: str = GEMINI_URL,
+    session: Optional[BrowserSession] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Generate images for the scenes of the script JSON at ``script_path``.
+
+    Uses ``session`` when given (its driver stays open), otherwise a one-off
+    Chrome on ``user_data_dir``. Returns ``{'ok', 'images', 'paths'}`` or
+    ``{'ok': False, 'error'}``; never raises.
+    """
+    if not script_path or not Path(script_path).exists():
+        return {"ok": False, "error": f"File kịch bản không tồn tại: {script_path}"}
+    try:
+        script_data = _load_script(Path(script_path))
+    except Exception as e:
+        return {"ok": False, "error": f"Không thể đọc file kịch bản: {e}"}
+
+    scenes = scenes_from_script(script_data)
+    if not scenes:
+        return {"ok": False, "error": "Không tìm thấy scenes trong file kịch bản (derived from acts)."}
+
+    if output_dir:
+        out_dir = Path(output_dir)
+    else:
+        try:
+            from app.utils import get_project_path
+
+            out_dir = Path(get_project_path(script_data))
+        except Exception:
+            out_dir = Path.cwd() / "output_images"
+
+    owned = session is None
+    if owned:
+        session = BrowserSession(user_data_dir, headless=headless, chrome_exe=chrome_exe)
+    started = time.perf_counter()
+    try:
+        result = generate_scene_images(
+            session.driver, scenes, out_dir, url=url, mode=mode, batch_size=batch_size,
+            tabs=tabs, timeout=timeout, on_progress=on_progress,
+        )
+    except Exception as e:
+        # A broken driver is restarted on the next job instead of being reused
+        session.reset()
+        result = {"ok": False, "error": f"WebDriver error: {e}"}
+    finally:
+        if owned:
+            session.close()
+    result["elapsed"] = round(time.perf_counter() - started, 2)
+    log.info("image.generate.done", script=str(script_path), ok=result["ok"], images=result.get("images"), elapsed=result["elapsed"])
+    return result
+
+
+def generate_many(
+    script_paths: Iterable[Path],
+    pool: "SessionPool",
+    output_dirs: Optional[Dict[str, Path]] = None,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """Generate images for several scripts concurrently, one pool session per script."""
+    paths = [Path(p) for p in script_paths]
+    output_dirs = output_dirs or {}
+
+    def run(path: Path) -> Dict[str, Any]:
+        with pool.acquire() as session:
+            res = generate_images(path, output_dir=output_dirs.get(str(path)), session=session, **kwargs)
+        return dict(res, script=str(path))
+
+    with ThreadPoolExecutor(max_workers=pool.size) as ex:
+        return list(ex.map(run, paths))
+
+
+_pool: Optional[SessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """Shared pool sized by ``IMAGE_SESSIONS`` on the CHROME_PROFILE_PATH setting."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from app.settings import settings
+
+            size = int(os.getenv("IMAGE_SESSIONS", DEFAULT_SESSIONS))
+            headless = os.getenv("IMAGE_HEADLESS", "").lower() in ("1", "true", "yes")
+            _pool = SessionPool(size, settings.CHROME_PROFILE_PATH, headless=headless, chrome_exe=settings.CHROME_EXE_PATH)
+        return _pool
+
+
+def _publish(job_id: str, update: Dict[str, Any]) -> None:
+    from app.tasks import publish_job_update, update_job_state
+
+    with _jobs_lock:
+        state = update_job_state(IMAGE_JOBS, job_id, update)
+    publish_job_update("images", job_id, state)
+
+
+def image_job(job_id: str, script_path: str, output_dir: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Background-task entry point: generate one script's images on a pooled session."""
+    _publish(job_id, {"status": "waiting"})
+    try:
+        with get_session_pool().acquire() as session:
+            _publish(job_id, {"status": "running"})
+            result = generate_images(
+                Path(script_path),
+                output_dir=Path(output_dir) if output_dir else None,
+                session=session,
+                on_progress=lambda p: _publish(job_id, {"progress": p}),
+                **(options or {}),
+            )
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    _publish(job_id, {"status": "done" if result.get("ok") else "failed", "result": result})
+    return result
+
+
+def enqueue_image_generation(script_path: Path, output_dir: Optional[Path] = None, **options: Any) -> str:
+    """Schedule `image_job` on the app's background task queue and return its job id."""
+    from app.tasks import enqueue_job
+
+    job_id = uuid.uuid4().hex
+    _publish(job_id, {"status": "queued", "script": str(script_path), "created": time.time()})
+    enqueue_job(image_job, job_id, str(script_path), str(output_dir) if output_dir else None, options)
+    return job_id
+
+
+def get_image_job(job_id: str) -> Optional[Dict[str, Any]]:
+    from app.tasks import shared_job_state
+
+    with _jobs_lock:
+        job = IMAGE_JOBS.get(job_id)
+        job = dict(job) if job is not None else None
+    # jobs run by a separate worker process (redis queue backend)
+    shared = shared_job_state("images", job_id)
+    return {**(job or {}), **shared} if shared else job
+
+
+__all__ = [
+    "BrowserSession",
+    "SessionPool",
+    "build_prompt",
+    "enqueue_image_generation",
+    "fetch_image_bytes",
+    "generate_images",
+    "generate_many",
+    "generate_scene_images",
+    "get_image_job",
+    "get_session_pool",
+    "plan_batches",
+    "save_batch_images",
+    "scenes_from_script",
+]
@@ -0,0 +1,278 @@
+"""Post-process scene images for CapCut drafts.
+
+Generated scene images arrive at whatever size the generator produced and
+used to be handed to CapCut as-is, twice (scene track and zoomed, blurred
+background). This stage renders, per source image:
+
+- the scene image resized to the draft canvas (1080x1920 or 1920x1080):
+  ``contain`` keeps the whole picture (what CapCut shows by default),
+  ``cover`` fills the canvas and crops the overflow
+- the background variant: cover-cropped to the canvas and blurred once here,
+  so CapCut does not have to scale and blur a full-size image
+- a 64-bit dHash used to spot near-identical scenes; duplicates reuse the
+  first scene's files
+
+Outputs go to ``<episode>/.processed/`` and are named by the source sha256
+plus the render parameters, so a repeated draft never reprocesses an image.
+Source hashes are memoized by (size, mtime) in ``.processed/index.json``.
+Rendering runs in a process pool (Pillow work is CPU bound).
+
+Pillow is optional and imported lazily; ``available()`` tells callers
+whether to fall back to the original files.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from app.services.fileio import write_if_changed
+
+log = structlog.get_logger()
+
+PROCESSED_DIR = ".processed"
+INDEX_NAME = "index.json"
+CANVAS = {"9:16": (1080, 1920), "16:9": (1920, 1080)}
+FORMATS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "fit": "contain",
+    "format": "jpeg",
+    "quality": 90,
+    "background_quality": 80,
+    "blur": 30,
+    "dedupe_threshold": 4,
+}
+_HASH_CHUNK = 1024 * 1024
+
+
+def available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def canvas_size(ratio: str) -> Tuple[int, int]:
+    return CANVAS.get(ratio, CANVAS["16:9"])
+
+
+def resolve_config(builder_configs: Optional[Dict[str, Any]] = None, **overrides: Any) -> Dict[str, Any]:
+    """Defaults < ``builder_configs['image_processing']`` < explicit overrides."""
+    config = dict(DEFAULT_CONFIG)
+    section = (builder_configs or {}).get("image_processing")
+    if isinstance(section, dict):
+        config.update({k: v for k, v in section.items() if k in DEFAULT_CONFIG})
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    if config["fit"] not in ("contain", "cover"):
+        raise ValueError(f"unknown fit: {config['fit']}")
+    if config["format"] not in FORMATS:
+        raise ValueError(f"unsupported format: {config['format']}")
+    return config
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def find_duplicates(hashes: Dict[int, int], threshold: int) -> Dict[int, int]:
+    """Map each duplicate scene to the first earlier scene within ``threshold`` bits."""
+    dupes: Dict[int, int] = {}
+    kept: list = []
+    for scene in sorted(hashes):
+        h = hashes[scene]
+        original = next((k for k in kept if hamming(hashes[k], h) <= threshold), None)
+        if original is None:
+            kept.append(scene)
+        else:
+            dupes[scene] = original
+    return dupes
+
+
+def dhash(img, size: int = 8) -> int:
+    """64-bit difference hash of a PIL image."""
+    from PIL import Image
+
+    small = img.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    px = small.tobytes()
+    bits = 0
+    for row in range(size):
+        base = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (px[base + col] > px[base + col + 1])
+    return bits
+
+
+def _params_key(canvas: Tuple[int, int], config: Dict[str, Any]) -> str:
+    raw = json.dumps([canvas, config["fit"], config["format"], config["quality"], config["background_quality"], config["blur"]])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+
+
+def output_names(sha256: str, canvas: Tuple[int, int], config: Dict[str, Any]) -> Tuple[str, str]:
+    ext = FORMATS[config["format"]]
+    stem = f"{sha256[:16]}-{canvas[0]}x{canvas[1]}-{_params_key(canvas, config)}"
+    return f"{stem}{ext}", f"{stem}-bg{ext}"
+
+
+def _encode(img, fmt: str, quality: int) -> bytes:
+    import io
+
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        img.convert("RGB").save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "webp":
+        img.save(buf, "WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def render_image(src: str, out_dir: str, sha256: str, canvas: Tuple[int, int], config: Dict[str, Any]) -> Dict[str, Any]:
+    """Render the scene and background variants of one source (process-pool entry point)."""
+    from PIL import Image, ImageFilter, ImageOps
+
+    started = time.perf_counter()
+    with Image.open(src) as opened:
+        img = ImageOps.exif_transpose(opened)
+        img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    fmt = config["format"]
+    image_name, bg_name = output_names(sha256, canvas, config)
+
+    if config["fit"] == "cover":
+        scene = ImageOps.fit(img, canvas, Image.Resampling.LANCZOS)
+    else:
+        scene = ImageOps.contain(img, canvas, Image.Resampling.LANCZOS)
+
+    # Blur at quarter resolution, then upscale: same look, a fraction of the cost
+    small = (max(1, canvas[0] // 4), max(1, canvas[1] // 4))
+    bg = ImageOps.fit(img, small, Image.Resampling.BILINEAR)
+    bg = bg.filter(ImageFilter.GaussianBlur(max(1, config["blur"] / 4)))
+    bg = bg.resize(canvas, Image.Resampling.BICUBIC)
+
+    out = Path(out_dir)
+    write_if_changed(out / image_name, _encode(scene, fmt, config["quality"]))
+    write_if_changed(out / bg_name, _encode(bg, fmt, config["background_quality"]))
+    return {
+        "image": str(out / image_name),
+        "background": str(out / bg_name),
+        "dhash": dhash(img),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _Index:
+    """``.processed/index.json``: source stamps -> sha256, sha256 -> dHash."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        self.data.setdefault("sources", {})
+        self.data.setdefault("dhash", {})
+        self.dirty = False
+
+    def source_hash(self, src: Path) -> str:
+        st = src.stat()
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = self.data["sources"].get(src.name)
+        if entry and entry.get("stamp") == stamp:
+            return entry["sha256"]
+        sha = _sha256(src)
+        self.data["sources"][src.name] = {"stamp": stamp, "sha256": sha}
+        self.dirty = True
+        return sha
+
+    def save(self) -> None:
+        if self.dirty:
+            write_if_changed(self.path, json.dumps(self.data, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+            self.dirty = False
+
+
+def process_scene_images(
+    episode_dir: Path,
+    images: Dict[int, Path],
+    ratio: str = "9:16",
+    config: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Render draft-ready variants for ``{scene number: source image}``.
+
+    Returns ``{images, backgrounds, duplicates, rendered, cached, seconds}``
+    where ``images``/``backgrounds`` map scene number -> processed path (a
+    duplicate maps to its original's files) and ``duplicates`` maps scene ->
+    original scene. Requires Pillow.
+    """
+    started = time.perf_counter()
+    config = config or resolve_config()
+    canvas = canvas_size(ratio)
+    out_dir = Path(episode_dir) / PROCESSED_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = _Index(out_dir / INDEX_NAME)
+
+    jobs: Dict[int, Tuple[str, str]] = {}
+    results: Dict[int, Dict[str, Any]] = {}
+    cached = 0
+    for scene, src in images.items():
+        src = Path(src)
+        sha = index.source_hash(src)
+        image_name, bg_name = output_names(sha, canvas, config)
+        known_hash = index.data["dhash"].get(sha)
+        if known_hash is not None and (out_dir / image_name).exists() and (out_dir / bg_name).exists():
+            results[scene] = {"image": str(out_dir / image_name), "background": str(out_dir / bg_name), "dhash": known_hash}
+            cached += 1
+        else:
+            jobs[scene] = (str(src), sha)
+
+    if jobs:
+        workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {s: pool.submit(render_image, src, str(out_dir), sha, canvas, config) for s, (src, sha) in jobs.items()}
+                rendered = {s: f.result() for s, f in futures.items()}
+        else:
+            rendered = {s: render_image(src, str(out_dir), sha, canvas, config) for s, (src, sha) in jobs.items()}
+        for scene, res in rendered.items():
+            index.data["dhash"][jobs[scene][1]] = res["dhash"]
+            index.dirty = True
+            results[scene] = res
+    index.save()
+
+    duplicates = find_duplicates({s: r["dhash"] for s, r in results.items()}, int(config["dedupe_threshold"]))
+    summary = {
+        "images": {s: results[duplicates.get(s, s)]["image"] for s in sorted(results)},
+        "backgrounds": {s: results[duplicates.get(s, s)]["background"] for s in sorted(results)},
+        "duplicates": duplicates,
+        "rendered": len(jobs),
+        "cached": cached,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    log.info("images.processed", episode=str(episode_dir), rendered=len(jobs), cached=cached, duplicates=len(duplicates), seconds=summary["seconds"])
+    return summary
+
+
+__all__ = [
+    "available",
+    "canvas_size",
+    "find_duplicates",
+    "hamming",
+    "process_scene_images",
+    "render_image",
+    "resolve_config",
+]
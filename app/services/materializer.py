@@ -0,0 +1,188 @@
+"""Materialize project folders on disk from Script rows.
+
+Replaces the row-by-row generators (``app.utils.generator_run_once`` and
+``scripts/generate_from_db.py``):
+
+- pending scripts are selected through the indexed ``is_has_folder`` flag,
+  in id-keyset batches, loading only the columns needed to render
+- rendering and file writes run in a thread pool on plain dicts (no ORM
+  objects cross threads)
+- every file is written atomically (temp file + ``os.replace``) and skipped
+  when its content hash is unchanged
+- the flags of a batch are updated with one bulk UPDATE and one commit
+
+Each episode folder gets ``content.txt`` (dialogue lines), ``content.json``
+(dialogue objects for TTS) and ``capcut-api.json``. An existing
+``capcut-api.json`` is kept unless ``force`` is set, because scene alignment
+writes timings into it.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import structlog
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models.script import Script
+from app.services.fileio import write_if_changed
+from app.utils import get_project_path
+
+log = structlog.get_logger()
+
+DEFAULT_BATCH_SIZE = 200
+_COLUMNS = (
+    Script.id,
+    Script.title,
+    Script.alias,
+    Script.logline,
+    Script.acts,
+    Script.characters,
+    Script.setting,
+    Script.genre,
+    Script.themes,
+    Script.tone,
+    Script.builder_configs,
+)
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def render_script(row: Dict[str, Any]) -> Dict[str, bytes]:
+    """Render the folder files of one script row (plain column dict)."""
+    # Transient instance: reuses the model's tolerant JSON parsing, never added to a session
+    script = Script(**row)
+    acts = script.acts_parsed or []
+    scenes = [scene for act in acts if isinstance(act, dict) for scene in (act.get("scenes") or [])]
+    dialogues = [d for scene in scenes for d in (scene.get("dialogues") or []) if isinstance(d, dict)]
+    lines = [str(d.get("line") or d.get("text") or "").strip() for d in dialogues]
+
+    payload = {
+        "id": row["id"],
+        "title": row["title"],
+        "alias": row["alias"],
+        "meta": {"alias": row["alias"], "title": row["title"]},
+        "logline": row["logline"],
+        "tone": row["tone"],
+        "genre": script.genre_parsed,
+        "themes": script.themes_parsed,
+        "setting": script.setting_parsed,
+        "characters": script.characters_parsed,
+        "acts": acts,
+        # Flattened for scene alignment, which reads and writes top-level scenes
+        "scenes": scenes,
+    }
+    builder = script.builder_configs_parsed
+    if builder:
+        payload["builder_configs"] = builder
+
+    return {
+        "content.txt": "\n\n".join(line for line in lines if line).encode("utf-8"),
+        "content.json": _dumps(dialogues),
+        "capcut-api.json": _dumps(payload),
+    }
+
+
+def materialize_row(row: Dict[str, Any], root_dir: Path, force: bool = False) -> Dict[str, Any]:
+    """Create one episode folder. Never raises; returns a per-script result."""
+    result = {"id": row["id"], "ok": True, "written": [], "unchanged": []}
+    try:
+        path = get_project_path({"meta": {"alias": row["alias"], "title": row["title"]}, "id": row["id"]}, root_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        result["path"] = str(path)
+        for name, data in render_script(row).items():
+            target = path / name
+            if name == "capcut-api.json" and target.exists() and not force:
+                result["unchanged"].append(name)
+                continue
+            (result["written"] if write_if_changed(target, data) else result["unchanged"]).append(name)
+    except Exception as e:
+        result.update(ok=False, error=str(e))
+    return result
+
+
+def _pending_batches(batch_size: int, force: bool, script_ids: Optional[Iterable[int]], limit: int):
+    last_id = 0
+    remaining = limit if limit and limit > 0 else None
+    ids = sorted(set(script_ids)) if script_ids is not None else None
+    while True:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        if size <= 0:
+            return
+        stmt = select(*_COLUMNS).where(Script.id > last_id).order_by(Script.id).limit(size)
+        if not force:
+            stmt = stmt.where(Script.is_has_folder.is_(False))
+        if ids is not None:
+            stmt = stmt.where(Script.id.in_(ids))
+        rows = [dict(r._mapping) for r in db.session.execute(stmt)]
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def materialize_pending(
+    root_dir: Optional[Path] = None,
+    force: bool = False,
+    limit: int = 0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: Optional[int] = None,
+    script_ids: Optional[Iterable[int]] = None,
+) -> Dict[str, Any]:
+    """Materialize folders for scripts without one (all selected scripts with ``force``).
+
+    Must run inside an app context. Returns a summary dict:
+    ``{selected, materialized, files_written, files_unchanged, failed, failures}``.
+    """
+    if root_dir is None:
+        from flask import current_app
+
+        root_dir = Path(current_app.root_path).parent
+    root_dir = Path(root_dir)
+    summary: Dict[str, Any] = {
+        "selected": 0,
+        "materialized": 0,
+        "files_written": 0,
+        "files_unchanged": 0,
+        "failed": 0,
+        "failures": [],
+    }
+    workers = max_workers or min(8, (os.cpu_count() or 1) * 2)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rows in _pending_batches(batch_size, force, script_ids, limit):
+            results: List[Dict[str, Any]] = list(pool.map(lambda r: materialize_row(r, root_dir, force), rows))
+            ok_ids = [r["id"] for r in results if r["ok"]]
+            if ok_ids:
+                try:
+                    db.session.execute(
+                        update(Script)
+                        .where(Script.id.in_(ok_ids), Script.is_has_folder.is_(False))
+                        .values(is_has_folder=True)
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    log.error("materializer.flag_update.failed", ids=ok_ids, error=str(e))
+                    raise
+            summary["selected"] += len(rows)
+            summary["materialized"] += len(ok_ids)
+            for r in results:
+                summary["files_written"] += len(r["written"])
+                summary["files_unchanged"] += len(r["unchanged"])
+                if not r["ok"]:
+                    summary["failed"] += 1
+                    summary["failures"].append({"id": r["id"], "error": r.get("error")})
+            log.info("materializer.batch.done", size=len(rows), ok=len(ok_ids), last_id=rows[-1]["id"])
+
+    return summary
+
+
+__all__ = ["materialize_pending", "materialize_row", "render_script"]
@@ -0,0 +1,290 @@
+"""Shared media probing with an on-disk cache.
+
+A single ``ffprobe -show_format -show_streams`` call per file replaces the
+ffprobe/ffmpeg cascades that used to live in the pipeline scripts. Results
+are cached in a small SQLite index keyed by ``(path, size, mtime)`` so an
+episode that has not changed is never probed twice.
+
+Usage:
+    from app.services.media_probe import probe_duration, probe_tree
+
+    seconds = probe_duration(Path('projects/x/1.alias/audio.mp3'))
+    infos = probe_tree(Path('projects'), max_workers=4)
+"""
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "cc_bcal" / "media_probe.sqlite"
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".wav", ".aac", ".ogg", ".flac")
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+\.\d+)")
+
+
+def _find_executable(name: str) -> Optional[str]:
+    """Locate ffprobe/ffmpeg, preferring the binary bundled with imageio_ffmpeg."""
+    try:
+        import imageio_ffmpeg
+
+        getter = getattr(imageio_ffmpeg, f"get_{name}_exe", None)
+        if callable(getter):
+            path = getter()
+            if path:
+                return path
+    except Exception:
+        pass
+    return shutil.which(name)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_ffprobe_output(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce ffprobe JSON output to the fields the pipeline uses.
+
+    Returns a dict with keys: duration, codec, sample_rate, channels,
+    format_name and bit_rate. Missing values are None.
+    """
+    fmt = raw.get("format") or {}
+    streams = raw.get("streams") or []
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    stream = audio or (streams[0] if streams else {})
+
+    duration = _to_float(fmt.get("duration"))
+    if duration is None:
+        duration = _to_float(stream.get("duration"))
+
+    return {
+        "duration": duration,
+        "codec": stream.get("codec_name"),
+        "sample_rate": _to_int(stream.get("sample_rate")),
+        "channels": _to_int(stream.get("channels")),
+        "format_name": fmt.get("format_name"),
+        "bit_rate": _to_int(fmt.get("bit_rate")),
+    }
+
+
+def run_probe(path: str) -> Optional[Dict[str, Any]]:
+    """Probe one file with a single subprocess call (no caching).
+
+    Uses ffprobe when available and falls back to parsing the ``Duration``
+    line of ``ffmpeg -i`` (duration only). Returns None when the file could
+    not be probed. Kept at module level so it can run in a process pool.
+    """
+    ffprobe = _find_executable("ffprobe")
+    if ffprobe:
+        try:
+            out = subprocess.check_output(
+                [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", str(path)],
+                text=True,
+                stderr=subprocess.DEVNULL,
+            )
+            return parse_ffprobe_output(json.loads(out or "{}"))
+        except Exception:
+            pass
+
+    ffmpeg = _find_executable("ffmpeg")
+    if ffmpeg:
+        try:
+            proc = subprocess.run([ffmpeg, "-hide_banner", "-i", str(path)], capture_output=True, text=True)
+            m = _DURATION_RE.search(proc.stderr or "")
+            if m:
+                h, mm, ss = m.groups()
+                return {
+                    "duration": int(h) * 3600 + int(mm) * 60 + float(ss),
+                    "codec": None,
+                    "sample_rate": None,
+                    "channels": None,
+                    "format_name": None,
+                    "bit_rate": None,
+                }
+        except Exception:
+            pass
+
+    return None
+
+
+class MediaProbeCache:
+    """SQLite-backed cache of probe results keyed by (path, size, mtime_ns).
+
+    The connection is shared between threads and guarded by a lock; the
+    cache is tiny compared to the cost of a subprocess so contention is not
+    a concern.
+    """
+
+    def __init__(self, db_path: Path | str | None = None):
+        if db_path is None:
+            db_path = os.getenv("MEDIA_PROBE_CACHE") or DEFAULT_CACHE_PATH
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS media_probe ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " info TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, path: Path, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, info FROM media_probe WHERE path = ?", (str(path),)
+            ).fetchone()
+        if not row or row[0] != size or row[1] != mtime_ns:
+            return None
+        try:
+            return json.loads(row[2])
+        except Exception:
+            return None
+
+    def put_many(self, rows: Iterable[tuple]) -> None:
+        """Store ``(path, size, mtime_ns, info)`` tuples in one transaction."""
+        payload = [(str(p), s, m, json.dumps(info)) for p, s, m, info in rows]
+        if not payload:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO media_probe (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                payload,
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[MediaProbeCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> MediaProbeCache:
+    """Return the process-wide cache instance, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MediaProbeCache()
+        return _default_cache
+
+
+def probe_many(
+    paths: Iterable[Path],
+    max_workers: int | None = None,
+    cache: MediaProbeCache | None = None,
+) -> Dict[Path, Optional[Dict[str, Any]]]:
+    """Probe several files, only spawning subprocesses for cache misses.
+
+    Misses are probed in a bounded process pool (``max_workers`` defaults to
+    the CPU count, capped at 8). Files that do not exist map to None.
+    """
+    cache = cache or get_cache()
+    results: Dict[Path, Optional[Dict[str, Any]]] = {}
+    misses: List[tuple] = []
+
+    for p in paths:
+        p = Path(p).resolve()
+        try:
+            st = p.stat()
+        except OSError:
+            results[p] = None
+            continue
+        cached = cache.get(p, st.st_size, st.st_mtime_ns)
+        if cached is not None:
+            results[p] = cached
+        else:
+            misses.append((p, st.st_size, st.st_mtime_ns))
+
+    if not misses:
+        return results
+
+    if max_workers is None:
+        max_workers = min(8, os.cpu_count() or 1)
+    max_workers = max(1, min(max_workers, len(misses)))
+
+    if max_workers == 1:
+        infos = [run_probe(str(p)) for p, _, _ in misses]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            infos = list(executor.map(run_probe, [str(p) for p, _, _ in misses]))
+
+    to_store = []
+    for (p, size, mtime_ns), info in zip(misses, infos):
+        results[p] = info
+        if info is not None:
+            to_store.append((p, size, mtime_ns, info))
+    cache.put_many(to_store)
+    log.debug("media_probe.probed", probed=len(misses), cached=len(results) - len(misses))
+    return results
+
+
+def probe_media(path: Path, cache: MediaProbeCache | None = None) -> Optional[Dict[str, Any]]:
+    """Probe a single file (cached). Returns the info dict or None."""
+    p = Path(path).resolve()
+    return probe_many([p], max_workers=1, cache=cache).get(p)
+
+
+def probe_duration(path: Path, cache: MediaProbeCache | None = None) -> Optional[float]:
+    """Return the duration of a media file in seconds, or None."""
+    info = probe_media(path, cache=cache)
+    return info.get("duration") if info else None
+
+
+def probe_tree(
+    root: Path,
+    extensions: Iterable[str] = AUDIO_EXTENSIONS,
+    max_workers: int | None = None,
+    cache: MediaProbeCache | None = None,
+) -> Dict[Path, Optional[Dict[str, Any]]]:
+    """Probe every media file under ``root`` matching ``extensions``."""
+    exts = tuple(e.lower() for e in extensions)
+    found: List[Path] = []
+    stack = [Path(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.name.lower().endswith(exts):
+                        found.append(Path(entry.path))
+        except OSError:
+            continue
+    return probe_many(found, max_workers=max_workers, cache=cache)
+
+
+__all__ = [
+    "MediaProbeCache",
+    "get_cache",
+    "parse_ffprobe_output",
+    "run_probe",
+    "probe_many",
+    "probe_media",
+    "probe_duration",
+    "probe_tree",
+]
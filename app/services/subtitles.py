@@ -0,0 +1,316 @@
+"""Subtitle engine for WhisperX transcripts.
+
+Builds subtitle cues from word timings and writes SRT, WebVTT and ASS files.
+
+- Word timings come from the columnar transcript sidecar
+  (``app.services.transcript_store``); the JSON is only streamed, segment by
+  segment, when the sidecar is missing or stale.
+- Word grouping is computed with NumPy: gap, duration and word-count break
+  points are derived for every word at once, and cues are formed by walking
+  the precomputed "next break" chain.
+
+Grouping matches the original ``write_srt_from_json`` rules: a new cue
+starts at a word when the pause before it reaches ``pause_threshold``, when
+the current cue already has ``max_words`` words, or when the cue would span
+``max_segment_duration`` seconds. Cues never cross WhisperX segments.
+
+Per-script settings come from ``builder_configs['subtitles']``::
+
+    {"pause_threshold": 0.6, "max_segment_duration": 6.0, "max_words": 10,
+     "formats": ["srt", "vtt", "ass"]}
+"""
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from app.services.transcript_store import Transcript, iter_segments, load_transcript
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "pause_threshold": 0.6,
+    "max_segment_duration": 6.0,
+    "max_words": 10,
+    "formats": ["srt"],
+}
+SUPPORTED_FORMATS = ("srt", "vtt", "ass")
+
+Cue = Tuple[float, float, str]
+
+
+def resolve_config(builder_configs: Optional[Dict[str, Any]] = None, **overrides) -> Dict[str, Any]:
+    """Merge defaults, ``builder_configs['subtitles']`` and explicit overrides.
+
+    Keys are accepted in lower case or in the legacy constant spelling
+    (``PAUSE_THRESHOLD``, ``MAX_SEGMENT_DURATION``, ``MAX_WORDS``).
+    """
+    cfg = dict(DEFAULT_CONFIG)
+    sub = (builder_configs or {}).get("subtitles") if isinstance(builder_configs, dict) else None
+    for source in (sub or {}, overrides):
+        for key, value in source.items():
+            if value is not None:
+                cfg[str(key).lower()] = value
+    cfg["pause_threshold"] = float(cfg["pause_threshold"])
+    cfg["max_segment_duration"] = float(cfg["max_segment_duration"])
+    cfg["max_words"] = max(1, int(cfg["max_words"]))
+    formats = cfg.get("formats") or ["srt"]
+    if isinstance(formats, str):
+        formats = [formats]
+    cfg["formats"] = [f.lower() for f in formats if f.lower() in SUPPORTED_FORMATS] or ["srt"]
+    return cfg
+
+
+def _num(value: Any) -> float:
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+
+class WordTable:
+    """Flat per-word arrays for a transcript plus cues for word-less segments."""
+
+    def __init__(self):
+        self.words: List[str] = []
+        self.start: np.ndarray = np.empty(0)
+        self.end: np.ndarray = np.empty(0)
+        self.segment: np.ndarray = np.empty(0, dtype=np.int64)
+        # (segment index, start, end, text) for segments without word timings
+        self.fallback: List[Tuple[int, Optional[float], Optional[float], str]] = []
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict[str, Any]]) -> "WordTable":
+        table = cls()
+        starts: List[float] = []
+        ends: List[float] = []
+        seg_ids: List[int] = []
+        for si, seg in enumerate(segments):
+            words = seg.get("words")
+            if words and isinstance(words, list):
+                table.words.extend([w.get("word", "") or "" for w in words])
+                starts.extend([_num(w.get("start")) for w in words])
+                ends.extend([_num(w.get("end")) for w in words])
+                seg_ids.extend([si] * len(words))
+            else:
+                table.fallback.append((si, seg.get("start"), seg.get("end"), (seg.get("text") or "").strip()))
+        table.start = np.asarray(starts, dtype=np.float64)
+        table.end = np.asarray(ends, dtype=np.float64)
+        table.segment = np.asarray(seg_ids, dtype=np.int64)
+        return table
+
+    @classmethod
+    def from_transcript(cls, transcript: Transcript) -> "WordTable":
+        """Build from columnar transcript arrays without touching the JSON."""
+        table = cls()
+        table.words = transcript.words()
+        table.start = np.asarray(transcript.start)
+        table.end = np.asarray(transcript.end)
+        table.segment = np.asarray(transcript.segment, dtype=np.int64)
+        texts = None
+        for si in np.flatnonzero(~np.asarray(transcript.seg_has_words)).tolist():
+            if texts is None:
+                texts = transcript.segment_texts()
+            st, en = float(transcript.seg_start[si]), float(transcript.seg_end[si])
+            table.fallback.append((si, None if math.isnan(st) else st, None if math.isnan(en) else en, texts[si].strip()))
+        return table
+
+    @classmethod
+    def from_json(cls, json_path: Path) -> "WordTable":
+        return cls.from_segments(iter_segments(json_path))
+
+
+def group_boundaries(
+    start: np.ndarray,
+    end: np.ndarray,
+    segment: np.ndarray,
+    pause_threshold: float,
+    max_segment_duration: float,
+    max_words: int,
+) -> np.ndarray:
+    """Return the index of the first word of every cue (ascending)."""
+    n = len(start)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    # Missing timings count as 0 when computing breaks (as .get('start', 0) did)
+    s = np.nan_to_num(start, nan=0.0)
+    e = np.nan_to_num(end, nan=0.0)
+    idx = np.arange(n)
+
+    # Forced breaks: new segment or a long enough pause before the word
+    forced = np.ones(n, dtype=bool)
+    forced[1:] = (segment[1:] != segment[:-1]) | ((s[1:] - e[:-1]) >= pause_threshold)
+    forced_idx = np.flatnonzero(forced)
+    pos = np.searchsorted(forced_idx, idx, side="right")
+    next_forced = np.where(pos < len(forced_idx), forced_idx[np.minimum(pos, len(forced_idx) - 1)], n)
+
+    # Duration breaks: first j > i with end[j] - start[i] >= max duration.
+    # searchsorted over the running max of end times gives a lower bound; the
+    # exact subtraction is then re-checked so float ties match the loop version.
+    running_max = np.maximum.accumulate(e)
+    next_dur = np.searchsorted(running_max, s + max_segment_duration - 1e-9, side="left")
+    next_dur = np.maximum(next_dur, idx + 1)
+    for _ in range(32):
+        pending = next_dur < n
+        pending[pending] = (e[next_dur[pending]] - s[pending]) < max_segment_duration
+        if not pending.any():
+            break
+        next_dur[pending] += 1
+    else:
+        # Only reachable with heavily non-monotonic end times
+        for i in np.flatnonzero(next_dur < n):
+            j = next_dur[i]
+            hits = np.flatnonzero((e[j:] - s[i]) >= max_segment_duration)
+            next_dur[i] = j + hits[0] if len(hits) else n
+
+    nxt = np.minimum(np.minimum(next_forced, idx + max_words), next_dur)
+    nxt = np.minimum(nxt, n).tolist()
+
+    starts = []
+    g = 0
+    while g < n:
+        starts.append(g)
+        g = nxt[g]
+    return np.asarray(starts, dtype=np.int64)
+
+
+def build_cues(table: WordTable, config: Dict[str, Any]) -> List[Cue]:
+    """Group words into cues and merge in word-less segments, in transcript order."""
+    bounds = group_boundaries(
+        table.start,
+        table.end,
+        table.segment,
+        config["pause_threshold"],
+        config["max_segment_duration"],
+        config["max_words"],
+    )
+    n = len(table.words)
+    ends = np.append(bounds[1:], n) if len(bounds) else bounds
+    keyed: List[Tuple[int, int, Cue]] = []
+    starts_l = table.start.tolist()
+    ends_l = table.end.tolist()
+    seg_l = table.segment.tolist()
+    for order, (a, b) in enumerate(zip(bounds.tolist(), ends.tolist())):
+        st, en = starts_l[a], ends_l[b - 1]
+        text = " ".join(table.words[a:b]).strip()
+        if math.isnan(st) or math.isnan(en) or not text:
+            continue
+        keyed.append((seg_l[a], order, (st, en, text)))
+    for si, st, en, text in table.fallback:
+        if st is None or en is None or not text:
+            continue
+        keyed.append((si, 0, (float(st), float(en), text)))
+    keyed.sort(key=lambda k: (k[0], k[1]))
+    return [c for _, _, c in keyed]
+
+
+# --- formatting -----------------------------------------------------------
+
+def _split_ms(seconds: float) -> Tuple[int, int, int, int]:
+    total_ms = int(round(max(float(seconds or 0), 0.0) * 1000))
+    h, rem = divmod(total_ms, 3_600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1000)
+    return h, m, s, ms
+
+
+def srt_timestamp(seconds: float) -> str:
+    h, m, s, ms = _split_ms(seconds)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def vtt_timestamp(seconds: float) -> str:
+    h, m, s, ms = _split_ms(seconds)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def ass_timestamp(seconds: float) -> str:
+    h, m, s, ms = _split_ms(seconds)
+    return f"{h:d}:{m:02d}:{s:02d}.{ms // 10:02d}"
+
+
+def _timestamps(seconds: List[float], sep: str) -> List[str]:
+    """Vectorized ``srt_timestamp``/``vtt_timestamp`` for a whole cue list."""
+    total = np.rint(np.maximum(np.asarray(seconds, dtype=np.float64), 0.0) * 1000).astype(np.int64)
+    h, rem = np.divmod(total, 3_600_000)
+    m, rem = np.divmod(rem, 60_000)
+    sec, ms = np.divmod(rem, 1000)
+    return [f"{a:02d}:{b:02d}:{c:02d}{sep}{d:03d}" for a, b, c, d in zip(h.tolist(), m.tolist(), sec.tolist(), ms.tolist())]
+
+
+def _cue_blocks(cues: List[Cue], sep: str) -> Iterator[str]:
+    starts = _timestamps([c[0] for c in cues], sep)
+    ends = _timestamps([c[1] for c in cues], sep)
+    for st, en, (_, _, text) in zip(starts, ends, cues):
+        yield f"{st} --> {en}\n{text}\n"
+
+
+def write_srt(cues: List[Cue], fh: TextIO) -> int:
+    fh.write("\n".join(f"{i}\n{block}" for i, block in enumerate(_cue_blocks(cues, ","), start=1)))
+    return len(cues)
+
+
+def write_vtt(cues: List[Cue], fh: TextIO) -> int:
+    fh.write("WEBVTT\n")
+    fh.write("".join(f"\n{block}" for block in _cue_blocks(cues, ".")))
+    return len(cues)
+
+
+def write_ass(cues: Iterable[Cue], fh: TextIO, config: Optional[Dict[str, Any]] = None) -> int:
+    cfg = config or {}
+    width, height = cfg.get("play_res", (1080, 1920))
+    font = cfg.get("font", "Arial")
+    size = cfg.get("font_size", 64)
+    fh.write(
+        "[Script Info]\nScriptType: v4.00+\n"
+        f"PlayResX: {width}\nPlayResY: {height}\nWrapStyle: 0\n\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+        "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        f"Style: Default,{font},{size},&H00FFFFFF,&H000000FF,&H00000000,&H80000000,"
+        "0,0,0,0,100,100,0,0,1,3,0,2,40,40,120,1\n\n"
+        "[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+    count = 0
+    for count, (st, en, text) in enumerate(cues, start=1):
+        safe = text.replace("\\", "\\\\").replace("{", "(").replace("}", ")").replace("\n", "\\N")
+        fh.write(f"Dialogue: 0,{ass_timestamp(st)},{ass_timestamp(en)},Default,,0,0,0,,{safe}\n")
+    return count
+
+
+_WRITERS = {"srt": write_srt, "vtt": write_vtt}
+
+
+def write_subtitles(
+    json_path: Path,
+    config: Optional[Dict[str, Any]] = None,
+    formats: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """Write subtitle files next to ``json_path`` (``<name>.srt/.vtt/.ass``).
+
+    Returns ``{'cues': n, 'paths': {fmt: Path}}``.
+    """
+    json_path = Path(json_path)
+    cfg = config if config is not None else resolve_config()
+    fmts = list(formats) if formats else cfg["formats"]
+    cues = build_cues(WordTable.from_transcript(load_transcript(json_path)), cfg)
+
+    paths: Dict[str, Path] = {}
+    for fmt in fmts:
+        out = json_path.with_suffix(f".{fmt}")
+        with open(out, "w", encoding="utf-8", newline="\n") as fh:
+            if fmt == "ass":
+                write_ass(cues, fh, cfg)
+            else:
+                _WRITERS[fmt](cues, fh)
+        paths[fmt] = out
+    return {"cues": len(cues), "paths": paths}
+
+
+__all__ = [
+    "DEFAULT_CONFIG",
+    "resolve_config",
+    "iter_segments",
+    "WordTable",
+    "group_boundaries",
+    "build_cues",
+    "srt_timestamp",
+    "write_subtitles",
+]
@@ -0,0 +1,314 @@
+"""Full-text search over every transcribed episode.
+
+Transcripts are indexed at subtitle-cue granularity (the same word groups as
+the SRT) in a SQLite FTS5 table. Each cue row carries its payload: script id,
+scene number, start/end time and the episode folder. A search therefore
+returns timecodes directly, without opening any transcript.
+
+The index lives in one SQLite file, ``$TRANSCRIPT_INDEX`` or
+``<projects root>/.transcript-index.sqlite``. It is updated incrementally.
+An episode is re-indexed only when the size/mtime of its ``.whisperx.json``
+or ``capcut-api.json`` changed; the latter matters because alignment moves
+scene boundaries. ``run_pipeline`` indexes each episode as soon as it has
+been post-processed.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import structlog
+
+from app.services.episode_manifest import discover_episodes, script_id_from_folder
+from app.services.subtitles import WordTable, build_cues, resolve_config, vtt_timestamp
+from app.services.transcript_store import load_transcript
+
+log = structlog.get_logger()
+
+INDEX_NAME = ".transcript-index.sqlite"
+# Above this many matching cues, results are not ranked (see TranscriptIndex.search)
+RANK_LIMIT = 5000
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    episode TEXT NOT NULL UNIQUE,
+    script_id INTEGER,
+    stamp TEXT NOT NULL,
+    cue_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS cues (
+    id INTEGER PRIMARY KEY,
+    transcript_id INTEGER NOT NULL REFERENCES transcripts(id) ON DELETE CASCADE,
+    script_id INTEGER,
+    scene INTEGER,
+    start REAL NOT NULL,
+    "end" REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cues_transcript ON cues(transcript_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS cue_fts USING fts5(
+    text, content='cues', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='3'
+);
+CREATE TRIGGER IF NOT EXISTS cues_ai AFTER INSERT ON cues BEGIN
+    INSERT INTO cue_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS cues_ad AFTER DELETE ON cues BEGIN
+    INSERT INTO cue_fts(cue_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def default_index_path(projects_root: Optional[Path] = None) -> Path:
+    """``$TRANSCRIPT_INDEX``, else the index file in ``projects_root``.
+
+    ``projects_root`` defaults to ``get_projects_root()`` (needs an app
+    context), the same folder ``run_pipeline`` and `flask index-transcripts`
+    write to.
+    """
+    env = os.getenv("TRANSCRIPT_INDEX")
+    if env:
+        return Path(env)
+    if projects_root is None:
+        from app.utils import get_projects_root
+
+        projects_root = get_projects_root()
+    return Path(projects_root) / INDEX_NAME
+
+
+def build_match_query(q: str) -> str:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    ``"exact words"`` becomes a phrase query. Otherwise every word must
+    appear, and a last word of three or more characters is a prefix so
+    partially typed queries already match (shorter prefixes would fan out to
+    most of the vocabulary).
+    """
+    q = (q or "").strip()
+    if len(q) > 1 and q.startswith('"') and q.endswith('"'):
+        tokens = _TOKEN_RE.findall(q)
+        return '"' + " ".join(tokens) + '"' if tokens else ""
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return ""
+    terms = [f'"{t}"' for t in tokens]
+    if len(tokens[-1]) >= 3:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _stamp(paths: Iterable[Path]) -> str:
+    parts = []
+    for p in paths:
+        try:
+            st = p.stat()
+            parts.append(f"{p.name}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{p.name}:-")
+    return "|".join(parts)
+
+
+def _scene_starts(capcut_path: Path) -> List[float]:
+    """Aligned scene start times (seconds) from capcut-api.json, in scene order."""
+    try:
+        with open(capcut_path, "r", encoding="utf-8") as f:
+            scenes = json.load(f).get("scenes") or []
+    except (OSError, ValueError, AttributeError):
+        return []
+    starts = [s.get("start") if isinstance(s, dict) else None for s in scenes]
+    return starts if any(isinstance(s, (int, float)) for s in starts) else []
+
+
+def _scene_for(t: float, scene_starts: List[Any]) -> Optional[int]:
+    scene = None
+    for i, st in enumerate(scene_starts, start=1):
+        if isinstance(st, (int, float)) and st <= t + 1e-6:
+            scene = i
+    return scene
+
+
+class TranscriptIndex:
+    """SQLite FTS5 index of transcript cues (one connection per thread)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- writing ----------------------------------------------------------
+
+    def index_episode(self, episode_dir: Path, force: bool = False) -> Optional[int]:
+        """(Re)index one episode. Returns the cue count, or None when unchanged/untranscribed."""
+        episode_dir = Path(episode_dir)
+        transcripts = sorted(episode_dir.glob("*.whisperx.json"))
+        if not transcripts:
+            return None
+        json_path = transcripts[0]
+        capcut_path = episode_dir / "capcut-api.json"
+        stamp = _stamp([json_path, capcut_path])
+        key = str(episode_dir.resolve())
+
+        conn = self._connect()
+        row = conn.execute("SELECT id, stamp FROM transcripts WHERE episode = ?", (key,)).fetchone()
+        if row is not None and row["stamp"] == stamp and not force:
+            return None
+
+        cues = build_cues(WordTable.from_transcript(load_transcript(json_path)), resolve_config(None))
+        scene_starts = _scene_starts(capcut_path)
+        script_id = script_id_from_folder(episode_dir.name)
+
+        with self._write_lock, conn:
+            if row is not None:
+                conn.execute("DELETE FROM cues WHERE transcript_id = ?", (row["id"],))
+                conn.execute("DELETE FROM transcripts WHERE id = ?", (row["id"],))
+            tid = conn.execute(
+                "INSERT INTO transcripts (episode, script_id, stamp, cue_count) VALUES (?, ?, ?, ?)",
+                (key, script_id, stamp, len(cues)),
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO cues (transcript_id, script_id, scene, start, "end", text) VALUES (?, ?, ?, ?, ?, ?)',
+                [(tid, script_id, _scene_for(st, scene_starts), st, en, text) for st, en, text in cues],
+            )
+        log.info("transcript_index.episode_indexed", episode=key, cues=len(cues))
+        return len(cues)
+
+    def remove_missing(self) -> int:
+        """Drop episodes whose folder or transcript no longer exists."""
+        conn = self._connect()
+        gone = [
+            r["id"]
+            for r in conn.execute("SELECT id, episode FROM transcripts").fetchall()
+            if not any(Path(r["episode"]).glob("*.whisperx.json"))
+        ]
+        if gone:
+            with self._write_lock, conn:
+                conn.executemany("DELETE FROM cues WHERE transcript_id = ?", [(i,) for i in gone])
+                conn.executemany("DELETE FROM transcripts WHERE id = ?", [(i,) for i in gone])
+        return len(gone)
+
+    def update(self, projects_root: Path, force: bool = False) -> Dict[str, int]:
+        """Incrementally index every episode under ``projects_root``."""
+        indexed = unchanged = failed = 0
+        for ep in discover_episodes(Path(projects_root)):
+            try:
+                if self.index_episode(ep, force=force) is None:
+                    unchanged += 1
+                else:
+                    indexed += 1
+            except Exception as e:
+                failed += 1
+                log.warning("transcript_index.episode_failed", episode=str(ep), error=str(e))
+        removed = self.remove_missing()
+        if indexed or removed:
+            conn = self._connect()
+            with self._write_lock, conn:
+                conn.execute("INSERT INTO cue_fts(cue_fts) VALUES ('optimize')")
+        return {"indexed": indexed, "unchanged": unchanged, "failed": failed, "removed": removed}
+
+    # --- reading ----------------------------------------------------------
+
+    def search(self, q: str, limit: int = 50, offset: int = 0, script_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return cue hits ranked by BM25 relevance.
+
+        Scoring touches every matching cue, so for unselective queries (more
+        than ``RANK_LIMIT`` matches, e.g. a very common word) hits are returned
+        in index order instead, which FTS5 streams and stops at ``limit``.
+        """
+        match = build_match_query(q)
+        if not match or not self.path.exists():
+            return []
+        conn = self._connect()
+        if script_id is None:
+            count_sql = "SELECT COUNT(*) FROM (SELECT rowid FROM cue_fts WHERE cue_fts MATCH ? LIMIT ?)"
+            count_params: List[Any] = [match, RANK_LIMIT + 1]
+        else:
+            # count only this script's hits, or a common word elsewhere disables ranking here
+            count_sql = (
+                "SELECT COUNT(*) FROM (SELECT cue_fts.rowid FROM cue_fts JOIN cues c ON c.id = cue_fts.rowid "
+                "WHERE cue_fts MATCH ? AND c.script_id = ? LIMIT ?)"
+            )
+            count_params = [match, script_id, RANK_LIMIT + 1]
+        matches = conn.execute(count_sql, count_params).fetchone()[0]
+        if not matches:
+            return []
+        sql = (
+            'SELECT c.script_id, c.scene, c.start, c."end", c.text, t.episode, '
+            "snippet(cue_fts, 0, '[', ']', '…', 12) AS snippet "
+            "FROM cue_fts JOIN cues c ON c.id = cue_fts.rowid "
+            "JOIN transcripts t ON t.id = c.transcript_id "
+            "WHERE cue_fts MATCH ?"
+        )
+        params: List[Any] = [match]
+        if script_id is not None:
+            sql += " AND c.script_id = ?"
+            params.append(script_id)
+        sql += " ORDER BY bm25(cue_fts), c.start" if matches <= RANK_LIMIT else " ORDER BY cue_fts.rowid"
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([int(limit), int(offset)])
+        rows = conn.execute(sql, params).fetchall()
+        return [
+            {
+                "script_id": r["script_id"],
+                "scene": r["scene"],
+                "start": r["start"],
+                "end": r["end"],
+                "timecode": vtt_timestamp(r["start"]),
+                "text": r["text"],
+                "snippet": r["snippet"],
+                "episode": Path(r["episode"]).name,
+            }
+            for r in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        if not self.path.exists():
+            return {"transcripts": 0, "cues": 0}
+        conn = self._connect()
+        row = conn.execute("SELECT COUNT(*) AS n, COALESCE(SUM(cue_count), 0) AS cues FROM transcripts").fetchone()
+        return {"transcripts": row["n"], "cues": row["cues"]}
+
+
+_INDEXES: Dict[str, TranscriptIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(path: Optional[Path] = None) -> TranscriptIndex:
+    """Shared index instance for ``path`` (default: ``default_index_path()``)."""
+    path = Path(path) if path is not None else default_index_path()
+    key = str(path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = TranscriptIndex(path)
+        return index
+
+
+__all__ = [
+    "TranscriptIndex",
+    "build_match_query",
+    "default_index_path",
+    "get_index",
+    "script_id_from_folder",
+]
@@ -0,0 +1,256 @@
+"""Compact columnar sidecar for WhisperX transcripts.
+
+Next to every ``<name>.whisperx.json`` the pipeline keeps a
+``<name>.whisperx.npz`` holding the same data as flat arrays:
+
+- words: ``token_ids`` (index into ``vocab``), ``start``, ``end``, ``score``
+  and ``segment`` (index of the owning segment)
+- segments: ``seg_start``, ``seg_end``, ``seg_has_words`` and the segment
+  texts as one UTF-8 blob (``seg_text_blob`` + ``seg_text_offsets``)
+- ``source``: size / mtime_ns of the JSON it was built from, plus the format
+  version, so a re-transcribed episode never reads a stale sidecar
+
+The archive is written uncompressed so every member can be memory-mapped in
+place; loading a multi-hour transcript only reads the zip directory and the
+array headers. Missing timings are stored as NaN.
+
+``load_transcript`` is the entry point for consumers (alignment, subtitles):
+it returns the sidecar when it is fresh and otherwise parses the JSON once and
+(re)writes the sidecar.
+"""
+import json
+import math
+import os
+import struct
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import ijson
+except ImportError:  # optional: fall back to json.load
+    ijson = None
+
+SIDECAR_SUFFIX = ".npz"
+FORMAT_VERSION = 1
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def iter_segments(json_path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield WhisperX segments one at a time (streamed when ijson is installed)."""
+    with open(json_path, "rb") as f:
+        if ijson is not None:
+            yield from ijson.items(f, "segments.item", use_float=True)
+            return
+        data = json.load(f)
+    yield from data.get("segments", []) or []
+
+
+def sidecar_path(json_path: Path) -> Path:
+    return Path(json_path).with_suffix(SIDECAR_SUFFIX)
+
+
+def _num(value: Any) -> float:
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+
+def _source_stamp(json_path: Path) -> np.ndarray:
+    st = os.stat(json_path)
+    return np.asarray([FORMAT_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+class Transcript:
+    """Column view of one transcript (arrays may be read-only memory maps)."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.token_ids = arrays["token_ids"]
+        self.start = arrays["start"]
+        self.end = arrays["end"]
+        self.score = arrays["score"]
+        self.segment = arrays["segment"]
+        self.vocab = arrays["vocab"]
+        self.seg_start = arrays["seg_start"]
+        self.seg_end = arrays["seg_end"]
+        self.seg_has_words = arrays["seg_has_words"]
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict[str, Any]]) -> "Transcript":
+        vocab: Dict[str, int] = {}
+        token_ids: List[int] = []
+        starts: List[float] = []
+        ends: List[float] = []
+        scores: List[float] = []
+        seg_ids: List[int] = []
+        seg_start: List[float] = []
+        seg_end: List[float] = []
+        seg_has_words: List[bool] = []
+        texts: List[bytes] = []
+        for si, seg in enumerate(segments):
+            words = seg.get("words")
+            has_words = bool(words) and isinstance(words, list)
+            if has_words:
+                for w in words:
+                    token = w.get("word", "") or ""
+                    token_ids.append(vocab.setdefault(token, len(vocab)))
+                    starts.append(_num(w.get("start")))
+                    ends.append(_num(w.get("end")))
+                    scores.append(_num(w.get("score")))
+                    seg_ids.append(si)
+            seg_start.append(_num(seg.get("start")))
+            seg_end.append(_num(seg.get("end")))
+            seg_has_words.append(has_words)
+            texts.append((seg.get("text") or "").encode("utf-8"))
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        if texts:
+            np.cumsum([len(t) for t in texts], out=offsets[1:])
+        return cls({
+            "token_ids": np.asarray(token_ids, dtype=np.int32),
+            "start": np.asarray(starts, dtype=np.float64),
+            "end": np.asarray(ends, dtype=np.float64),
+            "score": np.asarray(scores, dtype=np.float32),
+            "segment": np.asarray(seg_ids, dtype=np.int32),
+            "vocab": np.asarray(list(vocab), dtype=np.str_) if vocab else np.empty(0, dtype="U1"),
+            "seg_start": np.asarray(seg_start, dtype=np.float64),
+            "seg_end": np.asarray(seg_end, dtype=np.float64),
+            "seg_has_words": np.asarray(seg_has_words, dtype=bool),
+            "seg_text_blob": np.frombuffer(b"".join(texts), dtype=np.uint8),
+            "seg_text_offsets": offsets,
+        })
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.seg_start)
+
+    def words(self) -> List[str]:
+        """Word strings in transcript order."""
+        if not len(self.token_ids):
+            return []
+        return self.vocab[np.asarray(self.token_ids)].tolist()
+
+    def segment_texts(self) -> List[str]:
+        blob = bytes(self.arrays["seg_text_blob"])
+        offsets = self.arrays["seg_text_offsets"].tolist()
+        return [blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Segment dicts (``start``/``end``/``text``) as WhisperX writes them."""
+        texts = self.segment_texts()
+        starts = self.seg_start.tolist()
+        ends = self.seg_end.tolist()
+        return [
+            {
+                "start": None if math.isnan(st) else st,
+                "end": None if math.isnan(en) else en,
+                "text": text,
+            }
+            for st, en, text in zip(starts, ends, texts)
+        ]
+
+    def save(self, path: Path, source: np.ndarray) -> Path:
+        """Write the uncompressed archive atomically."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, source=source, **{k: np.ascontiguousarray(v) for k, v in self.arrays.items()})
+        os.replace(tmp, path)
+        return path
+
+
+def _mmap_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Memory-map every member of an uncompressed .npz archive."""
+    arrays: Dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as raw:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path.name}: member {info.filename} is compressed")
+            raw.seek(info.header_offset)
+            header = _ZIP_LOCAL_HEADER.unpack(raw.read(_ZIP_LOCAL_HEADER.size))
+            name_len, extra_len = header[-2], header[-1]
+            raw.seek(info.header_offset + _ZIP_LOCAL_HEADER.size + name_len + extra_len)
+            version = np.lib.format.read_magic(raw)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(raw)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(raw)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if dtype.hasobject:
+                raise ValueError(f"{path.name}: member {name} has object dtype")
+            count = int(np.prod(shape))
+            if count == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode="r", offset=raw.tell(), shape=shape, order="F" if fortran else "C"
+            )
+    return arrays
+
+
+def read_sidecar(json_path: Path, mmap: bool = True) -> Optional[Transcript]:
+    """Return the sidecar transcript when it matches ``json_path``, else None."""
+    path = sidecar_path(json_path)
+    try:
+        if mmap:
+            arrays = _mmap_npz(path)
+        else:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {k: npz[k] for k in npz.files}
+        if not np.array_equal(arrays.get("source"), _source_stamp(json_path)):
+            return None
+        return Transcript(arrays)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile, struct.error):
+        return None
+
+
+def write_sidecar(json_path: Path) -> Path:
+    """Parse ``json_path`` and (re)write its sidecar."""
+    json_path = Path(json_path)
+    source = _source_stamp(json_path)
+    transcript = Transcript.from_segments(iter_segments(json_path))
+    return transcript.save(sidecar_path(json_path), source)
+
+
+def ensure_sidecar(json_path: Path) -> bool:
+    """Write the sidecar if missing or stale. Returns True when it was rebuilt."""
+    if read_sidecar(json_path) is not None:
+        return False
+    write_sidecar(json_path)
+    return True
+
+
+def load_transcript(json_path: Path, write: bool = True, mmap: bool = True) -> Transcript:
+    """Load a transcript, preferring a fresh sidecar over the WhisperX JSON.
+
+    When the sidecar is missing or stale the JSON is parsed once and, if
+    ``write`` is set, the sidecar is written for the next consumer. A sidecar
+    that cannot be written (read-only folder) is not an error.
+    """
+    json_path = Path(json_path)
+    cached = read_sidecar(json_path, mmap=mmap)
+    if cached is not None:
+        return cached
+    source = _source_stamp(json_path)
+    transcript = Transcript.from_segments(iter_segments(json_path))
+    if write:
+        try:
+            transcript.save(sidecar_path(json_path), source)
+        except OSError:
+            pass
+    return transcript
+
+
+__all__ = [
+    "Transcript",
+    "iter_segments",
+    "sidecar_path",
+    "read_sidecar",
+    "write_sidecar",
+    "ensure_sidecar",
+    "load_transcript",
+]
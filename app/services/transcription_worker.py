@@ -0,0 +1,268 @@
+"""Long-lived WhisperX transcription worker.
+
+Loading the Whisper and alignment models dominates the cost of transcribing
+a single episode. This worker loads them once, in a dedicated thread, and then
+processes a queue of audio files so every following file only pays for the
+actual transcription/alignment work.
+
+Runs on CPU-only machines: when no CUDA device is available the worker falls
+back to ``device='cpu'`` with ``compute_type='int8'``.
+
+Usage:
+    from app.services.transcription_worker import get_worker
+
+    worker = get_worker(model_name='small')
+    result = worker.transcribe(Path('audio.mp3'), Path('audio.whisperx.json'))
+
+In the API, ``enqueue_transcription`` (``POST /transcripts/transcribe``) runs
+``transcribe_job`` on the app's background job queue; its arguments are plain
+strings so it also works with the redis queue backend.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+DEFAULT_MODEL = os.getenv("WHISPER_MODEL", "small")
+DEFAULT_BATCH_SIZE = 8
+
+
+def detect_device() -> str:
+    """Return 'cuda' when torch sees a GPU, otherwise 'cpu'."""
+    try:
+        import torch
+
+        if torch.cuda.is_available() and torch.cuda.device_count() > 0:
+            return "cuda"
+    except Exception:
+        pass
+    return "cpu"
+
+
+def default_compute_type(device: str) -> str:
+    """float16 is not supported by CTranslate2 on CPU; int8 is the fastest there."""
+    return "float16" if device == "cuda" else "int8"
+
+
+class TranscriptionWorker:
+    """Single-threaded transcription worker that keeps models warm.
+
+    Jobs are submitted with `submit`, which returns a Future resolving to a
+    dict ``{'ok': bool, 'output': str, 'elapsed': float, ...}``. The models
+    are loaded lazily by the worker thread on the first job so creating the
+    worker is cheap.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        device: str | None = None,
+        compute_type: str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        threads: int | None = None,
+        language: str | None = None,
+    ):
+        self.model_name = model_name
+        self.device = device or os.getenv("WHISPER_DEVICE") or detect_device()
+        self.compute_type = compute_type or os.getenv("WHISPER_COMPUTE_TYPE") or default_compute_type(self.device)
+        self.batch_size = batch_size
+        self.threads = threads or os.cpu_count() or 4
+        self.language = language
+
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._model = None
+        self._align_models: Dict[str, tuple] = {}
+        self.model_load_seconds: Optional[float] = None
+        self.processed = 0
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self) -> "TranscriptionWorker":
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="Transcription-Worker", daemon=True)
+        self._thread.start()
+        log.info("transcription.worker.started", model=self.model_name, device=self.device, compute_type=self.compute_type)
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Finish queued jobs, then stop the worker thread."""
+        self._stop.set()
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        log.info("transcription.worker.stopped", processed=self.processed)
+
+    @property
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # --- public API ------------------------------------------------------
+
+    def submit(self, audio_path: Path, output_path: Path) -> Future:
+        """Queue a file for transcription and return a Future for its result."""
+        if not self.is_alive:
+            self.start()
+        fut: Future = Future()
+        self._queue.put((Path(audio_path), Path(output_path), fut))
+        return fut
+
+    def transcribe(self, audio_path: Path, output_path: Path) -> Dict[str, Any]:
+        """Synchronous helper around `submit`."""
+        return self.submit(audio_path, output_path).result()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # --- internals -------------------------------------------------------
+
+    def _load_models(self) -> None:
+        if self._model is not None:
+            return
+        import whisperx
+
+        t0 = time.perf_counter()
+        self._model = whisperx.load_model(
+            self.model_name,
+            self.device,
+            compute_type=self.compute_type,
+            language=self.language,
+            threads=self.threads,
+        )
+        self.model_load_seconds = time.perf_counter() - t0
+        log.info("transcription.model.loaded", model=self.model_name, seconds=round(self.model_load_seconds, 2))
+
+    def _get_align_model(self, language: str) -> tuple:
+        if language not in self._align_models:
+            import whisperx
+
+            self._align_models[language] = whisperx.load_align_model(language_code=language, device=self.device)
+        return self._align_models[language]
+
+    def _process(self, audio_path: Path, output_path: Path) -> Dict[str, Any]:
+        import whisperx
+
+        self._load_models()
+        t0 = time.perf_counter()
+        audio = whisperx.load_audio(str(audio_path))
+        result = self._model.transcribe(audio, batch_size=self.batch_size)
+        language = result.get("language") or self.language or "en"
+
+        align_model, metadata = self._get_align_model(language)
+        aligned = whisperx.align(
+            result["segments"], align_model, metadata, audio, self.device, return_char_alignments=False
+        )
+
+        out = {
+            "language": language,
+            "segments": aligned.get("segments", []),
+            "word_segments": aligned.get("word_segments", []),
+        }
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output_path.with_name(output_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False)
+        os.replace(tmp, output_path)
+
+        elapsed = time.perf_counter() - t0
+        return {
+            "ok": True,
+            "audio": str(audio_path),
+            "output": str(output_path),
+            "language": language,
+            "elapsed": elapsed,
+            "audio_seconds": len(audio) / whisperx.audio.SAMPLE_RATE,
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                if self._stop.is_set():
+                    break
+                continue
+            audio_path, output_path, fut = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                res = self._process(audio_path, output_path)
+                self.processed += 1
+                fut.set_result(res)
+            except Exception as e:
+                log.exception("transcription.job.failed", audio=str(audio_path))
+                fut.set_result({"ok": False, "audio": str(audio_path), "output": str(output_path), "error": str(e)})
+
+
+_workers: Dict[tuple, TranscriptionWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(
+    model_name: str = DEFAULT_MODEL,
+    device: str | None = None,
+    compute_type: str | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> TranscriptionWorker:
+    """Return a started worker for the given options, reusing warm instances."""
+    key = (model_name, device, compute_type, batch_size)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None or not worker.is_alive:
+            worker = TranscriptionWorker(model_name, device=device, compute_type=compute_type, batch_size=batch_size)
+            worker.start()
+            _workers[key] = worker
+        return worker
+
+
+def shutdown_workers(timeout: float | None = None) -> None:
+    """Stop all warm workers (used on process shutdown)."""
+    with _workers_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for w in workers:
+        w.stop(timeout=timeout)
+
+
+def transcribe_job(audio_path: str, output_path: str, model_name: str = DEFAULT_MODEL) -> Dict[str, Any]:
+    """Background-task entry point: transcribe one file with the warm worker.
+
+    On success the episode is added to the transcript search index.
+    """
+    result = get_worker(model_name=model_name).transcribe(Path(audio_path), Path(output_path))
+    log.info("transcription.job.done", audio=audio_path, ok=result.get("ok"), elapsed=result.get("elapsed"))
+    if result.get("ok"):
+        try:
+            from app.services.transcript_index import get_index
+
+            get_index().index_episode(Path(output_path).parent)
+        except Exception as e:
+            log.warning("transcription.index_failed", output=output_path, error=str(e))
+    return result
+
+
+def enqueue_transcription(audio_path: Path, output_path: Path, model_name: str = DEFAULT_MODEL) -> str:
+    """Schedule `transcribe_job` on the app's background task queue and return the job id."""
+    from app.tasks import enqueue_job
+
+    return enqueue_job(transcribe_job, str(audio_path), str(output_path), str(model_name))
+
+
+__all__ = [
+    "TranscriptionWorker",
+    "detect_device",
+    "enqueue_transcription",
+    "get_worker",
+    "shutdown_workers",
+    "transcribe_job",
+]
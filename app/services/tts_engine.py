@@ -0,0 +1,413 @@
+"""Chunked, concurrent TTS synthesis for an episode.
+
+``scripts/generate_audio.py`` used to send the whole ``content.txt`` as one
+TTS job. This engine instead:
+
+- splits the dialogue lines into chunks at scene boundaries (a chunk never
+  spans two scenes), at most ``max_chars`` long; an overlong line is split at
+  sentence, then clause boundaries
+- submits chunks concurrently from a thread pool, throttled by a token-bucket
+  ``RateLimiter`` so the provider's request rate is respected
+- polls every job with exponential backoff (plus jitter) instead of a fixed
+  interval
+- caches each chunk's audio by ``sha256(provider, voice, text)`` so an edit
+  only re-synthesizes the lines that changed
+- concatenates the chunk files with ffmpeg's concat demuxer into
+  ``audio.mp3`` and writes ``audio.timings.json`` with per-chunk and
+  per-scene start/end, which scene alignment uses instead of text matching
+
+Providers implement ``submit(text, voice) -> task id`` and
+``status(task id) -> {'state': 'pending'|'done'|'failed', 'audio_url', 'error'}``
+and expose a ``name`` used in the cache key.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+import structlog
+
+from app.services.fileio import write_if_changed
+from app.services.media_probe import probe_duration
+
+log = structlog.get_logger()
+
+DEFAULT_MAX_CHARS = 1500
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 2.0
+DEFAULT_POLL_TIMEOUT = 600
+TIMINGS_NAME = "audio.timings.json"
+TIMINGS_VERSION = 1
+_DOWNLOAD_CHUNK = 1024 * 1024
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_RE = re.compile(r"(?<=[,;:])\s+")
+
+
+class TTSError(RuntimeError):
+    """A chunk could not be synthesized."""
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Split ``text`` into pieces of at most ``max_chars`` at the softest boundary available."""
+    if len(text) <= max_chars:
+        return [text]
+    for pattern in (_SENTENCE_RE, _CLAUSE_RE):
+        parts = [p for p in pattern.split(text) if p]
+        if len(parts) > 1:
+            out: List[str] = []
+            for part in parts:
+                out.extend(split_text(part, max_chars))
+            return pack_texts(out, max_chars, " ")
+    # No punctuation left: cut at the last space (or hard cut)
+    cut = text.rfind(" ", 0, max_chars)
+    cut = cut if cut > 0 else max_chars
+    return [text[:cut].strip()] + split_text(text[cut:].strip(), max_chars)
+
+
+def pack_texts(parts: List[str], max_chars: int, sep: str) -> List[str]:
+    """Greedily join consecutive parts with ``sep`` while they fit in ``max_chars``."""
+    out: List[str] = []
+    for part in parts:
+        if out and len(out[-1]) + len(sep) + len(part) <= max_chars:
+            out[-1] = out[-1] + sep + part
+        else:
+            out.append(part)
+    return out
+
+
+def iter_scene_lines(script_data: Dict[str, Any]):
+    """Yield ``(scene number, speaker, line)`` for every dialogue line, scenes numbered from 1 across acts."""
+    number = 0
+    for act in script_data.get("acts") or []:
+        if not isinstance(act, dict):
+            continue
+        for scene in act.get("scenes") or []:
+            if not isinstance(scene, dict):
+                continue
+            number += 1
+            for d in scene.get("dialogues") or []:
+                if not isinstance(d, dict):
+                    continue
+                line = str(d.get("line") or d.get("text") or "").strip()
+                if line:
+                    yield number, d.get("character") or d.get("speaker"), line
+
+
+def cache_key(text: str, voice: str, provider: str) -> str:
+    return hashlib.sha256(f"{provider}\x00{voice}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def plan_chunks(
+    script_data: Dict[str, Any],
+    voice: str,
+    provider: str,
+    max_chars: int = DEFAULT_MAX_CHARS,
+) -> List[Dict[str, Any]]:
+    """Chunks ``{index, scene, text, voice, key}`` in playback order."""
+    per_scene: Dict[int, List[str]] = {}
+    for scene, _speaker, line in iter_scene_lines(script_data):
+        per_scene.setdefault(scene, []).extend(split_text(line, max_chars))
+    chunks: List[Dict[str, Any]] = []
+    for scene in sorted(per_scene):
+        # Lines are joined like content.txt so the provider pauses between them
+        for text in pack_texts(per_scene[scene], max_chars, "\n\n"):
+            chunks.append({"index": len(chunks), "scene": scene, "text": text, "voice": voice, "key": cache_key(text, voice, provider)})
+    return chunks
+
+
+class RateLimiter:
+    """Token bucket: at most ``rate`` acquisitions per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = 1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def poll_with_backoff(
+    check: Callable[[], Optional[Dict[str, Any]]],
+    timeout: float = DEFAULT_POLL_TIMEOUT,
+    initial: float = 1.0,
+    factor: float = 1.6,
+    max_interval: float = 15.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, Any]:
+    """Call ``check`` until it returns a result, sleeping with jittered exponential backoff."""
+    deadline = time.monotonic() + timeout
+    interval = initial
+    while True:
+        result = check()
+        if result is not None:
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TTSError(f"timed out after {timeout}s")
+        sleep(min(remaining, interval * random.uniform(0.8, 1.2)))
+        interval = min(max_interval, interval * factor)
+
+
+class ServiceProvider:
+    """Adapter for the AI33-style TTS service used by ``scripts/generate_audio.py``.
+
+    ``service`` exposes ``<kind>_tts(text=, voice_id=) -> task id`` and either
+    ``get_task(task_id) -> dict`` (non-blocking) or the blocking
+    ``poll_for_result(task_id)``; results carry ``metadata.audio_url``.
+    """
+
+    def __init__(self, service: Any, kind: str = "elevenlabs"):
+        self.service = service
+        self.kind = kind
+        self.name = kind
+
+    def submit(self, text: str, voice: str) -> str:
+        task_id = getattr(self.service, f"{self.kind}_tts")(text=text, voice_id=voice)
+        if not task_id:
+            raise TTSError("no task id returned")
+        return task_id
+
+    def status(self, task_id: str) -> Dict[str, Any]:
+        getter = getattr(self.service, "get_task", None)
+        result = getter(task_id) if getter else self.service.poll_for_result(task_id)
+        state = str((result or {}).get("status") or "done").lower()
+        url = ((result or {}).get("metadata") or {}).get("audio_url")
+        if state in ("failed", "error"):
+            return {"state": "failed", "error": (result or {}).get("error") or state}
+        if url:
+            return {"state": "done", "audio_url": url}
+        return {"state": "pending"}
+
+
+def download(url: str, dest: Path, session: Optional[requests.Session] = None, timeout: int = 60) -> None:
+    """Stream ``url`` into ``dest`` atomically."""
+    http = session or requests
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with http.get(url, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        with open(tmp, "wb") as f:
+            for block in resp.iter_content(chunk_size=_DOWNLOAD_CHUNK):
+                f.write(block)
+    os.replace(tmp, dest)
+
+
+def concat_audio(paths: List[Path], output: Path, reencode: bool = False) -> None:
+    """Join audio files with ffmpeg's concat demuxer (stream copy unless ``reencode``)."""
+    if len(paths) == 1 and not reencode:
+        shutil.copyfile(paths[0], output)
+        return
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise TTSError("ffmpeg not found")
+    tmp_out = output.with_name(f".{output.stem}.{os.getpid()}.tmp{output.suffix}")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as lst:
+        for p in paths:
+            escaped = str(Path(p).resolve()).replace("'", r"'\''")
+            lst.write(f"file '{escaped}'\n")
+    try:
+        codec = ["-c:a", "libmp3lame", "-b:a", "128k"] if reencode else ["-c", "copy"]
+        proc = subprocess.run(
+            [ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", lst.name, *codec, str(tmp_out)],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise TTSError(f"ffmpeg concat failed: {proc.stderr.strip()[:500]}")
+        os.replace(tmp_out, output)
+    finally:
+        os.unlink(lst.name)
+        if tmp_out.exists():
+            tmp_out.unlink()
+
+
+def default_cache_dir() -> Path:
+    env = os.getenv("TTS_CACHE_DIR")
+    return Path(env) if env else Path.home() / ".cache" / "cc_bcal" / "tts"
+
+
+class TTSEngine:
+    """Synthesize chunks concurrently through one provider, with a shared audio cache."""
+
+    def __init__(
+        self,
+        provider: Any,
+        cache_dir: Optional[Path] = None,
+        max_workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        poll_timeout: float = DEFAULT_POLL_TIMEOUT,
+        extension: str = ".mp3",
+    ):
+        self.provider = provider
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = RateLimiter(rate)
+        self.poll_timeout = poll_timeout
+        self.extension = extension
+        self.session = requests.Session()
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=self.max_workers))
+
+    def cache_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{self.extension}"
+
+    def synthesize_chunk(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        path = self.cache_path(chunk["key"])
+        if path.exists() and path.stat().st_size > 0:
+            return {"index": chunk["index"], "path": path, "cached": True}
+        started = time.perf_counter()
+        self.limiter.acquire()
+        task_id = self.provider.submit(chunk["text"], chunk["voice"])
+
+        def check():
+            self.limiter.acquire()
+            st = self.provider.status(task_id)
+            if st.get("state") == "failed":
+                raise TTSError(f"chunk {chunk['index']}: {st.get('error') or 'failed'}")
+            return st if st.get("state") == "done" else None
+
+        st = poll_with_backoff(check, timeout=self.poll_timeout)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        download(st["audio_url"], path, self.session)
+        log.info("tts.chunk.done", index=chunk["index"], chars=len(chunk["text"]), seconds=round(time.perf_counter() - started, 2))
+        return {"index": chunk["index"], "path": path, "cached": False}
+
+    def synthesize(self, chunks: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Synthesize every chunk (cache hits are free); raises ``TTSError`` if any chunk fails."""
+        results: Dict[int, Dict[str, Any]] = {}
+        errors: List[str] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self.synthesize_chunk, c) for c in chunks]
+            for chunk, fut in zip(chunks, futures):
+                try:
+                    results[chunk["index"]] = fut.result()
+                except Exception as e:
+                    errors.append(f"chunk {chunk['index']} (scene {chunk['scene']}): {e}")
+        if errors:
+            raise TTSError("; ".join(errors[:5]))
+        return results
+
+
+def build_timings(chunks: List[Dict[str, Any]], durations: List[float]) -> Dict[str, Any]:
+    """Per-chunk and per-scene ``[start, end]`` from chunk durations in playback order."""
+    offset = 0.0
+    out_chunks: List[Dict[str, Any]] = []
+    scenes: Dict[str, List[float]] = {}
+    for chunk, duration in zip(chunks, durations):
+        start, end = offset, offset + duration
+        entry = {"index": chunk["index"], "scene": chunk["scene"], "voice": chunk["voice"], "key": chunk["key"], "start": round(start, 3), "end": round(end, 3)}
+        if chunk.get("speaker"):
+            entry["speaker"] = chunk["speaker"]
+        out_chunks.append(entry)
+        span = scenes.setdefault(str(chunk["scene"]), [round(start, 3), round(end, 3)])
+        span[1] = round(end, 3)
+        offset = end
+    return {"duration": round(offset, 3), "scenes": scenes, "chunks": out_chunks}
+
+
+def _stamp(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def read_timings(episode_dir: Path, audio_name: str = "audio.mp3") -> Optional[Dict[str, Any]]:
+    """``audio.timings.json`` if it was written for the current audio file, else None."""
+    episode_dir = Path(episode_dir)
+    try:
+        with open(episode_dir / TIMINGS_NAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == TIMINGS_VERSION and data.get("audio") == _stamp(episode_dir / audio_name):
+            return data
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def generate_episode_audio(
+    episode_dir: Path,
+    script_data: Dict[str, Any],
+    engine: TTSEngine,
+    voice: str,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    chunks: Optional[List[Dict[str, Any]]] = None,
+    reencode: bool = False,
+) -> Dict[str, Any]:
+    """Synthesize, stitch and time one episode into ``audio.mp3`` + ``audio.timings.json``.
+
+    ``chunks`` overrides the default single-voice plan (see
+    ``app.services.voice_cast.plan_cast_chunks``). Returns a summary
+    ``{ok, chunks, cached, synthesized, duration, scenes, seconds}``.
+    """
+    started = time.perf_counter()
+    episode_dir = Path(episode_dir)
+    if chunks is None:
+        chunks = plan_chunks(script_data, voice, engine.provider.name, max_chars)
+    if not chunks:
+        return {"ok": False, "error": "no dialogue lines to synthesize"}
+
+    results = engine.synthesize(chunks)
+    episode_dir.mkdir(parents=True, exist_ok=True)
+    paths = [results[c["index"]]["path"] for c in chunks]
+    output = episode_dir / "audio.mp3"
+    # Different voices may come back with different sample rates/bitrates
+    concat_audio(paths, output, reencode=reencode or len({c["voice"] for c in chunks}) > 1)
+
+    durations = [probe_duration(p) for p in paths]
+    summary: Dict[str, Any] = {
+        "ok": True,
+        "chunks": len(chunks),
+        "cached": sum(1 for r in results.values() if r["cached"]),
+        "synthesized": sum(1 for r in results.values() if not r["cached"]),
+        "path": str(output),
+    }
+    if all(d is not None for d in durations):
+        timings = build_timings(chunks, [float(d) for d in durations])
+        timings.update(version=TIMINGS_VERSION, audio=_stamp(output))
+        write_if_changed(episode_dir / TIMINGS_NAME, json.dumps(timings, ensure_ascii=False, indent=2).encode("utf-8"))
+        summary.update(duration=timings["duration"], scenes=len(timings["scenes"]))
+    else:
+        log.warning("tts.timings.unavailable", episode=str(episode_dir), reason="chunk duration probe failed")
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    log.info("tts.episode.done", episode=str(episode_dir), **{k: v for k, v in summary.items() if k in ("chunks", "cached", "synthesized", "seconds")})
+    return summary
+
+
+__all__ = [
+    "RateLimiter",
+    "ServiceProvider",
+    "TTSEngine",
+    "TTSError",
+    "build_timings",
+    "cache_key",
+    "concat_audio",
+    "generate_episode_audio",
+    "iter_scene_lines",
+    "pack_texts",
+    "plan_chunks",
+    "poll_with_backoff",
+    "read_timings",
+    "split_text",
+]
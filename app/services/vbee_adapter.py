@@ -1,4 +1,20 @@
-from typing import Any, Dict, List
+"""Map scripts to VBEE /projects payloads.
+
+Only ``id``, ``title`` and ``acts`` are needed, so callers should pass those
+(``map_script_to_vbee_payload`` accepts a dict, a model instance or a row)
+rather than ``Script.to_dict()``, which parses every JSON column.
+
+Blocks are produced lazily by ``iter_blocks``; ``PayloadStream`` serializes a
+payload block by block into bounded byte chunks so a very large script is
+never held as one JSON string, and can be iterated again when a request is
+retried. Scripts with more blocks than the provider accepts are split into
+several projects by ``plan_parts``.
+"""
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+DEFAULT_MAX_BLOCKS = 500
+DEFAULT_CHUNK_SIZE = 64 * 1024
 
 
 def _line_to_element(line: Dict[str, Any]) -> Dict[str, Any]:
@@ -7,7 +23,7 @@ def _line_to_element(line: Dict[str, Any]) -> Dict[str, Any]:
     Expected input line shape: {"speaker": "Name", "text": "..."} or other variants.
     """
     text = line.get('text') or line.get('content') or line.get('line') or ''
-    speaker = line.get('speaker') or line.get('role') or line.get('name') or None
+    speaker = line.get('speaker') or line.get('character') or line.get('role') or line.get('name') or None
 
     element: Dict[str, Any] = {
         'type': 'dialogue',
@@ -18,81 +34,161 @@ def _line_to_element(line: Dict[str, Any]) -> Dict[str, Any]:
     return element
 
 
-def _act_to_block(act: Dict[str, Any]) -> Dict[str, Any]:
-    """Map an act (which contains scenes/lines) into a VBEE block.
-
-    VBEE block shape is simplified to {id, characters, speed, elements: [...]}
-    """
-    elements: List[Dict[str, Any]] = []
-    # acts may have 'lines' or 'scenes' or be a list of dialogue objects
-    if isinstance(act, dict):
-        lines = act.get('lines') or act.get('scenes') or act.get('dialogues') or act.get('content') or []
-    else:
-        lines = []
-
+def _iter_elements(lines) -> Iterator[Dict[str, Any]]:
     if isinstance(lines, str):
         # try to split lines by newlines
         lines = [{'text': l.strip()} for l in lines.splitlines() if l.strip()]
 
     for l in lines:
-        if isinstance(l, dict):
-            elements.append(_line_to_element(l))
+        if isinstance(l, dict) and isinstance(l.get('dialogues'), list):
+            # a scene: its dialogue lines become the elements
+            yield from _iter_elements(l['dialogues'])
+        elif isinstance(l, dict):
+            yield _line_to_element(l)
         else:
-            elements.append({'type': 'dialogue', 'text': str(l)})
+            yield {'type': 'dialogue', 'text': str(l)}
+
+
+def _act_parts(act) -> Tuple[Any, Any, Iterator[Dict[str, Any]]]:
+    """``(id, speed, elements)`` of an act; elements are generated lazily."""
+    if not isinstance(act, dict):
+        # fallback: treat act as raw text
+        return None, 1.0, iter([{'type': 'dialogue', 'text': str(act)}])
+    # acts may have 'lines' or 'scenes' or be a list of dialogue objects
+    lines = act.get('lines') or act.get('scenes') or act.get('dialogues') or act.get('content') or []
+    return act.get('id'), act.get('speed'), _iter_elements(lines)
+
 
-    block = {
-        'id': act.get('id') if isinstance(act, dict) else None,
+def _act_to_block(act: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an act (which contains scenes/lines) into a VBEE block.
+
+    VBEE block shape is simplified to {id, characters, speed, elements: [...]}
+    """
+    block_id, speed, elements = _act_parts(act)
+    elements = list(elements)
+    return {
+        'id': block_id,
         'characters': len(elements),
-        'speed': act.get('speed') if isinstance(act, dict) else 1.0,
+        'speed': speed,
         'elements': elements,
     }
-    return block
 
 
-def map_script_to_vbee_payload(script, product: str | None = None) -> Dict[str, Any]:
-    """Map a Script SQLAlchemy model instance into a payload suitable for vbee /projects.
+def parse_acts(acts) -> List[Any]:
+    """``acts`` as a list; JSON strings are parsed, anything unusable becomes []."""
+    # acts may be JSON string; try to parse if necessary
+    if isinstance(acts, str):
+        try:
+            acts = json.loads(acts)
+        except Exception:
+            return []
+    return acts if isinstance(acts, list) else []
 
-    This is conservative: we only include known flattened fields and map acts -> blocks.
-    """
+
+def iter_blocks(acts: List[Any], start: int = 0, stop: int | None = None) -> Iterator[Dict[str, Any]]:
+    """Yield the VBEE blocks of ``acts[start:stop]`` one at a time."""
+    for act in acts[start:stop]:
+        yield _act_to_block(act)
+
+
+def script_source(script) -> Dict[str, Any]:
+    """``{id, title, acts}`` of a dict, model instance or row, without touching other columns."""
     # Accept both dict-like or model instance with attributes
     if isinstance(script, dict):
-        data = script
-    elif hasattr(script, 'to_dict'):
-        data = script.to_dict()
+        get = script.get
     else:
-        # try attribute access
-        data = {
-            'id': getattr(script, 'id', None),
-            'title': getattr(script, 'title', getattr(script, 'name', 'Untitled')),
-            'alias': getattr(script, 'alias', None),
-            'acts': getattr(script, 'acts', None),
-            'characters': getattr(script, 'characters', None),
-        }
+        def get(key, default=None):
+            return getattr(script, key, default)
+    # model instances parse their own (possibly repr-style) acts column
+    acts = get('acts_parsed')
+    if acts is None:
+        acts = get('acts') or []
+    return {'id': get('id'), 'title': get('title') or get('name'), 'acts': parse_acts(acts)}
 
-    acts = data.get('acts') or []
-    # acts may be JSON string; try to parse if necessary
-    if isinstance(acts, str):
-        try:
-            import json
 
-            acts = json.loads(acts)
-        except Exception:
-            acts = []
-
-    blocks = []
-    if isinstance(acts, list):
-        for act in acts:
-            if isinstance(act, dict):
-                blocks.append(_act_to_block(act))
-            else:
-                # fallback: treat act as raw text
-                blocks.append({'id': None, 'characters': 1, 'speed': 1.0, 'elements': [{'type': 'dialogue', 'text': str(act)}]})
-
-    payload = {
-        'title': data.get('title') or f"script-{data.get('id')}",
-        'product': product or 'default',
-        'isDeleted': False,
-        'blocks': blocks,
-    }
+def _payload_head(title: str, product: str) -> Dict[str, Any]:
+    return {'title': title, 'product': product, 'isDeleted': False}
+
+
+def plan_parts(source: Dict[str, Any], product: str | None = None, max_blocks: int = DEFAULT_MAX_BLOCKS) -> List[Dict[str, Any]]:
+    """Split a script into projects of at most ``max_blocks`` blocks.
+
+    Returns ``[{title, product, start, stop, part, parts}]``; a script that
+    fits keeps its title, otherwise titles get a `` (i/n)`` suffix.
+    """
+    title = source.get('title') or f"script-{source.get('id')}"
+    product = product or 'default'
+    total = len(source.get('acts') or [])
+    size = max(1, int(max_blocks))
+    bounds = [(i, min(i + size, total)) for i in range(0, total, size)] or [(0, 0)]
+    parts = len(bounds)
+    return [
+        {
+            'title': title if parts == 1 else f'{title} ({n}/{parts})',
+            'product': product,
+            'start': start,
+            'stop': stop,
+            'part': n,
+            'parts': parts,
+        }
+        for n, (start, stop) in enumerate(bounds, start=1)
+    ]
+
 
+def build_payload(source: Dict[str, Any], part: Dict[str, Any]) -> Dict[str, Any]:
+    payload = _payload_head(part['title'], part['product'])
+    payload['blocks'] = list(iter_blocks(source['acts'], part['start'], part['stop']))
     return payload
+
+
+class PayloadStream:
+    """Re-iterable JSON body of one project, yielded as byte chunks of about ``chunk_size``.
+
+    Each ``iter()`` starts over, so an HTTP retry can resend the body.
+    ``stats`` holds the block, element and byte counts of the last full pass.
+    """
+
+    def __init__(self, source: Dict[str, Any], part: Dict[str, Any], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.source = source
+        self.part = part
+        self.chunk_size = max(1, int(chunk_size))
+        self.stats: Dict[str, int] = {}
+
+    def __iter__(self) -> Iterator[bytes]:
+        def dumps(value) -> bytes:
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        buf = bytearray(dumps(_payload_head(self.part['title'], self.part['product']))[:-1] + b',"blocks":[')
+        blocks = elements = total = 0
+        for act in self.source['acts'][self.part['start']:self.part['stop']]:
+            block_id, speed, items = _act_parts(act)
+            # "characters" (the element count) goes last so elements can stream
+            buf += b'%s{"id":%s,"speed":%s,"elements":[' % (b',' if blocks else b'', dumps(block_id), dumps(speed))
+            count = 0
+            for element in items:
+                if count:
+                    buf += b','
+                buf += dumps(element)
+                count += 1
+                if len(buf) >= self.chunk_size:
+                    total += len(buf)
+                    yield bytes(buf)
+                    buf.clear()
+            buf += b'],"characters":%d}' % count
+            blocks += 1
+            elements += count
+        buf += b']}'
+        total += len(buf)
+        self.stats = {'blocks': blocks, 'elements': elements, 'bytes': total}
+        yield bytes(buf)
+
+
+def map_script_to_vbee_payload(script, product: str | None = None) -> Dict[str, Any]:
+    """Map a Script SQLAlchemy model instance into a payload suitable for vbee /projects.
+
+    This is conservative: we only include known flattened fields and map acts -> blocks.
+    The whole script goes into one payload; use ``plan_parts`` to respect block limits.
+    """
+    source = script_source(script)
+    part = plan_parts(source, product, max_blocks=max(1, len(source['acts'])))[0]
+    return build_payload(source, part)
@@ -1,71 +1,254 @@
+"""VBEE project creation.
+
+One ``VbeeService`` per app (``get_vbee_service``) holds a ``requests.Session``
+whose connection pool is shared by request handlers and background jobs, so
+repeated calls reuse TLS connections instead of handshaking every time.
+Transient failures (connection errors, 429 and 5xx) are retried with
+exponential backoff, honouring ``Retry-After``.
+
+POST is only safe to retry because every request carries an
+``Idempotency-Key`` derived from the script id and the payload: a retry (or
+a re-submitted batch) of an unchanged script maps to the project VBEE
+already created. The key is built from the stored ``acts`` column, so it is
+known before the body is streamed. Request bodies are streamed from
+``PayloadStream`` and scripts over ``VBEE_MAX_BLOCKS`` blocks become several
+projects (see ``vbee_adapter``). Many scripts can be submitted at once with
+``enqueue_project_creation``; each becomes a background job whose state is
+kept in ``VBEE_JOBS`` and published on Redis like the other job types.
+"""
+import hashlib
 import json
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
 import requests
+import structlog
 from flask import current_app as app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .vbee_adapter import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_BLOCKS,
+    PayloadStream,
+    build_payload,
+    plan_parts,
+    script_source,
+)
+
+log = structlog.get_logger()
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+EXTENSION_KEY = 'vbee'
+
+VBEE_JOBS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_service_lock = threading.Lock()
+
+
+def _truthy(v) -> bool:
+    # Accept truthy strings like '1', 'true', 'yes', 'on'
+    if isinstance(v, bool):
+        return v
+    if v is None:
+        return False
+    try:
+        s = str(v).strip().lower()
+    except Exception:
+        return False
+    return s in ('1', 'true', 'yes', 'on')
+
+
+def _setting(config, key: str, default):
+    value = config.get(key)
+    return default if value is None else value
 
-from .vbee_adapter import map_script_to_vbee_payload
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF) -> requests.Session:
+    """Session with a pooled adapter that retries connection errors, 429 and 5xx (POST included)."""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'POST'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def idempotency_key(script_id: int, *components: Any) -> str:
+    """Stable key for a script and what its payload is built from: unchanged scripts never create a second project."""
+    raw = '\x00'.join(str(c) for c in components)
+    digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()[:24]
+    return f'script-{script_id}-{digest}'
 
 
 class VbeeService:
-    def __init__(self, config):
+    def __init__(self, config, session: Optional[requests.Session] = None):
         # config may be app.config or a mapping-like object
         self.base_url = config.get('VBEE_API_URL') or 'https://vbee.vn/api/v1'
         self.api_key = config.get('VBEE_API_KEY') or config.get('VBEE_KEY')
         # allow debug/dry-run mode via config or env
-        # Accept truthy strings like '1', 'true', 'yes', 'on'
-        def _truthy(v):
-            if isinstance(v, bool):
-                return v
-            if v is None:
-                return False
-            try:
-                s = str(v).strip().lower()
-            except Exception:
-                return False
-            return s in ('1', 'true', 'yes', 'on')
+        self.dry_run = _truthy(config.get('VBEE_DRY_RUN')) or _truthy(os.getenv('VBEE_DRY_RUN'))
+        self.timeout = config.get('VBEE_TIMEOUT') or DEFAULT_TIMEOUT
+        self.max_blocks = int(config.get('VBEE_MAX_BLOCKS') or DEFAULT_MAX_BLOCKS)
+        self.chunk_size = int(config.get('VBEE_CHUNK_SIZE') or DEFAULT_CHUNK_SIZE)
+        self.session = session or build_session(
+            pool_size=int(config.get('VBEE_POOL_SIZE') or DEFAULT_POOL_SIZE),
+            retries=int(_setting(config, 'VBEE_RETRIES', DEFAULT_RETRIES)),
+            backoff=float(_setting(config, 'VBEE_BACKOFF', DEFAULT_BACKOFF)),
+        )
 
-        cfg_val = config.get('VBEE_DRY_RUN')
-        env_val = os.getenv('VBEE_DRY_RUN')
-        self.dry_run = _truthy(cfg_val) or _truthy(env_val)
-
-    def _headers(self):
+    def _headers(self, idempotency: Optional[str] = None):
         h = {'Content-Type': 'application/json'}
         if self.api_key:
             h['Authorization'] = f'Bearer {self.api_key}'
+        if idempotency:
+            h['Idempotency-Key'] = idempotency
         return h
 
+    def close(self) -> None:
+        self.session.close()
+
+    def create_project(self, payload: Dict[str, Any] | Iterable[bytes], idempotency: Optional[str] = None) -> dict:
+        """POST a payload dict, or a streamed JSON body (e.g. ``PayloadStream``), to /projects."""
+        url = f"{self.base_url.rstrip('/')}/projects"
+        body = {'json': payload} if isinstance(payload, dict) else {'data': payload}
+        started = time.perf_counter()
+        resp = self.session.post(url, headers=self._headers(idempotency), timeout=self.timeout, **body)
+        log.info('vbee.project.create', status=resp.status_code, key=idempotency,
+                 seconds=round(time.perf_counter() - started, 3))
+        resp.raise_for_status()
+        return resp.json()
+
     def create_project_from_script(self, script_id: int, product: str | None = None, dry_run: bool | None = None) -> dict:
-        """Load script data from DB, map to VBEE payload, and POST to /projects.
+        """Load script data from DB, map to VBEE payload(s), and POST to /projects.
 
-        Returns the JSON response from VBEE on success.
+        Returns the JSON response from VBEE on success; a script split into
+        several projects returns ``{'parts': n, 'projects': [...]}``.
         """
         # Lazy import to avoid circular imports at module load
+        from sqlalchemy.orm import load_only
+
         from ..models.script import Script
         from ..extensions import db
 
-        # prefer Session.get to avoid SQLAlchemy legacy warning
-        script = db.session.get(Script, script_id)
+        # only the columns the payload needs; other JSON columns stay unparsed
+        script = db.session.get(Script, script_id, options=[load_only(Script.id, Script.title, Script.acts)])
         if not script:
             raise ValueError(f"Script id={script_id} not found")
 
-        payload = map_script_to_vbee_payload(script, product=product)
+        source = script_source(script)
+        parts = plan_parts(source, product, self.max_blocks)
         # determine effective dry run: function param overrides service config
         effective_dry = self.dry_run if dry_run is None else bool(dry_run)
-        # when dry-run, log payload and return it instead of POSTing
+        # when dry-run, log a summary and return the payload(s) instead of POSTing
         if effective_dry:
-            # Use flask app logger at WARNING so it's visible in console runs/tests
-            pretty = json.dumps(payload, indent=2, ensure_ascii=False)
+            payloads = [build_payload(source, part) for part in parts]
+            summary = [{'title': p['title'], 'blocks': len(p['blocks'])} for p in payloads]
             try:
-                app.logger.warning('VBEE dry-run enabled; payload:\n%s', pretty)
+                app.logger.warning('VBEE dry-run enabled; script %s -> %s', script_id, json.dumps(summary, ensure_ascii=False))
             except Exception:
                 # fallback print for contexts without app
-                print('VBEE dry-run payload:\n', pretty)
-            # also print unconditionally so pytest -s and other console runs always see payload
-            print('VBEE dry-run payload:\n', pretty)
+                print('VBEE dry-run:', script_id, summary)
             # return payload so callers (or tests) can inspect it
-            return {'dry_run': True, 'payload': payload}
+            result = {'dry_run': True, 'parts': len(parts), 'payload': payloads[0]}
+            if len(parts) > 1:
+                result['payloads'] = payloads
+            return result
 
-        url = f"{self.base_url.rstrip('/')}/projects"
-        resp = requests.post(url, json=payload, headers=self._headers(), timeout=15)
-        resp.raise_for_status()
-        return resp.json()
+        fingerprint = hashlib.sha256((script.acts or '').encode('utf-8')).hexdigest()
+        projects = []
+        for part in parts:
+            body = PayloadStream(source, part, self.chunk_size)
+            key = idempotency_key(script_id, part['title'], part['product'], part['start'], part['stop'], fingerprint)
+            projects.append(self.create_project(body, key))
+            log.info('vbee.project.part', script_id=script_id, part=part['part'], parts=part['parts'], **body.stats)
+        if len(projects) == 1:
+            return projects[0]
+        return {'parts': len(projects), 'projects': projects}
+
+
+def get_vbee_service(flask_app=None) -> VbeeService:
+    """The app's shared VbeeService (created on first use, kept in ``app.extensions``)."""
+    flask_app = flask_app or app._get_current_object()
+    service = flask_app.extensions.get(EXTENSION_KEY)
+    if service is None:
+        with _service_lock:
+            service = flask_app.extensions.get(EXTENSION_KEY)
+            if service is None:
+                service = VbeeService(flask_app.config)
+                flask_app.extensions[EXTENSION_KEY] = service
+    return service
+
+
+def _publish(job_id: str, update: Dict[str, Any]) -> None:
+    from app.tasks import publish_job_update, update_job_state
+
+    with _jobs_lock:
+        state = update_job_state(VBEE_JOBS, job_id, update)
+    publish_job_update('vbee', job_id, state)
+
+
+def vbee_job(job_id: str, script_id: int, product: Optional[str] = None, dry_run: Optional[bool] = None) -> Dict[str, Any]:
+    """Background-task entry point: create the VBEE project of one script."""
+    _publish(job_id, {'status': 'running', 'started': time.time()})
+    try:
+        result = get_vbee_service().create_project_from_script(script_id, product=product, dry_run=dry_run)
+        _publish(job_id, {'status': 'done', 'result': result, 'finished': time.time()})
+        return {'ok': True, 'result': result}
+    except Exception as e:
+        log.warning('vbee.job.failed', job_id=job_id, script_id=script_id, error=str(e))
+        _publish(job_id, {'status': 'failed', 'error': str(e), 'finished': time.time()})
+        return {'ok': False, 'error': str(e)}
+
+
+def enqueue_project_creation(script_ids: Iterable[int], product: Optional[str] = None, dry_run: Optional[bool] = None) -> Dict[int, str]:
+    """Schedule one `vbee_job` per script (duplicates collapsed) and return ``{script_id: job_id}``."""
+    from app.tasks import enqueue_job
+
+    jobs: Dict[int, str] = {}
+    for script_id in dict.fromkeys(script_ids):
+        job_id = uuid.uuid4().hex
+        _publish(job_id, {'status': 'queued', 'script_id': script_id, 'created': time.time()})
+        enqueue_job(vbee_job, job_id, script_id, product, dry_run)
+        jobs[script_id] = job_id
+    return jobs
+
+
+def get_vbee_job(job_id: str) -> Optional[Dict[str, Any]]:
+    from app.tasks import shared_job_state
+
+    with _jobs_lock:
+        job = VBEE_JOBS.get(job_id)
+        job = dict(job) if job is not None else None
+    # jobs run by a separate worker process (redis queue backend)
+    shared = shared_job_state('vbee', job_id)
+    return {**(job or {}), **shared} if shared else job
+
+
+__all__ = [
+    'VbeeService',
+    'build_session',
+    'enqueue_project_creation',
+    'get_vbee_job',
+    'get_vbee_service',
+    'idempotency_key',
+    'vbee_job',
+]
@@ -0,0 +1,123 @@
+"""Per-character voices for TTS.
+
+The cast lives in ``builder_configs['voice_cast']``::
+
+    {"default": "<voice id>", "characters": {"Mặc Đức": "<voice id>", "An": "<voice id>"}}
+
+Dialogue speakers rarely match the character names exactly ("THIỀN SƯ MẶC
+ĐỨC", "Kể chuyện (giọng trầm, ấm)"), so names are compared case-, accent-
+and parenthetical-insensitively, and a speaker that contains a cast name
+(longest first) gets that voice. Everything else gets the default voice.
+
+``plan_cast_chunks`` produces TTS chunks with one voice each, one dialogue
+line per chunk by default. Chunks are cached by ``(provider, voice, text)``
+in the TTS engine, so re-voicing one character re-synthesizes only that
+character's lines, and the timings record who speaks when.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.tts_engine import DEFAULT_MAX_CHARS, cache_key, iter_scene_lines, pack_texts, split_text
+
+_PAREN_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """'THIỀN SƯ Mặc Đức (60 tuổi)' -> 'thien su mac duc'."""
+    if not name:
+        return ""
+    text = _PAREN_RE.sub(" ", str(name))
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SPACE_RE.sub(" ", text).strip().casefold()
+
+
+class VoiceCast:
+    """Speaker -> voice lookup with a default voice."""
+
+    def __init__(self, default: str, voices: Optional[Dict[str, str]] = None):
+        self.default = default
+        self.names = {normalize_name(k): k for k, v in (voices or {}).items() if normalize_name(k) and v}
+        self.voices = {n: voices[k] for n, k in self.names.items()}
+        # Longest names first so 'Bà An' wins over 'An'
+        self._by_length = sorted(self.voices, key=len, reverse=True)
+        self._memo: Dict[Optional[str], str] = {}
+
+    def voice_for(self, speaker: Optional[str]) -> str:
+        if speaker in self._memo:
+            return self._memo[speaker]
+        key = normalize_name(speaker)
+        voice = self.voices.get(key)
+        if voice is None and key:
+            padded = f" {key} "
+            voice = next((self.voices[n] for n in self._by_length if f" {n} " in padded), None)
+        self._memo[speaker] = voice or self.default
+        return self._memo[speaker]
+
+    @property
+    def distinct_voices(self) -> int:
+        return len(set(self.voices.values()) | {self.default})
+
+
+def resolve_cast(builder_configs: Optional[Dict[str, Any]], default_voice: str) -> VoiceCast:
+    """VoiceCast from ``builder_configs['voice_cast']``; ``default_voice`` when none is configured."""
+    section = (builder_configs or {}).get("voice_cast") or {}
+    if not isinstance(section, dict):
+        section = {}
+    voices = section.get("characters") if isinstance(section.get("characters"), dict) else {}
+    return VoiceCast(section.get("default") or default_voice, voices)
+
+
+def cast_report(cast: VoiceCast, characters: Iterable[Any], speakers: Iterable[Optional[str]]) -> Dict[str, Any]:
+    """Which characters/speakers fall back to the default voice, and cast entries matching no character."""
+    names = [c.get("name") if isinstance(c, dict) else str(c) for c in characters or []]
+    known = {normalize_name(n) for n in names if n}
+    return {
+        "voices": {s: cast.voice_for(s) for s in sorted({s for s in speakers if s})},
+        "default_characters": sorted(n for n in names if n and normalize_name(n) not in cast.voices),
+        "unknown_cast": sorted(cast.names[n] for n in cast.voices if n not in known),
+    }
+
+
+def plan_cast_chunks(
+    script_data: Dict[str, Any],
+    cast: VoiceCast,
+    provider: str,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    pack_lines: bool = False,
+) -> List[Dict[str, Any]]:
+    """Chunks ``{index, scene, speaker, text, voice, key}`` in playback order, one voice each.
+
+    With ``pack_lines`` consecutive lines of the same voice within a scene
+    share a chunk (fewer requests, coarser cache and timings).
+    """
+    runs: List[Dict[str, Any]] = []
+    for scene, speaker, line in iter_scene_lines(script_data):
+        voice = cast.voice_for(speaker)
+        pieces = split_text(line, max_chars)
+        last = runs[-1] if runs else None
+        if pack_lines and last and last["scene"] == scene and last["voice"] == voice:
+            last["pieces"].extend(pieces)
+            if last["speaker"] != speaker:
+                last["speaker"] = None
+        else:
+            runs.append({"scene": scene, "speaker": speaker, "voice": voice, "pieces": pieces})
+
+    chunks: List[Dict[str, Any]] = []
+    for run in runs:
+        texts = pack_texts(run["pieces"], max_chars, "\n\n") if pack_lines else run["pieces"]
+        for text in texts:
+            chunks.append({
+                "index": len(chunks),
+                "scene": run["scene"],
+                "speaker": run["speaker"],
+                "text": text,
+                "voice": run["voice"],
+                "key": cache_key(text, run["voice"], provider),
+            })
+    return chunks
+
+
+__all__ = ["VoiceCast", "cast_report", "normalize_name", "plan_cast_chunks", "resolve_cast"]
@@ -0,0 +1,97 @@
+"""Startup bookkeeping: per-phase timings and what a process actually needs.
+
+``StartupTimer`` records how long each phase of ``create_app`` (and of
+``run.py``, e.g. starting the job workers) took; the timer is kept in
+``app.extensions['startup']`` and logged once as ``app.startup``.
+
+``cli_command`` tells which ``flask`` CLI command the process is running, so
+one-off commands (``flask seed-prompts``, ``flask routes``) can skip the
+Redis ping and the worker threads, which only the server needs, and
+everything but ``flask db`` can skip Flask-Migrate (alembic is ~100 ms of
+imports). ``TASKS_AUTOSTART`` (auto|1|0) overrides the decision
+for the workers.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+# flask CLI options that take a value (``flask --app run routes``)
+_CLI_VALUE_OPTIONS = {'--app', '-A', '--env-file', '-e'}
+_TRUE = ('1', 'true', 'yes', 'on')
+_FALSE = ('0', 'false', 'no', 'off')
+
+
+class StartupTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - started)
+
+    def report(self) -> Dict[str, Any]:
+        """``{phases: {name: ms}, total_ms}``; total covers everything since the timer was created."""
+        return {
+            'phases': {name: round(s * 1000, 2) for name, s in self.phases.items()},
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+        }
+
+    def log(self, **extra: Any) -> None:
+        report = self.report()
+        log.info('app.startup', total_ms=report['total_ms'], phases=report['phases'], **extra)
+
+
+def cli_command(argv: Optional[List[str]] = None) -> Optional[str]:
+    """Name of the ``flask`` CLI command being run.
+
+    ``''`` for a bare ``flask``/``flask --help``, ``None`` when the process is
+    not the Flask CLI (``python run.py``, a WSGI server, tests).
+    """
+    argv = sys.argv if argv is None else argv
+    if not argv:
+        return None
+    prog = argv[0]
+    name = os.path.basename(prog)
+    if name not in ('flask', 'flask.exe') and not prog.endswith(os.path.join('flask', '__main__.py')):
+        return None
+    args = iter(argv[1:])
+    for arg in args:
+        if arg in _CLI_VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return ''
+
+
+def should_start_tasks(app, argv: Optional[List[str]] = None) -> bool:
+    """Whether this process should connect to Redis and start the job workers.
+
+    ``TASKS_AUTOSTART=1``/``0`` forces it; by default only the server does
+    (``python run.py``, WSGI servers and ``flask run``), not other CLI commands.
+    """
+    mode = str(app.config.get('TASKS_AUTOSTART', 'auto')).strip().lower()
+    if mode in _TRUE:
+        return True
+    if mode in _FALSE:
+        return False
+    command = cli_command(argv)
+    return command is None or command == 'run'
+
+
+def needs_migrate(argv: Optional[List[str]] = None) -> bool:
+    """Whether to set up Flask-Migrate (and import alembic): only ``flask db`` (and bare ``flask``, to list it) use it."""
+    return cli_command(argv) in ('', 'db')
+
+
+__all__ = ['StartupTimer', 'cli_command', 'needs_migrate', 'should_start_tasks']
@@ -1,21 +1,68 @@
+import importlib
+import json
 import queue
 import threading
-import redis
 from pathlib import Path
 import structlog
 import os
+import time
+import uuid
+
+from app.metrics import JOB_METRICS, Gauge
 
 # These are initialized by init_tasks
 redis_client = None
 JOB_QUEUE = queue.Queue()
 BACKGROUND_JOBS = {}
 REDIS_CHANNEL = 'job_updates'
+# 'memory': JOB_QUEUE, jobs run in the process that enqueued them.
+# 'redis': jobs are pushed to REDIS_QUEUE_KEY and run by whichever process
+# has workers (`flask worker`), so API processes need no worker pool.
+QUEUE_BACKEND = 'memory'
+REDIS_QUEUE_KEY = 'jobs:queue'
+# Seconds each job state stays readable under `jobs:<kind>:<id>` (redis backend)
+JOB_STATE_TTL = 24 * 3600
+# In-process job state dicts (VBEE_JOBS, IMAGE_JOBS): finished jobs are
+# dropped after JOB_HISTORY_TTL seconds, and only the newest
+# JOB_HISTORY_LIMIT jobs are kept
+JOB_HISTORY_TTL = 3600
+JOB_HISTORY_LIMIT = 1000
+FINISHED_STATUSES = ('done', 'failed')
 DEFAULT_NUM_WORKERS = 4
 NUM_WORKERS = DEFAULT_NUM_WORKERS
 
 # module logger
 log = structlog.get_logger()
 
+# Worker thread name -> {state: idle|busy, job, job_id, since, processed, failed}
+WORKER_STATE = {}
+_state_lock = threading.Lock()
+
+
+def worker_snapshot():
+    """Copy of WORKER_STATE that is safe to serialize."""
+    with _state_lock:
+        return {name: dict(state) for name, state in WORKER_STATE.items()}
+
+
+def _worker_counts():
+    with _state_lock:
+        states = [w['state'] for w in WORKER_STATE.values()]
+    return {('busy',): states.count('busy'), ('idle',): states.count('idle')}
+
+
+def queue_depth():
+    if QUEUE_BACKEND == 'redis' and redis_client is not None:
+        try:
+            return redis_client.llen(REDIS_QUEUE_KEY)
+        except Exception:
+            return 0
+    return JOB_QUEUE.qsize()
+
+
+JOB_METRICS.registry.register(Gauge('job_queue_depth', 'Jobs waiting in the queue.', queue_depth))
+JOB_METRICS.registry.register(Gauge('job_workers', 'Worker threads by state.', _worker_counts, ('state',)))
+
 
 # Event used to signal workers to stop (best-effort). Threads still start as
 # daemon threads by default to avoid preventing process exit in simple setups.
@@ -38,24 +85,168 @@ def _parse_workers(raw_value, default=DEFAULT_NUM_WORKERS, min_v=1, max_v=32):
         log.warning("NUM_WORKERS out of allowed range, clamping", raw_value=v, min=min_v, max=max_v)
     return max(min(v, max_v), min_v)
 
-def job_worker(app):
-    """A dedicated worker thread that processes jobs from the JOB_QUEUE one by one."""
-    while not STOP_EVENT.is_set():
-        try:
-            # use a short timeout to allow checking STOP_EVENT periodically
-            job = JOB_QUEUE.get(timeout=1)
-        except queue.Empty:
-            continue
+def _job_name(target) -> str:
+    return getattr(target, '__name__', type(target).__name__)
+
+
+def _set_worker_state(name, **state):
+    with _state_lock:
+        WORKER_STATE.setdefault(name, {'state': 'idle', 'processed': 0, 'failed': 0}).update(state)
+
+
+def _target_path(target) -> str:
+    module = getattr(target, '__module__', None)
+    qualname = getattr(target, '__qualname__', '')
+    if not module or not qualname or '<' in qualname:
+        raise ValueError(f'{_job_name(target)} cannot be queued in Redis: job targets must be module-level functions')
+    return f'{module}:{qualname}'
+
+
+def _resolve_target(path: str):
+    module, _, qualname = path.partition(':')
+    obj = importlib.import_module(module)
+    for part in qualname.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def encode_job(job) -> str:
+    """JSON form of a queued job for the Redis queue (target as ``module:qualname``, JSON args)."""
+    data = {k: v for k, v in job.items() if k not in ('target', 'enqueued')}
+    data['target'] = _target_path(job['target'])
+    data['args'] = list(job.get('args', ()))
+    # monotonic clocks differ between processes; carry wall time instead
+    data['enqueued_at'] = time.time() - (time.monotonic() - job.get('enqueued', time.monotonic()))
+    return json.dumps(data, ensure_ascii=False)
+
+
+def decode_job(raw):
+    data = json.loads(raw)
+    data['target'] = _resolve_target(data['target'])
+    data['args'] = tuple(data.get('args', ()))
+    data['enqueued'] = time.monotonic() - max(0.0, time.time() - data.pop('enqueued_at', time.time()))
+    return data
+
+
+def _put(job):
+    if QUEUE_BACKEND == 'redis':
+        redis_client.lpush(REDIS_QUEUE_KEY, encode_job(job))
+    else:
+        JOB_QUEUE.put(job)
+
+
+def _next_job(timeout=1):
+    """The next job, or None after ``timeout`` seconds without one."""
+    if QUEUE_BACKEND == 'redis':
+        item = redis_client.brpop(REDIS_QUEUE_KEY, timeout=timeout)
+        return decode_job(item[1]) if item else None
+    try:
+        return JOB_QUEUE.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+def update_job_state(jobs, job_id, update):
+    """Merge ``update`` into ``jobs[job_id]`` and return a copy of the state.
+
+    ``jobs`` is an ``OrderedDict`` in creation order; the caller holds its
+    lock. Finished jobs get a ``finished`` time, and the oldest ones are
+    evicted after ``JOB_HISTORY_TTL`` or beyond ``JOB_HISTORY_LIMIT`` jobs.
+    """
+    state = jobs.setdefault(job_id, {})
+    state.update(update)
+    if state.get('status') in FINISHED_STATUSES:
+        state.setdefault('finished', time.time())
+    cutoff = time.time() - JOB_HISTORY_TTL
+    while jobs:
+        oldest = next(iter(jobs.values()))
+        if not (oldest.get('status') in FINISHED_STATUSES and oldest.get('finished', cutoff) < cutoff):
+            break
+        jobs.popitem(last=False)
+    while len(jobs) > JOB_HISTORY_LIMIT:
+        jobs.popitem(last=False)
+    return dict(state)
+
+
+def _state_key(kind, job_id):
+    return f'jobs:{kind}:{job_id}'
+
+
+def publish_job_update(kind, job_id, state):
+    """Publish a job's state on REDIS_CHANNEL (the /stream SSE feed).
+
+    With the redis backend the state is also stored under
+    ``jobs:<kind>:<id>`` for ``JOB_STATE_TTL`` seconds, so any API process
+    can answer status polls for jobs that ran in the worker process (see
+    ``shared_job_state``).
+    """
+    if redis_client is None:
+        return
+    try:
+        if QUEUE_BACKEND == 'redis':
+            redis_client.setex(_state_key(kind, job_id), JOB_STATE_TTL, json.dumps(state, ensure_ascii=False, default=str))
+        redis_client.publish(REDIS_CHANNEL, json.dumps({'job_id': job_id, 'type': kind, **state}, ensure_ascii=False))
+    except Exception as e:
+        log.warning("job.publish_failed", kind=kind, job_id=job_id, error=str(e))
+
+
+def shared_job_state(kind, job_id):
+    """Latest state stored by ``publish_job_update`` (redis backend only), else None."""
+    if QUEUE_BACKEND != 'redis' or redis_client is None:
+        return None
+    try:
+        raw = redis_client.get(_state_key(kind, job_id))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
 
+
+def _retry_later(job, delay):
+    """Put ``job`` back on the queue after ``delay`` seconds (unless stopping)."""
+    def _requeue():
+        if not STOP_EVENT.is_set():
+            job['enqueued'] = time.monotonic()
+            _put(job)
+
+    timer = threading.Timer(delay, _requeue)
+    timer.daemon = True
+    timer.start()
+
+
+def run_job(app, job, worker_name=None):
+    """Run one queued job inside an app context, with its trace id bound in structlog.
+
+    Records queue wait, run time and outcome in ``JOB_METRICS``. The outcome is
+    'error' when the target raised, 'failed' when it returned ``{'ok': False}``
+    and 'retried' when an error re-queued the job (``retries`` left).
+    """
+    target = job.get('target')
+    args = job.get('args', ())
+    name = job.get('name') or _job_name(target)
+    worker_name = worker_name or threading.current_thread().name
+    started = time.monotonic()
+    JOB_METRICS.wait.observe(max(0.0, started - job.get('enqueued', started)), name)
+    _set_worker_state(worker_name, state='busy', job=name, job_id=job.get('id'), since=time.time())
+
+    outcome = 'ok'
+    with structlog.contextvars.bound_contextvars(trace_id=job.get('trace_id'), job_id=job.get('id'), job=name):
         try:
-            target_func = job.get('target')
-            args = job.get('args', ())
-            if callable(target_func):
+            if callable(target):
                 with app.app_context():
-                    target_func(*args)
+                    result = target(*args)
+                if isinstance(result, dict) and result.get('ok') is False:
+                    outcome = 'failed'
         except Exception as e:
+            outcome = 'error'
+            if job.get('attempt', 0) < job.get('retries', 0):
+                outcome = 'retried'
+                job['attempt'] = job.get('attempt', 0) + 1
+                delay = job.get('retry_delay', 1.0) * (2 ** (job['attempt'] - 1))
+                JOB_METRICS.retries.inc(1, name)
+                log.warning("job.retry", attempt=job['attempt'], retries=job['retries'], delay=delay, error=str(e))
+                _retry_later(job, delay)
             # Use app logger if available, otherwise print
-            if app:
+            elif app:
                 try:
                     app.logger.exception("Error in job worker thread.")
                 except Exception:
@@ -63,17 +254,110 @@ def job_worker(app):
             else:
                 print(f"Error in job worker thread: {e}")
         finally:
-            try:
-                JOB_QUEUE.task_done()
-            except Exception:
-                pass
+            elapsed = time.monotonic() - started
+            JOB_METRICS.run.observe(elapsed, name)
+            JOB_METRICS.outcomes.inc(1, name, outcome)
+            JOB_METRICS.busy.inc(elapsed, worker_name)
+            with _state_lock:
+                state = WORKER_STATE[worker_name]
+                state.update(state='idle', job=None, job_id=None, since=time.time())
+                state['processed'] += 1
+                state['failed'] += outcome in ('error', 'failed')
+            log.info("job.finished", outcome=outcome, seconds=round(elapsed, 3))
+    return outcome
+
+
+def job_worker(app):
+    """A dedicated worker thread that processes jobs from the JOB_QUEUE one by one."""
+    name = threading.current_thread().name
+    _set_worker_state(name, since=time.time())
+    while not STOP_EVENT.is_set():
+        try:
+            # use a short timeout to allow checking STOP_EVENT periodically
+            job = _next_job(timeout=1)
+        except Exception as e:
+            # Redis down or a job that no longer decodes (e.g. renamed target)
+            log.error("job.fetch_failed", error=str(e))
+            STOP_EVENT.wait(1)
+            continue
+        if job is None:
+            continue
 
-def init_tasks(app):
-    """Initializes the task runner background thread and Redis client."""
-    global redis_client, BACKGROUND_JOBS
+        try:
+            run_job(app, job, name)
+        finally:
+            if QUEUE_BACKEND == 'memory':
+                try:
+                    JOB_QUEUE.task_done()
+                except Exception:
+                    pass
 
-    # Determine worker count from app config -> env var -> default and validate
-    raw = app.config.get('NUM_WORKERS', None)
+def enqueue_job(target, *args, retries: int = 0, retry_delay: float = 1.0) -> str:
+    """Put a callable on the job queue and return a job id.
+
+    With the redis backend ``target`` must be a module-level function and
+    ``args`` JSON-serializable, since the job may run in another process.
+    The worker threads call ``target(*args)`` inside an app context; a job
+    that raises is re-queued up to ``retries`` times with exponential
+    backoff starting at ``retry_delay`` seconds. The caller's trace id (the
+    ``trace_id`` or ``request_id`` bound in structlog, e.g. by the API
+    request) travels with the job and is bound again in the worker.
+    """
+    job_id = uuid.uuid4().hex
+    context = structlog.contextvars.get_contextvars()
+    trace_id = context.get('trace_id') or context.get('request_id') or job_id
+    name = _job_name(target)
+    _put({
+        'id': job_id,
+        'target': target,
+        'args': args,
+        'name': name,
+        'trace_id': trace_id,
+        'enqueued': time.monotonic(),
+        'attempt': 0,
+        'retries': max(0, int(retries)),
+        'retry_delay': retry_delay,
+    })
+    log.info("job.enqueued", job_id=job_id, target=name, trace_id=trace_id)
+    return job_id
+
+def schedule_periodic(name, interval, target, *args):
+    """Enqueue ``target(*args)`` on the JOB_QUEUE every ``interval`` seconds.
+
+    A small daemon thread does the scheduling; the job itself runs on the
+    worker threads like any other. Stops with STOP_EVENT.
+    """
+    def _loop():
+        while not STOP_EVENT.wait(interval):
+            enqueue_job(target, *args)
+
+    thread = threading.Thread(target=_loop, daemon=True, name=name)
+    thread.start()
+    BACKGROUND_JOBS[name] = thread
+    log.info("job.scheduled", name=name, interval=interval)
+    return thread
+
+
+def _reconcile_flags_job():
+    from app.services.flag_reconciler import reconcile_flags
+
+    reconcile_flags()
+
+
+def init_tasks(app, start_workers=True, num_workers=None):
+    """Initializes the Redis client, the queue backend and (unless
+    ``start_workers`` is False, e.g. API processes that leave jobs to
+    `flask worker`) the job worker threads and periodic jobs."""
+    global redis_client, BACKGROUND_JOBS, QUEUE_BACKEND
+
+    backend = str(app.config.get('JOB_QUEUE_BACKEND') or 'memory').lower()
+    if backend not in ('memory', 'redis'):
+        log.warning("JOB_QUEUE_BACKEND invalid, using memory", value=backend)
+        backend = 'memory'
+    QUEUE_BACKEND = backend
+
+    # Determine worker count from argument -> app config -> env var -> default and validate
+    raw = num_workers if num_workers is not None else app.config.get('NUM_WORKERS', None)
     if raw is None:
         raw = os.getenv('NUM_WORKERS', DEFAULT_NUM_WORKERS)
 
@@ -83,7 +367,8 @@ def init_tasks(app):
     global NUM_WORKERS
     NUM_WORKERS = num_workers
 
-    log.info(f"Starting {num_workers} job worker threads.")
+    # imported here so processes that never start the workers skip it
+    import redis
 
     redis_client = redis.Redis(
         host=app.config.get('REDIS_HOST', 'localhost'),
@@ -117,7 +402,12 @@ def init_tasks(app):
             except Exception:
                 pass
 
+    if not start_workers:
+        log.info("Job workers not started in this process.", backend=QUEUE_BACKEND)
+        return
 
+    log.info(f"Starting {num_workers} job worker threads.", backend=QUEUE_BACKEND)
+    STOP_EVENT.clear()
     for i in range(num_workers):
         thread_name = f"Worker-Thread-{i+1}"
         thread = threading.Thread(
@@ -134,4 +424,47 @@ def init_tasks(app):
             # best-effort bookkeeping
             pass
 
-    log.info(f"{num_workers} job worker threads started.")
\ No newline at end of file
+    log.info(f"{num_workers} job worker threads started.")
+
+    try:
+        interval = int(app.config.get('FLAG_RECONCILE_INTERVAL') or 0)
+    except (TypeError, ValueError):
+        log.warning("FLAG_RECONCILE_INTERVAL invalid, periodic reconciliation disabled")
+        interval = 0
+    if interval > 0:
+        schedule_periodic("Flag-Reconciler", interval, _reconcile_flags_job)
+
+
+def stop_tasks(timeout=30.0):
+    """Graceful shutdown: set STOP_EVENT and wait up to ``timeout`` seconds.
+
+    Workers finish the job they are running and exit; periodic schedulers
+    stop. With the memory backend jobs still queued are lost (logged);
+    with redis they stay queued for the next worker. Returns True when
+    every background thread has stopped.
+    """
+    STOP_EVENT.set()
+    deadline = time.monotonic() + timeout
+    for thread in list(BACKGROUND_JOBS.values()):
+        thread.join(max(0.0, deadline - time.monotonic()))
+    alive = sorted(name for name, thread in BACKGROUND_JOBS.items() if thread.is_alive())
+    pending = JOB_QUEUE.qsize() if QUEUE_BACKEND == 'memory' else 0
+    log.info("tasks.stopped", alive=alive, dropped_jobs=pending)
+    return not alive
+
+
+def run_worker(app, num_workers=None, shutdown_timeout=30.0):
+    """Run job workers in the foreground until SIGTERM/SIGINT (`flask worker`)."""
+    import signal
+
+    def _stop(signum, frame):
+        log.info("worker.stopping", signal=signum)
+        STOP_EVENT.set()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, _stop)
+    init_tasks(app, start_workers=True, num_workers=num_workers)
+    log.info("worker.started", pid=os.getpid(), workers=NUM_WORKERS, backend=QUEUE_BACKEND)
+    while not STOP_EVENT.wait(1):
+        pass
+    return stop_tasks(shutdown_timeout)
@@ -29,20 +29,26 @@ def save_config(cfg: dict):
 
 # --- Project Path Helper ---
 
-def get_project_path(script_data: Dict[str, Any], root_dir: Path = None) -> Path:
+def get_projects_root(root_dir: Path = None) -> Path:
     """
-    Determines the full path for a project folder based on script data.
+    Resolves the PROJECT_FOLDER setting (relative paths are relative to root_dir).
     """
     if root_dir is None:
-        root_dir = current_app.root_path.parent
+        root_dir = Path(current_app.root_path).parent
 
     proj_folder = settings.PROJECT_FOLDER
 
     if proj_folder:
         proj_path = Path(proj_folder)
-        projects_root = proj_path if proj_path.is_absolute() else (root_dir / proj_folder).resolve()
-    else:
-        projects_root = (root_dir / "projects").resolve()
+        return proj_path if proj_path.is_absolute() else (Path(root_dir) / proj_folder).resolve()
+    return (Path(root_dir) / "projects").resolve()
+
+
+def get_project_path(script_data: Dict[str, Any], root_dir: Path = None) -> Path:
+    """
+    Determines the full path for a project folder based on script data.
+    """
+    projects_root = get_projects_root(root_dir)
 
     meta = script_data.get("meta", {})
     video_type = (meta.get("series") or meta.get("video_type", "general")).replace(" ", "-").lower()
@@ -62,35 +68,18 @@ def _safe_display(p: Path) -> str:
         return str(p)
 
 def generator_run_once():
-    """Run the generate_from_db.py script once."""
-    project_root = current_app.root_path.parent
-    with current_app.app_context():
-        new_scripts = Script.query.filter_by(status='new').order_by(Script.id).all()
-        if not new_scripts:
-            current_app.logger.info('Generator run: No new scripts to process.')
-            return
-
-        current_app.logger.info(f'Generator run: Found {len(new_scripts)} new scripts to process.')
-        processed_count = 0
-        for script in new_scripts:
-            try:
-                episode_path = get_project_path(script.script_data, Path(project_root))
-                episode_path.mkdir(parents=True, exist_ok=True)
-
-                content_txt_path = episode_path / "content.txt"
-                script_texts = [line.get('text', '') for scene in script.scenes for line in scene.get('dialogues', []) if line.get('text')]
-                txt_content = "\n\n".join(script_texts)
-                content_txt_path.write_text(txt_content, encoding='utf-8')
-
-                script_json_path = episode_path / "capcut-api.json"
-                script_json_path.write_text(json.dumps(script.script_data, indent=2, ensure_ascii=False), encoding='utf-8')
-
-                tts_json_path = episode_path / "content.json"
-                all_dialogues = [line for scene in script.scenes for line in scene.get('dialogues', [])]
-                tts_json_path.write_text(json.dumps(all_dialogues, indent=2, ensure_ascii=False), encoding='utf-8')
-
-                script.status = 'prepared'
-                db.session.add(script)
-                processed_count += 1
-            except Exception as e:
-                current_app.logger.exception(f"Generator run: Failed to process script id={script.id}. Error: {e}")
+    """Materialize project folders for all scripts that do not have one yet."""
+    from app.services.materializer import materialize_pending
+
+    project_root = Path(current_app.root_path).parent
+    summary = materialize_pending(root_dir=project_root)
+    if not summary['selected']:
+        current_app.logger.info('Generator run: No new scripts to process.')
+        return summary
+    current_app.logger.info(
+        f"Generator run: materialized {summary['materialized']}/{summary['selected']} script(s), "
+        f"{summary['files_written']} file(s) written, {summary['files_unchanged']} unchanged."
+    )
+    for failure in summary['failures']:
+        current_app.logger.error(f"Generator run: Failed to process script id={failure['id']}. Error: {failure['error']}")
+    return summary
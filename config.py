@@ -8,6 +8,36 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     CACHE_TYPE = "SimpleCache"
     SWAGGER = {"title": "Nexo API", "uiversion": 3, "specs_route": "/api/docs/"}
+    # Build the Swagger spec (docstring extras, example files) on the first
+    # /api/docs/ request instead of at startup; the result is cached.
+    SWAGGER_LAZY = os.environ.get('SWAGGER_LAZY', '1').lower() not in ('0', 'false', 'no', 'off')
+    # Precompiled spec from `flask openapi-build`, served while it matches the
+    # routes (ignored in debug; empty disables it).
+    OPENAPI_SPEC_PATH = os.environ.get('OPENAPI_SPEC_PATH', os.path.join(basedir, 'app', 'api', 'openapi.json'))
+    # Start Redis + job workers: auto (server and `flask run` only, not other
+    # CLI commands), 1 (always) or 0 (never).
+    TASKS_AUTOSTART = os.environ.get('TASKS_AUTOSTART', 'auto')
+    # memory: jobs run in the process that enqueued them; redis: jobs go
+    # through Redis to the `flask worker` process(es).
+    JOB_QUEUE_BACKEND = os.environ.get('JOB_QUEUE_BACKEND', 'memory')
+    # `flask serve` (waitress) defaults
+    SERVE_HOST = os.environ.get('SERVE_HOST', '127.0.0.1')
+    try:
+        SERVE_PORT = int(os.environ.get('SERVE_PORT', '5000'))
+        SERVE_THREADS = int(os.environ.get('SERVE_THREADS', '8'))
+        SERVE_PROCESSES = int(os.environ.get('SERVE_PROCESSES', '1'))
+        SERVE_CONNECTION_LIMIT = int(os.environ.get('SERVE_CONNECTION_LIMIT', '0'))
+        # `flask worker` /metrics + admin listener (0 = off)
+        WORKER_METRICS_PORT = int(os.environ.get('WORKER_METRICS_PORT', '0'))
+        # Seconds running jobs get to finish on SIGTERM
+        SHUTDOWN_TIMEOUT = float(os.environ.get('SHUTDOWN_TIMEOUT', '30'))
+    except Exception:
+        SERVE_PORT = 5000
+        SERVE_THREADS = 8
+        SERVE_PROCESSES = 1
+        SERVE_CONNECTION_LIMIT = 0
+        WORKER_METRICS_PORT = 0
+        SHUTDOWN_TIMEOUT = 30.0
     # Number of background task worker threads. Can be overridden via
     # environment variable NUM_WORKERS or app config entry 'NUM_WORKERS'.
     try:
@@ -17,6 +47,33 @@ class Config:
     # VBEE integration settings (external TTS/API provider)
     VBEE_API_URL = os.environ.get('VBEE_API_URL', 'https://vbee.vn/api/v1')
     VBEE_API_KEY = os.environ.get('VBEE_API_KEY') or os.environ.get('VBEE_KEY')
+    # Shared HTTP connection pool size and retry budget for VBEE calls
+    try:
+        VBEE_POOL_SIZE = int(os.environ.get('VBEE_POOL_SIZE', '10'))
+        VBEE_RETRIES = int(os.environ.get('VBEE_RETRIES', '3'))
+        # Blocks per VBEE project; longer scripts are split into several projects
+        VBEE_MAX_BLOCKS = int(os.environ.get('VBEE_MAX_BLOCKS', '500'))
+    except Exception:
+        VBEE_POOL_SIZE = 10
+        VBEE_RETRIES = 3
+        VBEE_MAX_BLOCKS = 500
+    # Request instrumentation (app/metrics.py): /metrics endpoint, Server-Timing
+    # headers and sampled cProfile runs (0 disables profiling).
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '1').lower() not in ('0', 'false', 'no', 'off')
+    try:
+        METRICS_PROFILE_SAMPLE_RATE = float(os.environ.get('METRICS_PROFILE_SAMPLE_RATE', '0'))
+    except Exception:
+        METRICS_PROFILE_SAMPLE_RATE = 0.0
+    METRICS_PROFILE_DIR = os.environ.get('METRICS_PROFILE_DIR')
+    # Token for the /api/v1/admin routes (profiling); unset disables them
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    # Seconds between background reconciliations of the Script.is_* flags
+    # against the project folders (0 disables the periodic job).
+    try:
+        FLAG_RECONCILE_INTERVAL = int(os.environ.get('FLAG_RECONCILE_INTERVAL', '0'))
+    except Exception:
+        FLAG_RECONCILE_INTERVAL = 0
     
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,26 @@
+"""index scripts.is_has_folder
+
+Revision ID: 7d2f1c9e4a10
+Revises: 4c8092ea1b97
+Create Date: 2026-10-19 16:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2f1c9e4a10'
+down_revision = '4c8092ea1b97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scripts_is_has_folder'), ['is_has_folder'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scripts_is_has_folder'))
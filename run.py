@@ -8,17 +8,27 @@ except Exception:
     pass
 
 from app import create_app
-from app.tasks import init_tasks
 from app.extensions import db
+from app.startup import should_start_tasks
 from app.cli.seed_commands import init_seed_commands
+from app.cli.transcript_commands import init_transcript_commands
+from app.cli.asset_commands import init_asset_commands
+from app.cli.profile_commands import init_profile_commands
+from app.cli.openapi_commands import init_openapi_commands
+from app.cli.serve_commands import init_serve_commands
 
 # Create the Flask app instance using the application factory
 # It will load the config based on FLASK_CONFIG or default to 'development'
 config_name = os.getenv('FLASK_CONFIG') or 'default'
 app = create_app(config_name)
 
-# Initialize background tasks (Redis connection and worker thread)
-init_tasks(app)
+# Initialize background tasks (Redis connection and worker threads); skipped
+# for one-off CLI commands such as `flask seed-prompts` (see TASKS_AUTOSTART)
+if should_start_tasks(app):
+    from app.tasks import init_tasks
+
+    with app.extensions['startup'].phase('tasks'):
+        init_tasks(app)
 
 @app.shell_context_processor
 def make_shell_context():
@@ -36,9 +46,15 @@ def create_db_command():
     print('Database tables created.')
 # Register modular CLI commands
 init_seed_commands(app)
+init_transcript_commands(app)
+init_asset_commands(app)
+init_profile_commands(app)
+init_openapi_commands(app)
+init_serve_commands(app)
 
 if __name__ == '__main__':
-    # For production, use a proper WSGI server like Gunicorn or Waitress.
+    # Development server. For production use `flask --app run serve`
+    # (waitress) and, with JOB_QUEUE_BACKEND=redis, `flask --app run worker`.
     # The `debug` and `port` values will be loaded from your config file.
     host = '127.0.0.1'
     port = 5000
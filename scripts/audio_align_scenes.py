@@ -5,99 +5,62 @@ import os
 import re
 import subprocess
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 
-from utils import get_project_path
-
-
-def to_srt_timestamp(sec: float) -> str:
-    """Converts seconds to SRT time format HH:MM:SS,ms."""
-    s = float(sec or 0)
-    h = int(s / 3600)
-    m = int((s % 3600) / 60)
-    sec_i = int(s % 60)
-    ms = round((s - int(s)) * 1000)
-    return f"{h:02d}:{m:02d}:{sec_i:02d},{ms:03d}"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# @timed labels of the post-processing stages, reported by run_pipeline
+TIMED_STAGES = ('align.write_srt', 'align.find_scene_times')
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.metrics import FUNCTION_SECONDS, timed  # noqa: E402
+from app.services.media_probe import probe_duration  # noqa: E402
+from app.services.episode_manifest import (  # noqa: E402
+    EpisodeManifest,
+    discover_episodes,
+    scene_image_map,
+    stage_plan,
+    stale_report,
+)
+from app.services.subtitles import resolve_config, write_subtitles  # noqa: E402
+from app.services.transcript_store import load_transcript, sidecar_path  # noqa: E402
+from app.services.tts_engine import read_timings  # noqa: E402
+from app.utils import get_project_path, get_projects_root  # noqa: E402
+
+
+def _episode_builder_configs(episode_dir: Path) -> dict:
+    """Return builder_configs from the episode's capcut-api.json (empty if none)."""
+    try:
+        with open(episode_dir / 'capcut-api.json', 'r', encoding='utf-8') as f:
+            configs = json.load(f).get('builder_configs')
+        return configs if isinstance(configs, dict) else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
 
 
+@timed('align.write_srt')
 def write_srt_from_json(whisperx_json_path: Path):
     """
-    Converts a .whisperx.json file to a .srt file with smart segment splitting.
-    This function replicates the logic from `write-srt-from-outjson.mjs`.
+    Converts a .whisperx.json file to subtitles with smart segment splitting.
+    Grouping thresholds and extra formats (vtt/ass) come from
+    builder_configs['subtitles'] in the episode's capcut-api.json.
     """
     if not whisperx_json_path.exists():
         print(f"  -> Error: WhisperX JSON file not found: {whisperx_json_path}", file=sys.stderr)
         return
 
-    # Settings from the original script
-    PAUSE_THRESHOLD = 0.6  # seconds
-    MAX_SEGMENT_DURATION = 6.0  # seconds
-    MAX_WORDS = 10
-
-    with open(whisperx_json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    segments = data.get('segments', [])
-    srt_lines = []
-    idx = 1
-
-    for seg in segments:
-        words = seg.get('words')
-        if words and isinstance(words, list) and len(words) > 0:
-            # Split segment by words based on timing
-            groups = []
-            current_group = []
-            for i, word in enumerate(words):
-                if not current_group:
-                    current_group.append(word)
-                    continue
-
-                prev_word = current_group[-1]
-                gap = word.get('start', 0) - prev_word.get('end', 0)
-                cur_start = current_group[0].get('start', 0)
-                cur_end = word.get('end', 0)
-                cur_dur = cur_end - cur_start
-
-                if gap >= PAUSE_THRESHOLD or len(current_group) >= MAX_WORDS or cur_dur >= MAX_SEGMENT_DURATION:
-                    groups.append(current_group)
-                    current_group = [word]
-                else:
-                    current_group.append(word)
-
-            if current_group:
-                groups.append(current_group)
-
-            for group in groups:
-                start_time = group[0].get('start')
-                end_time = group[-1].get('end')
-                text = ' '.join(w.get('word', '') for w in group).strip()
-                if start_time is not None and end_time is not None and text:
-                    srt_lines.append(str(idx))
-                    srt_lines.append(f"{to_srt_timestamp(start_time)} --> {to_srt_timestamp(end_time)}")
-                    srt_lines.append(text)
-                    srt_lines.append('')
-                    idx += 1
-        else:
-            # Fallback for segments without word timings
-            start_time = seg.get('start')
-            end_time = seg.get('end')
-            text = (seg.get('text') or '').strip()
-            if start_time is not None and end_time is not None and text:
-                srt_lines.append(str(idx))
-                srt_lines.append(f"{to_srt_timestamp(start_time)} --> {to_srt_timestamp(end_time)}")
-                srt_lines.append(text)
-                srt_lines.append('')
-                idx += 1
-
-    srt_content = '\n'.join(srt_lines)
-    srt_path = whisperx_json_path.with_suffix('.srt')
-    srt_path.write_text(srt_content, encoding='utf-8')
+    config = resolve_config(_episode_builder_configs(whisperx_json_path.parent))
+    # SRT is always written: the pipeline manifest tracks it as the srt stage output
+    formats = ['srt'] + [fmt for fmt in config['formats'] if fmt != 'srt']
+    result = write_subtitles(whisperx_json_path, config, formats=formats)
+    srt_path = result['paths']['srt']
     try:
         display_srt = srt_path.relative_to(Path.cwd())
     except Exception:
         display_srt = srt_path
-    print(f"  -> Wrote SRT: {display_srt} ({idx - 1} segments)")
+    extra = ''.join(f" + {fmt}" for fmt in formats[1:])
+    print(f"  -> Wrote SRT: {display_srt} ({result['cues']} segments){extra}")
 
 
 def run_whisperx_job(job: dict, dry_run: bool, require_gpu: bool) -> dict:
@@ -168,10 +131,7 @@ def run_whisperx_job(job: dict, dry_run: bool, require_gpu: bool) -> dict:
     try:
         # Using DEVNULL for stdout/stderr to keep the main output clean, like the original script
         subprocess.run(docker_args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        # Convert JSON to SRT
-        write_srt_from_json(json_path)
-        
+        # SRT generation happens in the post-processing stage (see postprocess_episode)
         return {'ok': True, 'job': job}
     except subprocess.CalledProcessError as e:
         print(f"  -> Docker exited with code {e.returncode} for {mp3_path.name}", file=sys.stderr)
@@ -181,6 +141,27 @@ def run_whisperx_job(job: dict, dry_run: bool, require_gpu: bool) -> dict:
         return {'ok': False, 'job': job, 'error': str(e)}
 
 
+def run_local_whisperx_job(job: dict, dry_run: bool, worker) -> dict:
+    """Transcribes a single job with the in-process warm WhisperX worker."""
+    mp3_path = job['mp3']
+    json_path = job['whisperx_json']
+    try:
+        display_path = mp3_path.relative_to(Path.cwd())
+    except Exception:
+        display_path = mp3_path
+    print(f"Processing (local worker): {display_path}")
+    if dry_run:
+        print("  -> Dry run, skipping transcription.")
+        return {'ok': True, 'job': job, 'note': 'dry-run'}
+
+    res = worker.transcribe(mp3_path, json_path)
+    if not res.get('ok'):
+        print(f"  -> Local transcription failed for {mp3_path.name}: {res.get('error')}", file=sys.stderr)
+        return {'ok': False, 'job': job, 'error': res.get('error')}
+
+    return {'ok': True, 'job': job, 'elapsed': res.get('elapsed')}
+
+
 def get_words(text: str) -> list[str]:
     """Normalizes and splits text into words."""
     if not text:
@@ -197,6 +178,7 @@ def calculate_similarity(arr1: list[str], arr2: list[str]) -> float:
     return intersection / union if union > 0 else 0
 
 
+@timed('align.find_scene_times')
 def find_scene_times(narration: str, segments: list[dict]) -> tuple[float | None, float | None]:
     """Finds the best matching block of segments for a given narration."""
     narration_words = get_words(narration)
@@ -229,8 +211,11 @@ def find_scene_times(narration: str, segments: list[dict]) -> tuple[float | None
 
 def align_episode_scenes(episode_dir: Path):
     """
-    Aligns scenes in capcut-api.json with timings from the whisperx.json file.
+    Aligns scenes in capcut-api.json with timings from audio.timings.json
+    (written by the TTS engine) or, for scenes it does not cover, by matching
+    narration against the whisperx.json transcript, which is then required.
     This function replicates the logic from `align-scenes.mjs`.
+    Returns True when capcut-api.json was updated.
     """
     try:
         print(f"\nAligning scenes for episode: {episode_dir.name}")
@@ -239,114 +224,51 @@ def align_episode_scenes(episode_dir: Path):
 
         if not script_json_path.exists() or not audio_path.exists():
             print(f"  -> Skipping: Missing capcut-api.json or audio.mp3 in {episode_dir.name}", file=sys.stderr)
-            return
-
-        whisper_files = list(episode_dir.glob('*.whisperx.json'))
-        if not whisper_files:
-            print(f"  -> Skipping: No .whisperx.json file found in {episode_dir.name}", file=sys.stderr)
-            return
+            return False
 
-        whisper_path = whisper_files[0]
         with open(script_json_path, 'r', encoding='utf-8') as f:
             script_data = json.load(f)
-        with open(whisper_path, 'r', encoding='utf-8') as f:
-            whisper_data = json.load(f)
-
-        segments = whisper_data.get('segments', [])
+        scene_count = len(script_data.get('scenes', []))
+
+        # Scene timings written by the chunked TTS engine are exact; text matching
+        # against the transcript is only needed for scenes they do not cover
+        tts_scenes = (read_timings(episode_dir) or {}).get('scenes', {})
+        from_timings = bool(tts_scenes) and all(str(i + 1) in tts_scenes for i in range(scene_count))
+        segments = []
+        if not from_timings:
+            whisper_files = list(episode_dir.glob('*.whisperx.json'))
+            if not whisper_files:
+                print(f"  -> Skipping: No .whisperx.json file found in {episode_dir.name}", file=sys.stderr)
+                return False
+            # Reads the memory-mapped .npz sidecar when fresh, else parses the JSON once
+            segments = load_transcript(whisper_files[0]).segments()
 
         null_count = 0
+        scene_images = scene_image_map(os.listdir(episode_dir))
         for i, scene in enumerate(script_data.get('scenes', [])):
-            start_time, end_time = find_scene_times(scene.get('narration', ''), segments)
+            if str(i + 1) in tts_scenes:
+                start_time, end_time = tts_scenes[str(i + 1)]
+            else:
+                start_time, end_time = find_scene_times(scene.get('narration', ''), segments)
             # Round start/end to nearest integer seconds when available, preserve None
             scene['start'] = int(round(start_time)) if start_time is not None else None
             scene['end'] = int(round(end_time)) if end_time is not None else None
             if start_time is None or end_time is None:
                 null_count += 1
             
-            # Add absolute image path if the file exists; otherwise set to None and warn
-            image_file = episode_dir / f"{i + 1}.png"
-            if image_file.exists():
-                scene['image'] = str(image_file.resolve().as_posix())
+            # Add absolute image path (N.png/jpg/webp) if the file exists; otherwise set to None and warn
+            image_name = scene_images.get(i + 1)
+            if image_name:
+                scene['image'] = str((episode_dir / image_name).resolve().as_posix())
             else:
+                image_file = episode_dir / f"{i + 1}.png"
                 # Use empty string to avoid 'undefined' in frontends that render this value
                 scene['image'] = ''
                 print(f"  -> Warning: image file not found for scene {i + 1}: {image_file}", file=sys.stderr)
 
-        # Get audio duration robustly with multiple fallbacks:
-        # 1) imageio_ffmpeg.get_ffprobe_exe(), 2) system 'ffprobe' (PATH),
-        # 3) imageio_ffmpeg.get_ffmpeg_exe() and parse stderr, 4) system 'ffmpeg' and parse stderr
-        duration_obtained = False
-        duration_value = None
-
-        # Helper to run a command and return stdout
-        def _run_cmd(cmd):
-            try:
-                return subprocess.check_output(cmd, text=True, stderr=subprocess.PIPE).strip()
-            except Exception:
-                return None
-
-        # Try imageio_ffmpeg.get_ffprobe_exe()
-        try:
-            import imageio_ffmpeg
-            ffprobe_path = getattr(imageio_ffmpeg, 'get_ffprobe_exe', None)
-            if callable(ffprobe_path):
-                path = ffprobe_path()
-            else:
-                path = None
-            if path:
-                out = _run_cmd([path, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(audio_path)])
-                if out:
-                    duration_value = float(out)
-                    duration_obtained = True
-        except ImportError:
-            path = None
-
-        # Try system ffprobe
-        if not duration_obtained:
-            import shutil
-            sys_ffprobe = shutil.which('ffprobe')
-            if sys_ffprobe:
-                out = _run_cmd([sys_ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(audio_path)])
-                if out:
-                    try:
-                        duration_value = float(out)
-                        duration_obtained = True
-                    except ValueError:
-                        duration_obtained = False
-
-        # Try imageio_ffmpeg.get_ffmpeg_exe() and parse stderr for Duration
-        if not duration_obtained:
-            try:
-                import imageio_ffmpeg
-                get_ffmpeg = getattr(imageio_ffmpeg, 'get_ffmpeg_exe', None)
-                if callable(get_ffmpeg):
-                    ffmpeg_path = get_ffmpeg()
-                else:
-                    ffmpeg_path = None
-                if ffmpeg_path:
-                    # ffmpeg writes duration info to stderr when probing
-                    proc = subprocess.run([ffmpeg_path, '-i', str(audio_path)], capture_output=True, text=True)
-                    stderr = proc.stderr or ''
-                    m = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', stderr)
-                    if m:
-                        h, mm, ss = m.groups()
-                        duration_value = int(h) * 3600 + int(mm) * 60 + float(ss)
-                        duration_obtained = True
-            except ImportError:
-                pass
-
-        # Try system ffmpeg probe
-        if not duration_obtained:
-            import shutil
-            sys_ffmpeg = shutil.which('ffmpeg')
-            if sys_ffmpeg:
-                proc = subprocess.run([sys_ffmpeg, '-i', str(audio_path)], capture_output=True, text=True)
-                stderr = proc.stderr or ''
-                m = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', stderr)
-                if m:
-                    h, mm, ss = m.groups()
-                    duration_value = int(h) * 3600 + int(mm) * 60 + float(ss)
-                    duration_obtained = True
+        # Get audio duration from the shared (cached) media probe
+        duration_value = probe_duration(audio_path)
+        duration_obtained = duration_value is not None
 
         if duration_obtained and duration_value is not None:
             # Round duration to nearest integer seconds
@@ -372,9 +294,67 @@ def align_episode_scenes(episode_dir: Path):
         print(f"  -> Successfully aligned and updated: {display_script}")
         if null_count > 0:
             print(f"  -> Warning: {null_count} scene(s) could not be aligned.", file=sys.stderr)
+        return True
 
     except Exception as e:
         print(f"  -> Failed to process {episode_dir.name}: {e}", file=sys.stderr)
+        return False
+
+
+def _timing_snapshot() -> dict:
+    return {label: FUNCTION_SECONDS.snapshot(label) or {'count': 0, 'sum': 0.0} for label in TIMED_STAGES}
+
+
+def postprocess_episode(episode_dir: str, force: bool = False, dry_run: bool = False) -> dict:
+    """Generate the SRT and align scenes for one transcribed episode.
+
+    Runs in the alignment process pool; only stages whose manifest inputs
+    changed are executed. Never raises so one broken episode cannot take the
+    batch down.
+
+    The pool processes have no ``/metrics``, so the ``@timed`` observations
+    of this call are returned under ``timings`` for ``run_pipeline`` to sum.
+    """
+    before = _timing_snapshot()
+    result = _postprocess_episode(Path(episode_dir), force, dry_run)
+    result['timings'] = {
+        label: {'count': after['count'] - before[label]['count'], 'sum': after['sum'] - before[label]['sum']}
+        for label, after in _timing_snapshot().items()
+    }
+    return result
+
+
+def _postprocess_episode(ep_dir: Path, force: bool, dry_run: bool) -> dict:
+    result = {'ok': True, 'dir': ep_dir, 'aligned': False, 'skipped': False}
+    try:
+        manifest = EpisodeManifest(ep_dir)
+        plan = stage_plan(manifest)
+        if not plan:
+            return result
+        whisperx_json_path = ep_dir / plan['transcribe'][1][0]
+        if not whisperx_json_path.exists():
+            return result
+
+        if force or manifest.is_stale('srt', *plan['srt']):
+            write_srt_from_json(whisperx_json_path)
+            if not dry_run:
+                manifest.listing(refresh=True)
+                manifest.record('srt', *plan['srt'])
+
+        if 'align' not in plan:
+            return result
+        if not force and not manifest.is_stale('align', *plan['align']):
+            result['skipped'] = True
+            return result
+        if align_episode_scenes(ep_dir):
+            result['aligned'] = True
+            if not dry_run:
+                manifest.record('align', *plan['align'])
+        else:
+            result.update(ok=False, error='alignment failed')
+    except Exception as e:
+        result.update(ok=False, error=str(e))
+    return result
 
 
 def run_pipeline(
@@ -385,6 +365,11 @@ def run_pipeline(
     require_gpu: bool = True,
     align_only: bool = False,
     repo_root: Path | None = None,
+    backend: str = 'docker',
+    whisper_model: str | None = None,
+    status_only: bool = False,
+    align_workers: int | None = None,
+    index_transcripts: bool = True,
 ) -> dict:
     """Run the transcription + alignment pipeline programmatically.
 
@@ -392,18 +377,40 @@ def run_pipeline(
     safe to import and call from other modules (for example `main.py`).
 
     Keys in the return dict:
-    - ok: bool
+    - ok: bool (False when any episode failed transcription or alignment)
     - processed_dirs: int
     - transcription: { total, success, failed, failures: [...] } (if align_only is False)
     - aligned: int
+    - skipped: int (episodes whose alignment inputs are unchanged)
+    - alignment_failures: [ { dir, error } ]
+    - timings: { label: { count, seconds } } of the @timed post-processing stages
+    - stale: { episode_dir: { stage: reason } } (only when status_only is True)
     - message: optional
+
+    `backend` selects how transcription runs: 'docker' starts one
+    `cc_bcal-whisperx` container per file, 'local' reuses a warm in-process
+    WhisperX worker (models loaded once; CPU when `require_gpu` is False).
+
+    Stages are streamed: as soon as an episode's transcription completes it
+    is handed to a process pool (`align_workers`, default CPU count) for SRT
+    generation and scene alignment, while other episodes are still being
+    transcribed. A failure only affects its own episode.
+
+    Each episode folder carries a `.pipeline-manifest.json` recording input
+    and output hashes per stage, so stages whose inputs did not change are
+    skipped and an interrupted run resumes where it stopped. `force` ignores
+    the manifest and reruns everything.
+
+    With `index_transcripts` each post-processed episode is also added to the
+    transcript search index (`<projects>/.transcript-index.sqlite`).
     """
     repo_root = Path.cwd() if repo_root is None else Path(repo_root)
-    episodes_root = repo_root / 'projects'
+    # The PROJECT_FOLDER setting, like get_project_path and the search API's index
+    episodes_root = get_projects_root(repo_root)
 
     # If script_files is None we will scan the projects directory, so ensure it exists.
     if script_files is None and not episodes_root.is_dir():
-        return {'ok': False, 'message': f"'projects' directory not found at {episodes_root}"}
+        return {'ok': False, 'message': f"projects directory not found at {episodes_root}"}
 
     target_episode_dirs = []
     if script_files:
@@ -412,81 +419,130 @@ def run_pipeline(
                 continue
             try:
                 with open(script_file, 'r', encoding='utf-8') as f:
-                    ep_dir = get_project_path(json.load(f))
+                    ep_dir = get_project_path(json.load(f), repo_root)
             except (json.JSONDecodeError, KeyError):
                 continue
 
             if ep_dir.is_dir():
                 target_episode_dirs.append(ep_dir)
     else:
-        target_episode_dirs = [d for d in episodes_root.glob('*/*') if d.is_dir()]
+        target_episode_dirs = discover_episodes(episodes_root)
 
     if not target_episode_dirs:
         return {'ok': True, 'processed_dirs': 0, 'message': 'No episode directories found to process.'}
 
-    transcription_summary = None
+    if status_only:
+        return {'ok': True, 'processed_dirs': len(target_episode_dirs), 'stale': stale_report(target_episode_dirs)}
+
+    manifests = {ep_dir: EpisodeManifest(ep_dir) for ep_dir in target_episode_dirs}
+    index = None
+    if index_transcripts and not dry_run:
+        from app.services.transcript_index import TranscriptIndex, default_index_path
+
+        index = TranscriptIndex(default_index_path(episodes_root))
+    plans = {ep_dir: stage_plan(m) for ep_dir, m in manifests.items()}
+
+    # Build WhisperX job list; every other episode goes straight to post-processing
+    work = []
     if not align_only:
-        # Build WhisperX job list
-        work = []
-        for ep_dir in target_episode_dirs:
-            audio_files = list(ep_dir.glob('*.mp3'))
-            if not audio_files:
+        for ep_dir, manifest in manifests.items():
+            if 'transcribe' not in plans[ep_dir]:
                 continue
+            inputs, outputs = plans[ep_dir]['transcribe']
+            mp3_path = ep_dir / inputs[0]
+            whisperx_json_path = ep_dir / outputs[0]
 
-            mp3_path = audio_files[0]
-            base_name = mp3_path.stem
-            whisperx_json_path = ep_dir / f"{base_name}.whisperx.json"
-
-            if whisperx_json_path.exists() and force:
+            if force:
                 try:
-                    whisperx_json_path.unlink()
-                    srt_path = whisperx_json_path.with_suffix('.srt')
-                    if srt_path.exists():
-                        srt_path.unlink()
+                    whisperx_json_path.unlink(missing_ok=True)
+                    whisperx_json_path.with_suffix('.srt').unlink(missing_ok=True)
+                    sidecar_path(whisperx_json_path).unlink(missing_ok=True)
                 except Exception:
                     pass
+                manifest.invalidate('transcribe', save=False)
+                manifest.invalidate('srt', save=False)
+            elif whisperx_json_path.exists() and 'transcribe' not in manifest.data['stages']:
+                # Adopt transcripts produced before manifests existed
+                manifest.record('transcribe', inputs, outputs)
 
-            if whisperx_json_path.exists() and not force:
+            if not manifest.is_stale('transcribe', inputs, outputs):
                 continue
 
             work.append({'mp3': mp3_path, 'whisperx_json': whisperx_json_path, 'dir': ep_dir})
 
-        if work:
-            results = []
-            with ThreadPoolExecutor(max_workers=parallel) as executor:
-                futures = {executor.submit(run_whisperx_job, job, dry_run, require_gpu): job for job in work}
-                for future in as_completed(futures):
-                    results.append(future.result())
-
-            successes = [r for r in results if r.get('ok')]
-            failures = [r for r in results if not r.get('ok')]
-            transcription_summary = {
-                'total': len(results),
-                'success': len(successes),
-                'failed': len(failures),
-                'failures': failures,
-            }
-            if failures:
-                # do not proceed to alignment if transcription failed
-                return {'ok': False, 'processed_dirs': len(target_episode_dirs), 'transcription': transcription_summary}
-        else:
-            transcription_summary = {'total': 0, 'success': 0, 'failed': 0, 'failures': []}
+    transcribing = {job['dir'] for job in work}
+    transcription_results = []
+    post_results = []
 
-    # Run Scene Alignment for all targeted dirs
-    aligned_count = 0
-    for ep_dir in target_episode_dirs:
-        try:
-            align_episode_scenes(ep_dir)
-            aligned_count += 1
-        except Exception:
-            # align_episode_scenes prints its own errors; continue
-            pass
+    if backend == 'local' and work:
+        from app.services.transcription_worker import get_worker, DEFAULT_MODEL
+
+        worker = get_worker(
+            model_name=whisper_model or DEFAULT_MODEL,
+            device='cuda' if require_gpu else 'cpu',
+        )
+        run_job = lambda job: run_local_whisperx_job(job, dry_run, worker)  # noqa: E731
+    else:
+        run_job = lambda job: run_whisperx_job(job, dry_run, require_gpu)  # noqa: E731
+
+    with ProcessPoolExecutor(max_workers=align_workers or os.cpu_count() or 1) as align_pool, \
+            ThreadPoolExecutor(max_workers=max(1, parallel)) as transcribe_pool:
+        pending = set()
+        for ep_dir in target_episode_dirs:
+            if ep_dir not in transcribing:
+                pending.add(align_pool.submit(postprocess_episode, str(ep_dir), force, dry_run))
+        for job in work:
+            pending.add(transcribe_pool.submit(run_job, job))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                res = future.result()
+                if 'job' not in res:
+                    post_results.append(res)
+                    if index is not None and res.get('ok'):
+                        try:
+                            # Unchanged episodes are a cheap stat() comparison
+                            index.index_episode(res['dir'])
+                        except Exception as e:
+                            print(f"  -> Warning: could not index transcript of {res['dir']}: {e}", file=sys.stderr)
+                    continue
+                transcription_results.append(res)
+                if not res.get('ok'):
+                    continue
+                ep_dir = res['job']['dir']
+                if not dry_run:
+                    # Record the stage as soon as it finishes so a crash resumes here
+                    manifests[ep_dir].record('transcribe', *plans[ep_dir]['transcribe'])
+                pending.add(align_pool.submit(postprocess_episode, str(ep_dir), force, dry_run))
+
+    if index is not None:
+        index.close()
+
+    transcription_summary = None
+    if not align_only:
+        failures = [r for r in transcription_results if not r.get('ok')]
+        transcription_summary = {
+            'total': len(transcription_results),
+            'success': len(transcription_results) - len(failures),
+            'failed': len(failures),
+            'failures': failures,
+        }
+    alignment_failures = [{'dir': str(r['dir']), 'error': r.get('error')} for r in post_results if not r.get('ok')]
+    timings = {label: {'count': 0, 'seconds': 0.0} for label in TIMED_STAGES}
+    for r in post_results:
+        for label, t in r['timings'].items():
+            timings[label]['count'] += t['count']
+            timings[label]['seconds'] += t['sum']
 
     return {
-        'ok': True,
+        'ok': not alignment_failures and not (transcription_summary and transcription_summary['failed']),
         'processed_dirs': len(target_episode_dirs),
         'transcription': transcription_summary,
-        'aligned': aligned_count,
+        'aligned': sum(1 for r in post_results if r.get('aligned')),
+        'skipped': sum(1 for r in post_results if r.get('skipped')),
+        'alignment_failures': alignment_failures,
+        'timings': {label: {'count': t['count'], 'seconds': round(t['seconds'], 3)} for label, t in timings.items()},
     }
 
 
@@ -499,16 +555,45 @@ def main():
     parser.add_argument('--require-gpu', action='store_true', default=True, help="Run Docker with GPU support (default).")
     parser.add_argument('--no-gpu', dest='require_gpu', action='store_false', help="Run Docker without GPU support.")
     parser.add_argument('--align-only', action='store_true', help="Only run the scene alignment step, skipping transcription.")
+    parser.add_argument('--backend', choices=['docker', 'local'], default='docker', help="Transcription backend: one Docker container per file, or a warm in-process worker.")
+    parser.add_argument('--align-workers', type=int, default=None, help="Processes used for SRT generation and scene alignment (default: CPU count).")
+    parser.add_argument('--status', action='store_true', help="Only report which stages are stale per episode; do not run anything.")
+    parser.add_argument('--no-index', dest='index', action='store_false', help="Do not update the transcript search index.")
+    parser.add_argument('--whisper-model', default=None, help="Whisper model for the local backend (default: $WHISPER_MODEL or 'small').")
 
     args = parser.parse_args()
-    result = run_pipeline(
-        script_files=[Path(p) for p in args.script_files] if args.script_files else None,
-        force=args.force,
-        dry_run=args.dry_run,
-        parallel=args.parallel,
-        require_gpu=args.require_gpu,
-        align_only=args.align_only,
-    )
+    from app import create_app
+
+    # create_app loads the PROJECT_FOLDER setting from the database, so the
+    # pipeline scans (and indexes) the same folder the API reads
+    app = create_app(os.getenv('FLASK_CONFIG') or 'default')
+    with app.app_context():
+        result = run_pipeline(
+            script_files=[Path(p) for p in args.script_files] if args.script_files else None,
+            force=args.force,
+            dry_run=args.dry_run,
+            parallel=args.parallel,
+            require_gpu=args.require_gpu,
+            align_only=args.align_only,
+            backend=args.backend,
+            whisper_model=args.whisper_model,
+            status_only=args.status,
+            align_workers=args.align_workers,
+            index_transcripts=args.index,
+        )
+
+    if args.status and result.get('ok'):
+        stale = result.get('stale') or {}
+        for ep, stages in stale.items():
+            print(ep)
+            for stage, reason in stages.items():
+                print(f"  - {stage}: {reason}")
+        print(f"{len(stale)} of {result.get('processed_dirs', 0)} episode(s) have stale stages.")
+        return 0
+
+    for label, t in (result.get('timings') or {}).items():
+        if t['count']:
+            print(f"{label}: {t['count']} call(s), {t['seconds']:.3f}s")
 
     # Mirror previous behavior for CLI: print summary and set exit code
     if not result.get('ok'):
@@ -519,6 +604,8 @@ def main():
             for f in result['transcription']['failures']:
                 job_path = f['job']['mp3'] if 'job' in f and 'mp3' in f['job'] else None
                 print(f" - Failure: {job_path}: {f.get('error')}", file=sys.stderr)
+        for f in result.get('alignment_failures') or []:
+            print(f" - Alignment failure: {f['dir']}: {f.get('error')}", file=sys.stderr)
         return 1
 
     # Success
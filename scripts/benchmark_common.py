@@ -0,0 +1,156 @@
+"""Shared helpers for the benchmark scripts in this folder.
+
+Covers result persistence (JSON/CSV), regression comparison against a stored
+baseline, peak RSS measurement, latency percentiles and word error rate.
+Imported as a sibling module (``from benchmark_common import ...``) because
+scripts are run directly from the ``scripts/`` folder.
+"""
+import csv
+import json
+import math
+import platform
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the current process in MiB (None if unknown)."""
+    try:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS reports bytes
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        mem = psutil.Process().memory_info()
+        return getattr(mem, "peak_wset", mem.rss) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (pct in 0..100) of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(samples: List[float], wall_seconds: float) -> Dict[str, Any]:
+    """Summarize per-request latencies (seconds) as ms percentiles + throughput."""
+    return {
+        "count": len(samples),
+        "p50_ms": _ms(percentile(samples, 50)),
+        "p95_ms": _ms(percentile(samples, 95)),
+        "p99_ms": _ms(percentile(samples, 99)),
+        "mean_ms": _ms(sum(samples) / len(samples)) if samples else None,
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds > 0 else None,
+    }
+
+
+def _ms(v: Optional[float]) -> Optional[float]:
+    return round(v * 1000, 3) if v is not None else None
+
+
+_WORD_RE = re.compile(r"[^\w\s']", re.UNICODE)
+
+
+def normalize_words(text: str) -> List[str]:
+    return _WORD_RE.sub(" ", (text or "").lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> Optional[float]:
+    """Levenshtein distance over words divided by the reference length."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return None
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, start=1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, start=1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_results(results: List[Dict[str, Any]], json_path: Path | None = None, csv_path: Path | None = None) -> None:
+    """Write results as ``{"env": ..., "results": [...]}`` JSON and/or flat CSV."""
+    if json_path:
+        json_path = Path(json_path)
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"env": environment_info(), "results": results}, f, indent=2, ensure_ascii=False)
+        print(f"Wrote {json_path}")
+    if csv_path:
+        csv_path = Path(csv_path)
+        csv_path.parent.mkdir(parents=True, exist_ok=True)
+        fields: List[str] = []
+        for r in results:
+            for k in r:
+                if k not in fields:
+                    fields.append(k)
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for r in results:
+                writer.writerow({k: (json.dumps(v) if isinstance(v, (dict, list)) else v) for k, v in r.items()})
+        print(f"Wrote {csv_path}")
+
+
+def load_baseline(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Load a results file and index its entries by ``name``."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {r["name"]: r for r in data.get("results", []) if "name" in r}
+
+
+def compare_to_baseline(
+    results: Iterable[Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    metrics: Iterable[str],
+    tolerance: float = 0.10,
+) -> List[Dict[str, Any]]:
+    """Return regressions: metrics that grew by more than ``tolerance``.
+
+    All compared metrics are "lower is better" (latency, RSS, WER, RTF).
+    """
+    regressions = []
+    for r in results:
+        base = baseline.get(r.get("name"))
+        if not base:
+            continue
+        for m in metrics:
+            new, old = r.get(m), base.get(m)
+            if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or old <= 0:
+                continue
+            change = (new - old) / old
+            if change > tolerance:
+                regressions.append({"name": r["name"], "metric": m, "baseline": old, "current": new, "change": round(change, 4)})
+    return regressions
+
+
+def print_regressions(regressions: List[Dict[str, Any]]) -> None:
+    if not regressions:
+        print("No regressions against baseline.")
+        return
+    print(f"{len(regressions)} regression(s) against baseline:", file=sys.stderr)
+    for r in regressions:
+        print(f"  - {r['name']} {r['metric']}: {r['baseline']} -> {r['current']} (+{r['change'] * 100:.1f}%)", file=sys.stderr)
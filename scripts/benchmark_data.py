@@ -0,0 +1,155 @@
+"""Synthetic data for the API benchmarks.
+
+``script_payload`` builds a realistic script in the shape the API accepts
+(meta, characters, setting, acts -> scenes -> dialogues) with configurable
+sizes; ``script_row`` turns it into a ``scripts`` table row and, for a
+fraction of rows, into one of the malformed legacy shapes the model still
+has to read (repr-style Python literals, raw control characters inside the
+JSON, comma-separated genre strings, missing titles, empty acts).
+
+``load_scripts`` bulk-inserts rows in batches through SQLAlchemy Core, so
+100k rows load in seconds on SQLite and work unchanged on Postgres.
+Imported as a sibling module (``from benchmark_data import ...``) like
+``benchmark_common``.
+"""
+import json
+import random
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+WORDS = (
+    'trời mưa con đường về nhà thầy nói rằng tâm an thì cảnh an nước chảy đá mòn '
+    'hơi thở chén trà ánh sáng sương sớm núi rừng tiếng chuông gió thổi lá rơi '
+    'hiện tại bình yên dừng lại lắng nghe trái tim quá khứ tương lai'
+).split()
+NAMES = ['Mặc Đức', 'An', 'Bình', 'Lan', 'Kể chuyện', 'Thiền sư', 'Cô bé', 'Người lữ khách']
+_LINE_SPACE_RE = re.compile(r'("line": "[^"]*?) ')
+LEGACY_KINDS = ('python_repr', 'control_chars', 'genre_csv', 'no_title', 'empty_acts')
+
+
+def _sentence(rng: random.Random, lo: int = 6, hi: int = 28) -> str:
+    return ' '.join(rng.choices(WORDS, k=rng.randint(lo, hi))).capitalize() + '.'
+
+
+def script_payload(
+    rng: random.Random,
+    index: int,
+    acts: int = 3,
+    scenes: int = 4,
+    dialogues: int = 5,
+    alias_prefix: str = 'bench',
+) -> Dict[str, Any]:
+    """One script as POSTed to /scripts (sizes are per act / per scene)."""
+    cast = rng.sample(NAMES, k=min(len(NAMES), rng.randint(2, 5)))
+    scene_no = 0
+    act_list = []
+    for a in range(1, acts + 1):
+        scene_list = []
+        for _ in range(scenes):
+            scene_no += 1
+            scene_list.append({
+                'scene_number': scene_no,
+                'action': _sentence(rng, 15, 45),
+                'location': _sentence(rng, 3, 8),
+                'time': rng.choice(['Sáng sớm', 'Trưa', 'Chiều tà', 'Đêm']),
+                'visual_style': _sentence(rng, 5, 12),
+                'audio_style': _sentence(rng, 5, 12),
+                'dialogues': [{'character': rng.choice(cast), 'line': _sentence(rng)} for _ in range(dialogues)],
+            })
+        act_list.append({'act_number': a, 'scenes': scene_list})
+    return {
+        'meta': {'title': f'{_sentence(rng, 3, 8)[:-1]} #{index}', 'alias': f'{alias_prefix}-{index}'},
+        'genre': rng.sample(['Thiền', 'Tâm lý', 'Gia đình', 'Hành trình', 'Cổ tích'], k=2),
+        'logline': _sentence(rng, 20, 40),
+        'tone': _sentence(rng, 3, 6),
+        'notes': _sentence(rng, 30, 60),
+        'setting': {'location': _sentence(rng, 5, 10), 'time': _sentence(rng, 3, 6)},
+        'themes': [_sentence(rng, 3, 6) for _ in range(rng.randint(2, 4))],
+        'characters': [{'name': n, 'role': _sentence(rng, 2, 5), 'description': _sentence(rng, 15, 30)} for n in cast],
+        'acts': act_list,
+    }
+
+
+def script_row(payload: Dict[str, Any], legacy: Optional[str] = None) -> Dict[str, Any]:
+    """``scripts`` table row for a payload, optionally in a malformed legacy shape."""
+    meta = payload['meta']
+    row = {
+        'title': meta['title'],
+        'alias': meta['alias'],
+        'logline': payload['logline'],
+        'tone': payload['tone'],
+        'notes': payload['notes'],
+        'genre': json.dumps(payload['genre'], ensure_ascii=False),
+        'themes': json.dumps(payload['themes'], ensure_ascii=False),
+        'setting': json.dumps(payload['setting'], ensure_ascii=False),
+        'characters': json.dumps(payload['characters'], ensure_ascii=False),
+        'acts': json.dumps(payload['acts'], ensure_ascii=False),
+    }
+    if legacy == 'python_repr':
+        row['acts'] = repr(payload['acts'])
+        row['characters'] = repr(payload['characters'])
+    elif legacy == 'control_chars':
+        # raw newlines/tabs inside JSON strings, as older imports stored them
+        row['acts'] = _LINE_SPACE_RE.sub(lambda m: m.group(1) + '\n\t', row['acts'], count=3)
+    elif legacy == 'genre_csv':
+        row['genre'] = ', '.join(payload['genre'])
+    elif legacy == 'no_title':
+        row['title'] = None
+    elif legacy == 'empty_acts':
+        row['acts'] = ''
+    return row
+
+
+def iter_rows(
+    count: int,
+    seed: int = 1,
+    acts: int = 3,
+    scenes: int = 4,
+    dialogues: int = 5,
+    legacy_ratio: float = 0.05,
+    alias_prefix: str = 'bench',
+) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(count):
+        legacy = rng.choice(LEGACY_KINDS) if rng.random() < legacy_ratio else None
+        yield script_row(script_payload(rng, i, acts, scenes, dialogues, alias_prefix), legacy)
+
+
+def load_scripts(db, rows: Iterator[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, Any]:
+    """Bulk insert ``rows`` into ``scripts``; returns ``{rows, seconds, rows_per_second}``."""
+    from sqlalchemy import insert
+
+    from app.models.script import Script
+
+    started = time.perf_counter()
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(Script), batch)
+            db.session.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Script), batch)
+        db.session.commit()
+        total += len(batch)
+    seconds = time.perf_counter() - started
+    return {'rows': total, 'seconds': round(seconds, 3), 'rows_per_second': round(total / seconds, 1) if seconds else None}
+
+
+def load_settings_and_prompts(db, settings: int = 50, prompts: int = 200, seed: int = 1) -> None:
+    from sqlalchemy import insert
+
+    from app.models.prompt import Prompt
+    from app.models.setting import Setting
+
+    rng = random.Random(seed)
+    db.session.execute(insert(Setting), [{'key': f'BENCH_SETTING_{i}', 'value': _sentence(rng, 1, 6)} for i in range(settings)])
+    db.session.execute(insert(Prompt), [{'name': f'bench-prompt-{i}', 'content': _sentence(rng, 80, 300)} for i in range(prompts)])
+    db.session.commit()
+
+
+__all__ = ['LEGACY_KINDS', 'iter_rows', 'load_scripts', 'load_settings_and_prompts', 'script_payload', 'script_row']
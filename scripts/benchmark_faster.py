@@ -1,39 +1,335 @@
 #!/usr/bin/env python3
 """
-Simple benchmark harness to compare faster-whisper vs whisper in this repo.
-Usage: python scripts/benchmark_faster.py --audio /path/to/audio.mp3 --mode small --runs 1
+Benchmark harness for transcription engines and the pure-Python pipeline stages.
+
+Transcription matrix: every combination of --models x --engines x
+--compute-types x --batch-sizes x --threads runs in a fresh child process
+(so peak RSS is per configuration) and records wall time, model load time,
+real-time factor and word error rate against --reference.
+
+Engines:
+  - whisperx        batched faster-whisper via whisperx (uses batch size)
+  - faster-whisper  plain faster_whisper.WhisperModel (batch size ignored)
+  - whisper         openai-whisper (compute type int8 is not supported)
+  - worker          warm in-process TranscriptionWorker; --runs reuse the model
+
+Pure-Python stages (write_srt_from_json, find_scene_times,
+align_episode_scenes) are benchmarked on synthetic transcripts with
+--synthetic-words words.
+
+Usage:
+  python scripts/benchmark_faster.py --audio a.mp3 --reference a.txt \\
+      --models small,medium --engines whisperx,faster-whisper --compute-types int8 \\
+      --batch-sizes 8,16 --threads 4 --out bench/results.json --csv bench/results.csv \\
+      --baseline bench/baseline.json
+  python scripts/benchmark_faster.py --stages-only --synthetic-words 200000
 """
 import argparse
-import time
+import itertools
+import json
+import random
 import subprocess
-from pathlib import Path
 import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmark_common import (
+    compare_to_baseline,
+    load_baseline,
+    peak_rss_mb,
+    print_regressions,
+    word_error_rate,
+    write_results,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+COMPARED_METRICS = ('wall_seconds', 'rtf', 'peak_rss_mb', 'wer')
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def _audio_seconds(audio: str) -> float | None:
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from app.services.media_probe import probe_duration
+
+    return probe_duration(Path(audio))
+
+
+# --- child process: one transcription configuration ---------------------------
+
+def _run_child(cfg: dict) -> dict:
+    """Transcribe cfg['audio'] cfg['runs'] times and return metrics (child process)."""
+    engine = cfg['engine']
+    audio = cfg['audio']
+    t_load = time.perf_counter()
+    texts: list[str] = []
+    run_times: list[float] = []
+
+    if engine == 'faster-whisper':
+        from faster_whisper import WhisperModel
+
+        model = WhisperModel(cfg['model'], device=cfg['device'], compute_type=cfg['compute_type'], cpu_threads=cfg['threads'])
+        load_seconds = time.perf_counter() - t_load
+        for _ in range(cfg['runs']):
+            t0 = time.perf_counter()
+            segments, _info = model.transcribe(audio)
+            texts.append(' '.join(s.text for s in segments))
+            run_times.append(time.perf_counter() - t0)
+
+    elif engine == 'whisper':
+        import torch
+        import whisper
+
+        torch.set_num_threads(cfg['threads'])
+        model = whisper.load_model(cfg['model'], device=cfg['device'])
+        load_seconds = time.perf_counter() - t_load
+        for _ in range(cfg['runs']):
+            t0 = time.perf_counter()
+            res = model.transcribe(audio, fp16=cfg['compute_type'] == 'float16')
+            texts.append(res.get('text', ''))
+            run_times.append(time.perf_counter() - t0)
+
+    elif engine == 'whisperx':
+        import whisperx
+
+        model = whisperx.load_model(cfg['model'], cfg['device'], compute_type=cfg['compute_type'], threads=cfg['threads'])
+        load_seconds = time.perf_counter() - t_load
+        for _ in range(cfg['runs']):
+            t0 = time.perf_counter()
+            res = model.transcribe(whisperx.load_audio(audio), batch_size=cfg['batch_size'])
+            texts.append(' '.join(s.get('text', '') for s in res.get('segments', [])))
+            run_times.append(time.perf_counter() - t0)
+
+    elif engine == 'worker':
+        sys.path.insert(0, str(PROJECT_ROOT))
+        from app.services.transcription_worker import TranscriptionWorker
+
+        worker = TranscriptionWorker(
+            cfg['model'], device=cfg['device'], compute_type=cfg['compute_type'],
+            batch_size=cfg['batch_size'], threads=cfg['threads'],
+        ).start()
+        load_seconds = 0.0
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(cfg['runs']):
+                out = Path(tmp) / f'run{i}.json'
+                t0 = time.perf_counter()
+                res = worker.transcribe(Path(audio), out)
+                run_times.append(time.perf_counter() - t0)
+                if not res.get('ok'):
+                    raise RuntimeError(res.get('error'))
+                data = json.loads(out.read_text(encoding='utf-8'))
+                texts.append(' '.join(s.get('text', '') for s in data.get('segments', [])))
+        load_seconds = worker.model_load_seconds or 0.0
+        # model load happens inside the first run for the worker
+        run_times[0] -= load_seconds
+        worker.stop()
+    else:
+        raise ValueError(f'unknown engine {engine}')
+
+    return {
+        'load_seconds': load_seconds,
+        'run_seconds': run_times,
+        'text': texts[-1] if texts else '',
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _config_name(cfg: dict) -> str:
+    return f"transcribe:{cfg['engine']}:{cfg['model']}:{cfg['compute_type']}:b{cfg['batch_size']}:t{cfg['threads']}"
+
+
+def _build_matrix(args) -> list[dict]:
+    seen = set()
+    matrix = []
+    for engine, model, ct, bs, th in itertools.product(
+        _csv(args.engines), _csv(args.models), _csv(args.compute_types),
+        [int(x) for x in _csv(args.batch_sizes)], [int(x) for x in _csv(args.threads)],
+    ):
+        if engine == 'whisper' and ct == 'int8':
+            continue
+        if engine in ('faster-whisper', 'whisper'):
+            bs = 1  # batch size does not apply; collapse duplicates
+        cfg = {
+            'engine': engine, 'model': model, 'compute_type': ct, 'batch_size': bs,
+            'threads': th, 'device': args.device, 'audio': args.audio, 'runs': args.runs,
+        }
+        key = _config_name(cfg)
+        if key not in seen:
+            seen.add(key)
+            matrix.append(cfg)
+    return matrix
+
+
+def run_transcription_matrix(args) -> list[dict]:
+    reference = Path(args.reference).read_text(encoding='utf-8') if args.reference else None
+    audio_seconds = _audio_seconds(args.audio)
+    results = []
+    for cfg in _build_matrix(args):
+        name = _config_name(cfg)
+        print(f'\n== {name}')
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, __file__, '--_child', json.dumps(cfg)],
+            capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - t0
+        row = {k: cfg[k] for k in ('engine', 'model', 'compute_type', 'batch_size', 'threads')}
+        row.update({'name': name, 'kind': 'transcribe', 'wall_seconds': round(wall, 3)})
+        if proc.returncode != 0:
+            row['error'] = (proc.stderr or '').strip().splitlines()[-1:] or ['child failed']
+            print(f'  failed: {row["error"]}', file=sys.stderr)
+            results.append(row)
+            continue
+        child = json.loads(proc.stdout.strip().splitlines()[-1])
+        best_run = min(child['run_seconds'])
+        row.update({
+            'load_seconds': round(child['load_seconds'], 3),
+            'transcribe_seconds': round(best_run, 3),
+            'audio_seconds': audio_seconds,
+            'rtf': round(best_run / audio_seconds, 4) if audio_seconds else None,
+            'peak_rss_mb': round(child['peak_rss_mb'], 1) if child.get('peak_rss_mb') else None,
+            'wer': round(word_error_rate(reference, child['text']), 4) if reference else None,
+        })
+        print(f"  wall={row['wall_seconds']}s load={row['load_seconds']}s rtf={row['rtf']} rss={row['peak_rss_mb']}MB wer={row['wer']}")
+        results.append(row)
+    return results
+
+
+# --- pure-Python stages -------------------------------------------------------
+
+_VOCAB = ['the', 'a', 'story', 'night', 'river', 'said', 'quietly', 'light', 'house', 'again',
+          'old', 'man', 'walked', 'toward', 'door', 'and', 'smiled', 'before', 'rain', 'fell']
+
+
+def synthetic_transcript(n_words: int, words_per_segment: int = 12, seed: int = 7) -> dict:
+    """WhisperX-shaped transcript with realistic word timings and pauses."""
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    for s in range(0, n_words, words_per_segment):
+        words = []
+        for _ in range(min(words_per_segment, n_words - s)):
+            dur = rng.uniform(0.15, 0.6)
+            words.append({'word': rng.choice(_VOCAB), 'start': round(t, 3), 'end': round(t + dur, 3), 'score': round(rng.random(), 3)})
+            t += dur + (rng.uniform(0.6, 1.2) if rng.random() < 0.05 else rng.uniform(0.0, 0.1))
+        segments.append({
+            'start': words[0]['start'], 'end': words[-1]['end'],
+            'text': ' '.join(w['word'] for w in words), 'words': words,
+        })
+        t += 0.3
+    return {'language': 'en', 'segments': segments}
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_stage_benchmarks(args) -> list[dict]:
+    import audio_align_scenes as aas
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        data = synthetic_transcript(args.synthetic_words)
+        json_path = tmp / 'audio.whisperx.json'
+        json_path.write_text(json.dumps(data), encoding='utf-8')
+        secs = _timed(lambda: aas.write_srt_from_json(json_path), args.repeat)
+        results.append({'name': f'stage:write_srt_from_json:{args.synthetic_words}w', 'kind': 'stage',
+                        'wall_seconds': round(secs, 4), 'peak_rss_mb': peak_rss_mb()})
+
+        # The SRT run above left a fresh .npz sidecar next to the JSON
+        from app.services.transcript_store import Transcript, iter_segments, load_transcript
+        secs = _timed(lambda: Transcript.from_segments(iter_segments(json_path)), args.repeat)
+        results.append({'name': f'stage:parse_transcript_json:{args.synthetic_words}w', 'kind': 'stage',
+                        'wall_seconds': round(secs, 4), 'peak_rss_mb': peak_rss_mb()})
+        secs = _timed(lambda: load_transcript(json_path).words(), args.repeat)
+        results.append({'name': f'stage:load_transcript_sidecar:{args.synthetic_words}w', 'kind': 'stage',
+                        'wall_seconds': round(secs, 4), 'peak_rss_mb': peak_rss_mb()})
+
+        # Scene alignment is cubic in the number of segments; keep it bounded
+        small = synthetic_transcript(args.align_segments * 12)
+        segments = small['segments']
+        scenes = []
+        per_scene = max(1, len(segments) // args.align_scenes)
+        for i in range(0, len(segments), per_scene):
+            scenes.append({'narration': ' '.join(s['text'] for s in segments[i:i + per_scene])})
+        secs = _timed(lambda: [aas.find_scene_times(sc['narration'], segments) for sc in scenes], args.repeat)
+        results.append({'name': f'stage:find_scene_times:{len(segments)}seg:{len(scenes)}sc', 'kind': 'stage',
+                        'wall_seconds': round(secs, 4), 'peak_rss_mb': peak_rss_mb()})
+
+        ep = tmp / 'episode'
+        ep.mkdir()
+        (ep / 'audio.mp3').write_bytes(b'')
+        (ep / 'audio.whisperx.json').write_text(json.dumps(small), encoding='utf-8')
+        capcut = json.dumps({'scenes': scenes})
+
+        def _align():
+            (ep / 'capcut-api.json').write_text(capcut, encoding='utf-8')
+            aas.align_episode_scenes(ep)
+
+        secs = _timed(_align, args.repeat)
+        results.append({'name': f'stage:align_episode_scenes:{len(segments)}seg:{len(scenes)}sc', 'kind': 'stage',
+                        'wall_seconds': round(secs, 4), 'peak_rss_mb': peak_rss_mb()})
+
+    for r in results:
+        print(f"{r['name']}: {r['wall_seconds']}s")
+    return results
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='Transcription/alignment benchmark suite.')
+    p.add_argument('--audio', help='Audio file for the transcription matrix')
+    p.add_argument('--reference', help='Reference transcript (plain text) for word error rate')
+    p.add_argument('--runs', type=int, default=1, help='Transcriptions per configuration (best is reported)')
+    p.add_argument('--models', default='small')
+    p.add_argument('--engines', default='whisperx', help='Comma list of whisperx,faster-whisper,whisper,worker')
+    p.add_argument('--compute-types', default='int8')
+    p.add_argument('--batch-sizes', default='8')
+    p.add_argument('--threads', default='4')
+    p.add_argument('--device', default='cpu', help='cuda or cpu')
+    p.add_argument('--stages-only', action='store_true', help='Skip the transcription matrix')
+    p.add_argument('--no-stages', action='store_true', help='Skip pure-Python stage benchmarks')
+    p.add_argument('--synthetic-words', type=int, default=100_000)
+    p.add_argument('--align-segments', type=int, default=60)
+    p.add_argument('--align-scenes', type=int, default=10)
+    p.add_argument('--repeat', type=int, default=3, help='Repeats per pure-Python stage (best is reported)')
+    p.add_argument('--out', type=Path, help='Write JSON results here')
+    p.add_argument('--csv', type=Path, help='Write CSV results here')
+    p.add_argument('--baseline', type=Path, help='Compare against this results JSON')
+    p.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative slowdown before flagging')
+    p.add_argument('--_child', help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args._child:
+        print(json.dumps(_run_child(json.loads(args._child))))
+        return 0
+
+    results = []
+    if not args.stages_only:
+        if not args.audio:
+            p.error('--audio is required unless --stages-only is given')
+        results.extend(run_transcription_matrix(args))
+    if not args.no_stages:
+        results.extend(run_stage_benchmarks(args))
+
+    write_results(results, args.out, args.csv)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_baseline(args.baseline), COMPARED_METRICS, args.tolerance)
+        print_regressions(regressions)
+        if regressions:
+            return 1
+    return 0
+
 
-p = argparse.ArgumentParser()
-p.add_argument('--audio', required=True)
-p.add_argument('--runs', type=int, default=1)
-p.add_argument('--model', default='small')
-p.add_argument('--use-faster', action='store_true')
-p.add_argument('--faster-compute-type', default='float16')
-args = p.parse_args()
-
-audio = args.audio
-runs = args.runs
-model = args.model
-use_faster = args.use_faster
-fct = args.faster_compute_type
-
-print('Benchmark settings:', args)
-
-for i in range(runs):
-    out = Path(audio).with_suffix(f'.bench.{model}.run{i}.json')
-    cmd = [sys.executable, 'scripts/run_whisperx_local.py', '--audio', audio, '--output', str(out), '--whisper-model', model]
-    if use_faster:
-        cmd += ['--use-faster', '--faster-compute-type', fct]
-    print('\nRun', i+1, 'cmd:', ' '.join(cmd))
-    t0 = time.time()
-    proc = subprocess.run(cmd)
-    t1 = time.time()
-    print('Exit', proc.returncode, 'Elapsed', t1-t0)
-
-print('Done')
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Load test: the Flask dev server against `flask serve` (waitress).
+
+Seeds a SQLite database with --rows synthetic scripts (see benchmark_data),
+starts each server profile as a subprocess on a free port, then drives it
+with --concurrency keep-alive clients for --duration seconds per level,
+cycling through a mix of:
+
+  GET /api/v1/scripts?page=N&pageSize=25
+  GET /api/v1/settings
+  GET /apispec_1.json
+
+Profiles (--profiles):
+
+  dev        `flask run` (werkzeug, a thread per request, no debugger/reloader)
+  waitress   `flask serve --threads T`
+  prefork    `flask serve --threads T --processes P` (POSIX only)
+
+Job workers are off in every profile so only request handling is measured.
+Each result reports p50/p95/p99 latency, throughput and errors; servers are
+stopped with SIGTERM, as in production.
+
+Usage:
+  python scripts/benchmark_server.py --duration 10 --concurrency 1,8,32 --out bench/server.json
+  python scripts/benchmark_server.py --profiles waitress,prefork --threads 16 --processes 4 --baseline bench/server-baseline.json
+"""
+import argparse
+import itertools
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from benchmark_common import compare_to_baseline, latency_summary, load_baseline, print_regressions, write_results
+from benchmark_data import iter_rows, load_scripts, load_settings_and_prompts
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _env(db_url):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get('PYTHONPATH')]))
+    env.update(FLASK_CONFIG='testing', TEST_DATABASE_URL=db_url, TASKS_AUTOSTART='0', METRICS_ENABLED='0')
+    return env
+
+
+def command(profile, port, args):
+    flask = [sys.executable, '-m', 'flask', '--app', 'run']
+    if profile == 'dev':
+        return flask + ['run', '--port', str(port), '--no-reload', '--no-debugger', '--with-threads']
+    serve = flask + ['serve', '--port', str(port), '--threads', str(args.threads), '--no-workers']
+    if profile == 'prefork':
+        serve += ['--processes', str(args.processes)]
+    return serve
+
+
+def seed(db_path, args):
+    """Create the benchmark SQLite DB once (reused while --rows matches)."""
+    url = f'sqlite:///{db_path.resolve()}'
+    if db_path.exists():
+        return url
+    os.environ.update(_env(url))
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        loaded = load_scripts(db, iter_rows(args.rows, seed=args.seed))
+        load_settings_and_prompts(db, seed=args.seed)
+    print(f"Loaded {loaded['rows']} scripts in {loaded['seconds']}s")
+    return url
+
+
+def start(profile, args, db_url, log_dir):
+    port = _free_port()
+    log_file = open(log_dir / f'server-{profile}.log', 'w', encoding='utf-8')
+    proc = subprocess.Popen(command(profile, port, args), cwd=PROJECT_ROOT, env=_env(db_url),
+                            stdout=log_file, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    import requests
+
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'{profile} exited with {proc.returncode}; see {log_file.name}')
+        try:
+            requests.get(base_url + '/api/v1/settings', timeout=1)
+            return proc, base_url, log_file
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop(proc, log_file)
+    raise RuntimeError(f'{profile} did not answer within {args.startup_timeout}s; see {log_file.name}')
+
+
+def stop(proc, log_file, timeout=30):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    log_file.close()
+
+
+def drive(base_url, concurrency, duration, pages, seed):
+    """Run ``concurrency`` clients for ``duration`` seconds; returns (samples, errors, wall)."""
+    import requests
+
+    samples, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(n):
+        rng = random.Random(seed + n)
+        session = requests.Session()
+        paths = itertools.cycle(['scripts', '/api/v1/settings', '/apispec_1.json'])
+        mine, failed = [], 0
+        while time.perf_counter() < stop_at:
+            path = next(paths)
+            if path == 'scripts':
+                path = f'/api/v1/scripts?page={rng.randint(1, pages)}&pageSize=25'
+            started = time.perf_counter()
+            try:
+                res = session.get(base_url + path, timeout=30)
+                ok = res.status_code < 400
+                res.content
+            except requests.RequestException:
+                ok = False
+            mine.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            samples.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, sum(errors), time.perf_counter() - started
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='Dev server vs waitress load test.')
+    p.add_argument('--profiles', default='dev,waitress,prefork', help='Comma list of dev, waitress, prefork')
+    p.add_argument('--threads', type=int, default=8, help='waitress threads per process')
+    p.add_argument('--processes', type=int, default=2, help='Processes for the prefork profile')
+    p.add_argument('--concurrency', default='1,8,32', help='Comma list of concurrent client counts')
+    p.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level')
+    p.add_argument('--warmup', type=float, default=1.0, help='Seconds of unmeasured load before each profile')
+    p.add_argument('--rows', type=int, default=2000, help='Synthetic scripts in the benchmark DB')
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--data-dir', type=Path, default=PROJECT_ROOT / 'bench', help='Benchmark DB and server logs')
+    p.add_argument('--startup-timeout', type=float, default=60.0)
+    p.add_argument('--out', type=Path, help='Write JSON results here')
+    p.add_argument('--csv', type=Path, help='Write CSV results here')
+    p.add_argument('--baseline', type=Path, help='Compare against this results JSON')
+    p.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative slowdown before flagging')
+    args = p.parse_args(argv)
+
+    profiles = [s.strip() for s in args.profiles.split(',') if s.strip()]
+    unknown = [s for s in profiles if s not in ('dev', 'waitress', 'prefork')]
+    if unknown:
+        p.error(f'unknown profiles: {unknown}')
+    if 'prefork' in profiles and not hasattr(os, 'fork'):
+        print('Skipping prefork: needs os.fork')
+        profiles.remove('prefork')
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    db_url = seed(args.data_dir / f'server-{args.rows}.db', args)
+    pages = max(1, args.rows // 25)
+
+    results = []
+    for profile in profiles:
+        proc, base_url, log_file = start(profile, args, db_url, args.data_dir)
+        try:
+            if args.warmup > 0:
+                drive(base_url, max(levels), args.warmup, pages, args.seed)
+            for level in levels:
+                samples, errors, wall = drive(base_url, level, args.duration, pages, args.seed)
+                r = {'name': f'server:{profile}:c{level}', 'profile': profile, 'concurrency': level}
+                if profile != 'dev':
+                    r['threads'] = args.threads
+                    r['processes'] = args.processes if profile == 'prefork' else 1
+                r.update(latency_summary(samples, wall))
+                r['errors'] = errors
+                results.append(r)
+                print(f"{profile:9s} c{level:<4d} p50 {r['p50_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms  "
+                      f"p99 {r['p99_ms']:9.2f} ms  {r['throughput_rps']:8.1f} req/s  errors {errors}")
+        finally:
+            stop(proc, log_file)
+
+    write_results(results, args.out, args.csv)
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_baseline(args.baseline), COMPARED_METRICS, args.tolerance)
+        print_regressions(regressions)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark application startup, per phase and per imported component.
+
+Every run is a fresh interpreter, so imports are cold each time. Modes:
+
+  precompiled  current defaults: the spec is served from app/api/openapi.json
+  lazy         no precompiled spec: extras and spec built on the first request
+  eager        SWAGGER_LAZY=0, no precompiled spec: extras applied in create_app
+  cli          `python -m flask --app run routes` (a one-off CLI command, which
+               no longer pings Redis or starts workers); cli_tasks forces them
+               back on with TASKS_AUTOSTART=1 for comparison
+
+For the first three modes the child reports the ``from app import
+create_app`` time, ``create_app`` time, its per-phase timings
+(``app.extensions['startup']``) and the cost (and source) of the first
+/apispec_1.json request. A separate
+``-X importtime`` run attributes import time to components: third-party
+packages by top-level name, app modules by module.
+
+Usage:
+  python scripts/benchmark_startup.py --runs 10 --out bench/startup.json --baseline bench/startup-baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmark_common import compare_to_baseline, load_baseline, print_regressions, write_results
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+COMPARED_METRICS = ('process_ms', 'import_ms', 'create_app_ms', 'first_spec_ms')
+MARKER = 'STARTUP '
+
+CHILD = r'''
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app('testing')
+t2 = time.perf_counter()
+res = app.test_client().get('/apispec_1.json')
+t3 = time.perf_counter()
+print(%r + json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_spec_ms': (t3 - t2) * 1000,
+    'spec_status': res.status_code,
+    'spec_source': res.headers.get('X-Spec-Source'),
+    'phases': app.extensions['startup'].report()['phases'],
+}))
+''' % MARKER
+
+MODES = {
+    'precompiled': ({'SWAGGER_LAZY': '1'}, ['-c', CHILD]),
+    'lazy': ({'SWAGGER_LAZY': '1', 'OPENAPI_SPEC_PATH': ''}, ['-c', CHILD]),
+    'eager': ({'SWAGGER_LAZY': '0', 'OPENAPI_SPEC_PATH': ''}, ['-c', CHILD]),
+    'cli': ({'TASKS_AUTOSTART': 'auto'}, ['-m', 'flask', '--app', 'run', 'routes']),
+    'cli_tasks': ({'TASKS_AUTOSTART': '1'}, ['-m', 'flask', '--app', 'run', 'routes']),
+}
+
+
+def _env(extra):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get('PYTHONPATH')]))
+    env.setdefault('FLASK_CONFIG', 'testing')
+    env.update(extra)
+    return env
+
+
+def run_once(mode, importtime=False):
+    extra, args = MODES[mode]
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + args
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=_env(extra), capture_output=True, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f'{mode} failed ({proc.returncode}):\n{proc.stderr[-2000:]}')
+    report = {}
+    for line in proc.stdout.splitlines():
+        if line.startswith(MARKER):
+            report = json.loads(line[len(MARKER):])
+    report['process_ms'] = wall
+    return report, proc.stderr
+
+
+def component(module):
+    parts = module.split('.')
+    if parts[0] == 'app':
+        return '.'.join(parts[:4] if parts[1:2] == ['api'] else parts[:3])
+    return parts[0]
+
+
+def import_components(stderr, top):
+    """Self import time (ms) per component from ``-X importtime`` output."""
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            self_us = int(fields[0])
+        except ValueError:  # the header line
+            continue
+        totals[component(fields[2].strip())] += self_us / 1000
+    return [{'component': c, 'self_ms': round(ms, 2)} for c, ms in totals.most_common(top)]
+
+
+def summarize(mode, reports):
+    out = {'name': f'startup:{mode}', 'runs': len(reports)}
+    for key in ('process_ms', 'import_ms', 'create_app_ms', 'first_spec_ms'):
+        values = [r[key] for r in reports if key in r]
+        if values:
+            out[key] = round(statistics.median(values), 2)
+            out[key.replace('_ms', '_max_ms')] = round(max(values), 2)
+    sources = {r['spec_source'] for r in reports if r.get('spec_source')}
+    if sources:
+        out['spec_source'] = ','.join(sorted(sources))
+    phases = {}
+    for r in reports:
+        for name, ms in r.get('phases', {}).items():
+            phases.setdefault(name, []).append(ms)
+    if phases:
+        out['phases_ms'] = {name: round(statistics.median(v), 2) for name, v in phases.items()}
+    return out
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='Startup time benchmark (fresh interpreter per run).')
+    p.add_argument('--runs', type=int, default=5, help='Runs per mode (median reported)')
+    p.add_argument('--modes', default='precompiled,lazy,eager,cli,cli_tasks', help=f'Comma list of {", ".join(MODES)}')
+    p.add_argument('--top', type=int, default=15, help='Components listed in the import breakdown')
+    p.add_argument('--out', type=Path, help='Write JSON results here')
+    p.add_argument('--csv', type=Path, help='Write CSV results here')
+    p.add_argument('--baseline', type=Path, help='Compare against this results JSON')
+    p.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative slowdown before flagging')
+    args = p.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        p.error(f'unknown modes: {unknown}')
+
+    results = []
+    for mode in modes:
+        reports = [run_once(mode)[0] for _ in range(args.runs)]
+        r = summarize(mode, reports)
+        if mode in ('precompiled', 'lazy', 'eager'):
+            _, stderr = run_once(mode, importtime=True)
+            r['imports'] = import_components(stderr, args.top)
+        results.append(r)
+        line = f"{mode:10s} process {r['process_ms']:8.1f} ms"
+        if 'create_app_ms' in r:
+            line += f"  import {r['import_ms']:7.1f} ms  create_app {r['create_app_ms']:7.1f} ms  first spec {r['first_spec_ms']:7.1f} ms"
+        print(line)
+        for name, ms in r.get('phases_ms', {}).items():
+            print(f'    {name:12s} {ms:8.2f} ms')
+        for c in r.get('imports', []):
+            print(f"    import {c['component']:34s} {c['self_ms']:8.2f} ms")
+
+    write_results(results, args.out, args.csv)
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_baseline(args.baseline), COMPARED_METRICS, args.tolerance)
+        print_regressions(regressions)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark the VBEE payload builder on a synthetic long script.
+
+Compares the previous path (``Script.to_dict()``, the whole ``blocks`` list in
+memory, ``indent=2`` dumped twice for dry runs) with the current ones:
+``build_payload`` + compact ``json.dumps`` and the chunked ``PayloadStream``
+that the client sends. Reports best-of-N wall time and the tracemalloc peak
+per stage.
+
+Usage:
+  python scripts/benchmark_vbee_payload.py --dialogues 10000 --out bench/vbee.json \\
+      --baseline bench/vbee-baseline.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmark_common import compare_to_baseline, load_baseline, print_regressions, write_results
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+COMPARED_METRICS = ('seconds', 'peak_mb')
+WORDS = 'trời mưa con đường về nhà thầy nói rằng tâm an thì cảnh an nước chảy đá mòn'.split()
+
+
+def synthetic_script(dialogues: int, scenes_per_act: int = 20, lines_per_scene: int = 25, seed: int = 7):
+    """Transient Script with ``dialogues`` lines plus sizeable unrelated JSON columns."""
+    from app.models.script import Script
+
+    rng = random.Random(seed)
+    acts, count, act_no = [], 0, 0
+    while count < dialogues:
+        act_no += 1
+        scenes = []
+        for _ in range(scenes_per_act):
+            n = min(lines_per_scene, dialogues - count)
+            if n <= 0:
+                break
+            scenes.append({'dialogues': [
+                {'character': rng.choice(['An', 'Bình', 'Thiền sư']), 'line': ' '.join(rng.choices(WORDS, k=rng.randint(6, 30)))}
+                for _ in range(n)
+            ]})
+            count += n
+        acts.append({'id': f'act-{act_no}', 'scenes': scenes})
+    characters = [{'name': f'Nhân vật {i}', 'description': ' '.join(rng.choices(WORDS, k=80))} for i in range(200)]
+    setting = {'places': [' '.join(rng.choices(WORDS, k=60)) for _ in range(300)]}
+    return Script(
+        id=1,
+        title='Benchmark',
+        alias='benchmark',
+        acts=json.dumps(acts, ensure_ascii=False),
+        characters=json.dumps(characters, ensure_ascii=False),
+        setting=json.dumps(setting, ensure_ascii=False),
+    )
+
+
+def legacy_dry_run(script):
+    from app.services.vbee_adapter import _act_to_block
+
+    data = script.to_dict()
+    payload = {'title': data['title'], 'product': 'default', 'isDeleted': False,
+               'blocks': [_act_to_block(a) for a in data['acts']]}
+    # the old dry run logged and printed the pretty payload separately
+    return sum(len(json.dumps(payload, indent=2, ensure_ascii=False).encode('utf-8')) for _ in range(2))
+
+
+def compact_payload(script):
+    from app.services.vbee_adapter import build_payload, plan_parts, script_source
+
+    source = script_source(script)
+    return sum(len(json.dumps(build_payload(source, p), ensure_ascii=False, separators=(',', ':')).encode('utf-8')) for p in plan_parts(source))
+
+
+def streamed_body(script, chunk_size: int = 64 * 1024):
+    from app.services.vbee_adapter import PayloadStream, plan_parts, script_source
+
+    source = script_source(script)
+    return sum(len(chunk) for p in plan_parts(source) for chunk in PayloadStream(source, p, chunk_size))
+
+
+STAGES = {'legacy_dry_run': legacy_dry_run, 'compact_payload': compact_payload, 'streamed_body': streamed_body}
+
+
+def measure(name, fn, script, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn(script)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn(script)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'name': name, 'seconds': round(best, 4), 'peak_mb': round(peak / (1024 * 1024), 2), 'bytes': size}
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description='VBEE payload builder benchmark.')
+    p.add_argument('--dialogues', type=int, default=10_000)
+    p.add_argument('--repeat', type=int, default=3, help='Repeats per stage (best is reported)')
+    p.add_argument('--stages', default=','.join(STAGES), help='Comma list of ' + ','.join(STAGES))
+    p.add_argument('--out', type=Path, help='Write JSON results here')
+    p.add_argument('--csv', type=Path, help='Write CSV results here')
+    p.add_argument('--baseline', type=Path, help='Compare against this results JSON')
+    p.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative slowdown before flagging')
+    args = p.parse_args(argv)
+
+    script = synthetic_script(args.dialogues)
+    results = []
+    for name in [s.strip() for s in args.stages.split(',') if s.strip()]:
+        if name not in STAGES:
+            p.error(f'unknown stage: {name}')
+        r = measure(name, STAGES[name], script, args.repeat)
+        r['dialogues'] = args.dialogues
+        results.append(r)
+        print(f"{name:16s} {r['seconds']:8.4f}s  peak {r['peak_mb']:8.2f} MiB  {r['bytes']} bytes")
+
+    write_results(results, args.out, args.csv)
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_baseline(args.baseline), COMPARED_METRICS, args.tolerance)
+        print_regressions(regressions)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
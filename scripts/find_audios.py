@@ -1,31 +1,63 @@
-import os, json, sys
+#!/usr/bin/env python3
+"""List audio files under the projects folder, using the project asset index.
+
+The index (<projects>/.asset-index.sqlite) is refreshed incrementally first,
+so only episode folders that changed since the last run are rescanned.
+
+Usage:
+    python scripts/find_audios.py [--projects-dir DIR] [--limit 200] [--full]
+"""
+import argparse
+import os
+import sys
 from pathlib import Path
-repo_root = Path(__file__).resolve().parent.parent
-settings = repo_root / 'settings.json'
-if not settings.exists():
-    print('settings.json not found')
-    sys.exit(1)
-try:
-    cfg = json.loads(settings.read_text(encoding='utf-8'))
-    proj = cfg.get('project_folder')
-    if not proj:
-        print('project_folder not set in settings.json')
-        sys.exit(1)
-    # resolve absolute if necessary
-    p = Path(proj)
-    if not p.is_absolute():
-        p = (repo_root / proj).resolve()
-    print('searching under', str(p))
-    count = 0
-    for dirpath, dirnames, filenames in os.walk(str(p)):
-        for f in filenames:
-            if f.lower().endswith(('.mp3', '.m4a', '.wav')):
-                print(os.path.join(dirpath, f))
-                count += 1
-                if count >= 200:
-                    print('...stopping after 200 matches')
-                    sys.exit(0)
-    print('total found', count)
-except Exception as e:
-    print('error reading settings.json:', e)
-    sys.exit(1)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.asset_index import AssetIndex  # noqa: E402
+
+
+def _projects_root(projects_dir: str | None) -> Path:
+    if projects_dir:
+        return Path(projects_dir).resolve()
+    # Resolve PROJECT_FOLDER from the settings table, like the API does
+    from app import create_app
+    from app.utils import get_projects_root
+
+    app = create_app(os.getenv('FLASK_CONFIG') or 'default')
+    with app.app_context():
+        return get_projects_root(PROJECT_ROOT)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List audio files in all project folders.')
+    parser.add_argument('--projects-dir', default=None, help='Projects root (default: PROJECT_FOLDER setting)')
+    parser.add_argument('--limit', type=int, default=200, help='Stop after this many matches (0 = no limit)')
+    parser.add_argument('--full', action='store_true', help='Rescan every folder instead of only changed ones')
+    args = parser.parse_args(argv)
+
+    root = _projects_root(args.projects_dir)
+    if not root.is_dir():
+        print(f'projects folder not found: {root}')
+        return 1
+    print('searching under', str(root))
+
+    index = AssetIndex(root)
+    stats = index.refresh(full=args.full)
+    print(f"index: {stats['episodes']} folders, {stats['scanned']} rescanned in {stats['seconds']}s")
+
+    limit = args.limit if args.limit > 0 else None
+    hits = index.find_assets(['audio'], limit=(limit + 1) if limit else None)
+    for hit in hits[:limit]:
+        print(hit['path'])
+    if limit and len(hits) > limit:
+        print(f'...stopping after {limit} matches')
+        return 0
+    print('total found', len(hits))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
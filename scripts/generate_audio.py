@@ -1,98 +1,109 @@
+"""Tạo audio.mp3 cho một kịch bản bằng dịch vụ TTS.
+
+Lời thoại được chia thành các đoạn theo scene (tối đa --max-chars ký tự),
+gửi song song (giới hạn --rate yêu cầu/giây), cache theo (văn bản, giọng,
+dịch vụ) rồi ghép bằng ffmpeg. Nếu builder_configs có voice_cast, mỗi nhân
+vật được đọc bằng giọng riêng (mỗi câu thoại một đoạn). audio.timings.json
+ghi thời điểm bắt đầu/kết thúc của từng scene để bước căn chỉnh không phải
+dò theo văn bản.
+
+Usage:
+    python scripts/generate_audio.py data/1.json elevenlabs --voice-id <id> [--force]
+"""
 import argparse
 import json
 import sys
 from pathlib import Path
 
-import requests
-
-from services.ai33 import AI33Service
-from utils import get_project_path
-
-
-def download_file(url: str, destination: Path):
-    """Tải file từ URL và lưu vào đường dẫn đích."""
-    try:
-        print(f"📥 Đang tải file từ: {url}")
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        with open(destination, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print(f"✅ Đã tải file thành công: {destination}")
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Lỗi khi tải file: {e}")
-        raise
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Tạo file audio.mp3 từ content.txt bằng dịch vụ TTS.")
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.tts_engine import (  # noqa: E402
+    DEFAULT_MAX_CHARS,
+    DEFAULT_RATE,
+    DEFAULT_WORKERS,
+    ServiceProvider,
+    TTSEngine,
+    generate_episode_audio,
+    iter_scene_lines,
+)
+from app.services.voice_cast import cast_report, plan_cast_chunks, resolve_cast  # noqa: E402
+from app.utils import get_project_path  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tạo file audio.mp3 từ lời thoại của kịch bản bằng dịch vụ TTS.")
     parser.add_argument("script_file", type=Path, help="Đường dẫn đến file kịch bản JSON (ví dụ: data/1.json).")
     parser.add_argument("service", nargs='?', default="elevenlabs", choices=["minimax", "elevenlabs"], help="Dịch vụ TTS để sử dụng (mặc định: elevenlabs).")
     parser.add_argument("--voice-id", default="3VnrjnYrskPMDsapTr8X", help="ID của giọng nói để sử dụng cho TTS (mặc định: 3VnrjnYrskPMDsapTr8X).")
     parser.add_argument("--force", action="store_true", help="Buộc tạo lại audio ngay cả khi file đã tồn tại.")
-    args = parser.parse_args()
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help="Số ký tự tối đa mỗi đoạn gửi TTS.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Số đoạn xử lý song song.")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Số yêu cầu tối đa mỗi giây tới dịch vụ TTS.")
+    parser.add_argument("--pack-lines", action="store_true", help="Gộp các câu liên tiếp cùng giọng trong một scene thành một đoạn.")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="Thư mục cache audio từng đoạn (mặc định: $TTS_CACHE_DIR hoặc ~/.cache/cc_bcal/tts).")
+    args = parser.parse_args(argv)
 
     # --- 1. Xác định đường dẫn ---
     if not args.script_file.exists():
         print(f"❌ Lỗi: File kịch bản không tồn tại: {args.script_file}", file=sys.stderr)
-        sys.exit(1)
+        return 1
 
     with open(args.script_file, 'r', encoding='utf-8') as f:
         script_data = json.load(f)
 
-    project_path = get_project_path(script_data)
-    content_path = project_path / "content.txt"
+    project_path = get_project_path(script_data, PROJECT_ROOT)
     audio_output_path = project_path / "audio.mp3"
-
-    if not content_path.exists():
-        print(f"❌ Không tìm thấy file 'content.txt' trong: {project_path}", file=sys.stderr)
-        sys.exit(1)
-
     if audio_output_path.exists() and not args.force:
-        print(f"⏩ Bỏ qua, file audio.mp3 đã tồn tại. Sử dụng --force để tạo lại.")
-        sys.exit(0)
-
-    # --- 2. Đọc nội dung và khởi tạo service ---
-    text_content = content_path.read_text(encoding='utf-8')
-    if not text_content.strip():
-        print("❌ File content.txt rỗng, không có gì để tạo audio.", file=sys.stderr)
-        sys.exit(1)
+        print("⏩ Bỏ qua, file audio.mp3 đã tồn tại. Sử dụng --force để tạo lại.")
+        return 0
 
+    # --- 2. Khởi tạo service ---
     try:
+        from services.ai33 import AI33Service
+
         service = AI33Service()
-    except ValueError as e:
+    except (ImportError, ValueError) as e:
         print(f"❌ Lỗi khởi tạo service: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    # --- 3. Gửi yêu cầu TTS và xử lý kết quả ---
+        return 1
+
+    engine = TTSEngine(
+        ServiceProvider(service, kind=args.service),
+        cache_dir=args.cache_dir,
+        max_workers=args.workers,
+        rate=args.rate,
+    )
+
+    # --- 3. Phân vai (nếu có voice_cast) ---
+    chunks = None
+    if (script_data.get("builder_configs") or {}).get("voice_cast"):
+        cast = resolve_cast(script_data["builder_configs"], args.voice_id)
+        speakers = [speaker for _, speaker, _ in iter_scene_lines(script_data)]
+        report = cast_report(cast, script_data.get("characters") or [], speakers)
+        for speaker, voice in report["voices"].items():
+            print(f"🎭 {speaker} -> {voice}")
+        if report["unknown_cast"]:
+            print(f"⚠️ voice_cast có tên không khớp nhân vật nào: {report['unknown_cast']}")
+        chunks = plan_cast_chunks(script_data, cast, engine.provider.name, args.max_chars, pack_lines=args.pack_lines)
+
+    # --- 4. Tổng hợp, ghép và ghi timing ---
     try:
-        task_id = None
-        print(f"🚀 Đang gửi yêu cầu TTS đến dịch vụ '{args.service}'...")
-        if args.service == "minimax":
-            task_id = service.minimax_tts(text=text_content, voice_id=args.voice_id)
-        elif args.service == "elevenlabs":
-            task_id = service.elevenlabs_tts(text=text_content, voice_id=args.voice_id)
-
-        if not task_id:
-            raise Exception("Không nhận được task_id từ API.")
-
-        print(f"✅ Yêu cầu đã được gửi với Task ID: {task_id}")
-
-        print("\n⏳ Bắt đầu thăm dò kết quả...")
-        result = service.poll_for_result(task_id)
-
-        audio_url = result.get("metadata", {}).get("audio_url")
-        if audio_url:
-            download_file(audio_url, audio_output_path)
-            print("\n🎉 Hoàn thành tạo file audio.mp3!")
-        else:
-            print("❌ Không tìm thấy 'audio_url' trong kết quả trả về.", file=sys.stderr)
-            sys.exit(1)
-
+        print(f"🚀 Đang tạo audio bằng dịch vụ '{args.service}'...")
+        result = generate_episode_audio(project_path, script_data, engine, args.voice_id, max_chars=args.max_chars, chunks=chunks)
     except Exception as e:
         print(f"\n💥 Đã xảy ra lỗi trong quá trình tạo audio: {e}", file=sys.stderr)
-        sys.exit(1)
+        return 1
+
+    if not result.get("ok"):
+        print(f"❌ {result.get('error')}", file=sys.stderr)
+        return 1
+    print(
+        f"\n🎉 Hoàn thành {audio_output_path}: {result['chunks']} đoạn "
+        f"({result['cached']} từ cache, {result['synthesized']} mới) trong {result['seconds']}s"
+    )
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
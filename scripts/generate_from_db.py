@@ -2,117 +2,66 @@
 """
 Generate project folders from scripts stored in the database.
 
-This script should be run from the repository root. It imports the Flask app
-defined in `main.py` to obtain the DB bindings and model definitions.
+This script should be run from the repository root. It builds the Flask app
+with `create_app` to obtain the DB bindings and model definitions.
 
 Behavior:
- - Find all Script rows with status == 'new'
- - For each, create episode folder, content.txt and capcut-api.json (using builder_configs if present)
- - If creation succeeds for a script, set its status to 'prepared' and commit immediately
- - If creation fails for a script, leave its status as-is and continue
+ - Find all Script rows with is_has_folder == False (every row with --force)
+ - For each, create the episode folder with content.txt, content.json and
+   capcut-api.json (including builder_configs if present)
+ - Files are written atomically and skipped when their content is unchanged;
+   an existing capcut-api.json is kept unless --force (alignment writes into it)
+ - Successful scripts get is_has_folder = True in one bulk update per batch
+ - A script that fails keeps its flag and the run continues
 
 Usage:
-    python scripts/generate_from_db.py [--force] [--limit N]
+    python scripts/generate_from_db.py [--force] [--limit N] [--workers N] [--batch-size N]
 
 """
 import argparse
-import json
+import os
 import sys
 from pathlib import Path
 
-# Import app and DB models from main so we can reuse the same DB config
-sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
-from main import app  # noqa: E402
-from database import db  # noqa: E402
-from models import Script  # noqa: E402
-from utils import get_project_path  # noqa: E402
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-
-def process_script_item(repo_root: Path, script: Script, force: bool = False) -> bool:
-    """Create folder/files for one Script. Return True on success."""
-    try:
-        data = script.script_data
-        # In the DB-backed model, script_data already shapes meta, scenes etc.
-        episode_path = get_project_path(data, repo_root)
-        episode_path.mkdir(parents=True, exist_ok=True)
-
-        # content.txt
-        content_txt_path = episode_path / "content.txt"
-        script_texts = [scene.get('narration', '') for scene in data.get('scenes', []) if scene.get('narration')]
-        txt_content = "\n\n".join(script_texts)
-        def _display(p: Path) -> str:
-            try:
-                return str(p.relative_to(repo_root))
-            except Exception:
-                return str(p)
-
-        if content_txt_path.exists() and not force:
-            print(f"⏩ Bỏ qua content.txt (tồn tại): {_display(content_txt_path)}")
-        else:
-            content_txt_path.write_text(txt_content, encoding='utf-8')
-            print(f"✍️  Đã ghi: {_display(content_txt_path)}")
-
-        # capcut-api.json
-        script_json_path = episode_path / "capcut-api.json"
-        builder_configs = data.get('builder_configs')
-        payload = data.copy()
-        if builder_configs:
-            payload['builder_configs'] = builder_configs
-
-        if script_json_path.exists() and not force:
-            print(f"⏩ Bỏ qua capcut-api.json (tồn tại): {_display(script_json_path)}")
-        else:
-            with open(script_json_path, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, indent=2, ensure_ascii=False)
-            print(f"📝 Đã ghi: {_display(script_json_path)}")
-
-        return True
-    except Exception as e:
-        print(f"❌ Lỗi khi xử lý script id={script.id} alias={script.alias}: {e}")
-        return False
+from app import create_app  # noqa: E402
+from app.services.materializer import DEFAULT_BATCH_SIZE, materialize_pending  # noqa: E402
 
 
 def main(argv=None):
-    parser = argparse.ArgumentParser(description='Tạo projects từ DB (Script.status == new)')
-    parser.add_argument('--force', action='store_true', help='Ghi đè file nếu đã tồn tại')
+    parser = argparse.ArgumentParser(description='Tạo projects từ DB (Script.is_has_folder == False)')
+    parser.add_argument('--force', action='store_true', help='Ghi lại mọi script, kể cả capcut-api.json đã tồn tại')
     parser.add_argument('--limit', type=int, default=0, help='Giới hạn số script xử lý (0 = không giới hạn)')
+    parser.add_argument('--workers', type=int, default=None, help='Số luồng ghi file song song')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Số script mỗi lô (một lệnh UPDATE mỗi lô)')
     args = parser.parse_args(argv)
 
-    repo_root = Path(__file__).resolve().parents[1]
+    app = create_app(os.getenv('FLASK_CONFIG') or 'default')
 
     # Run inside Flask app context so SQLAlchemy is configured
     with app.app_context():
-
-        query = Script.query.filter_by(status='new').order_by(Script.id)
-        if args.limit and args.limit > 0:
-            query = query.limit(args.limit)
-
-        new_scripts = query.all()
-        if not new_scripts:
-            print('Không tìm thấy script status=new trong database.')
-            return 0
-
-        print(f'Tìm thấy {len(new_scripts)} script mới.')
-
-        processed = 0
-        for s in new_scripts:
-            print(f"Xử lý id={s.id} alias={s.alias} ...")
-            ok = process_script_item(repo_root, s, force=args.force)
-            if ok:
-                try:
-                    s.status = 'prepared'
-                    db.session.add(s)
-                    db.session.commit()
-                    print(f"✅ Đã chuyển trạng thái id={s.id} -> prepared")
-                except Exception as e:
-                    db.session.rollback()
-                    print(f"❌ Không thể cập nhật DB cho id={s.id}: {e}")
-            else:
-                print(f"⚠️  Bỏ qua cập nhật trạng thái cho id={s.id} do lỗi xử lý")
-            processed += 1
-
-        print(f"Hoàn thành. Đã xử lý {processed} script(s).")
-    return 0
+        summary = materialize_pending(
+            root_dir=PROJECT_ROOT,
+            force=args.force,
+            limit=args.limit,
+            batch_size=args.batch_size,
+            max_workers=args.workers,
+        )
+
+    if not summary['selected']:
+        print('Không tìm thấy script nào cần tạo thư mục.')
+        return 0
+
+    for failure in summary['failures']:
+        print(f"❌ Lỗi khi xử lý script id={failure['id']}: {failure['error']}")
+    print(
+        f"Hoàn thành. Đã xử lý {summary['materialized']}/{summary['selected']} script(s); "
+        f"ghi {summary['files_written']} file, bỏ qua {summary['files_unchanged']} file không đổi."
+    )
+    return 1 if summary['failed'] else 0
 
 
 if __name__ == '__main__':
@@ -1,228 +1,87 @@
-"""scripts/2_generate_scenes_image.py
+"""scripts/generate_scenes_image.py
 
-Phiên bản API-friendly của trình tạo ảnh tự động (Gemini). File này
-xuất ra hàm generate_images(...) để có thể gọi từ một API (ví dụ: main.py).
+CLI cho trình tạo ảnh tự động (Gemini). Logic nằm trong
+app.services.image_generator; file này vẫn xuất generate_images(...) để các
+đoạn code cũ gọi trực tiếp.
 
 Tính năng:
-- generate_images(script_path, output_dir=None, headless=False, chrome_exe=None, user_data_dir=None, timeout=240)
+- generate_images(script_path, output_dir=None, headless=False, chrome_exe=None, user_data_dir=None, timeout=240,
+  mode='all', batch_size=1, tabs=3, url=GEMINI_URL)
   trả về dict {'ok': True, 'images': n, 'paths': [...] } hoặc {'ok': False, 'error': '...'}
+- Nhiều file kịch bản được xử lý song song, mỗi kịch bản một phiên Chrome
+  (profile riêng: <user-data-dir>, <user-data-dir>-1, ...).
+- --mode scene: gửi từng lô --batch-size scene, mỗi lô một tab, tối đa --tabs tab cùng lúc.
+- --url scripts/mock/gemini_mock.html để chạy thử không cần tài khoản Gemini.
 
-Giữ CLI entrypoint để chạy trực tiếp từ dòng lệnh.
-Trả lời bằng tiếng Việt trong log để dễ đọc khi chạy thủ công.
+Usage:
+    python scripts/generate_scenes_image.py data/1.json data/2.json --sessions 2 --mode scene --batch-size 2
 """
 
-from pathlib import Path
-import json
-import time
 import argparse
-from typing import Optional, Dict, Any, List
-
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-
-from utils import get_project_path
-
-# --- Selectors ---
-INPUT_BOX_SELECTOR = "div.ql-editor.ql-blank"
-SEND_BUTTON_SELECTOR = "button.send-button"
-GENERATED_IMAGE_SELECTOR = "img.image.loaded"
-
-
-def generate_images(
-    script_path: Path,
-    output_dir: Optional[Path] = None,
-    headless: bool = False,
-    chrome_exe: Optional[str] = None,
-    user_data_dir: Optional[Path] = None,
-    timeout: int = 240,
-) -> Dict[str, Any]:
-    """Generate images for the scenes defined in script_path.
-
-    Parameters:
-    - script_path: Path to the script JSON file (must contain key 'scenes').
-    - output_dir: Optional directory where images will be written. If not provided,
-      will use get_project_path(script_data) from utils.
-    - headless: Run Chrome headlessly when True. When False, you can optionally
-      pass user_data_dir to reuse a profile.
-    - chrome_exe: Optional path to Chrome binary. If None, system default is used.
-    - user_data_dir: Optional Path for Chrome user-data (useful when headless=False).
-    - timeout: max seconds to wait for generation (passed to WebDriverWait).
-
-    Returns:
-    - dict with keys 'ok' (bool). On success also includes 'images' (int) and 'paths' (list).
-    """
-    # Validate script file
-    if not script_path or not script_path.exists():
-        return {"ok": False, "error": f"File kịch bản không tồn tại: {script_path}"}
-
-    try:
-        with open(script_path, 'r', encoding='utf-8') as f:
-            script_data = json.load(f)
-    except Exception as e:
-        return {"ok": False, "error": f"Không thể đọc file kịch bản: {e}"}
-
-    # Derive scenes from acts only. Top-level 'scenes' key is no longer supported.
-    acts = script_data.get("acts") or []
-    scenes = []
-    for act in acts:
-        scenes.extend(act.get("scenes") or [])
-    if not scenes:
-        return {"ok": False, "error": "Không tìm thấy scenes trong file kịch bản (derived from acts)."}
-
-    # Determine output dir
-    if output_dir:
-        out_dir = Path(output_dir)
-    else:
-        try:
-            out_dir = Path(get_project_path(script_data))
-        except Exception:
-            out_dir = Path.cwd() / "output_images"
-
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    # Setup Chrome options
-    options = Options()
-    if chrome_exe:
-        options.binary_location = chrome_exe
-    # If user didn't pass a user_data_dir, default to repo-root/chrome-profile when running non-headless
-    if not user_data_dir:
-        try:
-            repo_root = Path(__file__).parent.parent.resolve()
-            default_profile = repo_root / "chrome-profile"
-            user_data_dir = default_profile
-        except Exception:
-            user_data_dir = None
-
-    if headless:
-        # new headless flags for modern chrome
-        options.add_argument("--headless=new")
-        options.add_argument("--disable-gpu")
-    else:
-        if user_data_dir:
-            options.add_argument(f"--user-data-dir={str(user_data_dir)}")
-
-    # Common options
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
-    driver = None
-    wait = None
-    try:
-        driver = webdriver.Chrome(options=options)
-        wait = WebDriverWait(driver, timeout)
-
-        print("🚀 Đang mở Gemini...")
-        driver.get("https://gemini.google.com/")
-
-        print("⏳ Chờ trang Gemini sẵn sàng...")
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, INPUT_BOX_SELECTOR)))
-        print("✅ Trang sẵn sàng. Bắt đầu gửi prompt...")
-
-        scenes_json_string = json.dumps(scenes, ensure_ascii=False, separators=(',', ':'))
-        prompt = (
-            f"tạo ảnh dựa theo JSON scenes sau: {scenes_json_string} "
-            "lưu ý: ảnh không chứa text, mọi nhân vật đều đủ 18 tuổi trở lên"
-        )
-
-        input_box = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, INPUT_BOX_SELECTOR)))
-        # Use JS to set the content reliably
-        driver.execute_script("arguments[0].innerText = arguments[1];", input_box, prompt)
-        time.sleep(0.8)
-
-        submit_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, SEND_BUTTON_SELECTOR)))
-        submit_button.click()
-        print("💬 Prompt đã gửi. Đang chờ Gemini tạo ảnh...")
-
-        expected_image_count = len(scenes)
-
-        # Wait until at least expected_image_count images are found
-        wait.until(lambda d: len(d.find_elements(By.CSS_SELECTOR, GENERATED_IMAGE_SELECTOR)) >= expected_image_count)
-        print(f"✅ Đã phát hiện tối thiểu {expected_image_count} ảnh trên trang.")
-
-        # Wait until the last N images have valid src attributes
-        def last_n_have_src(d):
-            imgs = d.find_elements(By.CSS_SELECTOR, GENERATED_IMAGE_SELECTOR)
-            if len(imgs) < expected_image_count:
-                return False
-            recent = imgs[-expected_image_count:]
-            return all(img.get_attribute("src") and img.get_attribute("src").startswith(('blob:', 'data:', 'http')) for img in recent)
-
-        wait.until(last_n_have_src)
-        print("✅ Tất cả ảnh đã có src hợp lệ.")
-
-        # Collect URLs and save each by opening in new tab and screenshot
-        image_elements = driver.find_elements(By.CSS_SELECTOR, GENERATED_IMAGE_SELECTOR)
-        new_image_urls = [img.get_attribute("src") for img in image_elements[-expected_image_count:]]
-
-        main_tab = driver.current_window_handle
-        saved_paths: List[str] = []
-
-        for i, url in enumerate(new_image_urls):
-            image_path = out_dir / f"{i+1}.png"
-            try:
-                _download_image_in_new_tab(driver, wait, url, image_path, main_tab)
-                saved_paths.append(str(image_path))
-            except Exception as e:
-                print(f"⚠️ Lỗi khi lưu ảnh {i+1}: {e}")
-
-        return {"ok": True, "images": len(saved_paths), "paths": saved_paths}
-
-    except TimeoutException:
-        return {"ok": False, "error": "timeout"}
-    except WebDriverException as e:
-        return {"ok": False, "error": f"WebDriver error: {e}"}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception:
-                pass
-
+import sys
+from pathlib import Path
 
-def _download_image_in_new_tab(driver: webdriver.Chrome, wait: WebDriverWait, image_url: str, image_output_path: Path, main_tab_handle: str):
-    """Open image_url in a new tab, wait for img and save screenshot to image_output_path."""
-    print(f"...Đang tải và ghi đè ảnh: {image_output_path.name}")
-    driver.switch_to.new_window('tab')
-    driver.get(image_url)
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-    img = wait.until(EC.presence_of_element_located((By.TAG_NAME, "img")))
-    # save screenshot of the image element (works even for blob/data urls)
-    img.screenshot(str(image_output_path))
+from app.services.image_generator import (  # noqa: E402
+    DEFAULT_TABS,
+    DEFAULT_TIMEOUT,
+    GEMINI_URL,
+    SessionPool,
+    generate_images,
+    generate_many,
+)
 
-    driver.close()
-    driver.switch_to.window(main_tab_handle)
+__all__ = ["generate_images"]
 
 
-def _cli_main():
+def _cli_main(argv=None):
     parser = argparse.ArgumentParser(description="Tự động tạo ảnh cho kịch bản video bằng Gemini.")
-    parser.add_argument("script_file", type=Path, help="Đường dẫn đến file kịch bản JSON (ví dụ: data/1.json).")
-    parser.add_argument("--out", type=Path, default=None, help="Thư mục xuất ảnh (mặc định là project path).")
+    parser.add_argument("script_files", type=Path, nargs="+", help="File kịch bản JSON (ví dụ: data/1.json).")
+    parser.add_argument("--out", type=Path, default=None, help="Thư mục xuất ảnh (chỉ dùng khi có một kịch bản; mặc định là project path).")
     parser.add_argument("--no-headless", dest='headless', action='store_false', help="Chạy chrome không headless (useful for debugging).")
     parser.add_argument("--chrome", type=str, default=None, help="Đường dẫn tới Chrome binary (nếu cần).")
-    parser.add_argument("--user-data-dir", type=Path, default=None, help="User data dir cho chrome khi không headless.")
-    parser.add_argument("--timeout", type=int, default=240, help="Timeout chờ tạo ảnh (giây).")
-    args = parser.parse_args()
-
-    res = generate_images(
-        args.script_file,
-        output_dir=args.out,
-        headless=args.headless,
-        chrome_exe=args.chrome,
-        user_data_dir=args.user_data_dir,
-        timeout=args.timeout,
-    )
+    parser.add_argument("--user-data-dir", type=Path, default=PROJECT_ROOT / "chrome-profile", help="Profile Chrome gốc; phiên thứ N dùng <dir>-N.")
+    parser.add_argument("--sessions", type=int, default=1, help="Số phiên Chrome chạy song song.")
+    parser.add_argument("--mode", choices=("all", "scene"), default="all", help="all: một prompt cho mọi scene; scene: gửi theo lô.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Số scene mỗi prompt khi --mode scene.")
+    parser.add_argument("--tabs", type=int, default=DEFAULT_TABS, help="Số tab chạy đồng thời trong một phiên.")
+    parser.add_argument("--url", type=str, default=GEMINI_URL, help="Trang tạo ảnh (Gemini hoặc file mock).")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Timeout chờ tạo ảnh mỗi lô (giây).")
+    args = parser.parse_args(argv)
+
+    url = args.url
+    if "://" not in url and Path(url).exists():
+        url = Path(url).resolve().as_uri()
+    if args.out and len(args.script_files) > 1:
+        parser.error("--out chỉ dùng được với một file kịch bản")
+
+    pool = SessionPool(min(args.sessions, len(args.script_files)), args.user_data_dir, headless=args.headless, chrome_exe=args.chrome)
+    try:
+        results = generate_many(
+            args.script_files,
+            pool,
+            output_dirs={str(args.script_files[0]): args.out} if args.out else None,
+            timeout=args.timeout,
+            mode=args.mode,
+            batch_size=args.batch_size,
+            tabs=args.tabs,
+            url=url,
+        )
+    finally:
+        pool.close()
 
-    if res.get('ok'):
-        print(f"✅ Hoàn tất: {res.get('images',0)} ảnh được xử lý. Lưu tại: {res.get('paths')}")
-    else:
-        print(f"❌ Lỗi: {res.get('error')}")
+    failed = 0
+    for res in results:
+        if res.get('ok'):
+            print(f"✅ {res['script']}: {res.get('images', 0)} ảnh ({res.get('elapsed')}s). Lưu tại: {res.get('paths')}")
+        else:
+            failed += 1
+            print(f"❌ {res['script']}: {res.get('error')}")
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
-    _cli_main()
+    raise SystemExit(_cli_main())
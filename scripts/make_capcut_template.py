@@ -1,14 +1,11 @@
 #!/usr/bin/env python3
 import argparse
 import json
-import re
-import subprocess
 import os
 import sys
 import threading
 import time
 from http.server import SimpleHTTPRequestHandler
-import shutil
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -18,6 +15,9 @@ import requests
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.append(str(PROJECT_ROOT))
 
+from app.services import image_postprocess  # noqa: E402
+from app.services.media_probe import probe_duration  # noqa: E402
+
 # --- Cấu hình ---
 # Port cho API của CapCut. Script gốc dùng 9001, bạn có thể thay đổi nếu cần.
 CAPCUT_API_PORT = 9001
@@ -75,9 +75,12 @@ def call_api(endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
 class CapCutGenerator:
     """Lớp quản lý việc tạo video CapCut, tương đương với script Node.js."""
 
-    def __init__(self, project_folder: Path, script_data: Dict[str, Any], ratio: str = "9:16"):
+    def __init__(self, project_folder: Path, script_data: Dict[str, Any], ratio: str = "9:16", process_images: bool = True):
         self.episode_dir = project_folder.resolve()
         self.ratio = ratio
+        self.process_images = process_images
+        # Pre-blurred background rendered by prepare_images (None = use the raw first image)
+        self.background_image: Optional[Path] = None
         self.file_server: Optional[FileServerThread] = None
         self.draft_id: Optional[str] = None
         self.script_data: Dict[str, Any] = script_data
@@ -139,61 +142,45 @@ class CapCutGenerator:
         else:
             print(f"⚠️ Không tìm thấy file video-template.json tại: {template_path}")
 
+    def _scenes(self) -> list:
+        # derive scenes from acts only; do not support top-level 'scenes'
+        scenes = []
+        for act in self.script_data.get("acts") or []:
+            scenes.extend(act.get("scenes") or [])
+        return scenes
+
+    def prepare_images(self):
+        """Thay ảnh scene bằng bản đã resize theo khung draft và render sẵn nền mờ.
+
+        Chỉ đổi đường dẫn trong bộ nhớ; capcut-api.json giữ nguyên ảnh gốc.
+        """
+        if not self.process_images:
+            return
+        if not image_postprocess.available():
+            print("⏩ Pillow chưa được cài, dùng ảnh gốc.")
+            return
+        scenes = self._scenes()
+        sources = {i + 1: Path(s["image"]) for i, s in enumerate(scenes) if s.get("image") and Path(s["image"]).is_file()}
+        if not sources:
+            return
+        config = image_postprocess.resolve_config(self.script_data.get("builder_configs"))
+        result = image_postprocess.process_scene_images(self.episode_dir, sources, self.ratio, config)
+        for number, path in result["images"].items():
+            scenes[number - 1]["image"] = path
+        if 1 in result["backgrounds"]:
+            self.background_image = Path(result["backgrounds"][1])
+        print(
+            f"🖼️ Ảnh đã xử lý: {result['rendered']} mới, {result['cached']} từ cache, "
+            f"{len(result['duplicates'])} trùng ({result['seconds']}s)"
+        )
+
     def _probe_audio_duration(self, audio_path: Path) -> Optional[float]:
-        """Try multiple methods to get duration (seconds) of audio file.
-        Returns float seconds or None.
+        """Return duration (seconds) of the audio file or None.
+
+        Delegates to the shared media probe, which runs a single ffprobe call
+        and caches the result by (path, size, mtime).
         """
-        # 1) Try imageio_ffmpeg.get_ffprobe_exe()
-        try:
-            import imageio_ffmpeg
-            get_ffprobe = getattr(imageio_ffmpeg, 'get_ffprobe_exe', None)
-            if callable(get_ffprobe):
-                ffprobe = get_ffprobe()
-                if ffprobe:
-                    out = subprocess.check_output([ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(audio_path)], text=True)
-                    return float(out.strip())
-        except Exception:
-            pass
-
-        # 2) Try system ffprobe
-        sys_ffprobe = shutil.which('ffprobe')
-        if sys_ffprobe:
-            try:
-                out = subprocess.check_output([sys_ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(audio_path)], text=True)
-                return float(out.strip())
-            except Exception:
-                pass
-
-        # 3) Try ffmpeg stderr parsing via imageio_ffmpeg.get_ffmpeg_exe()
-        try:
-            import imageio_ffmpeg
-            get_ffmpeg = getattr(imageio_ffmpeg, 'get_ffmpeg_exe', None)
-            if callable(get_ffmpeg):
-                ffmpeg = get_ffmpeg()
-                if ffmpeg:
-                    proc = subprocess.run([ffmpeg, '-i', str(audio_path)], capture_output=True, text=True)
-                    stderr = proc.stderr or ''
-                    m = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', stderr)
-                    if m:
-                        h, mm, ss = m.groups()
-                        return int(h) * 3600 + int(mm) * 60 + float(ss)
-        except Exception:
-            pass
-
-        # 4) Try system ffmpeg
-        sys_ffmpeg = shutil.which('ffmpeg')
-        if sys_ffmpeg:
-            try:
-                proc = subprocess.run([sys_ffmpeg, '-i', str(audio_path)], capture_output=True, text=True)
-                stderr = proc.stderr or ''
-                m = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', stderr)
-                if m:
-                    h, mm, ss = m.groups()
-                    return int(h) * 3600 + int(mm) * 60 + float(ss)
-            except Exception:
-                pass
-
-        return None
+        return probe_duration(audio_path)
 
     def _deep_merge(self, base: dict, new: dict) -> dict:
         """Hợp nhất hai dictionary một cách đệ quy."""
@@ -217,6 +204,7 @@ class CapCutGenerator:
         """Chạy toàn bộ pipeline tạo video."""
         try:
             self.init()
+            self.prepare_images()
             self.file_server = FileServerThread(self.base_serve_dir, FILE_SERVER_PORT)
             self.file_server.start()
             # Đợi server khởi động
@@ -277,36 +265,34 @@ class CapCutGenerator:
 
     def add_background_layer(self):
         params = self.script_data.get("builder_configs", {}).get("background_layer", {})
-        # derive scenes from acts only; do not support top-level 'scenes'
-        acts = self.script_data.get("acts") or []
-        scenes = []
-        for act in acts:
-            scenes.extend(act.get("scenes") or [])
+        scenes = self._scenes()
         if not scenes or not scenes[0].get("image"):
             print("⏩ Skipping background layer: No scenes or first scene has no image.")
             return
 
-        background_image_path = Path(scenes[0]["image"])
-        call_api("/add_video", {
+        payload = {
             "draft_id": self.draft_id,
-            "video_url": self._get_http_path(background_image_path),
             "start": 0,
             "end": self.total_audio_duration_s,
             "track_name": "background_track",
             "relative_index": -1, # Đặt ở lớp dưới cùng
-            "scale_x": params.get("scale", 2.5),
-            "scale_y": params.get("scale", 2.5),
-            "background_blur": params.get("blur", 3),
-        })
+        }
+        if self.background_image:
+            # Already cover-cropped to the canvas and blurred by prepare_images
+            payload.update(video_url=self._get_http_path(self.background_image), scale_x=1.0, scale_y=1.0)
+        else:
+            payload.update(
+                video_url=self._get_http_path(Path(scenes[0]["image"])),
+                scale_x=params.get("scale", 2.5),
+                scale_y=params.get("scale", 2.5),
+                background_blur=params.get("blur", 3),
+            )
+        call_api("/add_video", payload)
 
     def add_image_scenes(self):
         params = self.script_data.get("builder_configs", {}).get("scene_images", {})
-        # derive scenes from acts only
-        acts = self.script_data.get("acts") or []
-        scenes = []
-        for act in acts:
-            scenes.extend(act.get("scenes") or [])
-        
+        scenes = self._scenes()
+
         # Logic "stretch" thời gian giống hệt script Node.js
         valid_scenes = [s for s in scenes if s.get("start") is not None and s.get("end") is not None]
         total_visual_duration_s = sum(s["end"] - s["start"] for s in valid_scenes)
@@ -435,6 +421,7 @@ def main():
     parser = argparse.ArgumentParser(description="Tạo video nháp CapCut từ một thư mục project.")
     parser.add_argument("project_folder", type=Path, help="Đường dẫn đến thư mục project chứa capcut-api.json và các tài sản.")
     parser.add_argument("--ratio", type=str, default="9:16", choices=["9:16", "16:9"], help="Video aspect ratio (default: 9:16).")
+    parser.add_argument("--no-process-images", dest="process_images", action="store_false", help="Dùng ảnh scene gốc, không resize/nén/render nền mờ.")
 
     args = parser.parse_args()
 
@@ -442,7 +429,15 @@ def main():
         print(f"❌ Lỗi: Thư mục project không tồn tại: {args.project_folder}", file=sys.stderr)
         sys.exit(1)
 
-    generator = CapCutGenerator(args.project_folder, ratio=args.ratio)
+    script_path = args.project_folder / "capcut-api.json"
+    try:
+        with open(script_path, "r", encoding="utf-8") as f:
+            script_data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Lỗi: Không đọc được {script_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    generator = CapCutGenerator(args.project_folder, script_data, ratio=args.ratio, process_images=args.process_images)
     generator.run()
 
 
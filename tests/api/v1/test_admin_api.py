@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+TOKEN = {'X-Admin-Token': 'secret'}
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(500))
+
+
+def test_admin_routes_need_a_configured_token(app, client):
+    assert client.get('/api/v1/admin/threads').status_code == 404
+    app.config['ADMIN_TOKEN'] = 'secret'
+    assert client.get('/api/v1/admin/threads', headers={'X-Admin-Token': 'nope'}).status_code == 403
+    res = client.get('/api/v1/admin/threads', headers=TOKEN)
+    assert res.status_code == 200
+    assert threading.current_thread().name in res.get_json()['threads']
+
+
+def test_profile_captures_folded_stacks_of_a_thread(app, client):
+    app.config['ADMIN_TOKEN'] = 'secret'
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name='Spin-Thread-1', daemon=True)
+    worker.start()
+    try:
+        res = client.post('/api/v1/admin/profile?seconds=0.2&interval=0.002&thread=Spin-*', headers=TOKEN)
+        profile = client.post('/api/v1/admin/profile', json={'seconds': 0.1, 'thread': 'Spin-*', 'format': 'json'}, headers=TOKEN).get_json()
+    finally:
+        stop.set()
+        worker.join()
+
+    assert res.status_code == 200
+    lines = res.get_data(as_text=True).splitlines()
+    assert lines and all(line.startswith('Spin-Thread-1;') for line in lines)
+    assert any('_spin (tests/api/v1/test_admin_api.py:' in line for line in lines)
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == int(res.headers['X-Profile-Samples'])
+    assert profile['threads'] == ['Spin-Thread-1']
+    assert any(f['function'].startswith('_spin ') for f in profile['top'])
+
+
+@pytest.mark.parametrize('query', ['seconds=nan', 'seconds=inf', 'seconds=-1', 'interval=inf', 'interval=0'])
+def test_profile_rejects_non_finite_or_non_positive_values(app, client, query):
+    from app.profiling import sample_stacks
+
+    app.config['ADMIN_TOKEN'] = 'secret'
+    res = client.post(f'/api/v1/admin/profile?{query}', headers=TOKEN)
+    assert res.status_code == 400
+    with pytest.raises(ValueError):
+        sample_stacks(float('nan'))
+    # the lock was not taken: a valid capture still runs
+    assert client.post('/api/v1/admin/profile?seconds=0.01', headers=TOKEN).status_code == 200
+
+
+def test_timed_functions_are_reported(client):
+    from app.extensions import db
+    from app.metrics import FUNCTION_SECONDS
+    from app.models.script import Script
+
+    s = Script(title='T', alias='t', acts='[]')
+    db.session.add(s)
+    db.session.commit()
+    before = (FUNCTION_SECONDS.snapshot('Script.acts_parsed') or {'count': 0})['count']
+
+    res = client.get(f'/api/v1/scripts/{s.id}')
+    assert 'acts_parsed;dur=' in res.headers['Server-Timing']
+    assert FUNCTION_SECONDS.snapshot('Script.acts_parsed')['count'] == before + 1
+    assert 'function_duration_seconds_count{function="Script.acts_parsed"}' in client.get('/metrics').get_data(as_text=True)
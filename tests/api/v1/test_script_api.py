@@ -34,3 +34,51 @@ def test_create_get_update_delete_script(client):
     # Delete
     resp = client.delete(f'/api/v1/scripts/{sid}')
     assert resp.status_code == 200
+
+
+def test_script_assets_from_index(client, tmp_path, monkeypatch):
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, 'PROJECT_FOLDER', str(tmp_path))
+    resp = client.post('/api/v1/scripts', json={'meta': {'title': 'A', 'alias': 'assets'}, 'acts': []})
+    sid = resp.get_json()['id']
+
+    resp = client.get(f'/api/v1/scripts/{sid}/assets')
+    assert resp.status_code == 200
+    assert resp.get_json()['indexed'] is False
+
+    ep = tmp_path / 'general' / f'{sid}.assets'
+    ep.mkdir(parents=True)
+    (ep / 'audio.mp3').write_bytes(b'x')
+    (ep / '1.png').write_bytes(b'x')
+
+    data = client.get(f'/api/v1/scripts/{sid}/assets?refresh=1').get_json()
+    assert data['indexed'] is True
+    assert data['summary']['has_audio'] and data['summary']['scene_images'] == 1
+    assert [a['name'] for a in data['assets']['audio']] == ['audio.mp3']
+
+    assert client.get('/api/v1/scripts/999999/assets').status_code == 404
+
+
+def test_generate_images_enqueues_job(client, tmp_path, monkeypatch):
+    import app.tasks
+    from app.services import image_generator
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, 'PROJECT_FOLDER', str(tmp_path))
+    queued = []
+    monkeypatch.setattr(app.tasks, 'enqueue_job', lambda target, *args: queued.append((target, args)) or 'x')
+    acts = [{'scenes': [{'narration': 'n1'}, {'narration': 'n2'}]}]
+    sid = client.post('/api/v1/scripts', json={'meta': {'title': 'I', 'alias': 'img'}, 'acts': acts}).get_json()['id']
+
+    assert client.post(f'/api/v1/scripts/{sid}/generate-images', json={'mode': 'bad'}).status_code == 400
+    resp = client.post(f'/api/v1/scripts/{sid}/generate-images', json={'mode': 'scene', 'batch_size': 2})
+    assert resp.status_code == 202
+    job_id = resp.get_json()['job_id']
+
+    target, (qid, script_path, out_dir, options) = queued[0]
+    assert target is image_generator.image_job and qid == job_id
+    assert script_path.endswith('capcut-api.json') and options == {'mode': 'scene', 'batch_size': 2}
+    assert client.get(f'/api/v1/images/jobs/{job_id}').get_json()['status'] == 'queued'
+    assert client.get('/api/v1/images/jobs/nope').status_code == 404
+    assert client.post('/api/v1/scripts/999999/generate-images').status_code == 404
@@ -0,0 +1,25 @@
+import json
+
+
+def test_search_requires_query(client):
+    resp = client.get('/api/v1/transcripts/search')
+    assert resp.status_code == 400
+
+
+def test_search_returns_hits(client, tmp_path, monkeypatch):
+    from app.services.transcript_index import TranscriptIndex
+
+    ep = tmp_path / 'general' / '3.demo'
+    ep.mkdir(parents=True)
+    words = [{'word': w, 'start': i, 'end': i + 0.5} for i, w in enumerate(['xin', 'chào', 'các', 'bạn'])]
+    (ep / 'audio.whisperx.json').write_text(json.dumps({'segments': [{'words': words}]}), encoding='utf-8')
+    index_path = tmp_path / 'index.sqlite'
+    TranscriptIndex(index_path).update(tmp_path)
+    monkeypatch.setenv('TRANSCRIPT_INDEX', str(index_path))
+
+    resp = client.get('/api/v1/transcripts/search?q=chào')
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['count'] == 1
+    assert data['hits'][0]['script_id'] == 3
+    assert data['hits'][0]['text'] == 'xin chào các bạn'
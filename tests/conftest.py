@@ -24,3 +24,17 @@ def app():
 def client(app):
     """A test client for the app."""
     return app.test_client()
+
+
+@pytest.fixture(scope='function')
+def fake_vbee(app):
+    """A local fake VBEE API; the app's VBEE client points at it (no backoff delay)."""
+    from fake_vbee import FakeVbeeServer
+
+    with FakeVbeeServer() as server:
+        app.config.update(VBEE_API_URL=server.url, VBEE_BACKOFF=0, VBEE_DRY_RUN=False)
+        app.extensions.pop('vbee', None)
+        yield server
+        service = app.extensions.pop('vbee', None)
+        if service is not None:
+            service.close()
@@ -0,0 +1,122 @@
+"""Local stand-in for the VBEE projects API.
+
+Serves ``POST /projects`` on 127.0.0.1 with the same idempotency semantics
+the client relies on: a repeated ``Idempotency-Key`` returns the project
+created the first time. Chunked request bodies are accepted (``chunked``
+counts them). ``fail_next(n, status)`` makes the next ``n``
+requests fail so retry/backoff can be exercised.
+
+Run standalone for manual testing::
+
+    python tests/fake_vbee.py 8765
+    VBEE_API_URL=http://127.0.0.1:8765 flask run
+"""
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeVbeeServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.projects = {}
+        self.requests = []
+        self.connections = set()
+        self.chunked = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fail_next(self, count: int = 1, status: int = 503) -> None:
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def start(self) -> "FakeVbeeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle_create(self, body: dict, key: str | None):
+        with self._lock:
+            self.requests.append({"key": key, "body": body})
+            if self._failures:
+                return self._failures.pop(0), {"error": "temporarily unavailable"}
+            if key and key in self.projects:
+                return 200, self.projects[key]
+            project = {"id": f"proj-{len(self.projects) + 1}", "title": body.get("title")}
+            self.projects[key or project["id"]] = project
+            return 201, project
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _read_body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    parts = []
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            break
+                        parts.append(self.rfile.read(size))
+                        self.rfile.readline()
+                    server.chunked += 1
+                    return b"".join(parts)
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def do_POST(self):
+                server.connections.add(self.client_address)
+                raw = self._read_body()
+                if self.path.rstrip("/").endswith("/projects"):
+                    try:
+                        body = json.loads(raw or b"{}")
+                    except ValueError:
+                        status, data = 400, {"error": "invalid json"}
+                    else:
+                        status, data = server._handle_create(body, self.headers.get("Idempotency-Key"))
+                else:
+                    status, data = 404, {"error": "not found"}
+                out = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                if status in (429, 503):
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(out)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    srv = FakeVbeeServer(port=port)
+    print(f"Fake VBEE listening on {srv.url}")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        srv.stop()
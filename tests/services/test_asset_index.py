@@ -0,0 +1,56 @@
+import os
+
+from app.services.asset_index import AssetIndex, classify
+
+
+def _touch(path, data=b'x'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_classify():
+    assert classify('audio.mp3') == 'audio'
+    assert classify('audio.whisperx.json') == 'transcript'
+    assert classify('audio.whisperx.srt') == 'subtitle'
+    assert classify('12.PNG') == 'scene_image'
+    assert classify('cover.png') == 'image'
+    assert classify('capcut-api.json') == 'draft'
+    assert classify('content.txt') == 'script'
+
+
+def test_refresh_is_incremental(tmp_path):
+    ep1 = tmp_path / 'general' / '1.one'
+    ep2 = tmp_path / 'series-a' / '2.two'
+    for name in ('audio.mp3', '1.png', '2.png', 'audio.whisperx.json', 'audio.whisperx.srt'):
+        _touch(ep1 / name)
+    _touch(ep2 / 'capcut-api.json')
+    _touch(ep2 / '.pipeline-manifest.json')
+    index = AssetIndex(tmp_path, path=tmp_path / 'assets.sqlite')
+
+    stats = index.refresh()
+    assert (stats['episodes'], stats['scanned'], stats['unchanged']) == (2, 2, 0)
+    assert index.refresh()['scanned'] == 0
+
+    _touch(ep2 / 'audio.mp3')
+    st = ep2.stat()
+    os.utime(ep2, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert index.refresh()['scanned'] == 1
+
+    summaries = index.summaries()
+    assert summaries[1]['scene_images'] == 2 and summaries[1]['has_subtitles']
+    assert summaries[2]['has_audio'] and not summaries[2]['has_transcript']
+
+    info = index.episode_assets(str(ep2))
+    assert sorted(info['assets']) == ['audio', 'draft']
+    assert len(index.find_assets(['audio'])) == 2
+
+
+def test_removed_folders_are_dropped(tmp_path):
+    ep = tmp_path / 'general' / '5.gone'
+    _touch(ep / 'audio.mp3')
+    index = AssetIndex(tmp_path, path=tmp_path / 'assets.sqlite')
+    index.refresh()
+    (ep / 'audio.mp3').unlink()
+    ep.rmdir()
+    assert index.refresh()['removed'] == 1
+    assert index.episode_paths(5) == []
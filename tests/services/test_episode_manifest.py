@@ -0,0 +1,52 @@
+from app.services.episode_manifest import (
+    EpisodeManifest,
+    discover_episodes,
+    stage_plan,
+    stale_report,
+)
+
+
+def _make_episode(root, name='1.alias'):
+    ep = root / 'general' / name
+    ep.mkdir(parents=True)
+    (ep / 'audio.mp3').write_bytes(b'audio')
+    (ep / 'capcut-api.json').write_text('{"scenes": []}', encoding='utf-8')
+    (ep / '1.png').write_bytes(b'img')
+    return ep
+
+
+def test_discover_episodes_two_levels(tmp_path):
+    ep = _make_episode(tmp_path)
+    (tmp_path / '.hidden').mkdir()
+    assert discover_episodes(tmp_path) == [ep]
+
+
+def test_stage_plan_lists_inputs_and_outputs(tmp_path):
+    ep = _make_episode(tmp_path)
+    plan = stage_plan(EpisodeManifest(ep))
+    assert plan['transcribe'] == (['audio.mp3'], ['audio.whisperx.json'])
+    assert plan['align'][0] == ['capcut-api.json', 'audio.whisperx.json', '1.png']
+
+
+def test_record_then_detect_input_change(tmp_path):
+    ep = _make_episode(tmp_path)
+    (ep / 'audio.whisperx.json').write_text('{}', encoding='utf-8')
+
+    m = EpisodeManifest(ep)
+    m.record('transcribe', ['audio.mp3'], ['audio.whisperx.json'])
+    assert not EpisodeManifest(ep).is_stale('transcribe', ['audio.mp3'], ['audio.whisperx.json'])
+
+    (ep / 'audio.mp3').write_bytes(b'new audio')
+    reason = EpisodeManifest(ep).stale_reason('transcribe', ['audio.mp3'], ['audio.whisperx.json'])
+    assert reason == 'input changed: audio.mp3'
+
+
+def test_missing_output_is_stale_and_reported(tmp_path):
+    ep = _make_episode(tmp_path)
+    (ep / 'audio.whisperx.json').write_text('{}', encoding='utf-8')
+    EpisodeManifest(ep).record('transcribe', ['audio.mp3'], ['audio.whisperx.json'])
+    (ep / 'audio.whisperx.json').unlink()
+
+    report = stale_report([ep])
+    assert report[str(ep)]['transcribe'] == 'output missing: audio.whisperx.json'
+    assert report[str(ep)]['align'] == 'never completed'
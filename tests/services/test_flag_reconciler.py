@@ -0,0 +1,58 @@
+import json
+
+from app import db
+from app.models.script import Script
+from app.services.asset_index import AssetIndex
+from app.services.flag_reconciler import reconcile_flags
+
+
+ACTS = json.dumps([{'scenes': [{'narration': 'a'}, {'narration': 'b'}]}])
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x')
+
+
+class TestFlagReconciler:
+
+    def _seed(self):
+        db.session.add_all([
+            Script(title='T1', alias='a1', acts=ACTS),
+            Script(title='T2', alias='a2', acts=ACTS, is_has_folder=True, is_audio_generated=True),
+            Script(title='T3', alias='a3', acts=ACTS, is_image_generated=True, is_transcript_generated=True),
+        ])
+        db.session.commit()
+
+    def test_updates_mismatched_flags(self, app, tmp_path):
+        ep1 = tmp_path / 'general' / '1.a1'
+        for name in ('audio.mp3', '1.png', '2.png', 'audio.whisperx.json', 'audio.whisperx.srt'):
+            _touch(ep1 / name)
+        _touch(tmp_path / 'general' / '3.a3' / '1.png')
+        index = AssetIndex(tmp_path, path=tmp_path / 'assets.sqlite')
+        with app.app_context():
+            self._seed()
+
+            dry = reconcile_flags(index, dry_run=True)
+            assert dry['mismatched'] == 3 and dry['updated'] == 0
+            assert not db.session.get(Script, 1).is_audio_generated
+
+            res = reconcile_flags(index)
+            assert res['updated'] == 3
+            assert res['changes']['is_has_folder'] == {'set': 2, 'cleared': 1}
+            db.session.expire_all()
+            s1, s2, s3 = (db.session.get(Script, i) for i in (1, 2, 3))
+            assert s1.is_has_folder and s1.is_audio_generated and s1.is_image_generated and s1.is_transcript_generated
+            assert not s2.is_has_folder and not s2.is_audio_generated
+            # one image for two scenes, no transcript
+            assert s3.is_has_folder and not s3.is_image_generated and not s3.is_transcript_generated
+
+            assert reconcile_flags(index)['mismatched'] == 0
+
+    def test_missing_projects_root_changes_nothing(self, app, tmp_path):
+        index = AssetIndex(tmp_path / 'unmounted', path=tmp_path / 'assets.sqlite')
+        with app.app_context():
+            self._seed()
+            res = reconcile_flags(index)
+            assert not res['ok']
+            assert db.session.get(Script, 2).is_has_folder
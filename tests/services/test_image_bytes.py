@@ -0,0 +1,81 @@
+import base64
+import struct
+import zlib
+
+import pytest
+
+from app.services import image_generator
+from app.services.image_bytes import ImageError, decode_data_url, image_size, save_scene_image, sniff_format
+
+
+def png(w, h):
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+    raw = b''.join(b'\x00' + b'\x00' * (w * 3) for _ in range(h))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def jpeg(w, h):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+    sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, h, w, 1) + b'\x01\x11\x00'
+    return b'\xff\xd8' + app0 + sof + b'\xff\xd9'
+
+
+def webp(w, h):
+    body = b'VP8X' + struct.pack('<I', 10) + b'\x00' * 4 + (w - 1).to_bytes(3, 'little') + (h - 1).to_bytes(3, 'little')
+    return b'RIFF' + struct.pack('<I', 4 + len(body)) + b'WEBP' + body
+
+
+def test_sniff_and_size():
+    assert sniff_format(png(320, 180)) == 'png' and image_size(png(320, 180)) == (320, 180)
+    assert sniff_format(jpeg(1280, 720)) == 'jpeg' and image_size(jpeg(1280, 720)) == (1280, 720)
+    assert sniff_format(webp(1024, 576)) == 'webp' and image_size(webp(1024, 576)) == (1024, 576)
+    assert sniff_format(b'<html>') is None and image_size(b'<html>') is None
+
+
+def test_decode_data_url():
+    data = png(100, 100)
+    assert decode_data_url('data:image/png;base64,' + base64.b64encode(data).decode()) == data
+    assert decode_data_url('data:text/plain,a%20b') == b'a b'
+    with pytest.raises(ImageError):
+        decode_data_url('blob:https://x/1')
+
+
+def test_save_keeps_format_and_replaces_other_copies(tmp_path):
+    (tmp_path / '1.png').write_bytes(png(100, 100))
+    info = save_scene_image(jpeg(1280, 720), tmp_path, 1)
+    assert info['path'].endswith('1.jpg') and (info['width'], info['height']) == (1280, 720)
+    assert info['written'] and not (tmp_path / '1.png').exists()
+    assert save_scene_image(jpeg(1280, 720), tmp_path, 1)['written'] is False
+
+    with pytest.raises(ImageError):
+        save_scene_image(png(16, 16), tmp_path, 2)
+    with pytest.raises(ImageError):
+        save_scene_image(b'GIF89a' + b'\x00' * 20, tmp_path, 2)
+    assert not (tmp_path / '2.png').exists()
+
+
+def test_save_batch_extracts_bytes_and_falls_back_to_screenshot(tmp_path, monkeypatch):
+    class PageDriver:
+        def set_script_timeout(self, timeout):
+            pass
+
+        def execute_async_script(self, script, srcs):
+            assert srcs == ['blob:https://gemini/1', 'blob:https://gemini/2']
+            data = base64.b64encode(jpeg(1024, 576)).decode()
+            return [{'data': 'data:image/jpeg;base64,' + data}, {'error': 'HTTP 403'}]
+
+    shots = []
+
+    def fake_screenshot(driver, wait, src, path, handle):
+        shots.append(src)
+        path.write_bytes(png(100, 100))
+
+    monkeypatch.setattr(image_generator, '_download_image_in_new_tab', fake_screenshot)
+    srcs = ['data:image/png;base64,' + base64.b64encode(png(640, 360)).decode(), 'blob:https://gemini/1', 'blob:https://gemini/2']
+    res = image_generator.save_batch_images(PageDriver(), None, srcs, [4, 5, 6], tmp_path, 'tab')
+
+    assert res['errors'] == [] and res['screenshots'] == 1 and shots == ['blob:https://gemini/2']
+    assert res['files'][4]['width'] == 640 and res['files'][5]['format'] == 'jpeg'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['4.png', '5.jpg', '6.png']
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from app.services import image_generator
+from app.services.image_generator import (
+    GENERATED_IMAGE_SELECTOR,
+    INPUT_BOX_SELECTOR,
+    SEND_BUTTON_SELECTOR,
+    SessionPool,
+    generate_many,
+    plan_batches,
+    scenes_from_script,
+)
+
+
+class FakeDriver:
+    def __init__(self, profile):
+        self.profile = profile
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _factory(profile, headless=False, chrome_exe=None):
+    return FakeDriver(profile)
+
+
+def test_plan_batches():
+    assert plan_batches(5) == [range(0, 5)]
+    assert plan_batches(5, 'scene', 2) == [range(0, 2), range(2, 4), range(4, 5)]
+    assert plan_batches(0, 'scene') == []
+
+
+def test_scenes_from_acts_only():
+    data = {'scenes': [{'x': 0}], 'acts': [{'scenes': [{'x': 1}, {'x': 2}]}, {'scenes': None}]}
+    assert scenes_from_script(data) == [{'x': 1}, {'x': 2}]
+
+
+def test_pool_uses_separate_profiles_and_reuses_drivers(tmp_path):
+    pool = SessionPool(3, tmp_path / 'profile', driver_factory=_factory)
+    assert [s.profile_dir.name for s in pool.sessions] == ['profile', 'profile-1', 'profile-2']
+    assert pool.stats()['started'] == 0
+
+    with pool.acquire() as s1:
+        first = s1.driver
+        with pool.acquire() as s2:
+            assert s2 is not s1
+            assert pool.stats()['free'] == 1
+    with pool.acquire() as again:
+        assert again is s1 and again.driver is first
+
+    pool.close()
+    assert first.quit_called and pool.stats()['started'] == 0
+
+
+def test_generate_many_runs_one_session_per_script(tmp_path, monkeypatch):
+    seen = []
+
+    def fake_generate(path, output_dir=None, session=None, **kwargs):
+        seen.append((path.name, session.profile_dir.name, kwargs['mode']))
+        return {'ok': True, 'images': 1, 'paths': []}
+
+    monkeypatch.setattr(image_generator, 'generate_images', fake_generate)
+    pool = SessionPool(2, tmp_path / 'p', driver_factory=_factory)
+    scripts = [tmp_path / f'{i}.json' for i in range(4)]
+    results = generate_many(scripts, pool, mode='scene')
+    assert [r['script'] for r in results] == [str(p) for p in scripts]
+    assert {s[1] for s in seen} <= {'p', 'p-1'} and len(seen) == 4
+    assert pool.stats()['jobs'] == 4
+
+
+def test_mock_page_matches_selectors():
+    html = (Path(__file__).resolve().parents[2] / 'scripts' / 'mock' / 'gemini_mock.html').read_text(encoding='utf-8')
+    for selector in (INPUT_BOX_SELECTOR, SEND_BUTTON_SELECTOR, GENERATED_IMAGE_SELECTOR):
+        tag, *classes = selector.split('.')
+        assert f'<{tag}' in html or f'createElement("{tag}")' in html
+        for cls in classes:
+            assert cls in html
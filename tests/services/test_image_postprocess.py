@@ -0,0 +1,56 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.services.image_postprocess import find_duplicates, hamming, resolve_config
+
+
+def test_find_duplicates_maps_to_first_similar_scene():
+    hashes = {1: 0b1111_0000, 2: 0b0000_1111, 3: 0b1111_0001, 4: 0b0000_1111}
+    assert hamming(hashes[1], hashes[3]) == 1
+    assert find_duplicates(hashes, threshold=2) == {3: 1, 4: 2}
+    assert find_duplicates(hashes, threshold=0) == {4: 2}
+
+
+def test_resolve_config():
+    config = resolve_config({'image_processing': {'fit': 'cover', 'unknown': 1}}, quality=70)
+    assert config['fit'] == 'cover' and config['quality'] == 70 and 'unknown' not in config
+    with pytest.raises(ValueError):
+        resolve_config(format='tiff')
+
+
+def test_process_renders_once_and_dedupes(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    from app.services.image_postprocess import process_scene_images
+
+    def make(name, size=(2048, 1152), flip=False):
+        # Horizontal gradient; the dHash only sees this structure
+        ramp = Image.linear_gradient('L').rotate(90 if flip else -90).resize(size)
+        img = Image.merge('RGB', (ramp, ramp, ramp))
+        img.save(tmp_path / name)
+        return tmp_path / name
+
+    sources = {1: make('1.png'), 2: make('2.png'), 3: make('3.png', (800, 800), flip=True)}
+    first = process_scene_images(tmp_path, sources, '9:16', max_workers=1)
+    assert first['rendered'] == 3 and first['cached'] == 0
+    assert first['duplicates'] == {2: 1} and first['images'][2] == first['images'][1]
+
+    with Image.open(first['images'][1]) as img:
+        assert img.size == (1080, 608) and img.format == 'JPEG'
+    with Image.open(first['backgrounds'][3]) as bg:
+        assert bg.size == (1080, 1920)
+
+    again = process_scene_images(tmp_path, sources, '9:16', max_workers=1)
+    assert again['rendered'] == 0 and again['cached'] == 3
+    assert again['images'] == first['images']
+
+
+def test_byte_helpers_do_not_import_models_or_settings():
+    code = ('import sys\n'
+            'import app.services.image_bytes, app.services.image_postprocess, app.services.tts_engine\n'
+            'print(sorted(m for m in ("app.models", "app.settings", "app.services.materializer") if m in sys.modules))')
+    out = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).resolve().parents[2],
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == '[]'
@@ -0,0 +1,52 @@
+import json
+
+from app import db
+from app.models.script import Script
+from app.services.materializer import materialize_pending
+from app.settings import settings
+
+
+ACTS = [{'scenes': [{'narration': 'n1', 'dialogues': [{'line': 'Xin chào'}, {'text': 'Tạm biệt'}]}]}]
+
+
+class TestMaterializer:
+
+    def _seed(self, n=3):
+        for i in range(n):
+            db.session.add(Script(title=f'T{i}', alias=f'a{i}', acts=json.dumps(ACTS),
+                                  builder_configs=json.dumps({'subtitles': {'max_words': 5}})))
+        db.session.commit()
+
+    def test_materializes_pending_and_sets_flags(self, app, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, 'PROJECT_FOLDER', str(tmp_path))
+        with app.app_context():
+            self._seed(3)
+            db.session.get(Script, 2).is_has_folder = True
+            db.session.commit()
+
+            summary = materialize_pending(root_dir=tmp_path, batch_size=1)
+
+            assert summary['selected'] == 2 and summary['materialized'] == 2
+            assert summary['files_written'] == 6
+            assert all(s.is_has_folder for s in Script.query.all())
+
+            ep = tmp_path / 'general' / '1.a0'
+            assert (ep / 'content.txt').read_text(encoding='utf-8') == 'Xin chào\n\nTạm biệt'
+            payload = json.loads((ep / 'capcut-api.json').read_text(encoding='utf-8'))
+            assert payload['scenes'][0]['narration'] == 'n1'
+            assert payload['builder_configs'] == {'subtitles': {'max_words': 5}}
+            assert not (tmp_path / 'general' / '2.a1').exists()
+
+    def test_force_rewrites_only_changed_files(self, app, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, 'PROJECT_FOLDER', str(tmp_path))
+        with app.app_context():
+            self._seed(1)
+            materialize_pending(root_dir=tmp_path)
+            assert materialize_pending(root_dir=tmp_path)['selected'] == 0
+
+            summary = materialize_pending(root_dir=tmp_path, force=True)
+            assert summary['files_written'] == 0 and summary['files_unchanged'] == 3
+
+            (tmp_path / 'general' / '1.a0' / 'content.txt').write_text('edited', encoding='utf-8')
+            summary = materialize_pending(root_dir=tmp_path, force=True)
+            assert summary['files_written'] == 1
@@ -0,0 +1,54 @@
+import os
+
+from app.services import media_probe
+from app.services.media_probe import MediaProbeCache, parse_ffprobe_output, probe_many
+
+
+def test_parse_ffprobe_output_prefers_audio_stream():
+    raw = {
+        'format': {'duration': '12.5', 'format_name': 'mp3', 'bit_rate': '128000'},
+        'streams': [
+            {'codec_type': 'video', 'codec_name': 'mjpeg'},
+            {'codec_type': 'audio', 'codec_name': 'mp3', 'sample_rate': '44100', 'channels': 2},
+        ],
+    }
+    info = parse_ffprobe_output(raw)
+    assert info['duration'] == 12.5
+    assert info['codec'] == 'mp3'
+    assert info['sample_rate'] == 44100
+    assert info['channels'] == 2
+
+
+def test_probe_many_uses_cache_until_file_changes(tmp_path, monkeypatch):
+    audio = tmp_path / 'audio.mp3'
+    audio.write_bytes(b'fake')
+    calls = []
+
+    def fake_probe(path):
+        calls.append(path)
+        return {'duration': 3.0, 'codec': 'mp3', 'sample_rate': 44100, 'channels': 1}
+
+    monkeypatch.setattr(media_probe, 'run_probe', fake_probe)
+    cache = MediaProbeCache(tmp_path / 'probe.sqlite')
+
+    first = probe_many([audio], max_workers=1, cache=cache)
+    second = probe_many([audio], max_workers=1, cache=cache)
+    assert first[audio.resolve()]['duration'] == 3.0
+    assert second[audio.resolve()]['duration'] == 3.0
+    assert len(calls) == 1
+
+    # Changing size/mtime invalidates the cached entry
+    audio.write_bytes(b'longer fake')
+    st = audio.stat()
+    os.utime(audio, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    probe_many([audio], max_workers=1, cache=cache)
+    assert len(calls) == 2
+    cache.close()
+
+
+def test_probe_many_missing_file_returns_none(tmp_path):
+    cache = MediaProbeCache(tmp_path / 'probe.sqlite')
+    missing = tmp_path / 'nope.mp3'
+    res = probe_many([missing], max_workers=1, cache=cache)
+    assert res[missing.resolve()] is None
+    cache.close()
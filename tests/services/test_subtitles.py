@@ -0,0 +1,101 @@
+import json
+import random
+
+from app.services.subtitles import (
+    WordTable,
+    build_cues,
+    resolve_config,
+    srt_timestamp,
+    write_subtitles,
+)
+
+
+def _reference_groups(words, pause, max_dur, max_words):
+    """The original per-word loop from write_srt_from_json."""
+    groups, current = [], []
+    for word in words:
+        if not current:
+            current.append(word)
+            continue
+        gap = word.get('start', 0) - current[-1].get('end', 0)
+        dur = word.get('end', 0) - current[0].get('start', 0)
+        if gap >= pause or len(current) >= max_words or dur >= max_dur:
+            groups.append(current)
+            current = [word]
+        else:
+            current.append(word)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _random_segments(seed, n_segments=40):
+    rng = random.Random(seed)
+    t = 0.0
+    segments = []
+    for _ in range(n_segments):
+        words = []
+        for _ in range(rng.randint(1, 30)):
+            t += rng.choice([0.05, 0.1, 0.7, 1.5]) * rng.random()
+            start = round(t, 3)
+            t += rng.uniform(0.1, 1.2)
+            words.append({'word': f'w{len(words)}', 'start': start, 'end': round(t, 3)})
+        segments.append({'start': words[0]['start'], 'end': words[-1]['end'], 'words': words})
+    return segments
+
+
+def test_grouping_matches_reference_loop():
+    for seed in range(5):
+        segments = _random_segments(seed)
+        cfg = resolve_config(None)
+        expected = []
+        for seg in segments:
+            for g in _reference_groups(seg['words'], 0.6, 6.0, 10):
+                expected.append((g[0]['start'], g[-1]['end'], ' '.join(w['word'] for w in g)))
+        assert build_cues(WordTable.from_segments(segments), cfg) == expected
+
+
+def test_fallback_segments_and_missing_timings_keep_order():
+    segments = [
+        {'start': 0.0, 'end': 1.0, 'text': ' intro '},
+        {'words': [{'word': 'a', 'start': 1.0, 'end': 1.2}, {'word': 'b'}]},
+        {'words': [{'word': 'c', 'start': 3.0, 'end': 3.5}]},
+        {'start': 4.0, 'end': 5.0, 'text': ''},
+    ]
+    cues = build_cues(WordTable.from_segments(segments), resolve_config(None))
+    # 'a b' has no end time on its last word and is dropped, as before
+    assert cues == [(0.0, 1.0, 'intro'), (3.0, 3.5, 'c')]
+
+
+def test_builder_configs_override_thresholds():
+    cfg = resolve_config({'subtitles': {'MAX_WORDS': 2, 'formats': ['srt', 'vtt', 'bogus']}})
+    assert cfg['max_words'] == 2
+    assert cfg['formats'] == ['srt', 'vtt']
+    words = [{'word': str(i), 'start': i * 0.1, 'end': i * 0.1 + 0.05} for i in range(5)]
+    cues = build_cues(WordTable.from_segments([{'words': words}]), cfg)
+    assert [c[2] for c in cues] == ['0 1', '2 3', '4']
+
+
+def test_srt_timestamp_never_overflows_milliseconds():
+    assert srt_timestamp(1.9996) == '00:00:02,000'
+    assert srt_timestamp(3723.25) == '01:02:03,250'
+
+
+def test_write_subtitles_formats(tmp_path):
+    path = tmp_path / 'audio.whisperx.json'
+    path.write_text(json.dumps({'segments': [
+        {'words': [{'word': 'xin', 'start': 0.5, 'end': 0.9}, {'word': 'chào', 'start': 1.0, 'end': 1.4}]},
+        {'start': 2.0, 'end': 3.0, 'text': 'tạm biệt'},
+    ]}), encoding='utf-8')
+
+    result = write_subtitles(path, resolve_config(None, formats=['srt', 'vtt', 'ass']))
+
+    assert result['cues'] == 2
+    assert (tmp_path / 'audio.whisperx.srt').read_text(encoding='utf-8') == (
+        '1\n00:00:00,500 --> 00:00:01,400\nxin chào\n\n'
+        '2\n00:00:02,000 --> 00:00:03,000\ntạm biệt\n'
+    )
+    vtt = (tmp_path / 'audio.whisperx.vtt').read_text(encoding='utf-8')
+    assert vtt.startswith('WEBVTT\n\n00:00:00.500 --> 00:00:01.400\nxin chào\n')
+    ass = (tmp_path / 'audio.whisperx.ass').read_text(encoding='utf-8')
+    assert 'Dialogue: 0,0:00:02.00,0:00:03.00,Default,,0,0,0,,tạm biệt' in ass
@@ -0,0 +1,60 @@
+import json
+
+from app.services import transcript_index
+from app.services.transcript_index import TranscriptIndex, build_match_query
+
+
+def _episode(root, name, words, scenes=None):
+    ep = root / 'general' / name
+    ep.mkdir(parents=True)
+    segs = [{'words': [{'word': w, 'start': i * 0.5, 'end': i * 0.5 + 0.4} for i, w in enumerate(words)]}]
+    (ep / 'audio.whisperx.json').write_text(json.dumps({'segments': segs}), encoding='utf-8')
+    (ep / 'capcut-api.json').write_text(json.dumps({'scenes': scenes or []}), encoding='utf-8')
+    return ep
+
+
+def test_build_match_query_quotes_tokens():
+    assert build_match_query('xin chào') == '"xin" "chào"*'
+    assert build_match_query('ông vu') == '"ông" "vu"'
+    assert build_match_query('"xin chào"') == '"xin chào"'
+    assert build_match_query('a OR b') == '"a" "OR" "b"'
+    assert build_match_query('  " ( * ') == ''
+
+
+def test_update_is_incremental_and_search_returns_payload(tmp_path):
+    _episode(tmp_path, '7.first', ['một', 'hai', 'ba', 'bốn'] * 5, scenes=[{'start': 0}, {'start': 5}])
+    ep2 = _episode(tmp_path, '8.second', ['ngày', 'xưa', 'có', 'một', 'ông', 'vua'])
+    index = TranscriptIndex(tmp_path / 'index.sqlite')
+
+    assert index.update(tmp_path) == {'indexed': 2, 'unchanged': 0, 'failed': 0, 'removed': 0}
+    assert index.update(tmp_path)['unchanged'] == 2
+
+    hits = index.search('ông vua')
+    assert len(hits) == 1
+    assert hits[0]['script_id'] == 8 and hits[0]['episode'] == '8.second'
+    assert hits[0]['timecode'] == '00:00:00.000'
+
+    # Second cue of the 20-word episode starts at 5.0s -> scene 2; diacritics are folded
+    hits = index.search('mot', script_id=7)
+    assert {h['scene'] for h in hits} == {1, 2}
+
+    for p in ep2.iterdir():
+        p.unlink()
+    ep2.rmdir()
+    assert index.update(tmp_path)['removed'] == 1
+    assert index.search('vua') == []
+
+
+def test_rank_limit_counts_only_the_searched_script(tmp_path, monkeypatch):
+    _episode(tmp_path, '7.first', ['một', 'hai', 'ba', 'bốn'] * 5)
+    _episode(tmp_path, '8.second', ['ngày', 'xưa', 'có', 'một', 'ông', 'vua'])
+    index = TranscriptIndex(tmp_path / 'index.sqlite')
+    index.update(tmp_path)
+    monkeypatch.setattr(transcript_index, 'RANK_LIMIT', 1)
+
+    queries = []
+    index._connect().set_trace_callback(lambda sql: sql.startswith('SELECT c.script_id') and queries.append(sql))
+    assert index.search('một', script_id=8)
+    assert 'bm25' in queries[-1]
+    assert index.search('một')
+    assert 'bm25' not in queries[-1]
@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+
+from app.services.transcript_store import (
+    load_transcript,
+    read_sidecar,
+    sidecar_path,
+    write_sidecar,
+)
+from app.services.subtitles import WordTable, build_cues, resolve_config
+
+
+SEGMENTS = [
+    {'start': 0.5, 'end': 1.4, 'text': ' xin chào', 'words': [
+        {'word': 'xin', 'start': 0.5, 'end': 0.9, 'score': 0.9},
+        {'word': 'chào', 'start': 1.0, 'end': 1.4},
+    ]},
+    {'start': 2.0, 'end': 3.0, 'text': 'tạm biệt'},
+    {'text': 'no timing', 'words': [{'word': 'xin'}]},
+]
+
+
+def _write(tmp_path):
+    path = tmp_path / 'audio.whisperx.json'
+    path.write_text(json.dumps({'segments': SEGMENTS}), encoding='utf-8')
+    return path
+
+
+def test_load_writes_memory_mapped_sidecar(tmp_path):
+    path = _write(tmp_path)
+    assert read_sidecar(path) is None
+
+    first = load_transcript(path)
+    assert sidecar_path(path).exists()
+
+    cached = read_sidecar(path)
+    assert isinstance(cached.start, np.memmap)
+    assert cached.words() == first.words() == ['xin', 'chào', 'xin']
+    assert cached.token_ids.tolist() == [0, 1, 0]
+    assert cached.segment.tolist() == [0, 0, 2]
+    assert np.isnan(cached.start[2]) and np.isnan(cached.score[1])
+    assert cached.segments() == [
+        {'start': 0.5, 'end': 1.4, 'text': ' xin chào'},
+        {'start': 2.0, 'end': 3.0, 'text': 'tạm biệt'},
+        {'start': None, 'end': None, 'text': 'no timing'},
+    ]
+
+
+def test_sidecar_goes_stale_when_json_changes(tmp_path):
+    path = _write(tmp_path)
+    write_sidecar(path)
+    assert read_sidecar(path) is not None
+
+    path.write_text(json.dumps({'segments': SEGMENTS[:1]}), encoding='utf-8')
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert read_sidecar(path) is None
+    assert load_transcript(path).segment_count == 1
+
+
+def test_subtitle_cues_identical_from_sidecar_and_json(tmp_path):
+    path = _write(tmp_path)
+    cfg = resolve_config(None)
+    from_json = build_cues(WordTable.from_json(path), cfg)
+    write_sidecar(path)
+    from_sidecar = build_cues(WordTable.from_transcript(read_sidecar(path)), cfg)
+    assert from_sidecar == from_json == [(0.5, 1.4, 'xin chào'), (2.0, 3.0, 'tạm biệt')]
@@ -0,0 +1,137 @@
+import queue
+import sys
+import threading
+import types
+
+import pytest
+
+import app.tasks as tasks
+from app.services import transcription_worker
+from app.services.transcription_worker import TranscriptionWorker, get_worker, shutdown_workers
+
+
+class FakeModel:
+    def transcribe(self, audio, batch_size):
+        words = [{'word': 'xin', 'start': 0.0, 'end': 0.4}, {'word': 'chào', 'start': 0.5, 'end': 1.0}]
+        return {'language': 'vi', 'segments': [{'text': 'xin chào', 'start': 0.0, 'end': 1.0, 'words': words}]}
+
+
+@pytest.fixture
+def fake_whisperx(monkeypatch):
+    """A stand-in ``whisperx`` module that counts model loads."""
+    module = types.ModuleType('whisperx')
+    module.loads = {'model': 0, 'align': 0}
+
+    def load_model(*args, **kwargs):
+        module.loads['model'] += 1
+        return FakeModel()
+
+    def load_align_model(language_code, device):
+        module.loads['align'] += 1
+        return object(), {'language': language_code}
+
+    module.load_model = load_model
+    module.load_align_model = load_align_model
+    module.load_audio = lambda path: [0.0] * 32000
+    module.align = lambda segments, *args, **kwargs: {'segments': segments, 'word_segments': []}
+    module.audio = types.SimpleNamespace(SAMPLE_RATE=16000)
+    monkeypatch.setitem(sys.modules, 'whisperx', module)
+    return module
+
+
+def test_models_load_once_and_results_are_written(tmp_path, fake_whisperx):
+    worker = TranscriptionWorker('tiny', device='cpu')
+    try:
+        results = [worker.transcribe(tmp_path / f'{i}.mp3', tmp_path / f'{i}.whisperx.json') for i in range(3)]
+    finally:
+        worker.stop(timeout=5)
+
+    assert all(r['ok'] and r['language'] == 'vi' and r['audio_seconds'] == 2.0 for r in results)
+    assert (tmp_path / '2.whisperx.json').exists()
+    assert fake_whisperx.loads == {'model': 1, 'align': 1}
+    assert worker.processed == 3
+
+
+def test_jobs_run_in_order_and_stop_drains_the_queue(tmp_path, monkeypatch):
+    order = []
+    release = threading.Event()
+
+    def process(self, audio_path, output_path):
+        release.wait(5)
+        order.append(audio_path.name)
+        return {'ok': True, 'audio': str(audio_path)}
+
+    monkeypatch.setattr(TranscriptionWorker, '_process', process)
+    worker = TranscriptionWorker('tiny', device='cpu')
+    futures = [worker.submit(tmp_path / f'{i}.mp3', tmp_path / f'{i}.json') for i in range(4)]
+    release.set()
+    worker.stop(timeout=5)
+
+    assert not worker.is_alive
+    assert all(f.done() for f in futures)
+    assert order == ['0.mp3', '1.mp3', '2.mp3', '3.mp3']
+    assert [f.result()['audio'] for f in futures] == [str(tmp_path / f'{i}.mp3') for i in range(4)]
+
+
+def test_failed_job_resolves_to_an_error_result(tmp_path, monkeypatch):
+    def process(self, audio_path, output_path):
+        raise RuntimeError('bad audio')
+
+    monkeypatch.setattr(TranscriptionWorker, '_process', process)
+    worker = TranscriptionWorker('tiny', device='cpu')
+    try:
+        result = worker.transcribe(tmp_path / 'a.mp3', tmp_path / 'a.json')
+    finally:
+        worker.stop(timeout=5)
+
+    assert result == {'ok': False, 'audio': str(tmp_path / 'a.mp3'), 'output': str(tmp_path / 'a.json'), 'error': 'bad audio'}
+    assert worker.processed == 0
+
+
+def test_get_worker_reuses_live_workers(monkeypatch):
+    monkeypatch.setattr(transcription_worker, '_workers', {})
+    try:
+        first = get_worker('tiny', device='cpu')
+        assert get_worker('tiny', device='cpu') is first
+        assert get_worker('base', device='cpu') is not first
+
+        first.stop(timeout=5)
+        replacement = get_worker('tiny', device='cpu')
+        assert replacement is not first and replacement.is_alive
+    finally:
+        shutdown_workers(timeout=5)
+
+
+def test_transcribe_route_runs_on_the_job_queue(app, client, tmp_path, monkeypatch, fake_whisperx):
+    from app.extensions import db
+    from app.models.script import Script
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, 'PROJECT_FOLDER', str(tmp_path))
+    monkeypatch.delenv('TRANSCRIPT_INDEX', raising=False)
+    monkeypatch.setattr(tasks, 'JOB_QUEUE', queue.Queue())
+    monkeypatch.setattr(transcription_worker, '_workers', {})
+    script = Script(title='Demo', alias='demo', acts='[]')
+    db.session.add(script)
+    db.session.commit()
+    episode = tmp_path / 'general' / f'{script.id}.demo'
+    episode.mkdir(parents=True)
+    (episode / 'audio.mp3').write_bytes(b'mp3')
+
+    res = client.post('/api/v1/transcripts/transcribe', json={'script_id': script.id, 'model': 'tiny'})
+    assert res.status_code == 202
+    job = tasks.JOB_QUEUE.get_nowait()
+    assert job['id'] == res.get_json()['job_id']
+    assert job['args'] == (str(episode / 'audio.mp3'), str(episode / 'audio.whisperx.json'), 'tiny')
+    assert tasks.decode_job(tasks.encode_job(job))['target'] is transcription_worker.transcribe_job  # redis-safe
+
+    try:
+        assert tasks.run_job(app, job, 'Test-Worker') == 'ok'
+    finally:
+        shutdown_workers(timeout=5)
+    assert (episode / 'audio.whisperx.json').exists()
+    hits = client.get(f'/api/v1/transcripts/search?q=chào&script_id={script.id}').get_json()['hits']
+    assert [h['episode'] for h in hits] == [episode.name]
+
+    assert client.post('/api/v1/transcripts/transcribe', json={}).status_code == 400
+    assert client.post('/api/v1/transcripts/transcribe', json={'script_id': 999}).status_code == 404
@@ -0,0 +1,114 @@
+import importlib.util
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.services import tts_engine
+from app.services.tts_engine import TTSEngine, TTSError, generate_episode_audio, plan_chunks, poll_with_backoff, read_timings
+
+
+def _script(lines_per_scene):
+    scenes = [{'dialogues': [{'character': 'A', 'line': line} for line in lines]} for lines in lines_per_scene]
+    return {'acts': [{'scenes': scenes[:1]}, {'scenes': scenes[1:]}]}
+
+
+class FakeProvider:
+    name = 'fake'
+
+    def __init__(self, fail_on=None):
+        self.submitted = []
+        self.polls = {}
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def submit(self, text, voice):
+        with self.lock:
+            self.submitted.append(text)
+            return f'task-{len(self.submitted)}|{text}'
+
+    def status(self, task_id):
+        with self.lock:
+            self.polls[task_id] = self.polls.get(task_id, 0) + 1
+            if self.polls[task_id] < 2:
+                return {'state': 'pending'}
+        if self.fail_on and self.fail_on in task_id:
+            return {'state': 'failed', 'error': 'quota'}
+        return {'state': 'done', 'audio_url': 'fake://' + task_id.split('|', 1)[1]}
+
+
+@pytest.fixture
+def fake_io(monkeypatch):
+    """Audio 'files' hold their text; duration = 0.1s per character."""
+    monkeypatch.setattr(tts_engine, 'download', lambda url, dest, session=None: dest.write_text(url[7:], encoding='utf-8'))
+    monkeypatch.setattr(tts_engine, 'probe_duration', lambda p: len(p.read_text(encoding='utf-8')) / 10)
+    monkeypatch.setattr(tts_engine, 'concat_audio', lambda paths, out, reencode=False: out.write_text(
+        '|'.join(p.read_text(encoding='utf-8') for p in paths), encoding='utf-8'))
+    monkeypatch.setattr(tts_engine, 'poll_with_backoff', lambda check, timeout: poll_with_backoff(check, timeout, sleep=lambda s: None))
+
+
+def test_plan_chunks_respects_scenes_and_limits():
+    long_line = 'Câu một rất dài. ' * 10
+    chunks = plan_chunks(_script([['a', 'b'], ['c', long_line.strip()]]), 'v', 'p', max_chars=60)
+    assert [c['scene'] for c in chunks][:2] == [1, 2]
+    assert chunks[0]['text'] == 'a\n\nb'
+    assert all(len(c['text']) <= 60 for c in chunks)
+    assert ''.join(c['text'] for c in chunks[1:]).count('Câu một rất dài.') == 10
+    assert chunks[0]['key'] != plan_chunks(_script([['a', 'b']]), 'other-voice', 'p')[0]['key']
+
+
+def test_poll_with_backoff_grows_interval():
+    sleeps = []
+    answers = iter([None, None, None, {'state': 'done'}])
+    assert poll_with_backoff(lambda: next(answers), timeout=60, initial=1, factor=2, sleep=sleeps.append) == {'state': 'done'}
+    assert len(sleeps) == 3 and sleeps[0] < sleeps[1] < sleeps[2]
+
+
+def test_generate_caches_chunks_and_writes_timings(tmp_path, fake_io):
+    provider = FakeProvider()
+    engine = TTSEngine(provider, cache_dir=tmp_path / 'cache', max_workers=3, rate=0)
+    ep = tmp_path / 'ep'
+
+    first = generate_episode_audio(ep, _script([['xin chào'], ['một', 'hai'], ['ba']]), engine, 'v1')
+    assert first['ok'] and first['chunks'] == 3 and first['synthesized'] == 3
+    assert (ep / 'audio.mp3').read_text(encoding='utf-8') == 'xin chào|một\n\nhai|ba'
+    timings = read_timings(ep)
+    assert timings['scenes'] == {'1': [0.0, 0.8], '2': [0.8, 1.6], '3': [1.6, 1.8]}
+
+    provider.submitted.clear()
+    second = generate_episode_audio(ep, _script([['xin chào'], ['một', 'HAI'], ['ba']]), engine, 'v1')
+    assert second['cached'] == 2 and provider.submitted == ['một\n\nHAI']
+
+    (ep / 'audio.mp3').write_text('edited elsewhere', encoding='utf-8')
+    assert read_timings(ep) is None
+
+
+def test_failed_chunk_raises(tmp_path, fake_io):
+    engine = TTSEngine(FakeProvider(fail_on='bad'), cache_dir=tmp_path / 'cache', rate=0)
+    with pytest.raises(TTSError, match='quota'):
+        generate_episode_audio(tmp_path / 'ep', _script([['ok'], ['bad']]), engine, 'v')
+
+
+def _align_scenes_script():
+    path = Path(__file__).resolve().parents[2] / 'scripts' / 'audio_align_scenes.py'
+    spec = importlib.util.spec_from_file_location('audio_align_scenes', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_scenes_align_from_timings_without_a_transcript(tmp_path, fake_io, monkeypatch):
+    ep = tmp_path / 'ep'
+    engine = TTSEngine(FakeProvider(), cache_dir=tmp_path / 'cache', rate=0)
+    generate_episode_audio(ep, _script([['xin chào'], ['một', 'hai'], ['ba']]), engine, 'v1')
+    (ep / 'capcut-api.json').write_text(json.dumps({'scenes': [{'narration': 'x'}] * 3}), encoding='utf-8')
+
+    align = _align_scenes_script()
+    monkeypatch.setattr(align, 'probe_duration', lambda p: 1.8)
+    monkeypatch.setattr(align, 'load_transcript', lambda p: pytest.fail('transcript should not be read'))
+    monkeypatch.setattr(align, 'find_scene_times', lambda *a: pytest.fail('text matching should not run'))
+
+    assert align.align_episode_scenes(ep) is True
+    scenes = json.loads((ep / 'capcut-api.json').read_text(encoding='utf-8'))['scenes']
+    assert [(s['start'], s['end']) for s in scenes] == [(0, 1), (1, 2), (2, 2)]
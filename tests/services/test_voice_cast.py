@@ -0,0 +1,49 @@
+from app.services.voice_cast import VoiceCast, cast_report, normalize_name, plan_cast_chunks, resolve_cast
+
+
+SCRIPT = {
+    'acts': [{'scenes': [
+        {'dialogues': [
+            {'character': 'Kể chuyện (giọng trầm, ấm)', 'line': 'Buổi sáng.'},
+            {'character': 'THIỀN SƯ MẶC ĐỨC', 'line': 'Ngồi xuống.'},
+            {'character': 'An', 'line': 'Vâng.'},
+        ]},
+        {'dialogues': [{'character': 'An', 'line': 'Con hiểu rồi.'}, {'character': 'An', 'line': 'Cảm ơn thầy.'}]},
+    ]}],
+}
+CONFIGS = {'voice_cast': {'default': 'narrator', 'characters': {'Mặc Đức': 'old-man', 'An': 'young-man', 'Bà Tư': 'x'}}}
+
+
+def test_normalize_and_match_speakers():
+    assert normalize_name('THIỀN SƯ Mặc Đức (60 tuổi)') == 'thien su mac duc'
+    cast = resolve_cast(CONFIGS, 'fallback')
+    assert cast.voice_for('THIỀN SƯ MẶC ĐỨC') == 'old-man'
+    assert cast.voice_for('an') == 'young-man'
+    # 'an' inside another word is not a match
+    assert cast.voice_for('Người bán hàng') == 'narrator'
+    assert resolve_cast({}, 'fallback').voice_for('An') == 'fallback'
+    assert VoiceCast('d', {'An': 'a', 'Bà An': 'b'}).voice_for('BÀ AN') == 'b'
+
+
+def test_plan_cast_chunks_one_voice_per_chunk():
+    cast = resolve_cast(CONFIGS, 'fallback')
+    chunks = plan_cast_chunks(SCRIPT, cast, 'p')
+    assert [(c['scene'], c['voice']) for c in chunks] == [
+        (1, 'narrator'), (1, 'old-man'), (1, 'young-man'), (2, 'young-man'), (2, 'young-man')]
+
+    packed = plan_cast_chunks(SCRIPT, cast, 'p', pack_lines=True)
+    assert len(packed) == 4 and packed[-1]['text'] == 'Con hiểu rồi.\n\nCảm ơn thầy.'
+
+    # Re-voicing one character changes only that character's cache keys
+    recast = plan_cast_chunks(SCRIPT, resolve_cast({'voice_cast': dict(CONFIGS['voice_cast'], characters={
+        'Mặc Đức': 'other', 'An': 'young-man'})}, 'fallback'), 'p')
+    changed = [c['speaker'] for c, r in zip(chunks, recast) if c['key'] != r['key']]
+    assert changed == ['THIỀN SƯ MẶC ĐỨC']
+
+
+def test_cast_report():
+    cast = resolve_cast(CONFIGS, 'fallback')
+    report = cast_report(cast, [{'name': 'Mặc Đức'}, {'name': 'An'}, {'name': 'Người kể chuyện'}], ['An', None])
+    assert report['voices'] == {'An': 'young-man'}
+    assert report['default_characters'] == ['Người kể chuyện']
+    assert report['unknown_cast'] == ['Bà Tư']
@@ -0,0 +1,73 @@
+import structlog
+
+from app.metrics import Histogram, add_timing, get_metrics
+
+
+def _make_script(title='T1', alias='a'):
+    from app.extensions import db
+    from app.models.script import Script
+
+    s = Script(title=title, alias=alias)
+    db.session.add(s)
+    db.session.commit()
+    return s.id
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram('demo_seconds', 'Demo.', ('endpoint',), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.observe(v, '/x')
+    lines = h.render()
+    assert 'demo_seconds_bucket{endpoint="/x",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{endpoint="/x",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{endpoint="/x",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{endpoint="/x"} 4' in lines
+    assert h.snapshot('/x') == {'count': 4, 'sum': 4.05}
+
+
+def test_requests_are_measured_per_endpoint(client):
+    sid = _make_script()
+    for _ in range(2):
+        res = client.get(f'/api/v1/scripts/{sid}')
+        assert res.status_code == 200
+    assert client.get('/no/such/page').status_code == 404
+
+    metrics = get_metrics(client.application)
+    endpoint = '/api/v1/scripts/<int:script_id>'
+    assert metrics.requests.snapshot('GET', endpoint, 200)['count'] == 2
+    assert metrics.requests.snapshot('GET', '<unmatched>', 404)['count'] == 1
+    # each script lookup issues at least one query
+    assert metrics.db_queries.snapshot(endpoint)['sum'] >= 2
+    assert metrics.response_size.snapshot(endpoint)['sum'] > 0
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/api/v1/scripts/<int:script_id>",status="200"} 2' in body
+    assert '# TYPE http_request_db_queries histogram' in body
+
+
+def test_server_timing_and_request_id(client):
+    captured = {}
+
+    @client.application.route('/_timed')
+    def timed():
+        add_timing('render', 0.002)
+        captured.update(structlog.contextvars.get_contextvars())
+        return 'ok'
+
+    res = client.get('/_timed', headers={'X-Request-ID': 'req-1'})
+    timing = res.headers['Server-Timing']
+    assert timing.startswith('app;dur=')
+    assert 'db;dur=' in timing and 'render;dur=2.0' in timing
+    assert res.headers['X-Request-ID'] == 'req-1'
+    assert captured['request_id'] == 'req-1'
+    assert 'request_id' not in structlog.contextvars.get_contextvars()
+
+
+def test_sampled_requests_are_profiled(app, client, tmp_path):
+    app.config.update(METRICS_PROFILE_SAMPLE_RATE=1.0, METRICS_PROFILE_DIR=str(tmp_path))
+    client.get('/api/v1/scripts')
+    profiles = list(get_metrics(app).profiles)
+    assert len(profiles) == 1
+    assert profiles[0]['endpoint'] == '/api/v1/scripts'
+    assert 'cumulative' in profiles[0]['top']
+    assert (tmp_path / profiles[0]['file'].rsplit('/', 1)[-1]).exists()
@@ -0,0 +1,58 @@
+import gzip
+import json
+
+from app.api.swagger_helpers import spec_fingerprint
+from app.cli.openapi_commands import init_openapi_commands
+
+
+def test_committed_spec_is_current(app):
+    with open(app.config['OPENAPI_SPEC_PATH'], encoding='utf-8') as f:
+        spec = json.load(f)
+    assert spec['x-source-fingerprint'] == spec_fingerprint(app), 'app/api/openapi.json is stale: run `flask openapi-build`'
+
+
+def test_build_command_includes_extras(app, tmp_path):
+    init_openapi_commands(app)
+    out = tmp_path / 'openapi.json'
+    result = app.test_cli_runner().invoke(args=['openapi-build', '--out', str(out)])
+    assert result.exit_code == 0, result.output
+
+    spec = json.loads(out.read_text(encoding='utf-8'))
+    list_params = spec['paths']['/api/v1/scripts']['get']['parameters']
+    assert {'page', 'pageSize', 'sortBy', 'sortOrder'} <= {p['name'] for p in list_params}
+    body = [p for p in spec['paths']['/api/v1/scripts']['post']['parameters'] if p['in'] == 'body'][0]
+    assert 'example' in body['schema']
+
+    check = app.test_cli_runner().invoke(args=['openapi-build', '--out', str(out), '--check'])
+    assert check.exit_code == 0, check.output
+
+
+def test_precompiled_spec_is_served_with_etag_and_gzip(app, client, tmp_path):
+    path = tmp_path / 'openapi.json'
+    path.write_text(json.dumps({'swagger': '2.0', 'paths': {}, 'x-source-fingerprint': spec_fingerprint(app)}), encoding='utf-8')
+    app.config['OPENAPI_SPEC_PATH'] = str(path)
+
+    res = client.get('/apispec_1.json')
+    assert res.status_code == 200
+    assert res.headers['X-Spec-Source'] == 'precompiled'
+    assert res.get_json()['paths'] == {}
+    assert app.swag._extras_applied is False
+
+    again = client.get('/apispec_1.json', headers={'If-None-Match': res.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    zipped = client.get('/apispec_1.json', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['ETag'] != res.headers['ETag']
+    assert gzip.decompress(zipped.data) == res.data
+
+
+def test_stale_spec_falls_back_to_dynamic(app, client, tmp_path):
+    path = tmp_path / 'openapi.json'
+    path.write_text(json.dumps({'paths': {}, 'x-source-fingerprint': 'stale'}), encoding='utf-8')
+    app.config['OPENAPI_SPEC_PATH'] = str(path)
+
+    res = client.get('/apispec_1.json')
+    assert res.headers['X-Spec-Source'] == 'dynamic'
+    assert '/api/v1/scripts' in res.get_json()['paths']
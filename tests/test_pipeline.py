@@ -0,0 +1,102 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / 'scripts'
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    # importable by name so the alignment process pool can pickle its functions
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    import audio_align_scenes
+
+    return audio_align_scenes
+
+
+@pytest.fixture
+def projects(tmp_path, monkeypatch):
+    from app.settings import settings
+
+    root = tmp_path / 'library'  # not <repo_root>/projects
+    root.mkdir()
+    monkeypatch.setattr(settings, 'PROJECT_FOLDER', str(root))
+    monkeypatch.delenv('TRANSCRIPT_INDEX', raising=False)
+    return root
+
+
+def _episode(root, name, words=None, transcribed=True):
+    ep = root / 'general' / name
+    ep.mkdir(parents=True)
+    (ep / 'audio.mp3').write_bytes(b'fake mp3 ' + name.encode())
+    (ep / 'capcut-api.json').write_text(json.dumps({'scenes': [{'narration': ' '.join(words or [])}]}), encoding='utf-8')
+    if words and transcribed:
+        _transcript(ep, words)
+    return ep
+
+
+def _transcript(ep, words):
+    timed = [{'word': w, 'start': i * 0.5, 'end': i * 0.5 + 0.4} for i, w in enumerate(words)]
+    segment = {'text': ' '.join(words), 'start': 0.0, 'end': timed[-1]['end'], 'words': timed}
+    (ep / 'audio.whisperx.json').write_text(json.dumps({'segments': [segment]}), encoding='utf-8')
+
+
+def test_pipeline_index_is_the_one_the_search_api_reads(client, pipeline, projects, tmp_path):
+    _episode(projects, '5.demo', ['xin', 'chào', 'các', 'bạn'])
+
+    result = pipeline.run_pipeline(align_only=True, repo_root=tmp_path, align_workers=1, index_transcripts=True)
+    assert result['ok'], result
+
+    data = client.get('/api/v1/transcripts/search?q=chào').get_json()
+    assert data['count'] == 1
+    assert data['hits'][0]['script_id'] == 5 and data['hits'][0]['episode'] == '5.demo'
+
+
+def test_alignment_streams_per_episode_and_failures_stay_isolated(pipeline, projects, tmp_path, monkeypatch):
+    words = ['ngày', 'xưa', 'có', 'một', 'ông', 'vua']
+    episodes = {name: _episode(projects, name, words, transcribed=False) for name in ('1.fast', '2.slow', '3.broken')}
+    fast_srt = episodes['1.fast'] / 'audio.whisperx.srt'
+    seen = {}
+
+    def fake_transcribe(job, dry_run, require_gpu):
+        name = job['dir'].name
+        if name == '3.broken':
+            return {'ok': False, 'job': job, 'error': 'docker exited with code 1'}
+        if name == '2.slow':
+            # still transcribing: the fast episode must already be post-processed
+            for _ in range(200):
+                if fast_srt.exists():
+                    break
+                threading.Event().wait(0.05)
+            seen['fast_aligned_first'] = fast_srt.exists()
+        _transcript(job['dir'], words)
+        return {'ok': True, 'job': job}
+
+    monkeypatch.setattr(pipeline, 'run_whisperx_job', fake_transcribe)
+    result = pipeline.run_pipeline(repo_root=tmp_path, parallel=3, align_workers=2, index_transcripts=False)
+
+    assert seen == {'fast_aligned_first': True}
+    assert result['ok'] is False
+    assert result['transcription']['total'] == 3 and result['transcription']['success'] == 2
+    assert [f['job']['dir'].name for f in result['transcription']['failures']] == ['3.broken']
+    assert result['aligned'] == 2 and result['alignment_failures'] == []
+    for name in ('1.fast', '2.slow'):
+        assert (episodes[name] / 'audio.whisperx.srt').exists()
+        assert json.loads((episodes[name] / 'capcut-api.json').read_text(encoding='utf-8'))['scenes'][0]['start'] == 0
+    assert not (episodes['3.broken'] / 'audio.whisperx.srt').exists()
+
+
+def test_pool_stage_timings_are_reported(pipeline, projects, tmp_path):
+    for name in ('1.a', '2.b'):
+        _episode(projects, name, ['xin', 'chào', 'các', 'bạn'])
+
+    result = pipeline.run_pipeline(align_only=True, repo_root=tmp_path, align_workers=2, index_transcripts=False)
+    assert result['ok'], result
+    assert set(result['timings']) == {'align.write_srt', 'align.find_scene_times'}
+    assert all(t['count'] == 2 and t['seconds'] >= 0 for t in result['timings'].values())
+
+    # nothing changed: no stage runs and nothing is counted again
+    result = pipeline.run_pipeline(align_only=True, repo_root=tmp_path, align_workers=2, index_transcripts=False)
+    assert all(t['count'] == 0 for t in result['timings'].values())
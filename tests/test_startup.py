@@ -0,0 +1,54 @@
+import pytest
+
+from app.startup import cli_command, needs_migrate, should_start_tasks
+
+
+@pytest.mark.parametrize('argv, expected', [
+    (['/venv/bin/flask', 'seed-prompts', '--create-tables'], 'seed-prompts'),
+    (['/venv/bin/flask', '--app', 'run', '--debug', 'run'], 'run'),
+    (['/venv/bin/flask', '-A', 'run', '-e', '.env', 'db', 'upgrade'], 'db'),
+    (['/usr/lib/python3/site-packages/flask/__main__.py', 'routes'], 'routes'),
+    (['/venv/bin/flask', '--help'], ''),
+    (['run.py'], None),
+    (['/venv/bin/gunicorn', 'run:app'], None),
+])
+def test_cli_command(argv, expected):
+    assert cli_command(argv) == expected
+
+
+def test_tasks_start_for_the_server_only(app):
+    app.config['TASKS_AUTOSTART'] = 'auto'
+    assert should_start_tasks(app, ['run.py'])
+    assert should_start_tasks(app, ['/venv/bin/flask', 'run'])
+    assert not should_start_tasks(app, ['/venv/bin/flask', 'seed-prompts'])
+
+    app.config['TASKS_AUTOSTART'] = '1'
+    assert should_start_tasks(app, ['/venv/bin/flask', 'seed-prompts'])
+    app.config['TASKS_AUTOSTART'] = '0'
+    assert not should_start_tasks(app, ['run.py'])
+
+
+def test_migrate_only_for_db_commands():
+    assert needs_migrate(['/venv/bin/flask', 'db', 'upgrade'])
+    assert not needs_migrate(['/venv/bin/flask', 'seed-prompts'])
+    assert needs_migrate(['/venv/bin/flask', '--help'])
+    assert not needs_migrate(['/venv/bin/gunicorn', 'run:app'])
+
+
+def test_startup_phases_are_recorded(app):
+    report = app.extensions['startup'].report()
+    assert {'config', 'extensions', 'blueprints', 'swagger', 'metrics'} <= set(report['phases'])
+    assert report['total_ms'] >= sum(report['phases'].values()) - 1
+
+
+def test_swagger_spec_is_built_on_first_request_and_cached(app, client):
+    app.config['OPENAPI_SPEC_PATH'] = ''  # no precompiled spec
+    assert app.swag._extras_applied is False
+
+    res = client.get('/apispec_1.json')
+    assert res.status_code == 200
+    assert app.swag._extras_applied is True
+    params = res.get_json()['paths']['/api/v1/scripts']['get']['parameters']
+    assert 'pageSize' in {p['name'] for p in params}
+
+    assert app.swag.get_apispecs('apispec_1') is app.swag.get_apispecs('apispec_1')
@@ -0,0 +1,236 @@
+import queue
+import threading
+
+import pytest
+import structlog
+
+import app.tasks as tasks
+from app.metrics import JOB_METRICS
+
+
+@pytest.fixture
+def job_queue(monkeypatch):
+    """A private queue so no worker thread (or other test) picks jobs up."""
+    q = queue.Queue()
+    monkeypatch.setattr(tasks, 'JOB_QUEUE', q)
+    return q
+
+
+class FakeRedis:
+    """The list, string and pub/sub commands the redis queue backend uses."""
+
+    def __init__(self):
+        self.lists, self.values, self.ttls, self.published = {}, {}, {}, []
+        self.cond = threading.Condition()
+
+    def lpush(self, key, value):
+        with self.cond:
+            self.lists.setdefault(key, []).insert(0, value)
+            self.cond.notify_all()
+
+    def brpop(self, key, timeout=0):
+        with self.cond:
+            self.cond.wait_for(lambda: self.lists.get(key), timeout)
+            items = self.lists.get(key)
+            return (key, items.pop()) if items else None
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def setex(self, key, ttl, value):
+        self.values[key], self.ttls[key] = value, ttl
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+@pytest.fixture
+def redis_queue(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(tasks, 'redis_client', fake)
+    monkeypatch.setattr(tasks, 'QUEUE_BACKEND', 'redis')
+    return fake
+
+
+def redis_job(job_id, value):
+    tasks.publish_job_update('test', job_id, {'status': 'done', 'value': value})
+
+
+def failing_redis_job():
+    raise RuntimeError('boom')
+
+
+def test_trace_id_travels_from_request_to_worker(app, client, job_queue):
+    seen = {}
+
+    def traced_job(value):
+        seen.update(structlog.contextvars.get_contextvars(), value=value)
+        return {'ok': True}
+
+    @app.route('/_enqueue')
+    def enqueue():
+        return tasks.enqueue_job(traced_job, 42)
+
+    res = client.get('/_enqueue', headers={'X-Request-ID': 'trace-abc'})
+    job = job_queue.get_nowait()
+    assert job['trace_id'] == 'trace-abc' and job['id'] == res.get_data(as_text=True)
+
+    before = JOB_METRICS.outcomes.value('traced_job', 'ok')
+    assert tasks.run_job(app, job, 'Test-Worker') == 'ok'
+    assert seen == {'trace_id': 'trace-abc', 'job_id': job['id'], 'job': 'traced_job', 'value': 42}
+    assert 'trace_id' not in structlog.contextvars.get_contextvars()
+    assert JOB_METRICS.outcomes.value('traced_job', 'ok') == before + 1
+    assert JOB_METRICS.wait.snapshot('traced_job')['count'] >= 1
+    assert tasks.WORKER_STATE['Test-Worker']['state'] == 'idle'
+
+
+def test_failed_jobs_are_retried_then_counted(app, job_queue):
+    calls = []
+
+    def flaky_job():
+        calls.append(1)
+        raise RuntimeError('boom')
+
+    tasks.enqueue_job(flaky_job, retries=1, retry_delay=0.01)
+    retries = JOB_METRICS.retries.value('flaky_job')
+    errors = JOB_METRICS.outcomes.value('flaky_job', 'error')
+
+    assert tasks.run_job(app, job_queue.get_nowait(), 'Test-Worker') == 'retried'
+    retried = job_queue.get(timeout=2)
+    assert retried['attempt'] == 1
+    assert tasks.run_job(app, retried, 'Test-Worker') == 'error'
+    assert len(calls) == 2
+    assert JOB_METRICS.retries.value('flaky_job') == retries + 1
+    assert JOB_METRICS.outcomes.value('flaky_job', 'error') == errors + 1
+
+
+def test_job_metrics_are_exported(client, job_queue):
+    tasks.enqueue_job(lambda: None)
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'job_queue_depth 1' in body
+    assert '# TYPE job_run_seconds histogram' in body
+    assert '# TYPE job_workers gauge' in body
+
+
+def test_jobs_round_trip_through_json_for_redis():
+    job = {'id': 'j1', 'name': '_reconcile_flags_job', 'target': tasks._reconcile_flags_job,
+           'args': ('a', 1), 'attempt': 0, 'enqueued': tasks.time.monotonic()}
+    decoded = tasks.decode_job(tasks.encode_job(job))
+    assert decoded['target'] is tasks._reconcile_flags_job
+    assert decoded['args'] == ('a', 1) and decoded['id'] == 'j1'
+
+    with pytest.raises(ValueError):
+        tasks.encode_job(dict(job, target=lambda: None))
+
+
+def test_stop_tasks_lets_workers_finish(app, job_queue, monkeypatch):
+    monkeypatch.setattr(tasks, 'BACKGROUND_JOBS', {})
+    done = []
+    tasks.enqueue_job(done.append, 'ran')
+    thread = tasks.threading.Thread(target=tasks.job_worker, args=(app,), name='Test-Stop-Worker', daemon=True)
+    tasks.BACKGROUND_JOBS['Test-Stop-Worker'] = thread
+    thread.start()
+    try:
+        job_queue.join()
+        assert tasks.stop_tasks(timeout=5)
+        assert done == ['ran'] and not thread.is_alive()
+    finally:
+        tasks.STOP_EVENT.clear()
+
+
+def test_separate_worker_needs_redis_queue(app):
+    from app.cli.serve_commands import init_serve_commands
+
+    init_serve_commands(app)
+    assert tasks.shared_job_state('vbee', 'missing') is None
+    result = app.test_cli_runner().invoke(args=['worker'])
+    assert result.exit_code != 0
+    assert 'JOB_QUEUE_BACKEND=redis' in result.output
+
+
+def test_redis_queue_runs_jobs_and_shares_their_state(app, redis_queue, monkeypatch):
+    monkeypatch.setattr(tasks, 'BACKGROUND_JOBS', {})
+    tasks.enqueue_job(redis_job, 'job-1', 'hello')
+    assert redis_queue.llen(tasks.REDIS_QUEUE_KEY) == 1
+    assert tasks.queue_depth() == 1
+
+    thread = threading.Thread(target=tasks.job_worker, args=(app,), name='Test-Redis-Worker', daemon=True)
+    tasks.BACKGROUND_JOBS['Test-Redis-Worker'] = thread
+    thread.start()
+    try:
+        for _ in range(200):
+            if tasks.shared_job_state('test', 'job-1'):
+                break
+            threading.Event().wait(0.01)
+        assert tasks.stop_tasks(timeout=5)
+    finally:
+        tasks.STOP_EVENT.clear()
+
+    assert tasks.shared_job_state('test', 'job-1') == {'status': 'done', 'value': 'hello'}
+    assert redis_queue.ttls['jobs:test:job-1'] == tasks.JOB_STATE_TTL
+    assert redis_queue.llen(tasks.REDIS_QUEUE_KEY) == 0
+    assert redis_queue.published[-1][0] == tasks.REDIS_CHANNEL
+
+
+def test_redis_queue_requeues_failed_jobs(app, redis_queue):
+    tasks.enqueue_job(failing_redis_job, retries=1, retry_delay=0.01)
+    job = tasks._next_job(timeout=0)
+    assert job['target'] is failing_redis_job and job['attempt'] == 0
+
+    assert tasks.run_job(app, job, 'Test-Worker') == 'retried'
+    retried = tasks._next_job(timeout=2)
+    assert retried is not None and retried['attempt'] == 1
+    assert tasks.run_job(app, retried, 'Test-Worker') == 'error'
+    assert tasks._next_job(timeout=0.05) is None
+
+
+def test_prefork_serve_needs_shared_job_state(app):
+    from app.cli.serve_commands import init_serve_commands
+    from app.server import check_processes
+
+    init_serve_commands(app)
+    result = app.test_cli_runner().invoke(args=['serve', '--processes', '2'])
+    assert result.exit_code != 0
+    assert 'JOB_QUEUE_BACKEND=redis' in result.output
+
+    check_processes(app, 1, None)
+    check_processes(app, 2, False)
+    app.config['JOB_QUEUE_BACKEND'] = 'redis'
+    check_processes(app, 2, None)
+
+
+def test_job_state_dicts_evict_finished_and_oldest_jobs(monkeypatch):
+    from collections import OrderedDict
+
+    monkeypatch.setattr(tasks, 'JOB_HISTORY_LIMIT', 3)
+    jobs = OrderedDict()
+    tasks.update_job_state(jobs, 'old', {'status': 'done', 'finished': tasks.time.time() - tasks.JOB_HISTORY_TTL - 1})
+    tasks.update_job_state(jobs, 'a', {'status': 'queued'})
+    assert list(jobs) == ['a']
+
+    state = tasks.update_job_state(jobs, 'a', {'status': 'failed'})
+    assert state['status'] == 'failed' and 'finished' in state
+    for job_id in ('b', 'c', 'd'):
+        tasks.update_job_state(jobs, job_id, {'status': 'running'})
+    assert list(jobs) == ['b', 'c', 'd']
+
+
+def test_worker_admin_listener_exposes_job_metrics_and_worker_threads(app, monkeypatch):
+    import requests
+
+    from app.server import start_admin_listener
+
+    app.config['ADMIN_TOKEN'] = 'secret'
+    monkeypatch.setitem(tasks.WORKER_STATE, 'Worker-Thread-1', {'state': 'idle', 'processed': 3, 'failed': 0})
+    server = start_admin_listener(app, '127.0.0.1', 0)
+    base = f'http://127.0.0.1:{server.effective_port}'
+    try:
+        assert 'job_queue_depth' in requests.get(base + '/metrics', timeout=5).text
+        threads = requests.get(base + '/api/v1/admin/threads', headers={'X-Admin-Token': 'secret'}, timeout=5).json()
+        assert 'Worker-Thread-1' in threads['workers']
+        assert requests.get(base + '/api/v1/scripts', timeout=5).status_code == 404
+    finally:
+        server.close()
@@ -23,3 +23,34 @@ def test_map_script_with_string_acts():
     script = {'id': 2, 'title': 'S2', 'acts': '[{"lines": [{"text":"line1"}]}]'}
     payload = map_script_to_vbee_payload(script)
     assert payload['blocks'][0]['elements'][0]['text'] == 'line1'
+
+
+def test_scene_dialogues_become_elements():
+    from app.services.vbee_adapter import script_source
+
+    script = {'id': 3, 'title': 'S3', 'acts': [{'id': 'a1', 'scenes': [
+        {'dialogues': [{'character': 'An', 'line': 'Chào'}, {'character': 'Bình', 'line': 'Xin chào'}]},
+        {'dialogues': [{'character': 'An', 'line': 'Đi thôi'}]},
+    ]}]}
+    block = map_script_to_vbee_payload(script)['blocks'][0]
+    assert block['characters'] == 3
+    assert block['elements'][1] == {'type': 'dialogue', 'text': 'Xin chào', 'speaker': 'Bình'}
+    assert script_source(script)['acts'] == script['acts']
+
+
+def test_payload_stream_matches_payload_and_splits_parts():
+    from app.services.vbee_adapter import PayloadStream, build_payload, plan_parts, script_source
+
+    acts = [{'id': f'a{i}', 'lines': [{'speaker': 'A', 'text': 'x' * 40}] * 50} for i in range(5)] + ['raw act']
+    source = script_source({'id': 4, 'title': 'Long', 'acts': acts})
+    parts = plan_parts(source, 'p1', max_blocks=4)
+    assert [(p['title'], p['start'], p['stop']) for p in parts] == [('Long (1/2)', 0, 4), ('Long (2/2)', 4, 6)]
+
+    for part in parts:
+        stream = PayloadStream(source, part, chunk_size=512)
+        chunks = list(stream)
+        assert len(chunks) > 1
+        assert json.loads(b''.join(chunks)) == build_payload(source, part)
+        # a second pass (HTTP retry) yields the same body
+        assert b''.join(stream) == b''.join(chunks)
+    assert stream.stats == {'blocks': 2, 'elements': 51, 'bytes': len(b''.join(chunks))}
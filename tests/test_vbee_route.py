@@ -1,31 +1,109 @@
-import json
-from unittest.mock import patch
+import pytest
 
-from app import create_app
 
+def _make_script(app, title='T1', alias='a'):
+    from app.extensions import db
+    from app.models.script import Script
 
-def test_create_project_from_script_route(client, monkeypatch):
-    # use the pytest 'client' fixture which has a fresh testing DB
+    s = Script(title=title, alias=alias)
+    db.session.add(s)
+    db.session.commit()
+    return s.id
+
+
+@pytest.fixture
+def inline_jobs(monkeypatch):
+    """Run enqueued jobs immediately instead of on the worker threads."""
+    import app.tasks as tasks
+
+    def run_now(target, *args):
+        target(*args)
+        return 'inline'
+
+    monkeypatch.setattr(tasks, 'enqueue_job', run_now)
+
+
+def test_create_project_from_script_route(client, fake_vbee):
+    sid = _make_script(client.application)
+
+    res = client.post('/api/v1/vbee/projects/create-from-script', json={'script_id': sid})
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data['id'] == 'proj-1'
+    assert data['title'] == 'T1'
+    assert fake_vbee.requests[0]['key'].startswith(f'script-{sid}-')
+
+
+def test_create_project_is_idempotent_and_retried(client, fake_vbee):
+    sid = _make_script(client.application)
+
+    fake_vbee.fail_next(2, status=503)
+    first = client.post('/api/v1/vbee/projects/create-from-script', json={'script_id': sid})
+    again = client.post('/api/v1/vbee/projects/create-from-script', json={'script_id': sid})
+
+    assert first.status_code == 200 and again.status_code == 200
+    assert first.get_json()['id'] == again.get_json()['id']
+    # two failed attempts + the retry that succeeded + the repeat
+    assert len(fake_vbee.requests) == 4
+    assert len(fake_vbee.projects) == 1
+    assert len({r['key'] for r in fake_vbee.requests}) == 1
+
+
+def test_client_is_shared_per_app(app, fake_vbee):
+    from app.services.vbee_service import get_vbee_service
+
+    assert get_vbee_service(app) is get_vbee_service(app)
+
+
+def test_batch_creates_one_project_per_script(client, fake_vbee, inline_jobs):
     app = client.application
+    ids = [_make_script(app, title=f'T{i}', alias=f'a{i}') for i in range(3)]
+
+    res = client.post('/api/v1/vbee/projects/batch', json={'script_ids': ids + [ids[0], 999]})
+    assert res.status_code == 202
+    jobs = res.get_json()['jobs']
+    assert set(jobs) == {str(i) for i in ids} | {'999'}
+
+    statuses = {sid: client.get(f'/api/v1/vbee/jobs/{job_id}').get_json() for sid, job_id in jobs.items()}
+    assert statuses['999']['status'] == 'failed'
+    assert all(statuses[str(i)]['status'] == 'done' for i in ids)
+    assert len(fake_vbee.projects) == 3
 
-    # Mock the service requests.post via requests.post called in VbeeService
-    fake_response = {'id': 'proj-123', 'title': 'script-1'}
 
-    with patch('requests.post') as mock_post:
-        mock_post.return_value.status_code = 200
-        mock_post.return_value.json.return_value = fake_response
+def test_batch_rejects_bad_input(client):
+    assert client.post('/api/v1/vbee/projects/batch', json={}).status_code == 400
+    assert client.post('/api/v1/vbee/projects/batch', json={'script_ids': ['x']}).status_code == 400
+    assert client.get('/api/v1/vbee/jobs/missing').status_code == 404
+
+
+def test_long_script_is_streamed_as_several_projects(client, fake_vbee):
+    import json
+
+    from app.extensions import db
+    from app.models.script import Script
+
+    app = client.application
+    app.config['VBEE_MAX_BLOCKS'] = 2
+    acts = [{'id': f'a{i}', 'scenes': [{'dialogues': [{'character': 'A', 'line': f'line {i}'}]}]} for i in range(5)]
+    s = Script(title='Long', alias='long', acts=json.dumps(acts))
+    db.session.add(s)
+    db.session.commit()
+
+    res = client.post('/api/v1/vbee/projects/create-from-script', json={'script_id': s.id})
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data['parts'] == 3
+    assert [p['title'] for p in data['projects']] == ['Long (1/3)', 'Long (2/3)', 'Long (3/3)']
+    assert fake_vbee.chunked == 3
+    assert [len(r['body']['blocks']) for r in fake_vbee.requests] == [2, 2, 1]
+    assert fake_vbee.requests[2]['body']['blocks'][0]['elements'][0]['text'] == 'line 4'
 
-        # We need a script in DB; create minimal script via the model
-        with app.app_context():
-            from app.extensions import db
-            from app.models.script import Script
 
-            s = Script(title='T1', alias='a')
-            db.session.add(s)
-            db.session.commit()
-            sid = s.id
+def test_dry_run_returns_payload_without_posting(client, fake_vbee):
+    from app.services.vbee_service import get_vbee_service
 
-        res = client.post('/api/v1/vbee/projects/create-from-script', json={'script_id': sid})
-        assert res.status_code == 200
-        data = res.get_json()
-        assert data['id'] == 'proj-123'
+    sid = _make_script(client.application)
+    result = get_vbee_service().create_project_from_script(sid, product='p', dry_run=True)
+    assert result['dry_run'] is True and result['parts'] == 1
+    assert result['payload']['product'] == 'p'
+    assert fake_vbee.requests == []